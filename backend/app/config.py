@@ -9,6 +9,52 @@ class Settings(BaseSettings):
     CORS_ORIGINS_STR: str = "http://localhost:3000"
     AUTH_PASSWORD: Optional[str] = None  # Optional password for API authentication
     
+    # Connection-Pool (SQLAlchemy QueuePool)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30  # Sekunden Wartezeit auf eine freie Verbindung
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_RECYCLE: int = 1800  # Sekunden, -1 = nie recyceln
+    DB_STATEMENT_TIMEOUT_MS: int = 0  # 0 = kein statement_timeout
+    
+    # Mehrere Datenbanken (PROD/DEMO): Konfiguration und Schließen ungenutzter Pools
+    DATABASES_CONFIG_PATH: str = "data/databases.json"
+    DB_ENGINE_IDLE_SECONDS: int = 600
+    
+    # Threads für CPU-lastige Berechnungen aus async Endpunkten
+    CALC_EXECUTOR_WORKERS: int = 4
+    
+    # Hintergrund-Jobs (z.B. Berechnungstests)
+    JOB_WORKERS: int = 2
+    # Parallele Testkategorien innerhalb eines Testlaufs
+    TEST_RUN_WORKERS: int = 4
+    
+    # Kalender-Index (Bestandsschutz-/Gründerphasen-Termine): spätestens nach
+    # dieser Zeit komplett neu aufbauen (fängt Änderungen außerhalb der API ab)
+    CALENDAR_INDEX_MAX_AGE_SECONDS: int = 3600
+    # Portfolio-Snapshot für Szenario-Vorschauen (wird bei Datenänderung ohnehin neu gebaut)
+    PORTFOLIO_SNAPSHOT_MAX_AGE_SECONDS: int = 3600
+    # Monte-Carlo-Forecast: Speicherbudget pro Lauf und Obergrenze der Pfade
+    MONTE_CARLO_MEMORY_MB: int = 512
+    MONTE_CARLO_MAX_PATHS: int = 10000
+    
+    # Request-Timing: Requests ab dieser Dauer (ms) werden strukturiert geloggt
+    REQUEST_TIMING_LOG_MS: int = 0
+    # Query-Counter: ab so vielen gleichen Statements pro Request wird ein N+1 geloggt
+    N_PLUS_ONE_THRESHOLD: int = 10
+    
+    # On-Demand-Profiling (X-Profile: 1 / ?profile=1, nur mit Admin-Token)
+    PROFILING_ENABLED: bool = False
+    PROFILING_MAX_CONCURRENT: int = 2
+    PROFILING_MAX_STORED: int = 20
+    PROFILING_SAMPLE_INTERVAL_MS: int = 5
+    
+    # Versions-Check (Docker Hub / docker CLI)
+    VERSION_CHECK_TTL_SECONDS: int = 3600
+    VERSION_CHECK_INTERVAL_MINUTES: int = 30
+    DOCKER_HUB_API_URL: str = "https://hub.docker.com/v2"
+    DOCKER_CLI: str = "docker"
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -1,7 +1,18 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, exc
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from app.config import settings
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional
+import asyncio
+import json
+import os
+import threading
+import time
 import logging
 
 logger = logging.getLogger(__name__)
@@ -9,9 +20,412 @@ logger = logging.getLogger(__name__)
 # Die Base muss global sein für Model-Definitionen
 Base = declarative_base()
 
-# Standard-Engine für die Datenbank
-engine = create_engine(settings.DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+class PoolWaitStats:
+    """
+    Sammelt Wartezeiten beim Auschecken von Verbindungen aus dem Pool.
+    Damit lässt sich unter Last unterscheiden, ob Latenz durch Pool-Engpässe
+    oder durch Berechnungen entsteht.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.last_wait_seconds = 0.0
+
+    def record(self, wait_seconds: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.total_wait_seconds += wait_seconds
+            self.last_wait_seconds = wait_seconds
+            if wait_seconds > self.max_wait_seconds:
+                self.max_wait_seconds = wait_seconds
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "total_wait_seconds": round(self.total_wait_seconds, 6),
+                "avg_wait_seconds": round(self.total_wait_seconds / attempts, 6) if attempts else 0.0,
+                "max_wait_seconds": round(self.max_wait_seconds, 6),
+                "last_wait_seconds": round(self.last_wait_seconds, 6),
+            }
+
+
+class _WaitInstrumentedPool:
+    """Mixin für Pools, das die Wartezeit jedes Checkouts misst"""
+
+    wait_stats: PoolWaitStats = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            if self.wait_stats is not None:
+                self.wait_stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        if self.wait_stats is not None:
+            self.wait_stats.record(time.perf_counter() - start)
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.wait_stats = self.wait_stats
+        return pool
+
+
+class InstrumentedQueuePool(_WaitInstrumentedPool, QueuePool):
+    """QueuePool (sync Engine) mit Checkout-Wartezeiten"""
+
+
+class InstrumentedAsyncQueuePool(_WaitInstrumentedPool, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool (asyncpg Engine) mit Checkout-Wartezeiten"""
+
+
+def get_engine_options() -> dict:
+    """
+    Gemeinsame Engine-Optionen aus den Settings (Pool-Größe, Overflow, Pre-Ping,
+    Recycle und statement_timeout).
+    """
+    options = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+    if settings.DB_STATEMENT_TIMEOUT_MS > 0:
+        options["connect_args"] = {
+            "options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"
+        }
+    return options
+
+
+def create_pooled_engine(url: str):
+    """Erstellt eine Engine mit instrumentiertem Connection-Pool"""
+    engine = create_engine(url, poolclass=InstrumentedQueuePool, **get_engine_options())
+    engine.pool.wait_stats = PoolWaitStats()
+    return engine
+
+
+def to_async_url(url: str) -> str:
+    """Wandelt eine postgresql:// URL in eine asyncpg-URL um"""
+    return make_url(url).set(drivername="postgresql+asyncpg").render_as_string(hide_password=False)
+
+
+def create_pooled_async_engine(url: str):
+    """
+    Erstellt eine asyncpg-Engine mit denselben Pool-Einstellungen wie die
+    sync Engine. asyncpg kennt kein libpq "options", daher wird der
+    statement_timeout über server_settings gesetzt.
+    """
+    options = get_engine_options()
+    options.pop("connect_args", None)
+    if settings.DB_STATEMENT_TIMEOUT_MS > 0:
+        options["connect_args"] = {
+            "server_settings": {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}
+        }
+    async_engine = create_async_engine(
+        to_async_url(url), poolclass=InstrumentedAsyncQueuePool, **options
+    )
+    async_engine.sync_engine.pool.wait_stats = PoolWaitStats()
+    return async_engine
+
+
+def get_pool_status(engine_to_inspect=None) -> dict:
+    """
+    Liefert den aktuellen Zustand des Connection-Pools:
+    Größe, belegte Verbindungen, Overflow und Checkout-Wartezeiten.
+    """
+    target = engine_to_inspect or engine
+    # AsyncEngine: Pool hängt an der darunterliegenden sync Engine
+    pool = getattr(target, "sync_engine", target).pool
+    if not isinstance(pool, QueuePool):
+        return {"pool_class": type(pool).__name__}
+
+    wait_stats = getattr(pool, "wait_stats", None)
+    return {
+        "pool_class": type(pool).__name__,
+        "pool_size": pool.size(),
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(0, pool.overflow()),
+        "capacity": pool.size() + settings.DB_MAX_OVERFLOW,
+        "wait": wait_stats.snapshot() if wait_stats else None,
+    }
+
+
+class DatabaseEngines:
+    """Sync- und Async-Engine samt Session-Factories für eine Datenbank"""
+
+    def __init__(self, database_id: str, db_name: str, sync_engine, async_engine_):
+        self.database_id = database_id
+        self.db_name = db_name
+        self.engine = sync_engine
+        self.async_engine = async_engine_
+        self.session_factory = sessionmaker(autocommit=False, autoflush=False, bind=sync_engine)
+        self.async_session_factory = async_sessionmaker(
+            async_engine_, class_=AsyncSession, autoflush=False, expire_on_commit=False
+        )
+        self.last_used = time.monotonic()
+
+    def touch(self):
+        self.last_used = time.monotonic()
+
+    def in_use(self) -> bool:
+        """Verbindungen ausgecheckt (dann wird der Pool nicht geschlossen)"""
+        return any(
+            isinstance(pool, QueuePool) and pool.checkedout() > 0
+            for pool in (self.engine.pool, self.async_engine.sync_engine.pool)
+        )
+
+
+class UnknownDatabaseError(ValueError):
+    """Datenbank-ID ist nicht in databases.json konfiguriert"""
+
+
+class EngineRegistry:
+    """
+    Eine Engine (mit Pool) pro konfigurierter Datenbank aus databases.json,
+    erst beim ersten Zugriff angelegt. Alle Datenbanken liegen auf demselben
+    Server wie DATABASE_URL, nur der Datenbankname unterscheidet sich.
+
+    Die Datenbank aus DATABASE_URL ist die primäre: ihre Engines sind
+    engine/async_engine, werden nie geschlossen und sind Fallback, wenn
+    databases.json fehlt. Welche Datenbank eine Anfrage verwendet, steht in
+    current_database_id (gesetzt von DatabaseRoutingMiddleware); ohne Angabe
+    gilt die aktive Datenbank.
+
+    Aktiv ist die primäre Datenbank, bis jemand per switch() (POST
+    /api/databases/switch) wechselt; das wird als "serving_database_id" in
+    databases.json gespeichert. Das ältere Feld "active_database_id" wird
+    für die Anzeige mitgeschrieben, aber nicht für das Routing gelesen -
+    sonst würde ein Deploy mit "demo" als aktivem Eintrag den
+    Produktivverkehr unbemerkt auf DEMO umleiten.
+    """
+
+    def __init__(self, base_url: str, config_path: str, primary_engine, primary_async_engine):
+        self.base_url = make_url(base_url)
+        self.config_path = config_path
+        self._lock = threading.RLock()
+        self._config_mtime: Optional[float] = None
+        self._config: dict = {}
+        self._engines: Dict[str, DatabaseEngines] = {}
+        self._active_override: Optional[str] = None
+        self.engine_created_hooks: List[Callable[[DatabaseEngines], None]] = []
+
+        self.primary_db_name = self.base_url.database
+        self.primary_id = next(
+            (d["id"] for d in self._load_config().get("databases", []) if d.get("db_name") == self.primary_db_name),
+            "default"
+        )
+        self._engines[self.primary_id] = DatabaseEngines(
+            self.primary_id, self.primary_db_name, primary_engine, primary_async_engine
+        )
+
+    # ---------- Konfiguration ----------
+
+    def _load_config(self) -> dict:
+        """databases.json lesen; bei Änderung der Datei neu laden (kein Neustart nötig)"""
+        try:
+            mtime = os.path.getmtime(self.config_path)
+        except OSError:
+            return {"databases": [], "active_database_id": None}
+        if mtime != self._config_mtime:
+            with open(self.config_path, encoding="utf-8") as f:
+                self._config = json.load(f)
+            self._config_mtime = mtime
+        return self._config
+
+    def databases(self) -> List[dict]:
+        """Konfigurierte Datenbanken; ohne databases.json nur die primäre"""
+        with self._lock:
+            configured = list(self._load_config().get("databases", []))
+        if not any(d["id"] == self.primary_id for d in configured):
+            configured.insert(0, {
+                "id": self.primary_id, "name": self.primary_db_name, "db_name": self.primary_db_name,
+                "is_system": True,
+            })
+        return configured
+
+    def _db_name(self, database_id: str) -> str:
+        for database in self.databases():
+            if database["id"] == database_id:
+                return database["db_name"]
+        raise UnknownDatabaseError(f"Unbekannte Datenbank: {database_id}")
+
+    def active_database_id(self) -> str:
+        if self._active_override:
+            return self._active_override
+        with self._lock:
+            active = self._load_config().get("serving_database_id")
+        return active if active and any(d["id"] == active for d in self.databases()) else self.primary_id
+
+    def resolve(self, database_id: Optional[str] = None) -> str:
+        """Explizite ID prüfen bzw. aktive Datenbank"""
+        if database_id is None:
+            return self.active_database_id()
+        self._db_name(database_id)
+        return database_id
+
+    def switch(self, database_id: str):
+        """Aktive Datenbank wechseln und in databases.json speichern"""
+        self._db_name(database_id)
+        with self._lock:
+            config = dict(self._load_config())
+            config["serving_database_id"] = database_id
+            config["active_database_id"] = database_id
+            config["databases"] = [
+                {**d, "is_active": d["id"] == database_id} for d in config.get("databases", [])
+            ]
+            if os.path.exists(self.config_path):
+                tmp_path = f"{self.config_path}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(config, f, indent=2)
+                os.replace(tmp_path, self.config_path)
+                self._config_mtime = None
+            self._active_override = None if os.path.exists(self.config_path) else database_id
+        logger.info(f"🔀 Active database switched to {database_id}")
+
+    def use_primary_if_missing(self, existing_db_names: List[str]):
+        """Beim Start: fehlt die aktive Datenbank auf dem Server, die primäre verwenden"""
+        active = self.active_database_id()
+        if self._db_name(active) not in existing_db_names:
+            logger.warning(f"⚠️ Active database '{active}' does not exist, using '{self.primary_id}'")
+            self._active_override = self.primary_id
+
+    # ---------- Engines ----------
+
+    def get(self, database_id: Optional[str] = None) -> DatabaseEngines:
+        """Engines der Datenbank (Standard: aktuelle Anfrage bzw. aktive Datenbank)"""
+        database_id = self.resolve(database_id or current_database_id.get())
+        entry = self._engines.get(database_id)
+        if entry is None:
+            with self._lock:
+                entry = self._engines.get(database_id)
+                if entry is None:
+                    db_name = self._db_name(database_id)
+                    url = self.base_url.set(database=db_name).render_as_string(hide_password=False)
+                    entry = DatabaseEngines(
+                        database_id, db_name, create_pooled_engine(url), create_pooled_async_engine(url)
+                    )
+                    for hook in self.engine_created_hooks:
+                        hook(entry)
+                    self._engines[database_id] = entry
+                    logger.info(f"🔌 Engine created for database {database_id} ({db_name})")
+        entry.touch()
+        return entry
+
+    def loaded(self) -> Dict[str, DatabaseEngines]:
+        return dict(self._engines)
+
+    def reset_pools(self, db_name: str):
+        """
+        Nach dem Austausch einer Datenbank (Restore mit Umbenennung): Pools
+        neu anlegen. Die alten Verbindungen wurden serverseitig beendet und
+        werden nur verworfen (close=False); neue gehen an die neue Datenbank.
+        """
+        with self._lock:
+            entries = [entry for entry in self._engines.values() if entry.db_name == db_name]
+        for entry in entries:
+            entry.engine.dispose(close=False)
+            entry.async_engine.sync_engine.dispose(close=False)
+            logger.info(f"🔌 Pools for database {entry.database_id} reset")
+
+    async def evict_idle(self, max_idle_seconds: float) -> List[str]:
+        """Pools unbenutzter Datenbanken schließen (nie die primäre und die aktive)"""
+        keep = {self.primary_id, self.active_database_id()}
+        now = time.monotonic()
+        with self._lock:
+            idle = [
+                entry for database_id, entry in self._engines.items()
+                if database_id not in keep and now - entry.last_used > max_idle_seconds and not entry.in_use()
+            ]
+            for entry in idle:
+                del self._engines[entry.database_id]
+        for entry in idle:
+            entry.engine.dispose()
+            await entry.async_engine.dispose()
+            logger.info(f"🔌 Idle engine for database {entry.database_id} disposed")
+        return [entry.database_id for entry in idle]
+
+    async def run_eviction(self, interval_seconds: float, max_idle_seconds: float):
+        """Hintergrund-Task auf dem Event-Loop: regelmäßig evict_idle"""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await self.evict_idle(max_idle_seconds)
+            except Exception as e:
+                logger.warning(f"⚠️ Engine eviction failed: {e}")
+
+
+# Datenbank der aktuellen Anfrage bzw. des aktuellen Jobs (None = aktive Datenbank)
+current_database_id: ContextVar[Optional[str]] = ContextVar("current_database_id", default=None)
+
+
+@contextmanager
+def use_database(database_id: Optional[str]):
+    """Innerhalb des Blocks auf die angegebene Datenbank zugreifen"""
+    token = current_database_id.set(database_id)
+    try:
+        yield
+    finally:
+        current_database_id.reset(token)
+
+
+class DatabaseScoped:
+    """
+    Ein Objekt pro Datenbank (z.B. prozessweite Caches). Attributzugriffe
+    gehen an das Objekt der Datenbank der aktuellen Anfrage.
+    """
+
+    def __init__(self, factory: Callable[[], object]):
+        self._factory = factory
+        self._instances: Dict[str, object] = {}
+        self._instances_lock = threading.Lock()
+
+    def for_database(self, database_id: Optional[str] = None):
+        database_id = engine_registry.resolve(database_id or current_database_id.get())
+        instance = self._instances.get(database_id)
+        if instance is None:
+            with self._instances_lock:
+                instance = self._instances.setdefault(database_id, self._factory())
+        return instance
+
+    def __getattr__(self, name: str):
+        return getattr(self.for_database(), name)
+
+
+class _RoutedSessionFactory:
+    """SessionLocal()/AsyncSessionLocal() auf der Engine der aktuellen Datenbank"""
+
+    def __init__(self, attribute: str):
+        self._attribute = attribute
+
+    def __call__(self, **kwargs):
+        return getattr(engine_registry.get(), self._attribute)(**kwargs)
+
+
+# Engines der primären Datenbank (DATABASE_URL)
+engine = create_pooled_engine(settings.DATABASE_URL)
+
+# Async-Engine (asyncpg) für lesende Endpunkte
+async_engine = create_pooled_async_engine(settings.DATABASE_URL)
+
+engine_registry = EngineRegistry(settings.DATABASE_URL, settings.DATABASES_CONFIG_PATH, engine, async_engine)
+
+SessionLocal = _RoutedSessionFactory("session_factory")
+AsyncSessionLocal = _RoutedSessionFactory("async_session_factory")
 
 
 def get_db():
@@ -23,3 +437,12 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """
+    Dependency für lesende Routes: AsyncSession auf der asyncpg-Engine.
+    Hält während des Wartens auf Postgres keinen Threadpool-Thread.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,8 +1,11 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import settings
-from app.database import engine, Base
+from app.database import engine, async_engine, Base, engine_registry
+from app.utils.database_routing import DatabaseRoutingMiddleware
+from app.utils.timing import ServerTimingMiddleware, TimedJSONResponse, install_db_timing
 from app import models
+import asyncio
 import logging
 import subprocess
 import os
@@ -17,7 +20,7 @@ logger.info(f"=== Contracts Backend v{BACKEND_VERSION} starting ===")
 logger.info("=" * 50)
 
 # Latest migration revision (used to stamp alembic_version for fresh installs)
-LATEST_MIGRATION = "017_add_backup_app_version"
+LATEST_MIGRATION = "020_add_backup_format"
 
 def initialize_database():
     """
@@ -62,11 +65,30 @@ def initialize_database():
         raise
 
 
+def verify_active_database():
+    """Aktive Datenbank aus databases.json muss auf dem Server existieren, sonst die primäre"""
+    from app.services.backup_service import list_database_names
+    
+    try:
+        engine_registry.use_primary_if_missing(list_database_names())
+        logger.info(f"🗄️ Active database: {engine_registry.active_database_id()}")
+    except Exception as e:
+        logger.warning(f"⚠️ Could not verify active database: {e}")
+
+
 # Initialize database on module load
 initialize_database()
+verify_active_database()
 
 # Initialize backup scheduler
-from app.services.scheduler_service import initialize_scheduler_from_db, shutdown_scheduler
+from app.services.scheduler_service import (
+    initialize_scheduler_from_db, shutdown_scheduler, schedule_version_check, schedule_ledger_close
+)
+from app.services.version_service import version_cache
+from app.services.executor import shutdown_calculation_executor
+from app.services.job_service import job_service, mark_interrupted_jobs
+from app.services.loop_monitor import loop_monitor
+from app.services.telemetry import install_telemetry, render_metrics
 
 def initialize_scheduler():
     """Initialize the backup scheduler after database is ready"""
@@ -79,9 +101,29 @@ app = FastAPI(
     title="Contract Management API",
     description="API für die Verwaltung von Verträgen und Provisionsberechnungen",
     version="1.0.49",
-    redirect_slashes=False  # Disable automatic redirects that cause port issues
+    redirect_slashes=False,  # Disable automatic redirects that cause port issues
+    default_response_class=TimedJSONResponse
+)
+
+# Request-Timing: DB-Zeit beider Engines erfassen, Server-Timing-Header setzen
+install_db_timing(engine)
+install_db_timing(async_engine.sync_engine)
+engine_registry.engine_created_hooks.append(
+    lambda entry: (install_db_timing(entry.engine), install_db_timing(entry.async_engine.sync_engine))
+)
+app.add_middleware(
+    ServerTimingMiddleware,
+    log_threshold_ms=settings.REQUEST_TIMING_LOG_MS,
+    debug_headers=settings.DEBUG,
+    n_plus_one_threshold=settings.N_PLUS_ONE_THRESHOLD
 )
 
+# Prometheus-Metriken (Latenz pro Route, Berechnungen, Pool, Event-Loop, Backups)
+install_telemetry()
+
+# Datenbank pro Anfrage (X-Database-Id / Cookie), innerhalb von CORS
+app.add_middleware(DatabaseRoutingMiddleware)
+
 # CORS Middleware
 app.add_middleware(
     CORSMiddleware,
@@ -103,11 +145,27 @@ def read_root():
 async def startup_event():
     """Initialize scheduler on startup"""
     initialize_scheduler()
+    mark_interrupted_jobs()
+    loop_monitor.start()
+    
+    # Versions-Check: Cache an den Event-Loop binden und im Hintergrund füllen
+    version_cache.bind_loop(asyncio.get_running_loop())
+    schedule_version_check(settings.VERSION_CHECK_INTERVAL_MINUTES)
+    schedule_ledger_close()
+    
+    # Pools nicht mehr verwendeter Datenbanken (PROD/DEMO) schließen
+    asyncio.get_running_loop().create_task(
+        engine_registry.run_eviction(60, settings.DB_ENGINE_IDLE_SECONDS)
+    )
+    asyncio.get_running_loop().create_task(version_cache.refresh())
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Shutdown scheduler gracefully"""
+    loop_monitor.stop()
     shutdown_scheduler()
+    shutdown_calculation_executor()
+    job_service.shutdown()
 
 @app.get("/health")
 def health_check():
@@ -117,6 +175,12 @@ def health_check():
 def api_health_check():
     return {"status": "healthy"}
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus scrape endpoint"""
+    payload, content_type = render_metrics()
+    return Response(content=payload, media_type=content_type)
+
 @app.get("/api/version")
 def get_version():
     """Get backend version information"""
@@ -125,7 +189,7 @@ def get_version():
         "version": BACKEND_VERSION
     }
 
-from app.routers import customers, contracts, settings, price_increases, commission_rates, analytics, auth, system, backups, tests
+from app.routers import customers, contracts, settings, price_increases, commission_rates, analytics, auth, system, backups, tests, scenarios, ledger, databases
 
 # Include routers
 app.include_router(auth.router, prefix="/api")
@@ -137,4 +201,7 @@ app.include_router(commission_rates.router)
 app.include_router(analytics.router, prefix="/api/analytics")
 app.include_router(backups.router, prefix="/api/backups")
 app.include_router(tests.router, prefix="/api/tests")
+app.include_router(scenarios.router, prefix="/api/scenarios")
+app.include_router(ledger.router, prefix="/api/ledger")
+app.include_router(databases.router, prefix="/api/databases")
 app.include_router(system.router)
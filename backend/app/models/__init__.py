@@ -4,5 +4,8 @@ from app.models.contract import Contract
 from app.models.settings import Settings
 from app.models.price_increase import PriceIncrease
 from app.models.commission_rate import CommissionRate
+from app.models.job import Job
+from app.models.commission_ledger import CommissionLedgerEntry, CommissionLedgerMonth
 
-__all__ = ["Base", "Customer", "Contract", "Settings", "PriceIncrease", "CommissionRate"]
+__all__ = ["Base", "Customer", "Contract", "Settings", "PriceIncrease", "CommissionRate", "Job",
+           "CommissionLedgerEntry", "CommissionLedgerMonth"]
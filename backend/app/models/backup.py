@@ -23,6 +23,12 @@ class BackupConfig(Base):
     # Retention
     max_backups = Column(Integer, default=7)  # Anzahl Backups die vorgehalten werden
     
+    # Format: "custom" (pg_dump -F c, eine Datei) oder "directory"
+    # (pg_dump -F d mit parallel_jobs Prozessen, gepackt als .tar.zst)
+    backup_format = Column(String, default="custom")
+    parallel_jobs = Column(Integer, default=4)  # -j für pg_dump (directory) und pg_restore
+    compression_level = Column(Integer, nullable=True)  # custom: 0-9 (gzip), directory: 1-19 (zstd); leer = Standard
+    
     # Status
     is_enabled = Column(Boolean, default=True)
     last_backup_at = Column(DateTime, nullable=True)
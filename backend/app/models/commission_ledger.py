@@ -0,0 +1,55 @@
+"""
+Provisions-Ledger
+Eine Zeile pro Vertrag und abgeschlossenem Monat: angepasste Beträge pro
+Typ, angewendete Provisionssätze und Preiserhöhungen sowie die Provision.
+Dazu pro Monat ein Abschluss-Eintrag (Prüfpfad der Auszahlungen).
+"""
+from sqlalchemy import Column, String, Float, DateTime, JSON, Integer, ForeignKey, UniqueConstraint
+from app.database import Base
+from datetime import datetime
+import uuid
+
+
+class CommissionLedgerEntry(Base):
+    __tablename__ = "commission_ledger"
+    __table_args__ = (
+        UniqueConstraint("contract_id", "period", name="uq_commission_ledger_contract_period"),
+    )
+    
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    contract_id = Column(String, ForeignKey("contracts.id", ondelete="CASCADE"), nullable=False, index=True)
+    customer_id = Column(String, ForeignKey("customers.id", ondelete="CASCADE"), nullable=False, index=True)
+    
+    # Abgeschlossener Monat "YYYY-MM" und Abrechnungstag des Vertrags darin
+    # (Vertragsbeginn + n Monate, wie in calculate_earnings_to_date)
+    period = Column(String, nullable=False, index=True)
+    accrual_date = Column(DateTime, nullable=False)
+    effective_status = Column(String, nullable=False)  # "active" oder "founder"
+    
+    # Beträge inkl. der angewendeten Preiserhöhungen
+    software_rental_amount = Column(Float, default=0)
+    software_care_amount = Column(Float, default=0)
+    apps_amount = Column(Float, default=0)
+    purchase_amount = Column(Float, default=0)
+    cloud_amount = Column(Float, default=0)
+    
+    commission_rate_id = Column(String, nullable=True)  # None = Standardsätze
+    rates = Column(JSON, default={})
+    applied_price_increase_ids = Column(JSON, default=[])
+    
+    commission = Column(Float, nullable=False, default=0)
+    computed_at = Column(DateTime, default=datetime.utcnow)
+
+
+class CommissionLedgerMonth(Base):
+    """Abschluss eines Monats; "stale" = wird nach einer Änderung neu berechnet"""
+    __tablename__ = "commission_ledger_months"
+    
+    period = Column(String, primary_key=True)  # "YYYY-MM"
+    status = Column(String, nullable=False, default="closed")  # "closed", "stale"
+    contract_count = Column(Integer, default=0)
+    total_commission = Column(Float, default=0)
+    closed_at = Column(DateTime, default=datetime.utcnow)
+    recomputed_at = Column(DateTime, nullable=True)
+    # Zeitpunkt der letzten Änderung, die den Monat ungültig gemacht hat
+    invalidated_at = Column(DateTime, nullable=True)
@@ -0,0 +1,31 @@
+"""
+Job Model
+Hintergrund-Jobs (z.B. Berechnungstests) mit Fortschritt und Ergebnis
+"""
+from sqlalchemy import Column, String, DateTime, JSON
+from sqlalchemy.sql import func
+from app.database import Base
+import uuid
+
+
+class Job(Base):
+    """
+    Ein Hintergrund-Job. Fortschritt und Ergebnis werden persistiert,
+    damit sie auch nach dem Request (oder einem Neustart) abrufbar sind.
+    """
+    __tablename__ = "jobs"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    job_type = Column(String, nullable=False, index=True)  # z.B. "calculation_tests"
+    
+    # "queued", "running", "succeeded", "failed", "cancelled"
+    status = Column(String, nullable=False, default="queued", index=True)
+    
+    params = Column(JSON, nullable=True)
+    progress = Column(JSON, default=[])  # Liste der Fortschritts-Events
+    result = Column(JSON, nullable=True)
+    error_message = Column(String, nullable=True)
+    
+    created_at = Column(DateTime, server_default=func.now())
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
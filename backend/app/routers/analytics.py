@@ -1,7 +1,13 @@
+import asyncio
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from app.database import get_db
+from typing import Dict, List, Optional
+from app.config import settings as app_settings
+from app.database import get_async_db, get_db
+from app.models.job import Job
 from app.models.contract import Contract
 from app.models.customer import Customer
 from app.models.settings import Settings
@@ -9,16 +15,33 @@ from app.models.price_increase import PriceIncrease
 from app.models.commission_rate import CommissionRate
 from app.services.forecast import generate_forecast, calculate_forecast_kpis
 from app.services.metrics import calculate_customer_metrics
-from app.schemas.analytics import DashboardSummary, TopCustomer, Forecast, ForecastMonth
+from app.services.executor import run_calculation
+from app.services.calendar_index import calendar_index, EVENT_TYPES
+from app.services.portfolio_engine import snapshot_cache, exit_payout_curve, load_customer_names
+from app.services.monte_carlo import fit_churn_model, run_monte_carlo_job
+from app.services.waterfall import commission_waterfall
+from app.services.cohorts import cohort_report, PERIODS as COHORT_PERIODS, LAYOUTS as COHORT_LAYOUTS
+from app.services.job_service import job_service, job_to_dict
+from app.services.commission_ledger import load_ledger_balances
+from app.services.calculations import LedgerBalance
+from app.services.scenarios import naive_utc
+from app.utils.timing import span
+from app.schemas.analytics import (
+    DashboardSummary, TopCustomer, Forecast, ForecastMonth, ExitPayoutCurve, MonteCarloForecastRequest,
+    CohortReport, Waterfall
+)
 from app.utils.date_utils import add_months
+from app.services.profiler import ProfiledRoute
 from datetime import datetime
 
-router = APIRouter(tags=["analytics"])
+router = APIRouter(tags=["analytics"], route_class=ProfiledRoute)
+
+MONTE_CARLO_JOB_TYPE = "monte_carlo_forecast"
 
 @router.get("/dashboard", response_model=dict)
-def get_dashboard(
+async def get_dashboard(
     exit_date: Optional[str] = Query(None, description="Stichtag für Exit-Berechnung im Format YYYY-MM-DD"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Ruft die Dashboard-Übersicht auf.
@@ -27,10 +50,13 @@ def get_dashboard(
         exit_date: Optionales Datum für Exit-Zahlungs-Berechnung. 
                    Wenn nicht angegeben, wird das aktuelle Datum verwendet.
     """
-    customers = db.query(Customer).all()
-    settings = db.query(Settings).filter(Settings.id == "default").first()
-    price_increases = db.query(PriceIncrease).all()
-    commission_rates = db.query(CommissionRate).all()
+    with span("orm", exclude_db=True):
+        customers = (await db.execute(select(Customer))).scalars().all()
+        settings = (await db.execute(select(Settings).where(Settings.id == "default"))).scalars().first()
+        price_increases = (await db.execute(select(PriceIncrease))).scalars().all()
+        commission_rates = (await db.execute(select(CommissionRate))).scalars().all()
+        all_contracts = (await db.execute(select(Contract))).scalars().all()
+        ledger_balances = await load_ledger_balances(db)
     
     if not settings:
         raise HTTPException(status_code=500, detail="Einstellungen nicht konfiguriert")
@@ -45,6 +71,34 @@ def get_dashboard(
         except ValueError:
             raise HTTPException(status_code=400, detail="Ungültiges Datumsformat. Erwartet: YYYY-MM-DD")
     
+    # Verträge (in einer Abfrage geladen) nach Kunde gruppieren
+    contracts_by_customer: Dict[str, List[Contract]] = {}
+    for contract in all_contracts:
+        contracts_by_customer.setdefault(contract.customer_id, []).append(contract)
+    
+    dashboard = await run_calculation(
+        _build_dashboard,
+        customers, contracts_by_customer, settings, price_increases, commission_rates,
+        today, exit_calculation_date, ledger_balances
+    )
+    
+    return {
+        "status": "success",
+        "data": dashboard
+    }
+
+
+def _build_dashboard(
+    customers: List[Customer],
+    contracts_by_customer: Dict[str, List[Contract]],
+    settings: Settings,
+    price_increases: List[PriceIncrease],
+    commission_rates: List[CommissionRate],
+    today: datetime,
+    exit_calculation_date: datetime,
+    ledger_balances: Optional[Dict[str, LedgerBalance]] = None
+) -> DashboardSummary:
+    """Berechnet die Dashboard-Kennzahlen (läuft im Calculation-Executor)"""
     total_monthly_revenue = 0.0
     total_monthly_commission = 0.0
     total_exit_payout = 0.0
@@ -53,7 +107,7 @@ def get_dashboard(
     top_customers_data = []
     
     for customer in customers:
-        contracts = db.query(Contract).filter(Contract.customer_id == customer.id).all()
+        contracts = contracts_by_customer.get(customer.id, [])
         
         # Metriken für aktuelle Werte (Provision etc.) mit heutigem Datum
         metrics = calculate_customer_metrics(
@@ -62,7 +116,8 @@ def get_dashboard(
             settings=settings,
             price_increases=price_increases,
             commission_rates=commission_rates,
-            today=today
+            today=today,
+            ledger_balances=ledger_balances
         )
         
         # Metriken für Exit-Zahlungen mit dem gewählten Stichtag
@@ -72,7 +127,8 @@ def get_dashboard(
             settings=settings,
             price_increases=price_increases,
             commission_rates=commission_rates,
-            today=exit_calculation_date
+            today=exit_calculation_date,
+            ledger_balances=ledger_balances
         )
         
         total_monthly_revenue += metrics["total_monthly_revenue"]
@@ -99,30 +155,27 @@ def get_dashboard(
     total_monthly_net_income = total_monthly_commission * (1 - settings.personal_tax_rate / 100)
     total_exit_payout_net = total_exit_payout * (1 - settings.personal_tax_rate / 100)
     
-    dashboard = DashboardSummary(
-        total_customers=total_customers,
-        total_monthly_revenue=round(total_monthly_revenue, 2),
-        total_monthly_commission=round(total_monthly_commission, 2),
-        total_monthly_net_income=round(total_monthly_net_income, 2),
-        total_exit_payout=round(total_exit_payout, 2),
-        total_exit_payout_net=round(total_exit_payout_net, 2),
-        total_active_contracts=total_active_contracts,
-        average_commission_per_customer=round(average_commission, 2),
-        top_customers=top_customers
-    )
-    
-    return {
-        "status": "success",
-        "data": dashboard
-    }
+    with span("serialize"):
+        return DashboardSummary(
+            total_customers=total_customers,
+            total_monthly_revenue=round(total_monthly_revenue, 2),
+            total_monthly_commission=round(total_monthly_commission, 2),
+            total_monthly_net_income=round(total_monthly_net_income, 2),
+            total_exit_payout=round(total_exit_payout, 2),
+            total_exit_payout_net=round(total_exit_payout_net, 2),
+            total_active_contracts=total_active_contracts,
+            average_commission_per_customer=round(average_commission, 2),
+            top_customers=top_customers
+        )
 
 @router.get("/forecast")
-def get_forecast(months: int = 12, db: Session = Depends(get_db)):
+async def get_forecast(months: int = 12, db: AsyncSession = Depends(get_async_db)):
     """Ruft den 12-Monats-Provisions-Forecast auf"""
-    contracts = db.query(Contract).all()
-    settings = db.query(Settings).filter(Settings.id == "default").first()
-    price_increases = db.query(PriceIncrease).all()
-    commission_rates = db.query(CommissionRate).order_by(CommissionRate.valid_from).all()
+    with span("orm", exclude_db=True):
+        contracts = (await db.execute(select(Contract))).scalars().all()
+        settings = (await db.execute(select(Settings).where(Settings.id == "default"))).scalars().first()
+        price_increases = (await db.execute(select(PriceIncrease))).scalars().all()
+        commission_rates = (await db.execute(select(CommissionRate).order_by(CommissionRate.valid_from))).scalars().all()
     
     if not settings:
         raise HTTPException(status_code=500, detail="Einstellungen nicht konfiguriert")
@@ -133,7 +186,8 @@ def get_forecast(months: int = 12, db: Session = Depends(get_db)):
     # Gehe X Monate zurück
     start_date = add_months(start_date, -min(months, 36))
     
-    forecast_data = generate_forecast(
+    forecast_data = await run_calculation(
+        generate_forecast,
         contracts=contracts,
         settings=settings,
         price_increases=price_increases,
@@ -160,21 +214,300 @@ def get_forecast(months: int = 12, db: Session = Depends(get_db)):
         "data": forecast
     }
 
+@router.get("/exit-payout-curve", response_model=dict)
+async def get_exit_payout_curve(
+    from_date: Optional[str] = Query(None, description="Erster Stichtag (YYYY-MM-DD), Standard: heute"),
+    months: int = Query(60, ge=0, le=240, description="Zeitraum in Monaten"),
+    step_months: int = Query(1, ge=1, le=24),
+    dates: Optional[str] = Query(None, description="Kommagetrennte Stichtage (YYYY-MM-DD), ersetzt from_date/months"),
+    customer_id: List[str] = Query([], description="Verlauf für diese Kunden mitliefern"),
+    top_customers: int = Query(0, ge=0, le=100, description="Verlauf für die Top-N Kunden mitliefern"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Exit-Zahlung (gesamt und optional pro Kunde) für eine ganze Reihe von
+    Stichtagen in einem Durchlauf, z.B. monatlich über die nächsten 5 Jahre.
+    """
+    try:
+        if dates:
+            exit_dates = [datetime.strptime(d.strip(), "%Y-%m-%d") for d in dates.split(",") if d.strip()]
+        else:
+            start = datetime.strptime(from_date, "%Y-%m-%d") if from_date else datetime.utcnow().replace(
+                hour=0, minute=0, second=0, microsecond=0
+            )
+            exit_dates = [add_months(start, m) for m in range(0, months + 1, step_months)]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Ungültiges Datumsformat. Erwartet: YYYY-MM-DD")
+    if not exit_dates or len(exit_dates) > 500:
+        raise HTTPException(status_code=400, detail="Zwischen 1 und 500 Stichtage erlaubt")
+    
+    try:
+        snapshot = await snapshot_cache.get(db)
+    except ValueError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    curve = await run_calculation(exit_payout_curve, snapshot, exit_dates, customer_id, top_customers)
+    
+    names = await load_customer_names(db, [c["customer_id"] for c in curve["customers"]])
+    for customer in curve["customers"]:
+        customer["customer_name"] = names.get(customer["customer_id"], {}).get("name")
+    
+    return {
+        "status": "success",
+        "data": ExitPayoutCurve(**curve)
+    }
+
+@router.get("/waterfall", response_model=dict)
+async def get_commission_waterfall(
+    from_date: Optional[str] = Query(None, description="Eröffnungsmonat (YYYY-MM-DD), Standard: vor 12 Monaten"),
+    months: int = Query(12, ge=1, le=120),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Wasserfall der monatlichen Provision: pro Monat Eröffnungswert, Beiträge
+    (neue Verträge, Ende Existenzgründer-Phase, Preiserhöhungen,
+    Satzänderungen, beendete Verträge, Nachlauf) und Schlusswert.
+    """
+    try:
+        start = datetime.strptime(from_date, "%Y-%m-%d") if from_date else add_months(
+            datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0), -months
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Ungültiges Datumsformat. Erwartet: YYYY-MM-DD")
+    
+    try:
+        snapshot = await snapshot_cache.get(db)
+    except ValueError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    waterfall = await run_calculation(commission_waterfall, snapshot, start, months)
+    return {
+        "status": "success",
+        "data": Waterfall(**waterfall)
+    }
+
+@router.get("/cohorts", response_model=dict)
+async def get_cohorts(
+    period: str = Query("year", description="Kohorte nach Vertragsbeginn: year oder quarter"),
+    layout: str = Query("calendar", description="calendar: Kalendermonate, age: Monate seit Kohortenbeginn"),
+    from_date: Optional[str] = Query(None, description="Nur Kalendermonate ab diesem Datum (YYYY-MM-DD)"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Umsatz und Provision pro Kohorte (Vertragsbeginn nach Jahr/Quartal) und
+    Monat bis zum aktuellen Monat, jeweils absolut und als Retention.
+    """
+    if period not in COHORT_PERIODS:
+        raise HTTPException(status_code=400, detail=f"Ungültige Periode. Erlaubt: {', '.join(COHORT_PERIODS)}")
+    if layout not in COHORT_LAYOUTS:
+        raise HTTPException(status_code=400, detail=f"Ungültiges Layout. Erlaubt: {', '.join(COHORT_LAYOUTS)}")
+    try:
+        start = datetime.strptime(from_date, "%Y-%m-%d") if from_date else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Ungültiges Datumsformat. Erwartet: YYYY-MM-DD")
+    
+    try:
+        snapshot = await snapshot_cache.get(db)
+    except ValueError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    report = await run_calculation(cohort_report, snapshot, period, layout, datetime.utcnow(), start)
+    return {
+        "status": "success",
+        "data": CohortReport(**report)
+    }
+
+@router.get("/churn-model", response_model=dict)
+async def get_churn_model(db: AsyncSession = Depends(get_async_db)):
+    """Aus den Vertragsdaten geschätzte Kündigungs- und Verlängerungsraten (Basis des Monte-Carlo-Forecasts)"""
+    try:
+        snapshot = await snapshot_cache.get(db)
+    except ValueError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    model = await run_calculation(fit_churn_model, snapshot, datetime.utcnow())
+    return {
+        "status": "success",
+        "data": model.to_dict()
+    }
+
+@router.post("/monte-carlo", response_model=dict)
+async def start_monte_carlo_forecast(request: MonteCarloForecastRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    Startet einen Monte-Carlo-Forecast (P10/P50/P90 von Provision und
+    Exit-Zahlung pro Monat) als Hintergrund-Job.
+    Fortschritt: GET /monte-carlo/{job_id}/events, Ergebnis: GET /monte-carlo/{job_id}
+    """
+    if request.paths > app_settings.MONTE_CARLO_MAX_PATHS:
+        raise HTTPException(
+            status_code=400, detail=f"Maximal {app_settings.MONTE_CARLO_MAX_PATHS} Pfade erlaubt"
+        )
+    try:
+        snapshot = await snapshot_cache.get(db)
+    except ValueError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    start_date = naive_utc(request.start_date) if request.start_date else datetime.utcnow()
+    start_date = start_date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    params = {
+        "months": request.months,
+        "paths": request.paths,
+        "start_date": start_date.isoformat(),
+        "seed": request.seed,
+    }
+    # submit schreibt die Job-Zeile mit einer synchronen Session - nicht auf dem Event-Loop
+    job_id = await asyncio.to_thread(
+        job_service.submit,
+        MONTE_CARLO_JOB_TYPE,
+        lambda job: run_monte_carlo_job(
+            job, snapshot, start_date, request.months, request.paths,
+            app_settings.MONTE_CARLO_MEMORY_MB, request.seed
+        ),
+        params
+    )
+    return {
+        "status": "success",
+        "data": {"job_id": job_id, "status": "queued"}
+    }
+
+@router.get("/monte-carlo/{job_id}", response_model=dict)
+def get_monte_carlo_forecast(job_id: str, db: Session = Depends(get_db)):
+    """Status, Fortschritt und (wenn fertig) Ergebnis eines Monte-Carlo-Forecasts"""
+    job = db.query(Job).filter(Job.id == job_id, Job.job_type == MONTE_CARLO_JOB_TYPE).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {
+        "status": "success",
+        "data": job_to_dict(job)
+    }
+
+@router.get("/monte-carlo/{job_id}/events")
+def stream_monte_carlo_events(job_id: str, db: Session = Depends(get_db)):
+    """Fortschritts-Events eines Monte-Carlo-Forecasts als NDJSON-Stream"""
+    if not db.query(Job.id).filter(Job.id == job_id, Job.job_type == MONTE_CARLO_JOB_TYPE).first():
+        raise HTTPException(status_code=404, detail="Job not found")
+    return StreamingResponse(job_service.stream_events(job_id), media_type="application/x-ndjson")
+
+@router.post("/monte-carlo/{job_id}/cancel", response_model=dict)
+def cancel_monte_carlo_forecast(job_id: str):
+    """Bricht einen laufenden Monte-Carlo-Forecast nach dem aktuellen Block ab"""
+    if not job_service.cancel(job_id):
+        raise HTTPException(status_code=404, detail="Kein laufender Job mit dieser ID")
+    return {
+        "status": "success",
+        "data": {"job_id": job_id, "cancel_requested": True}
+    }
+
+@router.get("/calendar")
+def get_calendar(
+    from_date: Optional[str] = Query(None, description="Beginn des Zeitfensters (YYYY-MM-DD), Standard: heute"),
+    to_date: Optional[str] = Query(None, description="Ende des Zeitfensters exklusiv (YYYY-MM-DD)"),
+    months: int = Query(3, ge=1, le=120, description="Fensterlänge in Monaten, falls to_date fehlt"),
+    types: Optional[str] = Query(None, description="Kommagetrennt: price_increase, lock_in_end, founder_end"),
+    limit: int = Query(1000, ge=1, le=10000),
+    db: Session = Depends(get_db)
+):
+    """
+    Anstehende Termine im Zeitfenster: Preiserhöhungen, die für einen Vertrag
+    wirksam werden, Ende des Bestandsschutzes und Ende der Existenzgründer-Phase.
+    """
+    try:
+        start = datetime.strptime(from_date, "%Y-%m-%d") if from_date else datetime.utcnow().replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        end = datetime.strptime(to_date, "%Y-%m-%d") if to_date else add_months(start, months)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Ungültiges Datumsformat. Erwartet: YYYY-MM-DD")
+    
+    event_types = [t.strip() for t in types.split(",") if t.strip()] if types else None
+    unknown = [t for t in event_types or [] if t not in EVENT_TYPES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unbekannte Termin-Typen: {', '.join(unknown)}")
+    
+    calendar_index.ensure_loaded(db)
+    events = calendar_index.query(start, end, event_types, limit=limit + 1)
+    truncated = len(events) > limit
+    events = events[:limit]
+    
+    customer_ids = {event.customer_id for event in events}
+    customers = {
+        c.id: c for c in db.query(Customer).filter(Customer.id.in_(customer_ids)).all()
+    } if customer_ids else {}
+    descriptions = calendar_index.price_increase_descriptions()
+    
+    return {
+        "status": "success",
+        "data": {
+            "from_date": start.date().isoformat(),
+            "to_date": end.date().isoformat(),
+            "truncated": truncated,
+            "events": [
+                {
+                    "date": event.date.date().isoformat(),
+                    "type": event.event_type,
+                    "contract_id": event.contract_id,
+                    "customer_id": event.customer_id,
+                    "customer_name": f"{customers[event.customer_id].name} {customers[event.customer_id].name2 or ''}".strip()
+                    if event.customer_id in customers else None,
+                    "kundennummer": customers[event.customer_id].kundennummer if event.customer_id in customers else None,
+                    "price_increase_id": event.price_increase_id or None,
+                    "price_increase": descriptions.get(event.price_increase_id) if event.price_increase_id else None,
+                }
+                for event in events
+            ]
+        }
+    }
+
 @router.get("/customer/{customer_id}")
-def get_customer_analytics(customer_id: str, db: Session = Depends(get_db)):
+async def get_customer_analytics(customer_id: str, db: AsyncSession = Depends(get_async_db)):
     """Ruft detaillierte Analysen für einen Kunden auf"""
-    customer = db.query(Customer).filter(Customer.id == customer_id).first()
+    customer = (await db.execute(select(Customer).where(Customer.id == customer_id))).scalars().first()
     if not customer:
         raise HTTPException(status_code=404, detail="Kunde nicht gefunden")
     
-    contracts = db.query(Contract).filter(Contract.customer_id == customer_id).all()
-    settings = db.query(Settings).filter(Settings.id == "default").first()
-    price_increases = db.query(PriceIncrease).all()
-    commission_rates = db.query(CommissionRate).all()
+    contracts = (await db.execute(select(Contract).where(Contract.customer_id == customer_id))).scalars().all()
+    settings = (await db.execute(select(Settings).where(Settings.id == "default"))).scalars().first()
+    price_increases = (await db.execute(select(PriceIncrease))).scalars().all()
+    commission_rates = (await db.execute(select(CommissionRate))).scalars().all()
     
     if not settings:
         raise HTTPException(status_code=500, detail="Einstellungen nicht konfiguriert")
     
+    ledger_balances = await load_ledger_balances(db, [c.id for c in contracts])
+    metrics, contract_details = await run_calculation(
+        _build_customer_analytics, customer_id, contracts, settings, price_increases, commission_rates,
+        ledger_balances
+    )
+    
+    # Kundeninfo
+    customer_info = {
+        "id": customer.id,
+        "name": customer.name,
+        "kundennummer": customer.kundennummer,
+        "ort": customer.ort,
+        "plz": customer.plz,
+        "land": customer.land
+    }
+    
+    return {
+        "status": "success",
+        "data": {
+            "customer": customer_info,
+            "metrics": metrics,
+            "contracts": contract_details
+        }
+    }
+
+
+def _build_customer_analytics(
+    customer_id: str,
+    contracts: List[Contract],
+    settings: Settings,
+    price_increases: List[PriceIncrease],
+    commission_rates: List[CommissionRate],
+    ledger_balances: Optional[Dict[str, LedgerBalance]] = None
+):
+    """Berechnet Kunden- und Vertragsmetriken (läuft im Calculation-Executor)"""
     # Kundenmetriken
     metrics = calculate_customer_metrics(
         customer_id=customer_id,
@@ -182,7 +515,8 @@ def get_customer_analytics(customer_id: str, db: Session = Depends(get_db)):
         settings=settings,
         price_increases=price_increases,
         commission_rates=commission_rates,
-        today=datetime.utcnow()
+        today=datetime.utcnow(),
+        ledger_balances=ledger_balances
     )
     
     # Vertrag-Details mit Metriken
@@ -206,21 +540,4 @@ def get_customer_analytics(customer_id: str, db: Session = Depends(get_db)):
             "metrics": contract_metrics
         })
     
-    # Kundeninfo
-    customer_info = {
-        "id": customer.id,
-        "name": customer.name,
-        "kundennummer": customer.kundennummer,
-        "ort": customer.ort,
-        "plz": customer.plz,
-        "land": customer.land
-    }
-    
-    return {
-        "status": "success",
-        "data": {
-            "customer": customer_info,
-            "metrics": metrics,
-            "contracts": contract_details
-        }
-    }
+    return metrics, contract_details
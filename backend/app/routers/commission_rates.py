@@ -1,58 +1,64 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
-from app.database import get_db
+from app.database import get_async_db
 from app.models.commission_rate import CommissionRate as CommissionRateModel
 from app.schemas.commission_rate import CommissionRate, CommissionRateCreate, CommissionRateUpdate
+from app.services.commission_ledger import invalidate_for_rate_change
 
 router = APIRouter(prefix="/api/commission-rates", tags=["commission-rates"])
 
 @router.get("", response_model=list[CommissionRate])
-async def get_commission_rates(db: Session = Depends(get_db)):
+async def get_commission_rates(db: AsyncSession = Depends(get_async_db)):
     """Get all commission rates, ordered by valid_from (newest first)"""
-    rates = db.query(CommissionRateModel).order_by(
-        CommissionRateModel.valid_from.desc()
-    ).all()
-    return rates
+    result = await db.execute(
+        select(CommissionRateModel).order_by(CommissionRateModel.valid_from.desc())
+    )
+    return result.scalars().all()
 
 @router.get("/{rate_id}", response_model=CommissionRate)
-async def get_commission_rate(rate_id: str, db: Session = Depends(get_db)):
+async def get_commission_rate(rate_id: str, db: AsyncSession = Depends(get_async_db)):
     """Get a specific commission rate"""
-    rate = db.query(CommissionRateModel).filter(CommissionRateModel.id == rate_id).first()
+    result = await db.execute(
+        select(CommissionRateModel).where(CommissionRateModel.id == rate_id)
+    )
+    rate = result.scalars().first()
     if not rate:
         raise HTTPException(status_code=404, detail="Commission rate not found")
     return rate
 
 @router.post("", response_model=CommissionRate)
-async def create_commission_rate(rate: CommissionRateCreate, db: Session = Depends(get_db)):
+async def create_commission_rate(rate: CommissionRateCreate, db: AsyncSession = Depends(get_async_db)):
     """Create a new commission rate"""
-    # Check if a rate already exists for this date (or later)
-    existing = db.query(CommissionRateModel).filter(
-        CommissionRateModel.valid_from <= rate.valid_from
-    ).order_by(CommissionRateModel.valid_from.desc()).first()
-    
-    # We allow creating rates at any date, but warn if there's overlap
+    # We allow creating rates at any date, even if they overlap existing ones
     db_rate = CommissionRateModel(
         valid_from=rate.valid_from,
         rates=rate.rates,
         description=rate.description or ""
     )
     db.add(db_rate)
-    db.commit()
-    db.refresh(db_rate)
+    await db.commit()
+    await db.refresh(db_rate)
+    await invalidate_for_rate_change(db, db_rate.valid_from)
     return db_rate
 
 @router.put("/{rate_id}", response_model=CommissionRate)
 async def update_commission_rate(
     rate_id: str, 
     rate: CommissionRateUpdate, 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update a commission rate"""
-    db_rate = db.query(CommissionRateModel).filter(CommissionRateModel.id == rate_id).first()
+    result = await db.execute(
+        select(CommissionRateModel).where(CommissionRateModel.id == rate_id)
+    )
+    db_rate = result.scalars().first()
     if not db_rate:
         raise HTTPException(status_code=404, detail="Commission rate not found")
     
+    previous_valid_from = db_rate.valid_from
+    
     # Update fields
     if rate.valid_from is not None:
         db_rate.valid_from = rate.valid_from
@@ -62,23 +68,29 @@ async def update_commission_rate(
         db_rate.description = rate.description
     
     db_rate.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(db_rate)
+    await db.commit()
+    await db.refresh(db_rate)
+    await invalidate_for_rate_change(db, previous_valid_from, db_rate.valid_from)
     return db_rate
 
 @router.delete("/{rate_id}")
-async def delete_commission_rate(rate_id: str, db: Session = Depends(get_db)):
+async def delete_commission_rate(rate_id: str, db: AsyncSession = Depends(get_async_db)):
     """Delete a commission rate"""
-    db_rate = db.query(CommissionRateModel).filter(CommissionRateModel.id == rate_id).first()
+    result = await db.execute(
+        select(CommissionRateModel).where(CommissionRateModel.id == rate_id)
+    )
+    db_rate = result.scalars().first()
     if not db_rate:
         raise HTTPException(status_code=404, detail="Commission rate not found")
     
-    db.delete(db_rate)
-    db.commit()
+    valid_from = db_rate.valid_from
+    await db.delete(db_rate)
+    await db.commit()
+    await invalidate_for_rate_change(db, valid_from)
     return {"status": "success", "message": "Commission rate deleted"}
 
 @router.get("/effective/{date_str}", response_model=CommissionRate)
-async def get_effective_commission_rate(date_str: str, db: Session = Depends(get_db)):
+async def get_effective_commission_rate(date_str: str, db: AsyncSession = Depends(get_async_db)):
     """Get the commission rate that is effective on a given date (ISO format: YYYY-MM-DD)"""
     try:
         target_date = datetime.fromisoformat(date_str)
@@ -86,9 +98,13 @@ async def get_effective_commission_rate(date_str: str, db: Session = Depends(get
         raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
     
     # Find the most recent rate that is valid on or before the target date
-    rate = db.query(CommissionRateModel).filter(
-        CommissionRateModel.valid_from <= target_date
-    ).order_by(CommissionRateModel.valid_from.desc()).first()
+    result = await db.execute(
+        select(CommissionRateModel)
+        .where(CommissionRateModel.valid_from <= target_date)
+        .order_by(CommissionRateModel.valid_from.desc())
+        .limit(1)
+    )
+    rate = result.scalars().first()
     
     if not rate:
         raise HTTPException(status_code=404, detail="No commission rate found for this date")
@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from sqlalchemy import func as sql_func
-from typing import List
-from app.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func as sql_func, select
+from typing import Dict, List, Optional
+from app.database import get_db, get_async_db
 from app.models.contract import Contract
 from app.models.customer import Customer
 from app.models.price_increase import PriceIncrease
@@ -10,25 +11,31 @@ from app.models.commission_rate import CommissionRate
 from app.models.settings import Settings
 from app.schemas.contract import Contract as ContractSchema, ContractCreate, ContractUpdate, ContractMetrics, ContractWithDetails, ContractSearchResponse
 from app.services.metrics import calculate_contract_metrics
+from app.services.calculations import LedgerBalance
+from app.services.executor import run_calculation
+from app.utils.timing import span
+from app.services.profiler import ProfiledRoute
+from app.services.calendar_index import calendar_index
+from app.services.commission_ledger import load_ledger_balances, recompute_customers
 from datetime import datetime
 
-router = APIRouter(tags=["contracts"])
+router = APIRouter(tags=["contracts"], route_class=ProfiledRoute)
 
 
 @router.get("/last-modified")
-def get_last_modified(db: Session = Depends(get_db)):
+async def get_last_modified(db: AsyncSession = Depends(get_async_db)):
     """
     Gibt den Timestamp der letzten Vertragsänderung zurück.
     Wird verwendet um clientseitig gecachte Daten zu validieren.
     """
-    result = db.query(sql_func.max(Contract.updated_at)).scalar()
+    result = (await db.execute(select(sql_func.max(Contract.updated_at)))).scalar()
     if result:
         return {"lastModified": result.isoformat()}
     return {"lastModified": None}
 
 
 @router.get("/search", response_model=ContractSearchResponse)
-def search_contracts(
+async def search_contracts(
     search: str = "",
     sort_by: str = "customer",
     sort_direction: str = "asc",
@@ -39,32 +46,32 @@ def search_contracts(
     cloud: bool = True,
     skip: int = 0,
     limit: int = 1000,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Sucht und filtert Verträge mit Kundeninformationen und Metriken.
     Berechnet alle Metriken in einem einzigen Aufruf für maximale Performance.
     """
-    from app.services.metrics import calculate_contract_metrics, get_customer_first_contract_date
-    from app.utils.date_utils import months_between
     from sqlalchemy import or_, func
     
     # Lade alle notwendigen Daten einmalig
-    settings = db.query(Settings).filter(Settings.id == "default").first()
+    with span("orm", exclude_db=True):
+        settings = (await db.execute(select(Settings).where(Settings.id == "default"))).scalars().first()
+        price_increases = (await db.execute(select(PriceIncrease))).scalars().all()
+        commission_rates = (await db.execute(select(CommissionRate).order_by(CommissionRate.valid_from))).scalars().all()
+    
     if not settings:
         raise HTTPException(status_code=500, detail="Einstellungen nicht konfiguriert")
     
-    price_increases = db.query(PriceIncrease).all()
-    commission_rates = db.query(CommissionRate).order_by(CommissionRate.valid_from).all()
     today = datetime.utcnow()
     
     # Basis-Query mit Customer-Join
-    query = db.query(Contract, Customer).join(Customer, Contract.customer_id == Customer.id)
+    query = select(Contract, Customer).join(Customer, Contract.customer_id == Customer.id)
     
     # Suchfilter
     if search:
         search_term = f"%{search.lower()}%"
-        query = query.filter(
+        query = query.where(
             or_(
                 func.lower(Customer.name).like(search_term),
                 func.lower(Customer.name2).like(search_term),
@@ -76,7 +83,54 @@ def search_contracts(
         )
     
     # Hole alle Ergebnisse für Filterung und Metriken-Berechnung
-    all_results = query.all()
+    with span("orm", exclude_db=True):
+        all_results = (await db.execute(query)).all()
+        ledger_balances = await load_ledger_balances(
+            db, [contract.id for contract, _ in all_results] if search else None
+        )
+    
+    return await run_calculation(
+        _build_contract_search_response,
+        all_results, settings, price_increases, commission_rates, today,
+        ledger_balances=ledger_balances,
+        sort_by=sort_by,
+        sort_direction=sort_direction,
+        amount_filters={
+            "software_rental": software_rental,
+            "software_care": software_care,
+            "apps": apps,
+            "purchase": purchase,
+            "cloud": cloud,
+        },
+        skip=skip,
+        limit=limit
+    )
+
+
+def _build_contract_search_response(
+    all_results: List,
+    settings: Settings,
+    price_increases: List[PriceIncrease],
+    commission_rates: List[CommissionRate],
+    today: datetime,
+    sort_by: str,
+    sort_direction: str,
+    amount_filters: dict,
+    skip: int,
+    limit: int,
+    ledger_balances: Optional[Dict[str, LedgerBalance]] = None
+) -> ContractSearchResponse:
+    """
+    Filtert, berechnet Metriken, sortiert und paginiert die Suchergebnisse.
+    Läuft im Calculation-Executor.
+    """
+    from app.services.metrics import calculate_contract_metrics, get_customer_first_contract_date
+    
+    software_rental = amount_filters["software_rental"]
+    software_care = amount_filters["software_care"]
+    apps = amount_filters["apps"]
+    purchase = amount_filters["purchase"]
+    cloud = amount_filters["cloud"]
     
     # Gruppiere Verträge nach Kunde für Bestandsschutz-Berechnung
     customer_contracts: dict = {}
@@ -116,7 +170,8 @@ def search_contracts(
             price_increases=price_increases,
             commission_rates=commission_rates,
             today=today,
-            customer_first_contract_date=customer_first_contract_date
+            customer_first_contract_date=customer_first_contract_date,
+            ledger_balance=ledger_balances.get(contract.id) if ledger_balances else None
         )
         
         contracts_with_details.append({
@@ -192,35 +247,36 @@ def search_contracts(
     # Pagination
     paginated = contracts_with_details[skip:skip + limit]
     
-    return ContractSearchResponse(
-        contracts=[ContractWithDetails(**c) for c in paginated],
-        total=total_count,
-        total_revenue=round(total_revenue, 2),
-        total_commission=round(total_commission, 2),
-        total_exit_payout=round(total_exit_payout, 2)
-    )
+    with span("serialize"):
+        return ContractSearchResponse(
+            contracts=[ContractWithDetails(**c) for c in paginated],
+            total=total_count,
+            total_revenue=round(total_revenue, 2),
+            total_commission=round(total_commission, 2),
+            total_exit_payout=round(total_exit_payout, 2)
+        )
 
 
 @router.get("", response_model=List[ContractSchema])
-def list_contracts(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def list_contracts(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_async_db)):
     """Ruft alle Verträge auf"""
-    contracts = db.query(Contract).offset(skip).limit(limit).all()
-    return contracts
+    result = await db.execute(select(Contract).offset(skip).limit(limit))
+    return result.scalars().all()
 
 @router.get("/customer/{customer_id}", response_model=List[ContractSchema])
-def get_contracts_by_customer(customer_id: str, db: Session = Depends(get_db)):
+async def get_contracts_by_customer(customer_id: str, db: AsyncSession = Depends(get_async_db)):
     """Ruft alle Verträge eines Kunden auf mit effektivem Status"""
     from app.services.calculations import get_effective_status
     
     # Prüfe ob Kunde existiert
-    customer = db.query(Customer).filter(Customer.id == customer_id).first()
+    customer = (await db.execute(select(Customer).where(Customer.id == customer_id))).scalars().first()
     if not customer:
         raise HTTPException(status_code=404, detail="Kunde nicht gefunden")
     
-    settings = db.query(Settings).filter(Settings.id == "default").first()
+    settings = (await db.execute(select(Settings).where(Settings.id == "default"))).scalars().first()
     today = datetime.utcnow()
     
-    contracts = db.query(Contract).filter(Contract.customer_id == customer_id).all()
+    contracts = (await db.execute(select(Contract).where(Contract.customer_id == customer_id))).scalars().all()
     
     # Konvertiere zu Dict mit effektivem Status
     result = []
@@ -251,15 +307,15 @@ def get_contracts_by_customer(customer_id: str, db: Session = Depends(get_db)):
     return result
 
 @router.get("/{contract_id}", response_model=ContractSchema)
-def get_contract(contract_id: str, db: Session = Depends(get_db)):
+async def get_contract(contract_id: str, db: AsyncSession = Depends(get_async_db)):
     """Ruft einen einzelnen Vertrag auf mit effektivem Status"""
     from app.services.calculations import get_effective_status
     
-    contract = db.query(Contract).filter(Contract.id == contract_id).first()
+    contract = (await db.execute(select(Contract).where(Contract.id == contract_id))).scalars().first()
     if not contract:
         raise HTTPException(status_code=404, detail="Vertrag nicht gefunden")
     
-    settings = db.query(Settings).filter(Settings.id == "default").first()
+    settings = (await db.execute(select(Settings).where(Settings.id == "default"))).scalars().first()
     today = datetime.utcnow()
     effective_status, _ = get_effective_status(contract, settings, today)
     
@@ -310,6 +366,8 @@ def create_contract(contract: ContractCreate, db: Session = Depends(get_db)):
     db.add(db_contract)
     db.commit()
     db.refresh(db_contract)
+    calendar_index.upsert_contract(db_contract)
+    recompute_customers(db, [db_contract.customer_id])
     return db_contract
 
 @router.put("/{contract_id}", response_model=ContractSchema)
@@ -320,6 +378,7 @@ def update_contract(contract_id: str, contract_update: ContractUpdate, db: Sessi
         raise HTTPException(status_code=404, detail="Vertrag nicht gefunden")
     
     update_data = contract_update.dict(exclude_unset=True)
+    previous_customer_id = db_contract.customer_id
     
     # Konvertiere CHF zu EUR wenn nötig
     CHF_TO_EUR_RATE = 0.95
@@ -342,6 +401,8 @@ def update_contract(contract_id: str, contract_update: ContractUpdate, db: Sessi
     
     db.commit()
     db.refresh(db_contract)
+    calendar_index.upsert_contract(db_contract)
+    recompute_customers(db, {previous_customer_id, db_contract.customer_id})
     return db_contract
 
 @router.delete("/{contract_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -351,38 +412,45 @@ def delete_contract(contract_id: str, db: Session = Depends(get_db)):
     if not db_contract:
         raise HTTPException(status_code=404, detail="Vertrag nicht gefunden")
     
+    customer_id = db_contract.customer_id
     db.delete(db_contract)
     db.commit()
+    calendar_index.remove_contract(contract_id)
+    recompute_customers(db, [customer_id])
     return None
 
 @router.get("/{contract_id}/metrics")
-def get_contract_metrics(contract_id: str, db: Session = Depends(get_db)):
+async def get_contract_metrics(contract_id: str, db: AsyncSession = Depends(get_async_db)):
     """Berechnet Metriken für einen Vertrag"""
     from app.services.metrics import get_customer_first_contract_date
     
-    db_contract = db.query(Contract).filter(Contract.id == contract_id).first()
+    db_contract = (await db.execute(select(Contract).where(Contract.id == contract_id))).scalars().first()
     if not db_contract:
         raise HTTPException(status_code=404, detail="Vertrag nicht gefunden")
     
     # Lade alle notwendigen Daten
-    settings = db.query(Settings).filter(Settings.id == "default").first()
-    price_increases = db.query(PriceIncrease).all()
-    commission_rates = db.query(CommissionRate).order_by(CommissionRate.valid_from).all()
+    settings = (await db.execute(select(Settings).where(Settings.id == "default"))).scalars().first()
+    price_increases = (await db.execute(select(PriceIncrease))).scalars().all()
+    commission_rates = (await db.execute(select(CommissionRate).order_by(CommissionRate.valid_from))).scalars().all()
     
     if not settings:
         raise HTTPException(status_code=500, detail="Einstellungen nicht konfiguriert")
     
     # Ermittle das erste Vertragsdatum des Kunden für Bestandsschutz
-    customer_contracts = db.query(Contract).filter(Contract.customer_id == db_contract.customer_id).all()
+    customer_contracts = (await db.execute(
+        select(Contract).where(Contract.customer_id == db_contract.customer_id)
+    )).scalars().all()
     customer_first_contract_date = get_customer_first_contract_date(customer_contracts)
     
-    metrics_dict = calculate_contract_metrics(
+    metrics_dict = await run_calculation(
+        calculate_contract_metrics,
         contract=db_contract,
         settings=settings,
         price_increases=price_increases,
         commission_rates=commission_rates,
         today=datetime.utcnow(),
-        customer_first_contract_date=customer_first_contract_date
+        customer_first_contract_date=customer_first_contract_date,
+        ledger_balance=(await load_ledger_balances(db, [contract_id])).get(contract_id)
     )
     
     # Konvertiere zu Pydantic Model für camelCase Serialisierung
@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import or_, func, select
 from typing import List, Dict, Optional
-from app.database import get_db
+from app.database import get_db, get_async_db
 from app.models.customer import Customer
 from app.models.contract import Contract
 from app.models.price_increase import PriceIncrease
@@ -10,16 +11,62 @@ from app.models.commission_rate import CommissionRate
 from app.models.settings import Settings
 from app.schemas.customer import Customer as CustomerSchema, CustomerCreate, CustomerUpdate, CalculatedMetrics
 from app.services.metrics import calculate_customer_metrics
+from app.services.executor import run_calculation
+from app.services.profiler import ProfiledRoute
+from app.services.calendar_index import calendar_index
+from app.services.calculations import LedgerBalance
+from app.services.commission_ledger import load_ledger_balances, forget_customer
 from datetime import datetime
 
-router = APIRouter(tags=["customers"])
+router = APIRouter(tags=["customers"], route_class=ProfiledRoute)
+
+
+def _build_customers_with_metrics(
+    customers: List[Customer],
+    contracts_by_customer: Dict[str, List[Contract]],
+    settings: Settings,
+    price_increases: List[PriceIncrease],
+    commission_rates: List[CommissionRate],
+    today: datetime,
+    ledger_balances: Optional[Dict[str, LedgerBalance]] = None
+) -> List[Dict]:
+    """Berechnet die Metriken für eine Kundenliste (läuft im Calculation-Executor)"""
+    result = []
+    for customer in customers:
+        customer_contracts = contracts_by_customer.get(customer.id, [])
+        
+        metrics_dict = calculate_customer_metrics(
+            customer_id=customer.id,
+            contracts=customer_contracts,
+            settings=settings,
+            price_increases=price_increases,
+            commission_rates=commission_rates,
+            today=today,
+            ledger_balances=ledger_balances
+        )
+        
+        result.append({
+            "customer": CustomerSchema.model_validate(customer),
+            "metrics": CalculatedMetrics(**metrics_dict)
+        })
+    return result
+
+
+def _group_contracts_by_customer(contracts: List[Contract]) -> Dict[str, List[Contract]]:
+    """Gruppiert Verträge nach Kunde"""
+    contracts_by_customer: Dict[str, List[Contract]] = {}
+    for contract in contracts:
+        if contract.customer_id not in contracts_by_customer:
+            contracts_by_customer[contract.customer_id] = []
+        contracts_by_customer[contract.customer_id].append(contract)
+    return contracts_by_customer
 
 
 @router.get("/search")
-def search_customers(
+async def search_customers(
     q: str = Query(..., min_length=3, description="Suchbegriff (mind. 3 Zeichen)"),
     limit: int = Query(50, ge=1, le=200, description="Max. Ergebnisse"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Sucht Kunden nach Name, Kundennummer, Ort, PLZ oder Land.
@@ -28,20 +75,22 @@ def search_customers(
     """
     search_term = f"%{q.lower()}%"
     
-    customers = db.query(Customer).filter(
-        or_(
-            func.lower(Customer.name).like(search_term),
-            func.lower(Customer.name2).like(search_term),
-            func.lower(Customer.kundennummer).like(search_term),
-            func.lower(Customer.ort).like(search_term),
-            func.lower(Customer.plz).like(search_term),
-            func.lower(Customer.land).like(search_term),
-        )
-    ).limit(limit).all()
-    
-    settings = db.query(Settings).filter(Settings.id == "default").first()
-    price_increases = db.query(PriceIncrease).all()
-    commission_rates = db.query(CommissionRate).order_by(CommissionRate.valid_from).all()
+    customers = (await db.execute(
+        select(Customer).where(
+            or_(
+                func.lower(Customer.name).like(search_term),
+                func.lower(Customer.name2).like(search_term),
+                func.lower(Customer.kundennummer).like(search_term),
+                func.lower(Customer.ort).like(search_term),
+                func.lower(Customer.plz).like(search_term),
+                func.lower(Customer.land).like(search_term),
+            )
+        ).limit(limit)
+    )).scalars().all()
+    
+    settings = (await db.execute(select(Settings).where(Settings.id == "default"))).scalars().first()
+    price_increases = (await db.execute(select(PriceIncrease))).scalars().all()
+    commission_rates = (await db.execute(select(CommissionRate).order_by(CommissionRate.valid_from))).scalars().all()
     today = datetime.utcnow()
     
     if not settings:
@@ -49,32 +98,16 @@ def search_customers(
     
     # Lade alle Verträge der gefundenen Kunden auf einmal
     customer_ids = [c.id for c in customers]
-    all_contracts = db.query(Contract).filter(Contract.customer_id.in_(customer_ids)).all() if customer_ids else []
-    
-    # Gruppiere Verträge nach Kunde
-    contracts_by_customer: Dict[str, List[Contract]] = {}
-    for contract in all_contracts:
-        if contract.customer_id not in contracts_by_customer:
-            contracts_by_customer[contract.customer_id] = []
-        contracts_by_customer[contract.customer_id].append(contract)
-    
-    result = []
-    for customer in customers:
-        customer_contracts = contracts_by_customer.get(customer.id, [])
-        
-        metrics_dict = calculate_customer_metrics(
-            customer_id=customer.id,
-            contracts=customer_contracts,
-            settings=settings,
-            price_increases=price_increases,
-            commission_rates=commission_rates,
-            today=today
-        )
-        
-        result.append({
-            "customer": CustomerSchema.model_validate(customer),
-            "metrics": CalculatedMetrics(**metrics_dict)
-        })
+    all_contracts = (await db.execute(
+        select(Contract).where(Contract.customer_id.in_(customer_ids))
+    )).scalars().all() if customer_ids else []
+    ledger_balances = await load_ledger_balances(db, [c.id for c in all_contracts])
+    
+    result = await run_calculation(
+        _build_customers_with_metrics,
+        customers, _group_contracts_by_customer(all_contracts),
+        settings, price_increases, commission_rates, today, ledger_balances
+    )
     
     return {
         "status": "success",
@@ -84,47 +117,29 @@ def search_customers(
 
 
 @router.get("/with-metrics")
-def list_customers_with_metrics(skip: int = 0, limit: int = 10000, db: Session = Depends(get_db)):
+async def list_customers_with_metrics(skip: int = 0, limit: int = 10000, db: AsyncSession = Depends(get_async_db)):
     """
     Ruft alle Kunden mit ihren berechneten Metriken in einem einzigen Aufruf auf.
     Optimiert für Dashboard-Anzeige.
     """
-    customers = db.query(Customer).offset(skip).limit(limit).all()
-    settings = db.query(Settings).filter(Settings.id == "default").first()
-    price_increases = db.query(PriceIncrease).all()
-    commission_rates = db.query(CommissionRate).order_by(CommissionRate.valid_from).all()
+    customers = (await db.execute(select(Customer).offset(skip).limit(limit))).scalars().all()
+    settings = (await db.execute(select(Settings).where(Settings.id == "default"))).scalars().first()
+    price_increases = (await db.execute(select(PriceIncrease))).scalars().all()
+    commission_rates = (await db.execute(select(CommissionRate).order_by(CommissionRate.valid_from))).scalars().all()
     today = datetime.utcnow()
     
     if not settings:
         raise HTTPException(status_code=500, detail="Einstellungen nicht konfiguriert")
     
     # Lade alle Verträge auf einmal
-    all_contracts = db.query(Contract).all()
-    
-    # Gruppiere Verträge nach Kunde
-    contracts_by_customer: Dict[str, List[Contract]] = {}
-    for contract in all_contracts:
-        if contract.customer_id not in contracts_by_customer:
-            contracts_by_customer[contract.customer_id] = []
-        contracts_by_customer[contract.customer_id].append(contract)
+    all_contracts = (await db.execute(select(Contract))).scalars().all()
+    ledger_balances = await load_ledger_balances(db)
     
-    result = []
-    for customer in customers:
-        customer_contracts = contracts_by_customer.get(customer.id, [])
-        
-        metrics_dict = calculate_customer_metrics(
-            customer_id=customer.id,
-            contracts=customer_contracts,
-            settings=settings,
-            price_increases=price_increases,
-            commission_rates=commission_rates,
-            today=today
-        )
-        
-        result.append({
-            "customer": CustomerSchema.model_validate(customer),
-            "metrics": CalculatedMetrics(**metrics_dict)
-        })
+    result = await run_calculation(
+        _build_customers_with_metrics,
+        customers, _group_contracts_by_customer(all_contracts),
+        settings, price_increases, commission_rates, today, ledger_balances
+    )
     
     return {
         "status": "success",
@@ -133,15 +148,15 @@ def list_customers_with_metrics(skip: int = 0, limit: int = 10000, db: Session =
 
 
 @router.get("", response_model=List[CustomerSchema])
-def list_customers(skip: int = 0, limit: int = 10000, db: Session = Depends(get_db)):
+async def list_customers(skip: int = 0, limit: int = 10000, db: AsyncSession = Depends(get_async_db)):
     """Ruft alle Kunden auf"""
-    customers = db.query(Customer).offset(skip).limit(limit).all()
-    return customers
+    result = await db.execute(select(Customer).offset(skip).limit(limit))
+    return result.scalars().all()
 
 @router.get("/{customer_id}", response_model=CustomerSchema)
-def get_customer(customer_id: str, db: Session = Depends(get_db)):
+async def get_customer(customer_id: str, db: AsyncSession = Depends(get_async_db)):
     """Ruft einen einzelnen Kunden auf"""
-    customer = db.query(Customer).filter(Customer.id == customer_id).first()
+    customer = (await db.execute(select(Customer).where(Customer.id == customer_id))).scalars().first()
     if not customer:
         raise HTTPException(status_code=404, detail="Kunde nicht gefunden")
     return customer
@@ -188,33 +203,37 @@ def delete_customer(customer_id: str, db: Session = Depends(get_db)):
     if not db_customer:
         raise HTTPException(status_code=404, detail="Kunde nicht gefunden")
     
+    forget_customer(db, customer_id)
     db.delete(db_customer)
     db.commit()
+    calendar_index.remove_customer(customer_id)
     return None
 
 @router.get("/{customer_id}/metrics")
-def get_customer_metrics(customer_id: str, db: Session = Depends(get_db)):
+async def get_customer_metrics(customer_id: str, db: AsyncSession = Depends(get_async_db)):
     """Berechnet Metriken für einen Kunden"""
-    db_customer = db.query(Customer).filter(Customer.id == customer_id).first()
+    db_customer = (await db.execute(select(Customer).where(Customer.id == customer_id))).scalars().first()
     if not db_customer:
         raise HTTPException(status_code=404, detail="Kunde nicht gefunden")
     
     # Lade alle notwendigen Daten
-    contracts = db.query(Contract).filter(Contract.customer_id == customer_id).all()
-    settings = db.query(Settings).filter(Settings.id == "default").first()
-    price_increases = db.query(PriceIncrease).all()
-    commission_rates = db.query(CommissionRate).order_by(CommissionRate.valid_from).all()
+    contracts = (await db.execute(select(Contract).where(Contract.customer_id == customer_id))).scalars().all()
+    settings = (await db.execute(select(Settings).where(Settings.id == "default"))).scalars().first()
+    price_increases = (await db.execute(select(PriceIncrease))).scalars().all()
+    commission_rates = (await db.execute(select(CommissionRate).order_by(CommissionRate.valid_from))).scalars().all()
     
     if not settings:
         raise HTTPException(status_code=500, detail="Einstellungen nicht konfiguriert")
     
-    metrics_dict = calculate_customer_metrics(
+    metrics_dict = await run_calculation(
+        calculate_customer_metrics,
         customer_id=customer_id,
         contracts=contracts,
         settings=settings,
         price_increases=price_increases,
         commission_rates=commission_rates,
-        today=datetime.utcnow()
+        today=datetime.utcnow(),
+        ledger_balances=await load_ledger_balances(db, [c.id for c in contracts])
     )
     
     # Konvertiere zu Pydantic Model für camelCase Serialisierung
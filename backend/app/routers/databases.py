@@ -0,0 +1,155 @@
+"""
+Databases Router
+Konfigurierte Datenbanken (PROD/DEMO), Wechsel ohne Neustart und
+Vergleich der Bestände über alle Datenbanken
+"""
+import asyncio
+from typing import List
+from fastapi import APIRouter, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select
+
+from app.database import engine_registry, current_database_id, get_pool_status, UnknownDatabaseError
+from app.models.contract import Contract
+from app.models.customer import Customer
+from app.schemas.database_config import DatabaseConfig, DatabaseConfigList, SwitchDatabaseRequest
+from app.services import backup_service
+from app.services.database_diff import DIFF_TABLES, diff_databases, diff_as_ndjson
+from app.utils.database_routing import DATABASE_COOKIE
+
+router = APIRouter(tags=["databases"])
+
+
+def _database_list() -> DatabaseConfigList:
+    active_id = engine_registry.active_database_id()
+    databases = [
+        DatabaseConfig(
+            id=d["id"],
+            name=d.get("name", d["id"]),
+            color=d.get("color", "#3B82F6"),
+            db_name=d["db_name"],
+            is_active=d["id"] == active_id,
+            is_demo=d.get("is_demo", False),
+            is_system=d.get("is_system", False),
+        )
+        for d in engine_registry.databases()
+    ]
+    return DatabaseConfigList(
+        databases=databases,
+        active_database=next((d for d in databases if d.is_active), None)
+    )
+
+
+@router.get("", response_model=dict)
+def list_databases():
+    """Konfigurierte Datenbanken, die aktive und die Datenbank dieser Anfrage"""
+    return {
+        "status": "success",
+        "data": {
+            **_database_list().model_dump(by_alias=True),
+            "currentDatabaseId": engine_registry.resolve(current_database_id.get()),
+        }
+    }
+
+
+@router.post("/switch", response_model=dict)
+def switch_database(request: SwitchDatabaseRequest, response: Response):
+    """
+    Wechselt die Datenbank ohne Neustart: global (databases.json) oder nur
+    für diese Sitzung (Cookie database_id)
+    """
+    try:
+        db_name = engine_registry.get(request.database_id).db_name
+    except UnknownDatabaseError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    if not backup_service.database_exists(db_name):
+        raise HTTPException(status_code=400, detail=f"Datenbank '{db_name}' existiert nicht in PostgreSQL.")
+
+    if request.scope == "session":
+        response.set_cookie(DATABASE_COOKIE, request.database_id, httponly=True, samesite="lax")
+    else:
+        engine_registry.switch(request.database_id)
+        response.delete_cookie(DATABASE_COOKIE)
+    return {
+        "status": "success",
+        "data": {**_database_list().model_dump(by_alias=True), "currentDatabaseId": request.database_id}
+    }
+
+
+@router.get("/pools", response_model=dict)
+def get_database_pools():
+    """Pool-Zustand der geöffneten Engines pro Datenbank"""
+    return {
+        "status": "success",
+        "data": {
+            database_id: {
+                "db_name": entry.db_name,
+                "sync": get_pool_status(entry.engine),
+                "async": get_pool_status(entry.async_engine),
+            }
+            for database_id, entry in engine_registry.loaded().items()
+        }
+    }
+
+
+async def _database_summary(database_id: str) -> dict:
+    async with engine_registry.get(database_id).async_session_factory() as db:
+        customers = (await db.execute(select(func.count()).select_from(Customer))).scalar()
+        contracts, monthly_amount = (await db.execute(
+            select(
+                func.count(),
+                func.coalesce(func.sum(
+                    Contract.software_rental_amount + Contract.software_care_amount + Contract.apps_amount
+                    + Contract.purchase_amount + func.coalesce(Contract.cloud_amount, 0)
+                ), 0)
+            ).select_from(Contract)
+        )).one()
+    return {
+        "database_id": database_id,
+        "customers": customers,
+        "contracts": contracts,
+        "monthly_amount": round(float(monthly_amount), 2),
+    }
+
+
+@router.get("/compare", response_model=dict)
+async def compare_databases():
+    """
+    Kunden, Verträge und Vertragsbeträge aller vorhandenen Datenbanken
+    nebeneinander (parallel über die Pools der Registry)
+    """
+    existing = await asyncio.to_thread(backup_service.list_database_names)
+    database_ids = [d["id"] for d in engine_registry.databases() if d["db_name"] in existing]
+    summaries = await asyncio.gather(*(_database_summary(database_id) for database_id in database_ids))
+    return {
+        "status": "success",
+        "data": list(summaries)
+    }
+
+
+@router.get("/diff")
+def diff_databases_endpoint(
+    source: str = Query(..., description="Quell-Datenbank (ID), z.B. prod"),
+    target: str = Query(..., description="Ziel-Datenbank (ID), z.B. demo"),
+    tables: List[str] = Query(list(DIFF_TABLES), description="customers und/oder contracts"),
+    details: bool = Query(True, description="Geänderte Spalten nennen"),
+    include_timestamps: bool = Query(False, description="created_at/updated_at mit vergleichen"),
+):
+    """
+    Unterschiede zwischen zwei Datenbanken als NDJSON-Stream
+    (added/removed/changed pro Zeile, table_summary pro Tabelle)
+    """
+    unknown = [name for name in tables if name not in DIFF_TABLES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unbekannte Tabellen: {', '.join(unknown)}")
+    try:
+        source_engine = engine_registry.get(source).engine
+        target_engine = engine_registry.get(target).engine
+    except UnknownDatabaseError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    events = diff_databases(
+        source_engine, target_engine, tables, details,
+        ignore_columns=() if include_timestamps else ("created_at", "updated_at")
+    )
+    return StreamingResponse(diff_as_ndjson(events), media_type="application/x-ndjson")
@@ -0,0 +1,92 @@
+"""
+Ledger Router
+Provisions-Ledger: Monatsabschlüsse, Auszahlungshistorie pro Vertrag
+"""
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.database import get_async_db, get_db
+from app.models.commission_ledger import CommissionLedgerEntry, CommissionLedgerMonth
+from app.models.contract import Contract
+from app.models.job import Job
+from app.services.commission_ledger import LEDGER_JOB_TYPE, submit_ledger_job, months_to_dict, last_closable_period
+from app.services.job_service import job_to_dict
+from app.services.profiler import ProfiledRoute
+
+router = APIRouter(tags=["ledger"], route_class=ProfiledRoute)
+
+
+@router.post("/close", response_model=dict)
+def close_ledger_months(
+    until: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$", description="Letzter Monat (YYYY-MM), Standard: Vormonat")
+):
+    """Schließt offene Monate bzw. rechnet ungültige Monate neu (Hintergrund-Job)"""
+    if until and until > last_closable_period():
+        raise HTTPException(status_code=400, detail="Nur abgelaufene Monate können abgeschlossen werden")
+    job_id = submit_ledger_job(until)
+    return {
+        "status": "success",
+        "data": {"job_id": job_id, "status": "queued"}
+    }
+
+
+@router.get("/jobs/{job_id}", response_model=dict)
+def get_ledger_job(job_id: str, db: Session = Depends(get_db)):
+    """Status und Ergebnis eines Ledger-Jobs"""
+    job = db.query(Job).filter(Job.id == job_id, Job.job_type == LEDGER_JOB_TYPE).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {
+        "status": "success",
+        "data": job_to_dict(job)
+    }
+
+
+@router.get("/months", response_model=dict)
+async def list_ledger_months(db: AsyncSession = Depends(get_async_db)):
+    """Alle Monatsabschlüsse mit Anzahl Verträge und Provisionssumme"""
+    months = (await db.execute(
+        select(CommissionLedgerMonth).order_by(CommissionLedgerMonth.period.desc())
+    )).scalars().all()
+    return {
+        "status": "success",
+        "data": [months_to_dict(month) for month in months]
+    }
+
+
+@router.get("/contracts/{contract_id}", response_model=dict)
+async def get_contract_ledger(contract_id: str, db: AsyncSession = Depends(get_async_db)):
+    """Auszahlungshistorie eines Vertrags: eine Zeile pro abgeschlossenem Monat"""
+    if not (await db.execute(select(Contract.id).where(Contract.id == contract_id))).first():
+        raise HTTPException(status_code=404, detail="Vertrag nicht gefunden")
+    entries = (await db.execute(
+        select(CommissionLedgerEntry)
+        .where(CommissionLedgerEntry.contract_id == contract_id)
+        .order_by(CommissionLedgerEntry.period)
+    )).scalars().all()
+    return {
+        "status": "success",
+        "data": [
+            {
+                "period": entry.period,
+                "accrual_date": entry.accrual_date.isoformat(),
+                "effective_status": entry.effective_status,
+                "amounts": {
+                    "software_rental": entry.software_rental_amount,
+                    "software_care": entry.software_care_amount,
+                    "apps": entry.apps_amount,
+                    "purchase": entry.purchase_amount,
+                    "cloud": entry.cloud_amount,
+                },
+                "commission_rate_id": entry.commission_rate_id,
+                "rates": entry.rates,
+                "applied_price_increase_ids": entry.applied_price_increase_ids,
+                "commission": round(entry.commission, 2),
+                "computed_at": entry.computed_at.isoformat() if entry.computed_at else None,
+            }
+            for entry in entries
+        ]
+    }
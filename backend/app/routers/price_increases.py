@@ -1,8 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
-from app.database import get_db
+from app.database import get_db, get_async_db
 from app.models.price_increase import PriceIncrease
+from app.services.calendar_index import calendar_index
+from app.services.commission_ledger import invalidate_from
 from app.schemas.price_increase import (
     PriceIncrease as PriceIncreaseSchema,
     PriceIncreaseCreate,
@@ -12,25 +16,24 @@ from app.schemas.price_increase import (
 router = APIRouter(tags=["price-increases"])
 
 @router.get("", response_model=List[PriceIncreaseSchema])
-def list_price_increases(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def list_price_increases(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_async_db)):
     """Ruft alle Preiserhöhungen auf"""
-    price_increases = (
-        db.query(PriceIncrease)
+    result = await db.execute(
+        select(PriceIncrease)
         .order_by(PriceIncrease.valid_from.desc())
         .offset(skip)
         .limit(limit)
-        .all()
     )
-    return price_increases
+    return result.scalars().all()
 
 @router.get("/{price_increase_id}", response_model=PriceIncreaseSchema)
-def get_price_increase(price_increase_id: str, db: Session = Depends(get_db)):
+async def get_price_increase(price_increase_id: str, db: AsyncSession = Depends(get_async_db)):
     """Ruft eine einzelne Preiserhöhung auf"""
-    price_increase = (
-        db.query(PriceIncrease)
-        .filter(PriceIncrease.id == price_increase_id)
-        .first()
+    result = await db.execute(
+        select(PriceIncrease)
+        .where(PriceIncrease.id == price_increase_id)
     )
+    price_increase = result.scalars().first()
     if not price_increase:
         raise HTTPException(status_code=404, detail="Preiserhöhung nicht gefunden")
     return price_increase
@@ -42,6 +45,8 @@ def create_price_increase(price_increase: PriceIncreaseCreate, db: Session = Dep
     db.add(db_price_increase)
     db.commit()
     db.refresh(db_price_increase)
+    calendar_index.invalidate()
+    invalidate_from(db, db_price_increase.valid_from)
     return db_price_increase
 
 @router.put("/{price_increase_id}", response_model=PriceIncreaseSchema)
@@ -60,11 +65,14 @@ def update_price_increase(
         raise HTTPException(status_code=404, detail="Preiserhöhung nicht gefunden")
     
     update_data = price_increase_update.dict(exclude_unset=True)
+    previous_valid_from = db_price_increase.valid_from
     for field, value in update_data.items():
         setattr(db_price_increase, field, value)
     
     db.commit()
     db.refresh(db_price_increase)
+    calendar_index.invalidate()
+    invalidate_from(db, min(previous_valid_from, db_price_increase.valid_from))
     return db_price_increase
 
 @router.delete("/{price_increase_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -78,6 +86,9 @@ def delete_price_increase(price_increase_id: str, db: Session = Depends(get_db))
     if not db_price_increase:
         raise HTTPException(status_code=404, detail="Preiserhöhung nicht gefunden")
     
+    valid_from = db_price_increase.valid_from
     db.delete(db_price_increase)
     db.commit()
+    calendar_index.invalidate()
+    invalidate_from(db, valid_from)
     return None
@@ -0,0 +1,85 @@
+"""
+Scenario Router
+Was-wäre-wenn-Vorschauen auf dem ganzen Bestand (es wird nichts gespeichert)
+"""
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
+
+from app.database import get_async_db
+from app.schemas.scenario import PriceIncreaseScenarioRequest, CommissionRateScenarioRequest, ScenarioResult
+from app.services.executor import run_calculation
+from app.services.portfolio_engine import snapshot_cache, load_customer_names
+from app.services.scenarios import ContractPage, price_increase_scenario, commission_rate_scenario, naive_utc
+from app.services.profiler import ProfiledRoute
+
+router = APIRouter(tags=["scenarios"], route_class=ProfiledRoute)
+
+
+async def _get_snapshot(db: AsyncSession):
+    try:
+        return await snapshot_cache.get(db)
+    except ValueError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+async def _with_customer_names(db: AsyncSession, result: dict) -> dict:
+    rows = result["customers"] + result["contracts"]
+    names = await load_customer_names(db, list({row["customer_id"] for row in rows}))
+    for row in rows:
+        row.update({
+            "customer_name": names.get(row["customer_id"], {}).get("name"),
+            "kundennummer": names.get(row["customer_id"], {}).get("kundennummer"),
+        })
+    return result
+
+
+@router.post("/price-increase", response_model=dict)
+async def preview_price_increase(request: PriceIncreaseScenarioRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    Vorschau: Auswirkung einer oder mehrerer hypothetischer Preiserhöhungen
+    auf Umsatz, Provision und Exit-Zahlungen (gesamt, pro Kunde und seitenweise
+    pro Vertrag; gezielt über contractId bzw. customerId).
+    """
+    snapshot = await _get_snapshot(db)
+
+    evaluation_date = naive_utc(request.evaluation_date) if request.evaluation_date else max(
+        [datetime.utcnow()] + [naive_utc(p.valid_from) for p in request.price_increases]
+    )
+
+    result = await run_calculation(
+        price_increase_scenario, snapshot, request.price_increases, evaluation_date, request.top_customers,
+        ContractPage.from_request(request)
+    )
+    result = await _with_customer_names(db, result)
+
+    return {
+        "status": "success",
+        "data": ScenarioResult(**result)
+    }
+
+
+@router.post("/commission-rates", response_model=dict)
+async def preview_commission_rate(request: CommissionRateScenarioRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    Vorschau: Provision und Exit-Zahlungen mit einem neuen oder geänderten
+    Provisionssatz (Trockenlauf, es wird nichts gespeichert). Änderung pro
+    Vertrag seitenweise über contractOffset/contractLimit, gezielt über
+    contractId bzw. customerId.
+    """
+    snapshot = await _get_snapshot(db)
+
+    evaluation_date = naive_utc(request.evaluation_date) if request.evaluation_date else max(
+        datetime.utcnow(), naive_utc(request.valid_from)
+    )
+
+    result = await run_calculation(
+        commission_rate_scenario, snapshot, request, evaluation_date, request.top_customers,
+        ContractPage.from_request(request)
+    )
+    result = await _with_customer_names(db, result)
+
+    return {
+        "status": "success",
+        "data": ScenarioResult(**result)
+    }
@@ -2,6 +2,8 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models.settings import Settings
+from app.services.calendar_index import calendar_index
+from app.services.commission_ledger import invalidate_from
 from app.schemas.settings import Settings as SettingsSchema, SettingsUpdate
 from datetime import datetime
 
@@ -44,6 +46,7 @@ def update_settings(settings_update: SettingsUpdate, db: Session = Depends(get_d
         db.add(db_settings)
     
     update_data = settings_update.dict(exclude_unset=True)
+    previous_founder_delay = db_settings.founder_delay_months
     
     # Merge dicts für post_contract_months
     if "post_contract_months" in update_data:
@@ -61,4 +64,8 @@ def update_settings(settings_update: SettingsUpdate, db: Session = Depends(get_d
     db_settings.updated_at = datetime.utcnow()
     db.commit()
     db.refresh(db_settings)
+    calendar_index.invalidate()
+    if db_settings.founder_delay_months != previous_founder_delay:
+        # Existenzgründer-Karenz wirkt auf alle Monate
+        invalidate_from(db, None)
     return db_settings
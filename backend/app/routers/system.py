@@ -1,104 +1,79 @@
 """
-System router for version checking.
+System router for version checking and runtime diagnostics.
 """
-from fastapi import APIRouter
-import httpx
-import subprocess
-from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
+from app.services.version_service import version_cache
+from app.services.profiler import profiler, require_profiling_admin
 
 router = APIRouter(prefix="/api/system", tags=["system"])
 
-def get_current_version() -> str:
-    """Get the current backend version from main module."""
-    try:
-        from app.main import BACKEND_VERSION
-        return BACKEND_VERSION
-    except ImportError:
-        return "unknown"
+@router.get("/version-check")
+async def check_for_updates(force: bool = False):
+    """
+    Check if a newer version is available on Docker Hub.
+    Served from the background-refreshed cache; `force=true` waits for a
+    fresh check (concurrent callers share one refresh).
+    """
+    return await version_cache.get(force=force)
+
 
-async def get_docker_hub_digest(image: str, tag: str = "latest") -> Optional[str]:
+@router.get("/pool-status")
+def get_pool_metrics():
     """
-    Get the digest of an image from Docker Hub.
-    Returns None if unable to fetch.
+    Connection-pool health: size, in-use connections, overflow and
+    checkout wait times. Helps to tell pool starvation apart from slow
+    calculations under concurrent dashboard load.
     """
-    try:
-        # Docker Hub API v2 - get manifest
-        url = f"https://hub.docker.com/v2/repositories/{image}/tags/{tag}"
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(url)
-            if response.status_code == 200:
-                data = response.json()
-                return data.get("digest") or data.get("images", [{}])[0].get("digest")
-    except Exception as e:
-        print(f"Error fetching Docker Hub digest: {e}")
-    return None
+    from app.database import get_pool_status, engine, async_engine
+    
+    return {
+        "status": "success",
+        "data": {
+            "sync": get_pool_status(engine),
+            "async": get_pool_status(async_engine)
+        }
+    }
 
 
-async def get_local_image_digest(image: str) -> Optional[str]:
+@router.get("/event-loop")
+def get_event_loop_lag(reset: bool = False):
     """
-    Get the digest of a locally running image.
-    Returns None if unable to fetch.
+    Event-loop lag since startup (or since the last reset). Blocking sync I/O
+    inside async routes shows up here as max_lag_ms / slow_ticks.
     """
-    try:
-        # Use docker inspect to get the image digest
-        result = subprocess.run(
-            ["docker", "inspect", "--format", "{{index .RepoDigests 0}}", image],
-            capture_output=True,
-            text=True,
-            timeout=10
-        )
-        if result.returncode == 0:
-            # Format: image@sha256:...
-            digest_str = result.stdout.strip()
-            if "@" in digest_str:
-                return digest_str.split("@")[1]
-    except Exception as e:
-        print(f"Error getting local image digest: {e}")
-    return None
+    from app.services.loop_monitor import loop_monitor
+    
+    data = loop_monitor.snapshot()
+    if reset:
+        loop_monitor.reset()
+    return {
+        "status": "success",
+        "data": data
+    }
 
 
-@router.get("/version-check")
-async def check_for_updates():
+@router.get("/profiles", dependencies=[Depends(require_profiling_admin)])
+def list_profiles():
     """
-    Check if a newer version is available on Docker Hub.
-    Compares the digest of the running image with Docker Hub.
+    Recently captured request profiles (newest first). Requests on the
+    analytics, contracts, customers and tests routers are profiled when
+    sent with `X-Profile: 1` or `?profile=1`; the response carries the
+    profile id in `X-Profile-Id`.
     """
-    try:
-        # Check both frontend and backend images
-        images = [
-            "bimberle/contracts-backend",
-            "bimberle/contracts-frontend"
-        ]
-        
-        updates_available = False
-        details = []
-        
-        for image in images:
-            hub_digest = await get_docker_hub_digest(image)
-            local_digest = await get_local_image_digest(f"{image}:latest")
-            
-            image_update_available = False
-            if hub_digest and local_digest:
-                image_update_available = hub_digest != local_digest
-                if image_update_available:
-                    updates_available = True
-            
-            details.append({
-                "image": image,
-                "local_digest": local_digest[:20] + "..." if local_digest else None,
-                "hub_digest": hub_digest[:20] + "..." if hub_digest else None,
-                "update_available": image_update_available
-            })
-        
-        return {
-            "current_version": get_current_version(),
-            "update_available": updates_available,
-            "details": details
-        }
-    except Exception as e:
-        return {
-            "current_version": get_current_version(),
-            "update_available": False,
-            "error": str(e)
-        }
+    return {
+        "status": "success",
+        "data": profiler.store.list()
+    }
+
 
+@router.get("/profiles/{profile_id}", dependencies=[Depends(require_profiling_admin)])
+def get_profile(profile_id: str):
+    """Collapsed stacks of one profile, ready for flamegraph.pl or speedscope."""
+    session = profiler.store.get(profile_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(
+        session.collapsed(),
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.collapsed"'}
+    )
@@ -2,13 +2,17 @@
 Test Router
 API-Endpunkte fuer Berechnungstests
 """
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 import random
 
-from app.database import get_db
+from app.config import settings as app_settings
+from app.database import get_db, SessionLocal
+from app.models.job import Job
 from app.models.customer import Customer
 from app.models.contract import Contract
 from app.models.settings import Settings
@@ -22,8 +26,12 @@ from app.services.calculations import (
     get_commission_rates_for_date,
 )
 from app.utils.date_utils import months_between as mb, add_months
+from app.services.profiler import ProfiledRoute
+from app.services.job_service import JobHandle, job_service, job_to_dict
 
-router = APIRouter(tags=["tests"])
+router = APIRouter(tags=["tests"], route_class=ProfiledRoute)
+
+JOB_TYPE = "calculation_tests"
 
 
 def get_contract_description(contract: Contract) -> str:
@@ -45,12 +53,14 @@ def get_contract_description(contract: Contract) -> str:
     return f"Vertrag {contract.id[:8]}"
 
 
-def get_first_contract_date(customer_id: str, db: Session) -> datetime:
-    """Holt das Startdatum des ersten Vertrags eines Kunden"""
-    first_contract = db.query(Contract).filter(
-        Contract.customer_id == customer_id
-    ).order_by(Contract.start_date.asc()).first()
-    return first_contract.start_date if first_contract else None
+def load_first_contract_dates(contracts: List[Contract]) -> Dict[str, datetime]:
+    """Startdatum des ersten Vertrags je Kunde (aus den bereits geladenen Vertraegen)"""
+    first_dates: Dict[str, datetime] = {}
+    for contract in contracts:
+        current = first_dates.get(contract.customer_id)
+        if current is None or contract.start_date < current:
+            first_dates[contract.customer_id] = contract.start_date
+    return first_dates
 
 
 def get_customer_name(customer: Optional[Customer]) -> str:
@@ -67,24 +77,108 @@ def random_choice_or_none(items: list):
     return random.choice(items)
 
 
-@router.post("/run", response_model=dict)
-def run_calculation_tests(db: Session = Depends(get_db)):
+# Kategorien in Ausgabe-Reihenfolge; laufen unabhaengig voneinander parallel
+TEST_CATEGORIES = [
+    ("Preiserhoehungen", "price_increases"),
+    ("Existenzgruender-Schutz", "founder_protection"),
+    ("Provisionsberechnung", "commission"),
+    ("Exit-Auszahlungen", "exit_payout"),
+    ("Summen pro Kunde", "customer_sums"),
+    ("Gesamtsummen", "total_sums"),
+    ("Monatsberechnungen", "monthly_calculations"),
+]
+
+
+def _category_runner(key: str, data: Dict[str, Any]):
+    """Liefert eine Funktion, die die Tests einer Kategorie erzeugt"""
+    contracts = data["contracts"]
+    price_increases = data["price_increases"]
+    settings = data["settings"]
+    commission_rates = data["commission_rates"]
+    customer_lookup = data["customer_lookup"]
+    today = data["today"]
+    first_dates = data["first_dates"]
+
+    runners = {
+        "price_increases": lambda next_id: create_price_increase_tests(
+            contracts, price_increases, settings, customer_lookup, today, first_dates, next_id
+        ),
+        "founder_protection": lambda next_id: create_founder_protection_tests(
+            contracts, settings, customer_lookup, today, next_id
+        ),
+        "commission": lambda next_id: create_commission_tests(
+            contracts, price_increases, settings, commission_rates, customer_lookup, today, first_dates, next_id
+        ),
+        "exit_payout": lambda next_id: create_exit_payout_tests(
+            contracts, price_increases, settings, commission_rates, customer_lookup, today, first_dates, next_id
+        ),
+        "customer_sums": lambda next_id: create_customer_sum_tests(
+            contracts, price_increases, settings, commission_rates, customer_lookup, today, first_dates, next_id
+        ),
+        "total_sums": lambda next_id: create_total_sum_tests(
+            contracts, price_increases, settings, commission_rates, customer_lookup, today, first_dates, next_id
+        ),
+        "monthly_calculations": lambda next_id: create_monthly_calculation_tests(
+            contracts, price_increases, settings, commission_rates, customer_lookup, today, first_dates, next_id
+        ),
+    }
+    return runners[key]
+
+
+def load_test_data() -> Dict[str, Any]:
+    """Laedt alle benoetigten Daten in einer eigenen Session (fuer den Job-Thread)"""
+    db = SessionLocal()
+    try:
+        contracts = db.query(Contract).all()
+        customers = db.query(Customer).all()
+        return {
+            "today": datetime.now(),
+            "settings": db.query(Settings).filter(Settings.id == "default").first(),
+            "price_increases": db.query(PriceIncrease).all(),
+            "commission_rates": db.query(CommissionRate).all(),
+            "contracts": contracts,
+            "customer_lookup": {c.id: c for c in customers},
+            "first_dates": load_first_contract_dates(contracts),
+        }
+    finally:
+        db.close()
+
+
+def run_test_categories(job: JobHandle) -> Dict[str, Any]:
     """
-    Fuehrt umfassende Tests der Berechnungslogik durch.
-    Pro Test wird ein zufaellig passender Vertrag ausgewaehlt.
+    Job-Funktion: fuehrt alle Kategorien parallel aus und meldet den
+    Fortschritt pro Kategorie. Test-IDs werden am Ende in
+    Kategorie-Reihenfolge vergeben (T001, T002, ...).
     """
-    today = datetime.now()
-    
-    settings = db.query(Settings).filter(Settings.id == "default").first()
-    price_increases = db.query(PriceIncrease).all()
-    commission_rates = db.query(CommissionRate).all()
-    contracts = db.query(Contract).all()
-    customers = db.query(Customer).all()
-    
-    customer_lookup = {c.id: c for c in customers}
-    
+    data = load_test_data()
+    job.progress({
+        "type": "loaded",
+        "contracts": len(data["contracts"]),
+        "customers": len(data["customer_lookup"]),
+        "categories": [name for name, _ in TEST_CATEGORIES],
+    })
+
+    def run_category(key: str) -> List[Dict[str, Any]]:
+        job.check_cancelled()
+        # Test-IDs werden erst nach dem Zusammenfuehren vergeben
+        return _category_runner(key, data)(lambda: None)
+
+    results: Dict[str, List[Dict[str, Any]]] = {}
+    with ThreadPoolExecutor(max_workers=app_settings.TEST_RUN_WORKERS, thread_name_prefix="tests") as pool:
+        futures = {pool.submit(run_category, key): (name, key) for name, key in TEST_CATEGORIES}
+        for future in as_completed(futures):
+            name, key = futures[future]
+            results[key] = future.result()
+            job.progress({
+                "type": "category_finished",
+                "category": name,
+                "tests": len(results[key]),
+                "completed": len(results),
+                "total": len(TEST_CATEGORIES),
+            })
+
     test_results = {
-        "timestamp": today.isoformat(),
+        "timestamp": data["today"].isoformat(),
         "summary": {
             "total_tests": 0,
             "passed": 0,
@@ -93,56 +187,11 @@ def run_calculation_tests(db: Session = Depends(get_db)):
         },
         "tests": []
     }
-    
-    test_counter = [0]
-    
-    def next_test_id():
-        test_counter[0] += 1
-        return f"T{test_counter[0]:03d}"
-    
-    # KATEGORIE 1: PREISERHOEHUNGEN
-    price_increase_tests = create_price_increase_tests(
-        contracts, price_increases, settings, customer_lookup, today, db, next_test_id
-    )
-    test_results["tests"].extend(price_increase_tests)
-    
-    # KATEGORIE 2: EXISTENZGRUENDER-SCHUTZ
-    founder_tests = create_founder_protection_tests(
-        contracts, settings, customer_lookup, today, next_test_id
-    )
-    test_results["tests"].extend(founder_tests)
-    
-    # KATEGORIE 3: PROVISIONSBERECHNUNG
-    commission_tests = create_commission_tests(
-        contracts, price_increases, settings, commission_rates, customer_lookup, today, db, next_test_id
-    )
-    test_results["tests"].extend(commission_tests)
-    
-    # KATEGORIE 4: EXIT-AUSZAHLUNGEN
-    exit_tests = create_exit_payout_tests(
-        contracts, price_increases, settings, commission_rates, customer_lookup, today, db, next_test_id
-    )
-    test_results["tests"].extend(exit_tests)
-    
-    # KATEGORIE 5: SUMMEN PRO KUNDE
-    customer_sum_tests = create_customer_sum_tests(
-        contracts, price_increases, settings, commission_rates, customer_lookup, today, db, next_test_id
-    )
-    test_results["tests"].extend(customer_sum_tests)
-    
-    # KATEGORIE 6: GESAMTSUMMEN
-    total_sum_tests = create_total_sum_tests(
-        contracts, price_increases, settings, commission_rates, customer_lookup, today, db, next_test_id
-    )
-    test_results["tests"].extend(total_sum_tests)
-    
-    # KATEGORIE 7: MONATSBERECHNUNGEN (Umsatz, Provision, Exit)
-    monthly_calculation_tests = create_monthly_calculation_tests(
-        contracts, price_increases, settings, commission_rates, customer_lookup, today, db, next_test_id
-    )
-    test_results["tests"].extend(monthly_calculation_tests)
-    
-    for test in test_results["tests"]:
+    for _, key in TEST_CATEGORIES:
+        test_results["tests"].extend(results[key])
+
+    for index, test in enumerate(test_results["tests"], start=1):
+        test["test_id"] = f"T{index:03d}"
         test_results["summary"]["total_tests"] += 1
         if test["status"] == "passed":
             test_results["summary"]["passed"] += 1
@@ -150,20 +199,61 @@ def run_calculation_tests(db: Session = Depends(get_db)):
             test_results["summary"]["warnings"] += 1
         else:
             test_results["summary"]["info"] += 1
-    
+
+    return test_results
+
+
+@router.post("/run", response_model=dict)
+def run_calculation_tests():
+    """
+    Startet die Tests der Berechnungslogik als Hintergrund-Job.
+    Pro Test wird ein zufaellig passender Vertrag ausgewaehlt.
+    Fortschritt: GET /jobs/{job_id}/events, Ergebnis: GET /jobs/{job_id}
+    """
+    job_id = job_service.submit(JOB_TYPE, run_test_categories)
     return {
         "status": "success",
-        "data": test_results
+        "data": {"job_id": job_id, "status": "queued"}
     }
 
 
+@router.get("/jobs", response_model=dict)
+def list_test_jobs(limit: int = 20, db: Session = Depends(get_db)):
+    """Letzte Testlaeufe (ohne Ergebnisse)"""
+    jobs = db.query(Job).filter(Job.job_type == JOB_TYPE).order_by(Job.created_at.desc()).limit(limit).all()
+    return {
+        "status": "success",
+        "data": [job_to_dict(job, include_result=False) for job in jobs]
+    }
+
+
+@router.get("/jobs/{job_id}", response_model=dict)
+def get_test_job(job_id: str, db: Session = Depends(get_db)):
+    """Status, Fortschritt und (wenn fertig) Ergebnis eines Testlaufs"""
+    job = db.query(Job).filter(Job.id == job_id, Job.job_type == JOB_TYPE).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {
+        "status": "success",
+        "data": job_to_dict(job)
+    }
+
+
+@router.get("/jobs/{job_id}/events")
+def stream_test_job_events(job_id: str, db: Session = Depends(get_db)):
+    """Fortschritts-Events eines Testlaufs als NDJSON-Stream"""
+    if not db.query(Job.id).filter(Job.id == job_id, Job.job_type == JOB_TYPE).first():
+        raise HTTPException(status_code=404, detail="Job not found")
+    return StreamingResponse(job_service.stream_events(job_id), media_type="application/x-ndjson")
+
+
 def create_price_increase_tests(
     contracts: List[Contract],
     price_increases: List[PriceIncrease],
     settings: Settings,
     customer_lookup: Dict[str, Customer],
     today: datetime,
-    db: Session,
+    first_dates: Dict[str, datetime],
     next_test_id
 ) -> List[Dict[str, Any]]:
     """Erstellt Tests fuer die Preiserhoehungslogik"""
@@ -196,7 +286,7 @@ def create_price_increase_tests(
     # T002: Bestandsschutz aktiv
     protected_contracts = []
     for c in active_contracts:
-        customer_first_date = get_first_contract_date(c.customer_id, db)
+        customer_first_date = first_dates.get(c.customer_id)
         for pi in price_increases:
             ref_date = customer_first_date if customer_first_date else c.start_date
             months_at_pi = mb(ref_date, pi.valid_from)
@@ -247,7 +337,7 @@ def create_price_increase_tests(
     # T003: Bestandsschutz erfuellt - Preiserhoehung wird angewendet
     fulfilled_contracts = []
     for c in active_contracts:
-        customer_first_date = get_first_contract_date(c.customer_id, db)
+        customer_first_date = first_dates.get(c.customer_id)
         for pi in price_increases:
             ref_date = customer_first_date if customer_first_date else c.start_date
             months_at_pi = mb(ref_date, pi.valid_from)
@@ -260,7 +350,7 @@ def create_price_increase_tests(
     if contract_info:
         contract, pi, months_at_pi = contract_info
         customer = customer_lookup.get(contract.customer_id)
-        customer_first_date = get_first_contract_date(contract.customer_id, db)
+        customer_first_date = first_dates.get(contract.customer_id)
         base_price = (contract.software_rental_amount + contract.software_care_amount + 
                       contract.apps_amount + contract.purchase_amount + (contract.cloud_amount or 0))
         current_price = get_current_monthly_price(contract, price_increases, today, customer_first_date)
@@ -540,7 +630,7 @@ def create_commission_tests(
     commission_rates: List[CommissionRate],
     customer_lookup: Dict[str, Customer],
     today: datetime,
-    db: Session,
+    first_dates: Dict[str, datetime],
     next_test_id
 ) -> List[Dict[str, Any]]:
     """Erstellt Tests fuer die Provisionsberechnung"""
@@ -587,7 +677,7 @@ def create_commission_tests(
     contract = random_choice_or_none(rental_contracts)
     if contract:
         customer = customer_lookup.get(contract.customer_id)
-        customer_first_date = get_first_contract_date(contract.customer_id, db)
+        customer_first_date = first_dates.get(contract.customer_id)
         rate = rates.get('software_rental', 0)
         commission = get_current_monthly_commission(contract, settings, price_increases, commission_rates, today, customer_first_date)
         expected_base = contract.software_rental_amount * (rate / 100)
@@ -632,7 +722,7 @@ def create_commission_tests(
     contract = random_choice_or_none(care_contracts)
     if contract:
         customer = customer_lookup.get(contract.customer_id)
-        customer_first_date = get_first_contract_date(contract.customer_id, db)
+        customer_first_date = first_dates.get(contract.customer_id)
         rate = rates.get('software_care', 0)
         commission = get_current_monthly_commission(contract, settings, price_increases, commission_rates, today, customer_first_date)
         expected_base = contract.software_care_amount * (rate / 100)
@@ -678,7 +768,7 @@ def create_commission_tests(
     contract = random_choice_or_none(multi_type_contracts)
     if contract:
         customer = customer_lookup.get(contract.customer_id)
-        customer_first_date = get_first_contract_date(contract.customer_id, db)
+        customer_first_date = first_dates.get(contract.customer_id)
         commission = get_current_monthly_commission(contract, settings, price_increases, commission_rates, today, customer_first_date)
         
         details = []
@@ -751,7 +841,7 @@ def create_exit_payout_tests(
     commission_rates: List[CommissionRate],
     customer_lookup: Dict[str, Customer],
     today: datetime,
-    db: Session,
+    first_dates: Dict[str, datetime],
     next_test_id
 ) -> List[Dict[str, Any]]:
     """Erstellt Tests fuer die Exit-Auszahlungsberechnung"""
@@ -788,7 +878,7 @@ def create_exit_payout_tests(
     for c in active_contracts:
         months_running = mb(c.start_date, today)
         if months_running < min_months:
-            customer_first_date = get_first_contract_date(c.customer_id, db)
+            customer_first_date = first_dates.get(c.customer_id)
             exit_payout = calculate_exit_payout(c, settings, price_increases, commission_rates, today, customer_first_date)
             if exit_payout > 0:
                 under_min_contracts.append((c, months_running, exit_payout))
@@ -798,7 +888,7 @@ def create_exit_payout_tests(
         contract, months_running, exit_payout = contract_info
         customer = customer_lookup.get(contract.customer_id)
         months_remaining = min_months - months_running
-        customer_first_date = get_first_contract_date(contract.customer_id, db)
+        customer_first_date = first_dates.get(contract.customer_id)
         monthly_commission = get_current_monthly_commission(contract, settings, price_increases, commission_rates, today, customer_first_date)
         
         applicable_tier = None
@@ -857,7 +947,7 @@ def create_exit_payout_tests(
     if contract_info:
         contract, months_running = contract_info
         customer = customer_lookup.get(contract.customer_id)
-        customer_first_date = get_first_contract_date(contract.customer_id, db)
+        customer_first_date = first_dates.get(contract.customer_id)
         exit_payout = calculate_exit_payout(contract, settings, price_increases, commission_rates, today, customer_first_date)
         
         tests.append({
@@ -901,7 +991,7 @@ def create_exit_payout_tests(
         for c in active_contracts:
             months_running = mb(c.start_date, today)
             if months_running < min_months:
-                customer_first_date = get_first_contract_date(c.customer_id, db)
+                customer_first_date = first_dates.get(c.customer_id)
                 exit_payout = calculate_exit_payout(c, settings, price_increases, commission_rates, today, customer_first_date)
                 
                 for tier in sorted(exit_tiers, key=lambda t: t.get('fromMonth', 0), reverse=True):
@@ -977,7 +1067,7 @@ def create_customer_sum_tests(
     commission_rates: List[CommissionRate],
     customer_lookup: Dict[str, Customer],
     today: datetime,
-    db: Session,
+    first_dates: Dict[str, datetime],
     next_test_id
 ) -> List[Dict[str, Any]]:
     """Erstellt Tests fuer Summenberechnungen pro Kunde"""
@@ -1014,7 +1104,7 @@ def create_customer_sum_tests(
     customer = customer_lookup.get(customer_id)
     
     # Berechne Summen fuer diesen Kunden
-    customer_first_date = get_first_contract_date(customer_id, db)
+    customer_first_date = first_dates.get(customer_id)
     total_revenue = 0.0
     total_commission = 0.0
     total_exit = 0.0
@@ -1065,7 +1155,7 @@ def create_customer_sum_tests(
         for c in cust_contracts:
             effective_status, active_from = get_effective_status(c, settings, today)
             if effective_status == 'founder':
-                customer_first_date = get_first_contract_date(cust_id, db)
+                customer_first_date = first_dates.get(cust_id)
                 commission = get_current_monthly_commission(c, settings, price_increases, commission_rates, today, customer_first_date)
                 founder_customers.append((cust_id, c, commission, active_from))
                 break
@@ -1123,7 +1213,7 @@ def create_total_sum_tests(
     commission_rates: List[CommissionRate],
     customer_lookup: Dict[str, Customer],
     today: datetime,
-    db: Session,
+    first_dates: Dict[str, datetime],
     next_test_id
 ) -> List[Dict[str, Any]]:
     """Erstellt Tests fuer Gesamtsummen ueber alle Kunden"""
@@ -1162,7 +1252,7 @@ def create_total_sum_tests(
     total_inactive = 0
     
     for cust_id, cust_contracts in contracts_by_customer.items():
-        customer_first_date = get_first_contract_date(cust_id, db)
+        customer_first_date = first_dates.get(cust_id)
         
         for c in cust_contracts:
             effective_status, _ = get_effective_status(c, settings, today)
@@ -1211,7 +1301,7 @@ def create_total_sum_tests(
         founder_revenue = 0.0
         founder_commission = 0.0
         for cust_id, cust_contracts in contracts_by_customer.items():
-            customer_first_date = get_first_contract_date(cust_id, db)
+            customer_first_date = first_dates.get(cust_id)
             for c in cust_contracts:
                 effective_status, _ = get_effective_status(c, settings, today)
                 if effective_status == 'founder':
@@ -1269,7 +1359,7 @@ def create_monthly_calculation_tests(
     commission_rates: List[CommissionRate],
     customer_lookup: Dict[str, Customer],
     today: datetime,
-    db: Session,
+    first_dates: Dict[str, datetime],
     next_test_id
 ) -> List[Dict[str, Any]]:
     """Erstellt Tests fuer die monatlichen Berechnungen (Umsatz, Provision, Exit)"""
@@ -1296,7 +1386,7 @@ def create_monthly_calculation_tests(
     # T: Einzelvertrag Monatsberechnung (zufaelliger aktiver Vertrag)
     contract = random.choice(active_contracts)
     customer = customer_lookup.get(contract.customer_id)
-    customer_first_date = get_first_contract_date(contract.customer_id, db)
+    customer_first_date = first_dates.get(contract.customer_id)
     effective_status, active_from = get_effective_status(contract, settings, today)
     
     # Basis-Betraege
@@ -1368,7 +1458,7 @@ def create_monthly_calculation_tests(
     for c in active_contracts:
         effective_status, _ = get_effective_status(c, settings, today)
         if effective_status != c.status.value:
-            customer_first_date = get_first_contract_date(c.customer_id, db)
+            customer_first_date = first_dates.get(c.customer_id)
             commission = get_current_monthly_commission(c, settings, price_increases, commission_rates, today, customer_first_date)
             status_mismatch.append((c, effective_status, commission))
     
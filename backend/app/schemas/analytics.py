@@ -1,6 +1,7 @@
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 from pydantic.alias_generators import to_camel
-from typing import List, Generic, TypeVar
+from datetime import datetime
+from typing import List, Generic, Optional, TypeVar, Union
 
 # Dashboard Schemas
 class TopCustomer(BaseModel):
@@ -59,6 +60,126 @@ class Forecast(BaseModel):
     
     months: List[ForecastMonth]
 
+# Exit-Zahlung Verlauf
+class ExitPayoutPoint(BaseModel):
+    model_config = ConfigDict(
+        alias_generator=to_camel,
+        populate_by_name=True,
+        from_attributes=True
+    )
+    
+    date: datetime
+    total_exit_payout: float
+    total_exit_payout_net: float
+
+class CustomerExitPayoutCurve(BaseModel):
+    model_config = ConfigDict(
+        alias_generator=to_camel,
+        populate_by_name=True,
+        from_attributes=True
+    )
+    
+    customer_id: str
+    customer_name: Optional[str] = None
+    exit_payouts: List[float]
+
+class ExitPayoutCurve(BaseModel):
+    model_config = ConfigDict(
+        alias_generator=to_camel,
+        populate_by_name=True,
+        from_attributes=True
+    )
+    
+    points: List[ExitPayoutPoint]
+    customers: List[CustomerExitPayoutCurve]
+
+# Provisions-Wasserfall
+class WaterfallCounts(BaseModel):
+    model_config = ConfigDict(
+        alias_generator=to_camel,
+        populate_by_name=True,
+        from_attributes=True
+    )
+    
+    new_contracts: int
+    founder_activations: int
+    price_increases: int
+    rate_changes: int
+    ended_contracts: int
+    run_off: int
+
+class WaterfallMonth(BaseModel):
+    model_config = ConfigDict(
+        alias_generator=to_camel,
+        populate_by_name=True,
+        from_attributes=True
+    )
+    
+    date: str
+    opening_commission: float
+    new_contracts: float
+    founder_activations: float
+    price_increases: float
+    rate_changes: float
+    ended_contracts: float
+    run_off: float
+    closing_commission: float
+    counts: WaterfallCounts
+
+class Waterfall(BaseModel):
+    model_config = ConfigDict(
+        alias_generator=to_camel,
+        populate_by_name=True,
+        from_attributes=True
+    )
+    
+    start_date: str
+    opening_commission: float
+    months: List[WaterfallMonth]
+
+# Kohorten
+class CohortRow(BaseModel):
+    model_config = ConfigDict(
+        alias_generator=to_camel,
+        populate_by_name=True,
+        from_attributes=True
+    )
+    
+    cohort: str
+    contracts: int
+    customers: int
+    initial_revenue: float
+    initial_commission: float
+    revenue: List[float]
+    commission: List[float]
+    revenue_retention: List[Optional[float]]
+    commission_retention: List[Optional[float]]
+
+class CohortReport(BaseModel):
+    model_config = ConfigDict(
+        alias_generator=to_camel,
+        populate_by_name=True,
+        from_attributes=True
+    )
+    
+    period: str
+    layout: str
+    columns: List[Union[str, int]]  # "YYYY-MM" (calendar) bzw. Monate seit Kohortenbeginn (age)
+    cohorts: List[CohortRow]
+    computed_in_seconds: float
+
+# Monte-Carlo-Forecast
+class MonteCarloForecastRequest(BaseModel):
+    model_config = ConfigDict(
+        alias_generator=to_camel,
+        populate_by_name=True
+    )
+    
+    months: int = Field(36, ge=1, le=120)
+    paths: int = Field(2000, ge=100)
+    start_date: Optional[datetime] = None  # Standard: aktueller Monatsanfang
+    seed: Optional[int] = None
+
 # Generic Response Wrapper
 T = TypeVar('T')
 
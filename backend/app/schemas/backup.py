@@ -2,7 +2,7 @@
 Pydantic Schemas für Backup System
 """
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Literal, Optional, List
 from datetime import datetime
 
 
@@ -21,6 +21,11 @@ class BackupConfigUpdate(BaseModel):
     schedule_time: Optional[str] = Field(None, alias="scheduleTime")
     max_backups: Optional[int] = Field(None, alias="maxBackups")
     is_enabled: Optional[bool] = Field(None, alias="isEnabled")
+    backup_format: Optional[Literal["custom", "directory"]] = Field(None, alias="backupFormat")
+    parallel_jobs: Optional[int] = Field(None, ge=1, le=32, alias="parallelJobs")
+    # custom: 0-9 (gzip), directory: 1-19 (zstd); wird auf den gültigen Bereich begrenzt.
+    # Explizit null setzt auf den Standard des Werkzeugs zurück.
+    compression_level: Optional[int] = Field(None, ge=0, le=19, alias="compressionLevel")
 
     class Config:
         populate_by_name = True
@@ -77,6 +82,10 @@ class CreateBackupRequest(BaseModel):
 class RestoreBackupRequest(BaseModel):
     """Backup wiederherstellen"""
     backup_id: str = Field(..., alias="backupId")
+    # staging: neue Datenbank befüllen, prüfen und austauschen; in_place: pg_restore -c direkt
+    mode: Literal["staging", "in_place"] = "staging"
+    # Abweichende Kunden-/Vertragszahlen nach dem Staging-Restore nur als Warnung melden
+    force: bool = False
 
     class Config:
         populate_by_name = True
@@ -2,7 +2,7 @@
 Pydantic Schemas für Database Configuration
 """
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Literal
 from datetime import datetime
 
 
@@ -29,8 +29,8 @@ class DatabaseConfig(DatabaseConfigBase):
     is_active: bool = Field(default=False, alias="isActive")
     is_demo: bool = Field(default=False, alias="isDemo")
     is_system: bool = Field(default=False, alias="isSystem")
-    created_at: datetime = Field(..., alias="createdAt")
-    updated_at: datetime = Field(..., alias="updatedAt")
+    created_at: Optional[datetime] = Field(None, alias="createdAt")
+    updated_at: Optional[datetime] = Field(None, alias="updatedAt")
 
     class Config:
         from_attributes = True
@@ -49,6 +49,8 @@ class DatabaseConfigList(BaseModel):
 class SwitchDatabaseRequest(BaseModel):
     """Request zum Wechseln der aktiven Datenbank"""
     database_id: str = Field(..., alias="databaseId")
+    # "global": aktive Datenbank für alle; "session": nur diese Sitzung (Cookie)
+    scope: Literal["global", "session"] = "global"
 
     class Config:
         populate_by_name = True
@@ -0,0 +1,105 @@
+from pydantic import BaseModel, ConfigDict, Field
+from pydantic.alias_generators import to_camel
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# Szenario-Schemas (Vorschau ohne Speichern)
+class ProposedPriceIncrease(BaseModel):
+    model_config = ConfigDict(
+        alias_generator=to_camel,
+        populate_by_name=True
+    )
+    
+    valid_from: datetime
+    # Erhöhungen pro Betrag-Typ (in %)
+    amount_increases: Dict[str, float]
+    lock_in_months: int = 24
+    description: str = ""
+
+class ContractDeltaQuery(BaseModel):
+    """Seite der Vertragsliste (Verträge mit Änderung, nach Betrag der Änderung sortiert)"""
+    model_config = ConfigDict(
+        alias_generator=to_camel,
+        populate_by_name=True
+    )
+    
+    contract_offset: int = Field(0, ge=0)
+    contract_limit: int = Field(100, ge=0, le=10000)
+    # Nur diesen Vertrag bzw. die Verträge dieses Kunden (auch ohne Änderung)
+    contract_id: Optional[str] = None
+    customer_id: Optional[str] = None
+
+class PriceIncreaseScenarioRequest(ContractDeltaQuery):
+    model_config = ConfigDict(
+        alias_generator=to_camel,
+        populate_by_name=True
+    )
+    
+    price_increases: List[ProposedPriceIncrease] = Field(..., min_length=1)
+    # Stichtag der Auswertung; Standard: spätestes valid_from, mindestens heute
+    evaluation_date: Optional[datetime] = None
+    # Anzahl Kunden in der Detail-Liste (nach Provisionsänderung sortiert)
+    top_customers: int = Field(50, ge=0, le=10000)
+
+class CommissionRateScenarioRequest(ContractDeltaQuery):
+    model_config = ConfigDict(
+        alias_generator=to_camel,
+        populate_by_name=True
+    )
+    
+    # Bestehender Provisionssatz, der bearbeitet wird (wird in der Vorschau ersetzt)
+    replaces_id: Optional[str] = None
+    valid_from: datetime
+    rates: Dict[str, float]
+    # Stichtag der Auswertung; Standard: valid_from, mindestens heute
+    evaluation_date: Optional[datetime] = None
+    top_customers: int = Field(50, ge=0, le=10000)
+
+class MetricDelta(BaseModel):
+    model_config = ConfigDict(
+        alias_generator=to_camel,
+        populate_by_name=True
+    )
+    
+    before: float
+    after: float
+    delta: float
+
+class ScenarioTotals(BaseModel):
+    model_config = ConfigDict(
+        alias_generator=to_camel,
+        populate_by_name=True
+    )
+    
+    monthly_revenue: MetricDelta
+    monthly_commission: MetricDelta
+    exit_payout: MetricDelta
+
+class CustomerScenarioDelta(ScenarioTotals):
+    customer_id: str
+    customer_name: Optional[str] = None
+    kundennummer: Optional[str] = None
+
+class ContractScenarioDelta(ScenarioTotals):
+    contract_id: str
+    customer_id: str
+    customer_name: Optional[str] = None
+    kundennummer: Optional[str] = None
+
+class ScenarioResult(BaseModel):
+    model_config = ConfigDict(
+        alias_generator=to_camel,
+        populate_by_name=True
+    )
+    
+    evaluation_date: datetime
+    total_contracts: int
+    affected_contracts: int
+    affected_customers: int
+    totals: ScenarioTotals
+    customers: List[CustomerScenarioDelta]
+    # Seite der Vertragsliste; contracts_total = Anzahl aller passenden Verträge
+    contracts: List[ContractScenarioDelta] = []
+    contracts_total: int = 0
+    # Pro vorgeschlagener Preiserhöhung: Anzahl Verträge, für die sie gelten würde
+    eligible_contracts: List[int] = []
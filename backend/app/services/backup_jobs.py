@@ -0,0 +1,391 @@
+"""
+Backup-Jobs
+Backup und Restore laufen als Hintergrund-Jobs (job_service) statt im
+Request-Thread. pg_dump/pg_restore werden als Unterprozess gestartet; der
+Job meldet geschriebene Bytes und fertige Tabellen und kann abgebrochen
+werden. Nach Abschluss wird die Backup-Historie aktualisiert.
+
+Restores laufen standardmäßig über eine Staging-Datenbank, die erst nach
+erfolgreicher Prüfung gegen die laufende ausgetauscht wird (Ausfallzeit nur
+für die Umbenennung).
+
+Pro Datenbank läuft höchstens ein Backup- oder Restore-Job gleichzeitig.
+"""
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal, engine_registry
+from app.models.backup import BackupConfig, BackupHistory
+from app.models.job import Job
+from app.services import backup_service
+from app.services.calendar_index import calendar_index
+from app.services.job_service import JobHandle, job_service
+from app.services.portfolio_engine import snapshot_cache
+
+logger = logging.getLogger(__name__)
+
+BACKUP_JOB_TYPE = "backup"
+RESTORE_JOB_TYPE = "restore"
+BACKUP_JOB_TYPES = (BACKUP_JOB_TYPE, RESTORE_JOB_TYPE)
+
+# Tabellen, die nach einem Restore vorhanden sein müssen (und gezählt werden)
+SANITY_TABLES = ("customers", "contracts")
+
+_lock = threading.Lock()
+_busy: Dict[str, Optional[str]] = {}  # Datenbankname -> laufender Job bzw. Halter
+
+
+class BackupJobConflict(Exception):
+    """Für die Datenbank läuft bereits ein Backup- oder Restore-Job"""
+
+
+def _reserve(db_name: str, holder: Optional[str] = None):
+    with _lock:
+        if db_name in _busy:
+            raise BackupJobConflict(
+                f"Für '{db_name}' läuft bereits ein Backup/Restore ({_busy[db_name] or 'Job wird gestartet'})"
+            )
+        _busy[db_name] = holder
+
+
+def _release(db_name: str):
+    with _lock:
+        _busy.pop(db_name, None)
+
+
+def _submit(job_type: str, db_name: str, func, params: dict) -> str:
+    _reserve(db_name)
+
+    def run(job: JobHandle):
+        try:
+            return func(job)
+        finally:
+            _release(db_name)
+
+    try:
+        job_id = job_service.submit(job_type, run, params)
+    except Exception:
+        _release(db_name)
+        raise
+    with _lock:
+        if db_name in _busy:
+            _busy[db_name] = f"Job {job_id}"
+    return job_id
+
+
+@contextmanager
+def reserved(db_name: str, holder: str):
+    """
+    Reserviert die Datenbank für Arbeit außerhalb des job_service (z.B. das
+    geplante Backup im Scheduler-Thread).
+
+    Raises:
+        BackupJobConflict: wenn bereits ein Backup/Restore läuft
+    """
+    _reserve(db_name, holder)
+    try:
+        yield
+    finally:
+        _release(db_name)
+
+
+def _get_or_create_config(db: Session) -> BackupConfig:
+    config = db.query(BackupConfig).filter(BackupConfig.id == "default").first()
+    if not config:
+        config = BackupConfig(id="default")
+        db.add(config)
+    return config
+
+
+def backup_options(db: Session) -> dict:
+    """Format, Parallelität und Kompression aus der Backup-Konfiguration (für create_backup)"""
+    config = db.query(BackupConfig).filter(BackupConfig.id == "default").first()
+    if not config:
+        return {}
+    return {
+        "backup_format": config.backup_format or "custom",
+        "parallel_jobs": config.parallel_jobs or 1,
+        "compression_level": config.compression_level,
+    }
+
+
+def record_backup(
+    db: Session,
+    db_name: str,
+    success: bool,
+    filename: Optional[str],
+    filepath: Optional[str],
+    customer_count: Optional[int],
+    contract_count: Optional[int]
+):
+    """Status in der Konfiguration setzen, Historie schreiben und alte Backups aufräumen"""
+    from app.main import BACKEND_VERSION
+
+    config = _get_or_create_config(db)
+    config.last_backup_at = datetime.now()
+    config.last_backup_status = "success" if success else "failed"
+
+    if success:
+        file_size = os.path.getsize(filepath) if filepath and os.path.exists(filepath) else 0
+        db.add(BackupHistory(
+            filename=filename,
+            database_name=db_name,
+            file_size=file_size,
+            customer_count=customer_count,
+            contract_count=contract_count,
+            app_version=BACKEND_VERSION,
+            status="success"
+        ))
+    db.commit()
+
+    if success:
+        backup_service.cleanup_old_backups(config.max_backups or 7, db_name)
+
+
+def dump_with_counts(
+    db_name: str,
+    options: dict,
+    trigger: str = "manual",
+    progress: Optional[backup_service.ProgressCallback] = None,
+    on_counted: Optional[Callable[[Dict[str, int]], None]] = None
+) -> Tuple[bool, str, Optional[str], Dict[str, int]]:
+    """
+    pg_dump im exportierten Snapshot einer Transaktion, in der vorher Kunden
+    und Verträge gezählt werden. Die Zahlen in der Historie entsprechen so
+    exakt dem Inhalt des Backups (Prüfung beim Staging-Restore).
+
+    Returns:
+        Tuple[success, filename_or_error, file_path, counts]
+    """
+    with backup_service.exported_snapshot(db_name, SANITY_TABLES) as (snapshot_id, counts):
+        if on_counted:
+            on_counted(counts)
+        success, result, filepath = backup_service.create_backup(
+            db_name, trigger=trigger, progress=progress, snapshot=snapshot_id, **options
+        )
+    return success, result, filepath, counts
+
+
+def run_backup_job(job: JobHandle, db_name: str, trigger: str = "manual") -> dict:
+    """Job-Funktion: pg_dump mit Fortschritt, danach Historie aktualisieren"""
+    db = SessionLocal()
+    try:
+        options = backup_options(db)
+    finally:
+        db.close()
+    tables_total = backup_service.count_tables(db_name)
+    job.check_cancelled()
+
+    def on_counted(counts: Dict[str, int]):
+        job.progress({
+            "type": "started", "database": db_name, "tables_total": tables_total,
+            "customers": counts["customers"], "contracts": counts["contracts"],
+            "format": options.get("backup_format", "custom"),
+        })
+
+    def on_progress(tables_done: int, bytes_written: int):
+        job.check_cancelled()
+        job.progress({
+            "type": "progress", "tables_done": tables_done, "tables_total": tables_total,
+            "bytes_written": bytes_written,
+        })
+
+    success, result, filepath, counts = dump_with_counts(db_name, options, trigger, on_progress, on_counted)
+    customer_count, contract_count = counts["customers"], counts["contracts"]
+
+    db = SessionLocal()
+    try:
+        record_backup(db, db_name, success, result, filepath, customer_count, contract_count)
+    finally:
+        db.close()
+    if not success:
+        raise RuntimeError(f"Backup fehlgeschlagen: {result}")
+
+    file_size = os.path.getsize(filepath) if filepath and os.path.exists(filepath) else 0
+    return {
+        "filename": result,
+        "databaseName": db_name,
+        "fileSize": file_size,
+        "fileSizeFormatted": backup_service.format_file_size(file_size),
+        "customerCount": customer_count,
+        "contractCount": contract_count,
+    }
+
+
+def _restore_job_row(job: JobHandle, params: dict, started_at: datetime):
+    """
+    pg_restore -c ersetzt auch die Tabelle "jobs" durch den Stand des
+    Backups. Damit der Status des Restore-Jobs abrufbar bleibt, wird seine
+    Zeile danach wieder angelegt.
+    """
+    db = SessionLocal()
+    try:
+        db.merge(Job(
+            id=job.id, job_type=job.job_type, status="running", params=params,
+            progress=list(job.events), started_at=started_at,
+        ))
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"❌ Failed to restore job row {job.id}: {e}")
+    finally:
+        db.close()
+
+
+def _expected_counts(backup_filename: str) -> Dict[str, int]:
+    """Beim Backup gezählte Kunden/Verträge aus der Historie (soweit bekannt)"""
+    db = SessionLocal()
+    try:
+        entry = db.query(BackupHistory).filter(BackupHistory.filename == backup_filename).first()
+    finally:
+        db.close()
+    if not entry:
+        return {}
+    counts = {"customers": entry.customer_count, "contracts": entry.contract_count}
+    return {table: count for table, count in counts.items() if count is not None}
+
+
+def _restore_via_staging(
+    job: JobHandle,
+    backup_filename: str,
+    db_name: str,
+    parallel_jobs: int,
+    tables_total: Optional[int],
+    force: bool = False
+) -> dict:
+    """
+    Restore in eine neue Staging-Datenbank, dort Migrationen und
+    Plausibilitätsprüfung, danach Austausch per Umbenennung. Die laufende
+    Datenbank bleibt bis zum Austausch unverändert; schlägt vorher etwas
+    fehl (oder wird abgebrochen), wird nur die Staging-Datenbank gelöscht.
+    """
+    staging_db_name = f"{db_name}_staging_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    expected = _expected_counts(backup_filename)
+    success, message = backup_service.create_database(staging_db_name)
+    if not success:
+        raise RuntimeError(f"Staging-Datenbank konnte nicht angelegt werden: {message}")
+    job.progress({"type": "staging_created", "database": staging_db_name})
+
+    def on_progress(tables_done: int, _bytes: int):
+        job.check_cancelled()
+        job.progress({"type": "progress", "tables_done": tables_done, "tables_total": tables_total})
+
+    swapped = False
+    try:
+        success, message = backup_service.restore_backup(
+            backup_filename, staging_db_name, progress=on_progress, parallel_jobs=parallel_jobs
+        )
+        if not success:
+            raise RuntimeError(f"Restore fehlgeschlagen: {message}")
+
+        job.check_cancelled()
+        job.progress({"type": "migrating", "database": staging_db_name})
+        success, message = backup_service.migrate_database(staging_db_name)
+        if not success:
+            raise RuntimeError(f"Migrationen fehlgeschlagen: {message}")
+
+        counts = backup_service.count_rows(staging_db_name, list(SANITY_TABLES))
+        missing = [table for table, count in counts.items() if count is None]
+        if missing:
+            raise RuntimeError(f"Tabellen fehlen nach dem Restore: {', '.join(missing)}")
+        mismatched = {table: (count, counts[table]) for table, count in expected.items() if counts[table] != count}
+        if mismatched:
+            detail = "Anzahl weicht vom Backup ab: " + ", ".join(
+                f"{table} {want} erwartet, {got} vorhanden" for table, (want, got) in mismatched.items()
+            )
+            # Backups vor der Zählung im Dump-Snapshot können leicht abweichende Zahlen haben
+            if not force:
+                raise RuntimeError(f"{detail} (mit force trotzdem austauschen)")
+            logger.warning(f"⚠️ {detail} - continuing (force)")
+            job.progress({"type": "count_mismatch", "detail": detail})
+        job.progress({"type": "verified", "counts": counts, "expected": expected})
+
+        job.check_cancelled()
+        swap_started = time.perf_counter()
+        previous_db_name = backup_service.swap_databases(db_name, staging_db_name)
+        swapped = True
+        engine_registry.reset_pools(db_name)
+        swap_seconds = time.perf_counter() - swap_started
+    finally:
+        if not swapped:
+            backup_service.drop_database(staging_db_name)
+
+    backup_service.drop_database(previous_db_name)
+    return {"counts": counts, "swapSeconds": round(swap_seconds, 3)}
+
+
+def run_restore_job(
+    job: JobHandle,
+    backup_filename: str,
+    db_name: str,
+    mode: str = "staging",
+    force: bool = False
+) -> dict:
+    """
+    Job-Funktion: Restore mit Fortschritt.
+    mode "staging": über eine Staging-Datenbank mit Austausch am Ende
+    (abbrechbar bis zum Austausch). mode "in_place": pg_restore -c direkt in
+    die laufende Datenbank; abbrechen geht nur, solange pg_restore noch
+    nicht läuft - ein abgebrochener Restore hinterließe eine halb geleerte
+    Datenbank. force: abweichende Kunden-/Vertragszahlen nach dem
+    Staging-Restore nur als Warnung melden statt abzubrechen.
+    """
+    started_at = datetime.now()
+    db = SessionLocal()
+    try:
+        parallel_jobs = backup_options(db).get("parallel_jobs", 1)
+    finally:
+        db.close()
+    tables_total = backup_service.count_backup_tables(backup_filename)
+    job.progress({
+        "type": "started", "backup": backup_filename, "database": db_name,
+        "mode": mode, "tables_total": tables_total,
+    })
+    job.check_cancelled()
+
+    params = {"backup_id": backup_filename, "database": db_name, "mode": mode}
+    if mode == "staging":
+        details = _restore_via_staging(job, backup_filename, db_name, parallel_jobs, tables_total, force)
+        message = "Backup erfolgreich wiederhergestellt"
+        _restore_job_row(job, params, started_at)
+    else:
+        def on_progress(tables_done: int, _bytes: int):
+            job.progress({"type": "progress", "tables_done": tables_done, "tables_total": tables_total})
+
+        success, message = backup_service.restore_backup(
+            backup_filename, db_name, progress=on_progress, parallel_jobs=parallel_jobs
+        )
+        _restore_job_row(job, params, started_at)
+        if not success:
+            raise RuntimeError(f"Restore fehlgeschlagen: {message}")
+        details = {}
+
+    calendar_index.invalidate()
+    snapshot_cache.invalidate()
+    logger.info(f"✅ Restore of {backup_filename} into {db_name} finished ({mode})")
+    return {"backup": backup_filename, "databaseName": db_name, "mode": mode, "message": message, **details}
+
+
+def submit_backup_job(db_name: str) -> str:
+    """Startet ein manuelles Backup im Hintergrund; gibt die Job-ID zurück"""
+    return _submit(
+        BACKUP_JOB_TYPE, db_name,
+        lambda job: run_backup_job(job, db_name),
+        {"database": db_name}
+    )
+
+
+def submit_restore_job(backup_filename: str, db_name: str, mode: str = "staging", force: bool = False) -> str:
+    """Startet einen Restore im Hintergrund; gibt die Job-ID zurück"""
+    return _submit(
+        RESTORE_JOB_TYPE, db_name,
+        lambda job: run_restore_job(job, backup_filename, db_name, mode, force),
+        {"backup_id": backup_filename, "database": db_name, "mode": mode, "force": force}
+    )
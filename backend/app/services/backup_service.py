@@ -3,17 +3,42 @@ Backup Service
 Handles database backups using pg_dump and pg_restore
 """
 import os
+import re
+import shutil
 import subprocess
 import logging
+import tempfile
+import threading
+import time
 from datetime import datetime
-from typing import Optional, List, Tuple
+from typing import Callable, Optional, List, Sequence, Tuple
 from pathlib import Path
+from contextlib import contextmanager
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import NullPool
 
 logger = logging.getLogger(__name__)
 
 # Festes Backup-Verzeichnis
 BACKUP_DIRECTORY = "/app/backups"
 
+# Formate: "custom" = pg_dump -F c (.sql), "directory" = pg_dump -F d, gepackt als .tar.zst
+BACKUP_FORMATS = ("custom", "directory")
+ARCHIVE_SUFFIX = ".tar.zst"
+BACKUP_SUFFIXES = (".sql", ARCHIVE_SUFFIX)
+DEFAULT_ZSTD_LEVEL = 3
+
+# Abstand, in dem laufende pg_dump/pg_restore-Prozesse Fortschritt melden
+PROGRESS_INTERVAL_SECONDS = 2.0
+
+# Zeilen der --verbose-Ausgabe, die einen fertig gestarteten Tabelleninhalt melden
+_DUMP_TABLE_LINE = re.compile(r"dumping contents of table")
+_RESTORE_TABLE_LINE = re.compile(r"processing data for table")
+
+# progress(tables_done, bytes_written); darf (z.B. bei Abbruch) eine Exception werfen
+ProgressCallback = Callable[[int, int], None]
+
 
 def get_backup_directory() -> str:
     """Gibt das Backup-Verzeichnis zurück und erstellt es falls nötig"""
@@ -66,14 +91,152 @@ def get_db_connection_params() -> dict:
     }
 
 
-def create_backup(db_name: str, backup_name: Optional[str] = None) -> Tuple[bool, str, Optional[str]]:
+@contextmanager
+def _maintenance_connection():
+    """
+    Verbindung zur postgres-Wartungsdatenbank für CREATE/DROP DATABASE.
+    Läuft im AUTOCOMMIT-Modus ohne Pool, da diese Befehle nicht in einer
+    Transaktion laufen dürfen und selten benötigt werden.
+    """
+    from app.config import settings
+    
+    url = make_url(settings.DATABASE_URL).set(database="postgres")
+    maintenance_engine = create_engine(url, poolclass=NullPool, isolation_level="AUTOCOMMIT")
+    try:
+        with maintenance_engine.connect() as conn:
+            yield conn
+    finally:
+        maintenance_engine.dispose()
+
+
+def _output_size(path: Optional[str]) -> int:
+    """Größe einer Datei bzw. Summe aller Dateien eines Dump-Verzeichnisses"""
+    if not path or not os.path.exists(path):
+        return 0
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, _dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def _run_pg_tool(
+    cmd: List[str],
+    env: dict,
+    table_line: "re.Pattern",
+    output_path: Optional[str] = None,
+    progress: Optional[ProgressCallback] = None
+) -> Tuple[int, str]:
+    """
+    Startet pg_dump/pg_restore (bzw. tar) als Unterprozess, ohne zu blockieren.
+    stderr wird in einem eigenen Thread gelesen (sonst kann der Prozess an
+    einer vollen Pipe hängen) und nach table_line gezählt. Alle
+    PROGRESS_INTERVAL_SECONDS wird progress(tables_done, bytes_written)
+    aufgerufen; wirft progress, wird der Prozess beendet und die Exception
+    weitergereicht.
+
+    Returns:
+        Tuple[returncode, stderr]
+    """
+    process = subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    stderr_lines: List[str] = []
+    tables_done = [0]
+
+    def read_stderr():
+        for line in process.stderr:
+            stderr_lines.append(line)
+            if table_line.search(line):
+                tables_done[0] += 1
+
+    reader = threading.Thread(target=read_stderr, daemon=True)
+    reader.start()
+    try:
+        while True:
+            try:
+                process.wait(timeout=PROGRESS_INTERVAL_SECONDS)
+                break
+            except subprocess.TimeoutExpired:
+                pass
+            if progress:
+                progress(tables_done[0], _output_size(output_path))
+    except BaseException:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+        raise
+    finally:
+        reader.join(timeout=5)
+
+    if progress:
+        progress(tables_done[0], _output_size(output_path))
+    return process.returncode, "".join(stderr_lines)
+
+
+def create_backup(
+    db_name: str,
+    backup_name: Optional[str] = None,
+    trigger: str = "manual",
+    progress: Optional[ProgressCallback] = None,
+    backup_format: str = "custom",
+    parallel_jobs: int = 1,
+    compression_level: Optional[int] = None,
+    snapshot: Optional[str] = None
+) -> Tuple[bool, str, Optional[str]]:
     """
-    Erstellt ein Backup einer Datenbank
+    Erstellt ein Backup einer Datenbank und erfasst Dauer und Größe
+    als Metriken (trigger: "manual" oder "scheduled").
+    backup_format "directory" dumpt mit parallel_jobs Prozessen und packt
+    das Verzeichnis in eine .tar.zst-Datei. Mit snapshot (siehe
+    exported_snapshot) sieht pg_dump genau diesen Datenstand.
     
     Returns:
         Tuple[success, filename_or_error, file_path]
     """
+    from app.services.telemetry import observe_backup
+
+    started = time.perf_counter()
+    if backup_format == "directory":
+        success, result, backup_path = _dump_directory(
+            db_name, backup_name, progress, parallel_jobs, compression_level, snapshot
+        )
+    else:
+        success, result, backup_path = _dump_database(db_name, backup_name, progress, compression_level, snapshot)
+    size = os.path.getsize(backup_path) if success and backup_path and os.path.exists(backup_path) else None
+    observe_backup(trigger, success, time.perf_counter() - started, size)
+    return success, result, backup_path
+
+
+def _pg_env() -> Tuple[dict, dict]:
     params = get_db_connection_params()
+    env = os.environ.copy()
+    env["PGPASSWORD"] = params["password"]
+    return params, env
+
+
+def _remove(path: str):
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def _dump_database(
+    db_name: str,
+    backup_name: Optional[str] = None,
+    progress: Optional[ProgressCallback] = None,
+    compression_level: Optional[int] = None,
+    snapshot: Optional[str] = None
+) -> Tuple[bool, str, Optional[str]]:
+    """Führt pg_dump aus (Custom-Format, eine Datei)"""
+    params, env = _pg_env()
     backup_dir = get_backup_directory()
     
     if not backup_name:
@@ -82,52 +245,280 @@ def create_backup(db_name: str, backup_name: Optional[str] = None) -> Tuple[bool
     
     backup_path = os.path.join(backup_dir, backup_name)
     
+    cmd = [
+        "pg_dump",
+        "-h", params["host"],
+        "-p", params["port"],
+        "-U", params["user"],
+        "-d", db_name,
+        "-F", "c",  # Custom format (komprimiert)
+        "-v",  # Tabellenweise Ausgabe für den Fortschritt
+        "-f", backup_path
+    ]
+    if compression_level is not None:
+        cmd += ["-Z", str(min(max(compression_level, 0), 9))]
+    if snapshot:
+        cmd += ["--snapshot", snapshot]
+    
+    logger.info(f"Creating backup: {backup_name}")
     try:
-        env = os.environ.copy()
-        env["PGPASSWORD"] = params["password"]
-        
-        cmd = [
-            "pg_dump",
-            "-h", params["host"],
-            "-p", params["port"],
-            "-U", params["user"],
-            "-d", db_name,
-            "-F", "c",  # Custom format (komprimiert)
-            "-f", backup_path
-        ]
-        
-        logger.info(f"Creating backup: {backup_name}")
-        result = subprocess.run(cmd, env=env, capture_output=True, text=True)
-        
-        if result.returncode != 0:
-            logger.error(f"Backup failed: {result.stderr}")
-            return False, result.stderr, None
-        
-        logger.info(f"Backup created successfully: {backup_path}")
-        return True, backup_name, backup_path
-        
-    except Exception as e:
+        returncode, stderr = _run_pg_tool(cmd, env, _DUMP_TABLE_LINE, backup_path, progress)
+    except OSError as e:
+        logger.error(f"Backup exception: {str(e)}")
+        return False, str(e), None
+    except BaseException:
+        # Abbruch aus progress: keine halbe Backup-Datei liegen lassen
+        _remove(backup_path)
+        raise
+    
+    if returncode != 0:
+        logger.error(f"Backup failed: {stderr}")
+        _remove(backup_path)
+        return False, stderr, None
+    
+    logger.info(f"Backup created successfully: {backup_path}")
+    return True, backup_name, backup_path
+
+
+def _dump_directory(
+    db_name: str,
+    backup_name: Optional[str] = None,
+    progress: Optional[ProgressCallback] = None,
+    parallel_jobs: int = 1,
+    compression_level: Optional[int] = None,
+    snapshot: Optional[str] = None
+) -> Tuple[bool, str, Optional[str]]:
+    """
+    pg_dump -F d -j parallel_jobs in ein temporäres Verzeichnis, danach mit
+    tar + zstd (alle Kerne) zu einer Datei packen. pg_dump komprimiert dabei
+    selbst nicht (-Z 0), die Kompression übernimmt zstd.
+    """
+    params, env = _pg_env()
+    backup_dir = get_backup_directory()
+    
+    if not backup_name:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        backup_name = f"{db_name}_{timestamp}{ARCHIVE_SUFFIX}"
+    
+    backup_path = os.path.join(backup_dir, backup_name)
+    dump_dir = tempfile.mkdtemp(prefix=".dump_", dir=backup_dir)
+    dump_path = os.path.join(dump_dir, "dump")
+    level = DEFAULT_ZSTD_LEVEL if compression_level is None else min(max(compression_level, 1), 19)
+    
+    cmd = [
+        "pg_dump",
+        "-h", params["host"],
+        "-p", params["port"],
+        "-U", params["user"],
+        "-d", db_name,
+        "-F", "d",  # Directory format (eine Datei pro Tabelle, parallelisierbar)
+        "-j", str(max(parallel_jobs, 1)),
+        "-Z", "0",
+        "-v",
+        "-f", dump_path
+    ]
+    if snapshot:
+        cmd += ["--snapshot", snapshot]
+    pack_cmd = ["tar", "-I", f"zstd -T0 -{level}", "-cf", backup_path, "-C", dump_path, "."]
+    
+    logger.info(f"Creating backup: {backup_name} ({parallel_jobs} parallel jobs)")
+    try:
+        returncode, stderr = _run_pg_tool(cmd, env, _DUMP_TABLE_LINE, dump_path, progress)
+        if returncode == 0:
+            dumped = _output_size(dump_path)
+            tables_done = sum(1 for line in stderr.splitlines() if _DUMP_TABLE_LINE.search(line))
+            # Beim Packen nur noch Abbruch prüfen, der Dump-Stand bleibt stehen
+            pack_progress = (lambda _tables, _bytes: progress(tables_done, dumped)) if progress else None
+            returncode, stderr = _run_pg_tool(pack_cmd, env, _DUMP_TABLE_LINE, progress=pack_progress)
+    except OSError as e:
         logger.error(f"Backup exception: {str(e)}")
+        _remove(backup_path)
         return False, str(e), None
+    except BaseException:
+        _remove(backup_path)
+        raise
+    finally:
+        _remove(dump_dir)
+    
+    if returncode != 0:
+        logger.error(f"Backup failed: {stderr}")
+        _remove(backup_path)
+        return False, stderr, None
+    
+    logger.info(f"Backup created successfully: {backup_path}")
+    return True, backup_name, backup_path
 
 
-def restore_backup(backup_filename: str, target_db_name: str) -> Tuple[bool, str]:
+def count_backup_tables(backup_filename: str) -> Optional[int]:
     """
-    Stellt ein Backup in einer Datenbank wieder her
+    Anzahl Tabelleninhalte (TABLE DATA) im Inhaltsverzeichnis eines Backups.
+    Für gepackte Verzeichnis-Backups unbekannt (None), das Inhaltsverzeichnis
+    liegt erst nach dem Entpacken vor.
+    """
+    if backup_filename.endswith(ARCHIVE_SUFFIX):
+        return None
+    backup_path = os.path.join(get_backup_directory(), backup_filename)
+    try:
+        result = subprocess.run(["pg_restore", "-l", backup_path], capture_output=True, text=True)
+    except OSError:
+        return None
+    if result.returncode != 0:
+        return None
+    return sum(1 for line in result.stdout.splitlines() if " TABLE DATA " in line)
+
+
+@contextmanager
+def _database_connection(db_name: str):
+    """Kurzlebige Verbindung ohne Pool zu einer beliebigen Datenbank des Servers"""
+    from app.config import settings
+    
+    url = make_url(settings.DATABASE_URL).set(database=db_name)
+    single_engine = create_engine(url, poolclass=NullPool)
+    try:
+        with single_engine.connect() as conn:
+            yield conn
+    finally:
+        single_engine.dispose()
+
+
+@contextmanager
+def exported_snapshot(db_name: str, tables: Sequence[str]):
+    """
+    Öffnet eine REPEATABLE-READ-Transaktion, exportiert ihren Snapshot und
+    zählt darin die Zeilen der Tabellen. pg_dump --snapshot=<id> sieht
+    denselben Stand wie die Zählung; die Transaktion bleibt offen, bis der
+    Block (und damit der Dump) beendet ist.
+
+    Yields:
+        Tuple[snapshot_id, {Tabelle: Anzahl}]
+    """
+    with _database_connection(db_name) as conn:
+        conn = conn.execution_options(isolation_level="REPEATABLE READ")
+        with conn.begin():
+            snapshot_id = conn.execute(text("SELECT pg_export_snapshot()")).scalar()
+            counts = {table: conn.execute(text(f'SELECT count(*) FROM "{table}"')).scalar() for table in tables}
+            yield snapshot_id, counts
+
+
+def count_tables(db_name: str) -> Optional[int]:
+    """Anzahl Tabellen im Schema public (für den Fortschritt eines Backups)"""
+    try:
+        with _database_connection(db_name) as conn:
+            return conn.execute(
+                text("SELECT count(*) FROM pg_tables WHERE schemaname = 'public'")
+            ).scalar()
+    except Exception:
+        return None
+
+
+def count_rows(db_name: str, tables: List[str]) -> dict:
+    """Zeilenanzahl je Tabelle; None für fehlende Tabellen"""
+    counts = {}
+    with _database_connection(db_name) as conn:
+        existing = {
+            row[0] for row in conn.execute(text("SELECT tablename FROM pg_tables WHERE schemaname = 'public'"))
+        }
+        for table in tables:
+            counts[table] = conn.execute(text(f'SELECT count(*) FROM "{table}"')).scalar() if table in existing else None
+    return counts
+
+
+def migrate_database(db_name: str) -> Tuple[bool, str]:
+    """
+    alembic upgrade head gegen eine andere Datenbank (z.B. Staging nach
+    einem Restore). Läuft als eigener Prozess, da migrations/env.py die
+    DATABASE_URL aus den Settings liest.
+    """
+    from app.config import settings
+    
+    env = os.environ.copy()
+    env["DATABASE_URL"] = make_url(settings.DATABASE_URL).set(database=db_name).render_as_string(hide_password=False)
+    backend_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    try:
+        result = subprocess.run(
+            ["alembic", "upgrade", "head"], cwd=backend_dir, env=env,
+            capture_output=True, text=True, timeout=600
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        return False, str(e)
+    if result.returncode != 0:
+        return False, result.stderr or result.stdout
+    return True, "Migrationen ausgeführt"
+
+
+def swap_databases(live_db_name: str, staging_db_name: str) -> str:
+    """
+    Tauscht die Staging-Datenbank gegen die laufende aus (zwei Umbenennungen).
+    Die laufende Datenbank nimmt kurz keine Verbindungen an, bestehende
+    werden beendet. Schlägt die zweite Umbenennung fehl, wird die erste
+    zurückgenommen.
+    
+    Returns:
+        Neuer Name der bisherigen Datenbank
+    """
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    previous_db_name = f"{live_db_name}_previous_{timestamp}"
+    
+    with _maintenance_connection() as conn:
+        conn.execute(text(f'ALTER DATABASE "{live_db_name}" WITH ALLOW_CONNECTIONS false'))
+        try:
+            conn.execute(
+                text(
+                    "SELECT pg_terminate_backend(pid) FROM pg_stat_activity "
+                    "WHERE datname IN (:live, :staging) AND pid <> pg_backend_pid()"
+                ),
+                {"live": live_db_name, "staging": staging_db_name}
+            )
+            conn.execute(text(f'ALTER DATABASE "{live_db_name}" RENAME TO "{previous_db_name}"'))
+            try:
+                conn.execute(text(f'ALTER DATABASE "{staging_db_name}" RENAME TO "{live_db_name}"'))
+            except Exception:
+                conn.execute(text(f'ALTER DATABASE "{previous_db_name}" RENAME TO "{live_db_name}"'))
+                raise
+        finally:
+            # Nach Erfolg die bisherige Datenbank (zum Löschen/Prüfen), sonst wieder die laufende freigeben
+            renamed = conn.execute(
+                text("SELECT 1 FROM pg_database WHERE datname = :db_name"), {"db_name": previous_db_name}
+            ).scalar()
+            name = previous_db_name if renamed else live_db_name
+            conn.execute(text(f'ALTER DATABASE "{name}" WITH ALLOW_CONNECTIONS true'))
+    
+    logger.info(f"🔁 Database {staging_db_name} swapped in as {live_db_name} (previous: {previous_db_name})")
+    return previous_db_name
+
+
+def restore_backup(
+    backup_filename: str,
+    target_db_name: str,
+    progress: Optional[ProgressCallback] = None,
+    parallel_jobs: int = 1
+) -> Tuple[bool, str]:
+    """
+    Stellt ein Backup in einer Datenbank wieder her (pg_restore -j parallel_jobs).
+    Verzeichnis-Backups (.tar.zst) werden dafür vorher temporär entpackt.
+    progress(tables_done, 0) wird während pg_restore regelmäßig aufgerufen;
+    wirft progress, wird pg_restore beendet (nur für Staging-Datenbanken sinnvoll).
     
     Returns:
         Tuple[success, message_or_error]
     """
-    params = get_db_connection_params()
+    params, env = _pg_env()
     backup_dir = get_backup_directory()
     backup_path = os.path.join(backup_dir, backup_filename)
     
     if not os.path.exists(backup_path):
         return False, f"Backup file not found: {backup_filename}"
     
+    extract_dir = None
     try:
-        env = os.environ.copy()
-        env["PGPASSWORD"] = params["password"]
+        if backup_filename.endswith(ARCHIVE_SUFFIX):
+            extract_dir = tempfile.mkdtemp(prefix=".restore_", dir=backup_dir)
+            returncode, stderr = _run_pg_tool(
+                ["tar", "-I", "zstd -T0", "-xf", backup_path, "-C", extract_dir], env, _RESTORE_TABLE_LINE
+            )
+            if returncode != 0:
+                return False, f"Backup konnte nicht entpackt werden: {stderr}"
+            backup_path = extract_dir
         
         # Erst alle Tabellen löschen (clean restore)
         cmd = [
@@ -139,17 +530,19 @@ def restore_backup(backup_filename: str, target_db_name: str) -> Tuple[bool, str
             "-c",  # Clean (drop objects before recreating)
             "--if-exists",
             "--no-comments",  # Skip comments that may contain incompatible settings
+            "-v",  # Tabellenweise Ausgabe für den Fortschritt
+            "-j", str(max(parallel_jobs, 1)),
             backup_path
         ]
         
-        logger.info(f"Restoring backup {backup_filename} to {target_db_name}")
-        result = subprocess.run(cmd, env=env, capture_output=True, text=True)
+        logger.info(f"Restoring backup {backup_filename} to {target_db_name} ({parallel_jobs} parallel jobs)")
+        returncode, stderr = _run_pg_tool(cmd, env, _RESTORE_TABLE_LINE, progress=progress)
         
         # pg_restore kann Warnungen ausgeben, die nicht kritisch sind
         # Ignoriere bekannte harmlose Fehler wie transaction_timeout
-        if result.returncode != 0 and "ERROR" in result.stderr:
+        if returncode != 0 and "ERROR" in stderr:
             # Prüfe ob es nur harmlose Fehler sind
-            stderr_lines = result.stderr.strip().split('\n')
+            stderr_lines = stderr.strip().split('\n')
             critical_errors = []
             ignorable_patterns = [
                 "transaction_timeout",
@@ -169,14 +562,17 @@ def restore_backup(backup_filename: str, target_db_name: str) -> Tuple[bool, str
                 logger.error(f"Restore failed with critical errors: {critical_errors}")
                 return False, "\n".join(critical_errors)
             else:
-                logger.warning(f"Restore completed with ignorable warnings: {result.stderr}")
+                logger.warning(f"Restore completed with ignorable warnings: {stderr}")
         
         logger.info(f"Restore completed for {target_db_name}")
         return True, "Backup erfolgreich wiederhergestellt"
         
-    except Exception as e:
+    except OSError as e:
         logger.error(f"Restore exception: {str(e)}")
         return False, str(e)
+    finally:
+        if extract_dir:
+            _remove(extract_dir)
 
 
 def list_backups() -> List[dict]:
@@ -186,7 +582,7 @@ def list_backups() -> List[dict]:
     
     try:
         for filename in os.listdir(backup_dir):
-            if filename.endswith(".sql"):
+            if filename.endswith(BACKUP_SUFFIXES):
                 filepath = os.path.join(backup_dir, filename)
                 stat = os.stat(filepath)
                 backups.append({
@@ -247,35 +643,17 @@ def cleanup_old_backups(max_backups: int, db_name: Optional[str] = None) -> int:
 
 def create_database(db_name: str) -> Tuple[bool, str]:
     """Erstellt eine neue PostgreSQL-Datenbank"""
-    params = get_db_connection_params()
-    
     try:
-        env = os.environ.copy()
-        env["PGPASSWORD"] = params["password"]
-        
-        # Verbinde zu postgres DB um neue DB zu erstellen
-        cmd = [
-            "psql",
-            "-h", params["host"],
-            "-p", params["port"],
-            "-U", params["user"],
-            "-d", "postgres",
-            "-c", f'CREATE DATABASE "{db_name}";'
-        ]
-        
         logger.info(f"Creating database: {db_name}")
-        result = subprocess.run(cmd, env=env, capture_output=True, text=True)
-        
-        if result.returncode != 0:
-            if "already exists" in result.stderr:
-                return False, "Datenbank existiert bereits"
-            logger.error(f"Create DB failed: {result.stderr}")
-            return False, result.stderr
+        with _maintenance_connection() as conn:
+            conn.execute(text(f'CREATE DATABASE "{db_name}"'))
         
         logger.info(f"Database created: {db_name}")
         return True, "Datenbank erstellt"
         
     except Exception as e:
+        if "already exists" in str(e):
+            return False, "Datenbank existiert bereits"
         logger.error(f"Create DB exception: {str(e)}")
         return False, str(e)
 
@@ -289,36 +667,15 @@ def drop_database(db_name: str) -> Tuple[bool, str]:
         return False, "Die aktive Datenbank kann nicht gelöscht werden"
     
     try:
-        env = os.environ.copy()
-        env["PGPASSWORD"] = params["password"]
-        
-        # Beende alle Verbindungen zur DB
-        terminate_cmd = [
-            "psql",
-            "-h", params["host"],
-            "-p", params["port"],
-            "-U", params["user"],
-            "-d", "postgres",
-            "-c", f"SELECT pg_terminate_backend(pid) FROM pg_stat_activity WHERE datname = '{db_name}';"
-        ]
-        subprocess.run(terminate_cmd, env=env, capture_output=True, text=True)
-        
-        # Lösche die DB
-        cmd = [
-            "psql",
-            "-h", params["host"],
-            "-p", params["port"],
-            "-U", params["user"],
-            "-d", "postgres",
-            "-c", f'DROP DATABASE IF EXISTS "{db_name}";'
-        ]
-        
         logger.info(f"Dropping database: {db_name}")
-        result = subprocess.run(cmd, env=env, capture_output=True, text=True)
-        
-        if result.returncode != 0:
-            logger.error(f"Drop DB failed: {result.stderr}")
-            return False, result.stderr
+        with _maintenance_connection() as conn:
+            # Beende alle Verbindungen zur DB
+            conn.execute(
+                text("SELECT pg_terminate_backend(pid) FROM pg_stat_activity WHERE datname = :db_name"),
+                {"db_name": db_name}
+            )
+            # Lösche die DB
+            conn.execute(text(f'DROP DATABASE IF EXISTS "{db_name}"'))
         
         logger.info(f"Database dropped: {db_name}")
         return True, "Datenbank gelöscht"
@@ -330,24 +687,24 @@ def drop_database(db_name: str) -> Tuple[bool, str]:
 
 def database_exists(db_name: str) -> bool:
     """Prüft ob eine Datenbank existiert"""
-    params = get_db_connection_params()
+    from app.database import engine
     
     try:
-        env = os.environ.copy()
-        env["PGPASSWORD"] = params["password"]
-        
-        cmd = [
-            "psql",
-            "-h", params["host"],
-            "-p", params["port"],
-            "-U", params["user"],
-            "-d", "postgres",
-            "-t",
-            "-c", f"SELECT 1 FROM pg_database WHERE datname = '{db_name}';"
-        ]
-        
-        result = subprocess.run(cmd, env=env, capture_output=True, text=True)
-        return "1" in result.stdout
+        # pg_database ist aus jeder Datenbank lesbar - der Pool reicht aus
+        with engine.connect() as conn:
+            result = conn.execute(
+                text("SELECT 1 FROM pg_database WHERE datname = :db_name"),
+                {"db_name": db_name}
+            )
+            return result.scalar() is not None
         
     except Exception:
         return False
+
+
+def list_database_names() -> List[str]:
+    """Namen aller Datenbanken auf dem Server"""
+    from app.database import engine
+    
+    with engine.connect() as conn:
+        return [row[0] for row in conn.execute(text("SELECT datname FROM pg_database WHERE NOT datistemplate"))]
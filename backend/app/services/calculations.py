@@ -1,10 +1,11 @@
 from datetime import datetime, date as date_type
-from typing import List, Dict, Union, Tuple
+from typing import List, Dict, Union, Tuple, NamedTuple, Optional
 from app.models.contract import Contract
 from app.models.settings import Settings
 from app.models.price_increase import PriceIncrease
 from app.models.commission_rate import CommissionRate
-from app.utils.date_utils import months_between, add_months
+from app.utils.date_utils import months_between, add_months, add_months_stepwise
+from app.utils.timing import count
 
 
 def _to_date(d: Union[datetime, date_type]) -> date_type:
@@ -52,6 +53,31 @@ def get_effective_status(
     return ('active', None)
 
 
+def get_applicable_commission_rate(
+    commission_rates_list: List[CommissionRate],
+    date: Union[datetime, date_type]
+) -> Optional[CommissionRate]:
+    """
+    Der zum Datum geltende Provisionssatz-Eintrag: der neueste mit valid_from
+    auf oder vor dem Datum, sonst der älteste. None, wenn keine Sätze
+    hinterlegt sind (dann gelten die Standardsätze).
+    """
+    if not commission_rates_list:
+        return None
+    
+    # Normalisiere das Datum für Vergleiche
+    compare_date = _to_date(date)
+    
+    # Finde die neueste Commission Rate die auf oder vor dem Datum gültig ist
+    for rate in sorted(commission_rates_list, key=lambda r: r.valid_from, reverse=True):
+        rate_date = _to_date(rate.valid_from)
+        if rate_date <= compare_date:
+            return rate
+    
+    # Fallback: Älteste Commission Rate (auch wenn sie in der Zukunft liegt)
+    return min(commission_rates_list, key=lambda r: r.valid_from)
+
+
 def get_commission_rates_for_date(
     commission_rates_list: List[CommissionRate],
     date: Union[datetime, date_type]
@@ -62,8 +88,10 @@ def get_commission_rates_for_date(
     Uses snake_case keys for all rate dictionaries
     All rates are stored as percentages (e.g., 20 for 20%)
     """
+    applicable_rate = get_applicable_commission_rate(commission_rates_list, date)
+    
     # Keine Commission Rates verfügbar - Fallback zu Default
-    if not commission_rates_list:
+    if applicable_rate is None:
         return {
             "software_rental": 20.0,
             "software_care": 20.0,
@@ -72,27 +100,8 @@ def get_commission_rates_for_date(
             "cloud": 10.0
         }
     
-    # Normalisiere das Datum für Vergleiche
-    compare_date = _to_date(date)
-    
-    # Finde die neueste Commission Rate die auf oder vor dem Datum gültig ist
-    applicable_rate = None
-    for rate in sorted(commission_rates_list, key=lambda r: r.valid_from, reverse=True):
-        rate_date = _to_date(rate.valid_from)
-        if rate_date <= compare_date:
-            applicable_rate = rate
-            break
-    
-    if applicable_rate:
-        # Convert camelCase keys to snake_case if needed
-        rates_dict = applicable_rate.rates
-        normalized_rates = _normalize_rate_keys(rates_dict)
-        return normalized_rates
-    else:
-        # Fallback: Älteste Commission Rate (auch wenn sie in der Zukunft liegt)
-        oldest_rate = min(commission_rates_list, key=lambda r: r.valid_from)
-        normalized_rates = _normalize_rate_keys(oldest_rate.rates)
-        return normalized_rates
+    # Convert camelCase keys to snake_case if needed
+    return _normalize_rate_keys(applicable_rate.rates)
 
 
 def _normalize_rate_keys(rates: Dict[str, float]) -> Dict[str, float]:
@@ -143,6 +152,7 @@ def get_current_monthly_price(
                                       Wird für die Bestandsschutz-Berechnung verwendet.
                                       Falls None, wird das Startdatum des aktuellen Vertrags verwendet.
     """
+    count("get_current_monthly_price")
     # Basis-Beträge
     amounts = {
         'software_rental': contract.software_rental_amount,
@@ -215,6 +225,7 @@ def get_current_monthly_commission(
                                       Wird für die Bestandsschutz-Berechnung verwendet.
                                       Falls None, wird das Startdatum des aktuellen Vertrags verwendet.
     """
+    count("get_current_monthly_commission")
     if contract.status.value != 'active':
         return 0.0
     
@@ -305,13 +316,20 @@ def get_current_monthly_commission(
     
     return total_commission
 
+class LedgerBalance(NamedTuple):
+    """Summe der Provision eines Vertrags aus dem Provisions-Ledger"""
+    amount: float
+    through: datetime  # Erster Tag nach dem letzten abgeschlossenen Monat
+
+
 def calculate_earnings_to_date(
     contract: Contract,
     settings: Settings,
     price_increases: List[PriceIncrease],
     commission_rates_list: List[CommissionRate],
     to_date: datetime,
-    customer_first_contract_date: datetime = None
+    customer_first_contract_date: datetime = None,
+    ledger_balance: Optional[LedgerBalance] = None
 ) -> float:
     """
     Addiert alle Provisionen vom Vertragsbeginn bis to_date
@@ -319,12 +337,24 @@ def calculate_earnings_to_date(
     
     Args:
         customer_first_contract_date: Das Startdatum des ersten Vertrags des Kunden.
+        ledger_balance: Summe der abgeschlossenen Monate aus dem Provisions-Ledger;
+                        gerechnet werden dann nur die Monate ab ledger_balance.through.
     """
-    from app.utils.date_utils import add_months
+    count("calculate_earnings_to_date")
     
     total = 0.0
     current_date = contract.start_date
     
+    if ledger_balance is not None and ledger_balance.through <= to_date:
+        # Ohne aktiven Vertragsstatus ist jeder Monat 0 (wie get_current_monthly_commission)
+        if contract.status.value != 'active':
+            return 0.0
+        total = ledger_balance.amount
+        # Erster Abrechnungstag im Monat von through (gleiche Tageskürzung wie die Schleife)
+        current_date = add_months_stepwise(
+            contract.start_date, months_between(contract.start_date, ledger_balance.through)
+        )
+    
     while current_date <= to_date:
         commission = get_current_monthly_commission(
             contract, settings, price_increases, commission_rates_list, current_date,
@@ -384,6 +414,7 @@ def calculate_exit_payout(
     Args:
         customer_first_contract_date: Das Startdatum des ersten Vertrags des Kunden.
     """
+    count("calculate_exit_payout")
     months_running = months_between(contract.start_date, today)
     
     # Vertrag bereits beendet
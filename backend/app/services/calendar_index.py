@@ -0,0 +1,298 @@
+"""
+Kalender-Index
+Vorberechnete Termine pro Vertrag, nach Datum sortiert:
+
+- "price_increase": Preiserhöhung wird für den Vertrag wirksam (valid_from)
+- "lock_in_end":    Bestandsschutz des Vertrags für eine Preiserhöhung endet
+                    (erster Kundenvertrag + lock_in_months). Laut Berechnungslogik
+                    wird die Erhöhung danach NICHT nachträglich angewendet.
+- "founder_end":    Existenzgründer-Phase endet (Start + founder_delay_months)
+
+Der Index wird beim ersten Zugriff aus der Datenbank aufgebaut und danach
+von den Schreib-Endpunkten inkrementell gepflegt (Vertrag/Kunde geändert).
+Änderungen an Preiserhöhungen oder Einstellungen, Restores und Schreibzugriffe
+außerhalb der API (z.B. scripts/generate_portfolio.py) führen zu einem
+Neuaufbau beim nächsten Zugriff bzw. nach CALENDAR_INDEX_MAX_AGE_SECONDS.
+
+Abfragen eines Zeitfensters laufen per Binärsuche in O(log n + k).
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left, insort
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.config import settings as app_settings
+from app.database import DatabaseScoped
+from app.models.contract import Contract
+from app.models.price_increase import PriceIncrease
+from app.models.settings import Settings
+from app.utils.date_utils import add_months, months_between
+
+logger = logging.getLogger(__name__)
+
+EVENT_TYPES = ("price_increase", "lock_in_end", "founder_end")
+
+
+class CalendarEvent(NamedTuple):
+    """Sortierschlüssel ist (date, contract_id, price_increase_id)"""
+    date: datetime
+    contract_id: str
+    price_increase_id: str  # "" bei founder_end
+    event_type: str
+    customer_id: str
+
+
+@dataclass(frozen=True)
+class ContractDates:
+    """Die für den Kalender relevanten Felder eines Vertrags"""
+    id: str
+    customer_id: str
+    start_date: datetime
+    end_date: Optional[datetime]
+    is_founder_discount: bool
+    excluded_price_increase_ids: Tuple[str, ...]
+    included_early_price_increase_ids: Tuple[str, ...]
+
+    @classmethod
+    def from_contract(cls, contract) -> "ContractDates":
+        return cls(
+            id=contract.id,
+            customer_id=contract.customer_id,
+            start_date=contract.start_date,
+            end_date=contract.end_date,
+            is_founder_discount=bool(contract.is_founder_discount),
+            excluded_price_increase_ids=tuple(contract.excluded_price_increase_ids or ()),
+            included_early_price_increase_ids=tuple(contract.included_early_price_increase_ids or ()),
+        )
+
+
+@dataclass(frozen=True)
+class PriceIncreaseRule:
+    id: str
+    valid_from: datetime
+    lock_in_months: int
+    description: str
+
+
+def contract_events(
+    contract: ContractDates,
+    customer_first_contract_date: datetime,
+    price_increases: List[PriceIncreaseRule],
+    founder_delay_months: int
+) -> List[CalendarEvent]:
+    """
+    Termine eines Vertrags, gleiche Regeln wie get_current_monthly_price:
+    ausgeschlossene Erhöhungen zählen nicht, manuell vorgezogene umgehen
+    Startdatum- und Bestandsschutz-Prüfung. Termine nach Vertragsende entfallen.
+    """
+    events = []
+
+    def add(date: datetime, event_type: str, price_increase_id: str = ""):
+        if contract.end_date and contract.end_date <= date:
+            return
+        events.append(CalendarEvent(date, contract.id, price_increase_id, event_type, contract.customer_id))
+
+    if contract.is_founder_discount:
+        add(add_months(contract.start_date, founder_delay_months), "founder_end")
+
+    reference_date = customer_first_contract_date or contract.start_date
+    for price_increase in price_increases:
+        if price_increase.id in contract.excluded_price_increase_ids:
+            continue
+        is_manually_included = price_increase.id in contract.included_early_price_increase_ids
+        if price_increase.valid_from < contract.start_date and not is_manually_included:
+            continue
+
+        months_at_price_increase = months_between(reference_date, price_increase.valid_from)
+        if months_at_price_increase >= price_increase.lock_in_months or is_manually_included:
+            add(price_increase.valid_from, "price_increase", price_increase.id)
+        else:
+            add(add_months(reference_date, price_increase.lock_in_months), "lock_in_end", price_increase.id)
+
+    return events
+
+
+class CalendarIndex:
+    """
+    Sortierte Terminlisten (eine pro Typ) plus Zuordnung Vertrag → Termine
+    für die inkrementelle Pflege. Alle Zugriffe laufen unter einem Lock.
+    """
+
+    def __init__(self, max_age_seconds: int = 3600):
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.RLock()
+        self._loaded_at: Optional[float] = None
+        self._events: Dict[str, List[CalendarEvent]] = {event_type: [] for event_type in EVENT_TYPES}
+        self._by_contract: Dict[str, List[CalendarEvent]] = {}
+        self._contracts: Dict[str, ContractDates] = {}
+        self._customer_contracts: Dict[str, Dict[str, ContractDates]] = {}
+        self._price_increases: List[PriceIncreaseRule] = []
+        self._founder_delay_months = 12
+
+    # ---------- Aufbau ----------
+
+    def invalidate(self):
+        """Erzwingt einen Neuaufbau beim nächsten Zugriff"""
+        with self._lock:
+            self._loaded_at = None
+
+    def is_loaded(self) -> bool:
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < self.max_age_seconds
+
+    def ensure_loaded(self, db: Session):
+        with self._lock:
+            if not self.is_loaded():
+                self.rebuild(db)
+
+    def rebuild(self, db: Session):
+        """Lädt die relevanten Spalten aller Verträge und berechnet alle Termine neu"""
+        started = time.perf_counter()
+        settings = db.query(Settings).filter(Settings.id == "default").first()
+        price_increases = [
+            PriceIncreaseRule(pi.id, pi.valid_from, pi.lock_in_months or 0, pi.description or "")
+            for pi in db.query(PriceIncrease).all()
+        ]
+        rows = db.query(
+            Contract.id, Contract.customer_id, Contract.start_date, Contract.end_date,
+            Contract.is_founder_discount, Contract.excluded_price_increase_ids,
+            Contract.included_early_price_increase_ids
+        ).all()
+
+        with self._lock:
+            self._price_increases = price_increases
+            self._founder_delay_months = settings.founder_delay_months if settings else 12
+            self._contracts = {}
+            self._customer_contracts = {}
+            for row in rows:
+                contract = ContractDates.from_contract(row)
+                self._contracts[contract.id] = contract
+                self._customer_contracts.setdefault(contract.customer_id, {})[contract.id] = contract
+
+            self._by_contract = {}
+            all_events: List[CalendarEvent] = []
+            for customer_id in self._customer_contracts:
+                all_events.extend(self._compute_customer(customer_id))
+            self._events = {event_type: [] for event_type in EVENT_TYPES}
+            for event in all_events:
+                self._events[event.event_type].append(event)
+            for events in self._events.values():
+                events.sort()
+            self._loaded_at = time.monotonic()
+
+        logger.info(
+            f"📅 Calendar index built: {len(rows)} contracts, {len(all_events)} events "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
+
+    def _compute_customer(self, customer_id: str) -> List[CalendarEvent]:
+        """Berechnet die Termine aller Verträge eines Kunden (ohne sie einzufügen)"""
+        contracts = self._customer_contracts.get(customer_id, {})
+        if not contracts:
+            return []
+        first_date = min(contract.start_date for contract in contracts.values())
+        events = []
+        for contract in contracts.values():
+            contract_events_list = contract_events(
+                contract, first_date, self._price_increases, self._founder_delay_months
+            )
+            self._by_contract[contract.id] = contract_events_list
+            events.extend(contract_events_list)
+        return events
+
+    # ---------- Inkrementelle Pflege ----------
+
+    def _remove_events(self, contract_id: str):
+        for event in self._by_contract.pop(contract_id, []):
+            events = self._events[event.event_type]
+            position = bisect_left(events, event)
+            if position < len(events) and events[position] == event:
+                del events[position]
+
+    def _refresh_customer(self, customer_id: str):
+        """Erstes Vertragsdatum kann sich geändert haben: alle Verträge des Kunden neu"""
+        for contract_id in self._customer_contracts.get(customer_id, {}):
+            self._remove_events(contract_id)
+        for event in self._compute_customer(customer_id):
+            insort(self._events[event.event_type], event)
+
+    def upsert_contract(self, contract: Contract):
+        """Nach dem Anlegen/Ändern eines Vertrags aufrufen"""
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            updated = ContractDates.from_contract(contract)
+            previous = self._contracts.get(updated.id)
+            if previous and previous.customer_id != updated.customer_id:
+                self.remove_contract(updated.id)
+            self._contracts[updated.id] = updated
+            self._customer_contracts.setdefault(updated.customer_id, {})[updated.id] = updated
+            self._refresh_customer(updated.customer_id)
+
+    def remove_contract(self, contract_id: str):
+        """Nach dem Löschen eines Vertrags aufrufen"""
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            contract = self._contracts.pop(contract_id, None)
+            self._remove_events(contract_id)
+            if contract is None:
+                return
+            customer_contracts = self._customer_contracts.get(contract.customer_id, {})
+            customer_contracts.pop(contract_id, None)
+            if customer_contracts:
+                self._refresh_customer(contract.customer_id)
+            else:
+                self._customer_contracts.pop(contract.customer_id, None)
+
+    def remove_customer(self, customer_id: str):
+        """Nach dem Löschen eines Kunden (Verträge werden kaskadiert gelöscht)"""
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            for contract_id in list(self._customer_contracts.pop(customer_id, {})):
+                self._contracts.pop(contract_id, None)
+                self._remove_events(contract_id)
+
+    # ---------- Abfrage ----------
+
+    def query(
+        self,
+        start: datetime,
+        end: datetime,
+        event_types: Optional[List[str]] = None,
+        limit: Optional[int] = None
+    ) -> List[CalendarEvent]:
+        """Termine mit start <= date < end, nach Datum sortiert"""
+        with self._lock:
+            result = []
+            for event_type in event_types or EVENT_TYPES:
+                events = self._events[event_type]
+                lower = bisect_left(events, (start,))
+                upper = bisect_left(events, (end,))
+                if limit is not None:
+                    upper = min(upper, lower + limit)
+                result.extend(events[lower:upper])
+        result.sort()
+        return result[:limit] if limit is not None else result
+
+    def price_increase_descriptions(self) -> Dict[str, str]:
+        with self._lock:
+            return {pi.id: pi.description for pi in self._price_increases}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "loaded": self._loaded_at is not None,
+                "age_seconds": round(time.monotonic() - self._loaded_at, 1) if self._loaded_at else None,
+                "contracts": len(self._contracts),
+                "events": {event_type: len(events) for event_type, events in self._events.items()},
+            }
+
+
+# Ein Index pro Datenbank (PROD/DEMO)
+calendar_index = DatabaseScoped(lambda: CalendarIndex(max_age_seconds=app_settings.CALENDAR_INDEX_MAX_AGE_SECONDS))
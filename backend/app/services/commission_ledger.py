@@ -0,0 +1,382 @@
+"""
+Provisions-Ledger
+Pro Vertrag und abgeschlossenem Monat eine Zeile mit den Beträgen (inkl.
+Preiserhöhungen), den angewendeten Sätzen und Preiserhöhungen und der
+Provision. Abgerechnet wird wie in calculate_earnings_to_date am
+Abrechnungstag des Vertrags im Monat (Vertragsbeginn + n Monate).
+
+- Monatsabschluss: Scheduler-Job am Monatsersten (close_pending_months)
+  schließt alle noch offenen Monate bis zum Vormonat.
+- Änderungen an Verträgen: recompute_customers rechnet die Zeilen der
+  betroffenen Kunden neu (Bestandsschutz hängt am ersten Kundenvertrag).
+- Änderungen an Preiserhöhungen, Provisionssätzen oder der Existenzgründer-
+  Karenz: mark_stale markiert die Monate ab dem betroffenen Datum, ein
+  Hintergrund-Job rechnet nur diese Monate neu.
+
+Gespeichert wird die Provision nach Vertragsdaten. Der aktuelle Vertragsstatus
+(Contract.status, heutige Uhrzeit) wird erst beim Lesen angewendet, wie in
+get_current_monthly_commission. Gelesen werden nur lückenlos abgeschlossene
+Monate (load_ledger_balances); ab dem ersten offenen oder ungültigen Monat
+rechnet calculate_earnings_to_date wie bisher.
+"""
+import asyncio
+import logging
+import threading
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.commission_ledger import CommissionLedgerEntry, CommissionLedgerMonth
+from app.models.commission_rate import CommissionRate
+from app.models.contract import Contract
+from app.models.price_increase import PriceIncrease
+from app.models.settings import Settings
+from app.services.calculations import (
+    LedgerBalance, get_applicable_commission_rate, get_commission_rates_for_date
+)
+from app.services.job_service import JobHandle, job_service
+from app.services.portfolio_engine import AMOUNT_TYPES, PortfolioSnapshot, rate_vector, sequential_sum
+from app.utils.date_utils import add_months, add_months_stepwise
+
+logger = logging.getLogger(__name__)
+
+LEDGER_JOB_TYPE = "commission_ledger"
+INSERT_CHUNK_SIZE = 10_000
+
+# Nur ein Lauf gleichzeitig schreibt ins Ledger
+_ledger_lock = threading.Lock()
+
+
+def period_of(date: datetime) -> str:
+    return date.strftime("%Y-%m")
+
+
+def period_start(period: str) -> datetime:
+    return datetime.strptime(period, "%Y-%m")
+
+
+def last_closable_period(today: Optional[datetime] = None) -> str:
+    """Der Vormonat: der jüngste Monat, dessen Abrechnungstage alle vorbei sind"""
+    return period_of(add_months((today or datetime.utcnow()).replace(day=1), -1))
+
+
+def _periods_between(first: str, last: str) -> List[str]:
+    periods = []
+    current = period_start(first)
+    end = period_start(last)
+    while current <= end:
+        periods.append(period_of(current))
+        current = add_months(current, 1)
+    return periods
+
+
+def load_snapshot(db: Session, customer_ids: Optional[Sequence[str]] = None) -> Optional[PortfolioSnapshot]:
+    """Snapshot aller (bzw. der Verträge der angegebenen Kunden); None ohne Einstellungen"""
+    query = db.query(Contract)
+    if customer_ids is not None:
+        query = query.filter(Contract.customer_id.in_(list(customer_ids)))
+    settings = db.query(Settings).filter(Settings.id == "default").first()
+    if not settings:
+        return None
+    return PortfolioSnapshot(
+        query.all(), settings, db.query(PriceIncrease).all(),
+        db.query(CommissionRate).order_by(CommissionRate.valid_from).all()
+    )
+
+
+def build_period_rows(snapshot: PortfolioSnapshot, period: str, computed_at: datetime) -> List[dict]:
+    """
+    Ledger-Zeilen eines Monats für alle Verträge, die in dem Monat laufen
+    (begonnen, Abrechnungstag nicht nach Vertragsende)
+    """
+    first_day = period_start(period)
+    offsets = first_day.year * 12 + first_day.month - snapshot.start_month
+    accrual_by_position: Dict[int, datetime] = {}
+    for i in np.flatnonzero(offsets >= 0):
+        start = snapshot.start[i].astype("datetime64[us]").item()
+        accrual = add_months_stepwise(start, int(offsets[i]))
+        if snapshot.has_end[i] and np.datetime64(accrual, "us") > snapshot.end[i]:
+            continue
+        accrual_by_position[int(i)] = accrual
+
+    positions_by_date: Dict[datetime, List[int]] = defaultdict(list)
+    for i, accrual in accrual_by_position.items():
+        positions_by_date[accrual].append(i)
+
+    rows: List[dict] = []
+    for date, adjusted in snapshot.iter_adjusted_amounts(list(positions_by_date)):
+        positions = np.array(positions_by_date[date], dtype=np.int64)
+        rate = get_applicable_commission_rate(snapshot.commission_rates, date)
+        rates = get_commission_rates_for_date(snapshot.commission_rates, date)
+        active = snapshot.effective_active(date)[positions]
+        commission = np.where(active, sequential_sum(adjusted[positions] * (rate_vector(rates) / 100)), 0.0)
+        applied = [(pi_id, eligible[positions]) for pi_id, eligible in snapshot.applied_price_increases(date)]
+
+        for k, i in enumerate(positions):
+            amounts = adjusted[i]
+            rows.append({
+                "id": str(uuid.uuid4()),
+                "contract_id": snapshot.contract_ids[i],
+                "customer_id": snapshot.customer_ids[snapshot.customer_index[i]],
+                "period": period,
+                "accrual_date": date,
+                "effective_status": "active" if active[k] else "founder",
+                **{f"{t}_amount": float(amounts[j]) for j, t in enumerate(AMOUNT_TYPES)},
+                "commission_rate_id": rate.id if rate is not None else None,
+                "rates": rates,
+                "applied_price_increase_ids": [pi_id for pi_id, eligible in applied if eligible[k]],
+                "commission": float(commission[k]),
+                "computed_at": computed_at,
+            })
+    return rows
+
+
+def _insert_rows(db: Session, rows: List[dict]):
+    for offset in range(0, len(rows), INSERT_CHUNK_SIZE):
+        db.execute(insert(CommissionLedgerEntry), rows[offset:offset + INSERT_CHUNK_SIZE])
+
+
+def _refresh_month_totals(db: Session, periods: Iterable[str]):
+    """Anzahl und Summe pro Monat aus den Ledger-Zeilen übernehmen"""
+    periods = list(periods)
+    if not periods:
+        return
+    totals = dict.fromkeys(periods, (0, 0.0))
+    for period, count, total in db.execute(
+        select(CommissionLedgerEntry.period, func.count(), func.sum(CommissionLedgerEntry.commission))
+        .where(CommissionLedgerEntry.period.in_(periods))
+        .group_by(CommissionLedgerEntry.period)
+    ):
+        totals[period] = (count, total or 0.0)
+    for period, (count, total) in totals.items():
+        db.execute(
+            update(CommissionLedgerMonth)
+            .where(CommissionLedgerMonth.period == period)
+            .values(contract_count=count, total_commission=round(total, 2))
+        )
+
+
+def _close_period(db: Session, snapshot: PortfolioSnapshot, period: str, loaded_at: datetime) -> int:
+    """Schreibt alle Zeilen eines Monats neu und markiert ihn als abgeschlossen"""
+    now = datetime.utcnow()
+    rows = build_period_rows(snapshot, period, now)
+    db.execute(delete(CommissionLedgerEntry).where(CommissionLedgerEntry.period == period))
+    _insert_rows(db, rows)
+
+    month = db.get(CommissionLedgerMonth, period)
+    if month is None:
+        db.add(CommissionLedgerMonth(period=period, status="closed", closed_at=now))
+    else:
+        # Wurde der Monat nach dem Laden des Snapshots erneut ungültig, bleibt er "stale"
+        if month.invalidated_at is None or month.invalidated_at < loaded_at:
+            month.status = "closed"
+        month.recomputed_at = now
+    db.flush()
+    _refresh_month_totals(db, [period])
+    db.commit()
+    return len(rows)
+
+
+def _pending_periods(db: Session, until: str) -> List[str]:
+    """Monate ohne Abschluss (ab dem ersten Vertragsbeginn) und ungültige Monate bis until"""
+    first_start = db.query(func.min(Contract.start_date)).scalar()
+    if first_start is None or period_of(first_start) > until:
+        return []
+    months = {m.period: m.status for m in db.query(CommissionLedgerMonth).all()}
+    return [p for p in _periods_between(period_of(first_start), until) if months.get(p) != "closed"]
+
+
+def has_pending_periods(db: Session) -> bool:
+    return bool(_pending_periods(db, last_closable_period()))
+
+
+def close_pending_months(job: Optional[JobHandle] = None, until: Optional[str] = None) -> dict:
+    """
+    Schließt alle offenen Monate bis until (Standard: Vormonat) und rechnet
+    ungültige Monate neu, ältester zuerst. Ändert sich währenddessen etwas,
+    wird mit neuem Snapshot weitergerechnet, bis nichts mehr offen ist.
+    """
+    until = until or last_closable_period()
+    closed: List[str] = []
+    rows = 0
+    with _ledger_lock:
+        db = SessionLocal()
+        try:
+            for _ in range(3):
+                pending = _pending_periods(db, until)
+                if not pending:
+                    break
+                loaded_at = datetime.utcnow()
+                snapshot = load_snapshot(db)
+                if snapshot is None:
+                    raise ValueError("Einstellungen nicht konfiguriert")
+                for period in pending:
+                    if job is not None:
+                        job.check_cancelled()
+                    rows += _close_period(db, snapshot, period, loaded_at)
+                    closed.append(period)
+                    if job is not None:
+                        job.progress({"type": "progress", "period": period, "closed": len(closed), "pending": len(pending)})
+        finally:
+            db.close()
+
+    if closed:
+        logger.info(f"📒 Commission ledger: {len(closed)} month(s) closed, {rows:,} rows written")
+    return {"closed_periods": closed, "rows": rows, "until": until}
+
+
+def submit_ledger_job(until: Optional[str] = None) -> str:
+    """Monatsabschluss bzw. Neuberechnung als Hintergrund-Job"""
+    return job_service.submit(
+        LEDGER_JOB_TYPE, lambda job: close_pending_months(job, until), {"until": until}
+    )
+
+
+def _stale_statement(from_date: Optional[datetime]):
+    query = update(CommissionLedgerMonth).values(status="stale", invalidated_at=datetime.utcnow())
+    if from_date is not None:
+        query = query.where(CommissionLedgerMonth.period >= period_of(from_date))
+    return query
+
+
+def mark_stale(db: Session, from_date: Optional[datetime] = None) -> int:
+    """Abgeschlossene Monate ab from_date (None = alle) ungültig machen (ohne Commit)"""
+    return db.execute(_stale_statement(from_date)).rowcount
+
+
+def invalidate_from(db: Session, from_date: Optional[datetime]):
+    """Monate ab from_date (None = alle) ungültig machen und im Hintergrund neu berechnen"""
+    if mark_stale(db, from_date):
+        db.commit()
+        submit_ledger_job()
+
+
+async def invalidate_for_rate_change(db: AsyncSession, *dates: datetime):
+    """
+    Nach Änderung von Provisionssätzen: Monate ab dem frühesten betroffenen
+    Datum. Betrifft die Änderung den ältesten Satz, gelten davor liegende
+    Monate ebenfalls als betroffen (Fallback auf den ältesten Satz).
+    """
+    from_date = min(dates)
+    earliest = (await db.execute(select(func.min(CommissionRate.valid_from)))).scalar()
+    if earliest is None or from_date <= earliest:
+        from_date = None
+    if (await db.execute(_stale_statement(from_date))).rowcount:
+        await db.commit()
+        # job_service.submit schreibt die Job-Zeile synchron - nicht auf dem Event-Loop
+        await asyncio.to_thread(submit_ledger_job)
+
+
+def forget_customer(db: Session, customer_id: str):
+    """Vor dem Löschen eines Kunden: seine Zeilen entfernen und Monatssummen anpassen (ohne Commit)"""
+    periods = [
+        p for (p,) in db.query(CommissionLedgerEntry.period)
+        .filter(CommissionLedgerEntry.customer_id == customer_id).distinct()
+    ]
+    db.execute(delete(CommissionLedgerEntry).where(CommissionLedgerEntry.customer_id == customer_id))
+    _refresh_month_totals(db, periods)
+
+
+def recompute_customers(db: Session, customer_ids: Sequence[str]):
+    """
+    Ledger-Zeilen der Kunden in allen abgeschlossenen Monaten neu schreiben
+    (nach Anlegen, Ändern oder Löschen eines Vertrags). Läuft gerade ein
+    Ledger-Job, werden die Monate stattdessen als ungültig markiert.
+    """
+    customer_ids = list(customer_ids)
+    if not customer_ids:
+        return
+    if not _ledger_lock.acquire(blocking=False):
+        first_start = db.query(func.min(Contract.start_date)).filter(Contract.customer_id.in_(customer_ids)).scalar()
+        invalidate_from(db, first_start)
+        return
+    try:
+        periods = sorted(p for (p,) in db.query(CommissionLedgerMonth.period).filter(CommissionLedgerMonth.status == "closed"))
+        if not periods:
+            return
+        snapshot = load_snapshot(db, customer_ids)
+        if snapshot is None:
+            return
+        touched = set(
+            p for (p,) in db.query(CommissionLedgerEntry.period)
+            .filter(CommissionLedgerEntry.customer_id.in_(customer_ids)).distinct()
+        )
+        db.execute(delete(CommissionLedgerEntry).where(CommissionLedgerEntry.customer_id.in_(customer_ids)))
+        now = datetime.utcnow()
+        first = period_of(snapshot.start.min().astype("datetime64[us]").item()) if snapshot.size else None
+        for period in periods:
+            if first is None or period < first:
+                continue
+            rows = build_period_rows(snapshot, period, now)
+            _insert_rows(db, rows)
+            if rows:
+                touched.add(period)
+        db.flush()
+        _refresh_month_totals(db, touched & set(periods))
+        db.commit()
+    finally:
+        _ledger_lock.release()
+
+
+def _closed_range(months: List[Tuple[str, str]]) -> Optional[Tuple[str, str]]:
+    """Erster und letzter Monat des lückenlos abgeschlossenen Anfangs"""
+    if not months or months[0][1] != "closed":
+        return None
+    first = last = months[0][0]
+    for period, status in months[1:]:
+        if status != "closed" or period != period_of(add_months(period_start(last), 1)):
+            break
+        last = period
+    return first, last
+
+
+async def load_ledger_balances(
+    db: AsyncSession,
+    contract_ids: Optional[Sequence[str]] = None
+) -> Dict[str, LedgerBalance]:
+    """
+    Ledger-Summe pro Vertrag über die lückenlos abgeschlossenen Monate.
+    Verträge, die vor dem ersten Ledger-Monat beginnen, fehlen (sie werden
+    komplett gerechnet).
+    """
+    months = (await db.execute(
+        select(CommissionLedgerMonth.period, CommissionLedgerMonth.status).order_by(CommissionLedgerMonth.period)
+    )).all()
+    closed = _closed_range([tuple(m) for m in months])
+    if closed is None:
+        return {}
+    first, last = closed
+    through = add_months(period_start(last), 1)
+
+    query = (
+        select(CommissionLedgerEntry.contract_id, func.sum(CommissionLedgerEntry.commission))
+        .join(Contract, Contract.id == CommissionLedgerEntry.contract_id)
+        .where(CommissionLedgerEntry.period <= last, Contract.start_date >= period_start(first))
+        .group_by(CommissionLedgerEntry.contract_id)
+    )
+    if contract_ids is not None:
+        if not contract_ids:
+            return {}
+        query = query.where(CommissionLedgerEntry.contract_id.in_(list(contract_ids)))
+    return {
+        contract_id: LedgerBalance(amount=float(total or 0.0), through=through)
+        for contract_id, total in (await db.execute(query)).all()
+    }
+
+
+def months_to_dict(month: CommissionLedgerMonth) -> dict:
+    return {
+        "period": month.period,
+        "status": month.status,
+        "contract_count": month.contract_count,
+        "total_commission": month.total_commission,
+        "closed_at": month.closed_at.isoformat() if month.closed_at else None,
+        "recomputed_at": month.recomputed_at.isoformat() if month.recomputed_at else None,
+    }
@@ -0,0 +1,154 @@
+"""
+Datenbank-Vergleich
+Welche Kunden und Verträge unterscheiden sich zwischen zwei Datenbanken
+(z.B. PROD und DEMO nach einem Restore)?
+
+Beide Tabellen werden per Server-Side-Cursor nach Primärschlüssel sortiert
+gelesen und wie beim Merge-Sort nebeneinander abgelaufen. Pro Zeile kommt
+nur (id, md5 über alle Spalten) aus Postgres; unveränderte Zeilen werden nie
+vollständig geladen. Nur für geänderte IDs werden die Zeilen in Blöcken
+nachgeladen, um die geänderten Spalten zu nennen. Der Speicherbedarf ist
+unabhängig von der Tabellengröße.
+
+Sortiert wird mit COLLATE "C" (Byte-Reihenfolge), damit Postgres und der
+Python-Stringvergleich im Merge dieselbe Reihenfolge verwenden.
+"""
+import json
+import logging
+import time
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+from sqlalchemy import Table, Text, cast, func, select
+from sqlalchemy.engine import Engine
+
+from app.models.contract import Contract
+from app.models.customer import Customer
+
+logger = logging.getLogger(__name__)
+
+DIFF_TABLES: Dict[str, Table] = {
+    "customers": Customer.__table__,
+    "contracts": Contract.__table__,
+}
+STREAM_BATCH_SIZE = 5_000
+DETAIL_BATCH_SIZE = 500
+
+
+def _hash_query(table: Table, columns: Sequence[str]):
+    """
+    (id, md5 über die Spalten) sortiert nach id in Byte-Reihenfolge.
+    Gehasht wird ein JSON-Array der Spaltenwerte als Text: Trennzeichen in
+    den Werten werden escaped und NULL bleibt von jedem String verschieden.
+    """
+    parts = [cast(table.c[name], Text) for name in columns]
+    return (
+        select(table.c.id, func.md5(cast(func.json_build_array(*parts), Text)))
+        .order_by(table.c.id.collate("C"))
+    )
+
+
+def _stream_hashes(engine: Engine, table: Table, columns: Sequence[str]) -> Iterator[Tuple[str, str]]:
+    """Server-Side-Cursor: liefert (id, hash) blockweise, ohne die Tabelle zu laden"""
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=STREAM_BATCH_SIZE).execute(
+            _hash_query(table, columns)
+        )
+        for row in result:
+            yield row[0], row[1]
+
+
+def merge_diff(
+    source: Iterator[Tuple[str, str]],
+    target: Iterator[Tuple[str, str]]
+) -> Iterator[Tuple[str, str]]:
+    """
+    Zwei nach id sortierte (id, hash)-Folgen vergleichen.
+    Liefert ("removed" | "added" | "changed", id); removed = nur in source.
+    """
+    sentinel = (None, None)
+    source_row = next(source, sentinel)
+    target_row = next(target, sentinel)
+    while source_row[0] is not None or target_row[0] is not None:
+        if target_row[0] is None or (source_row[0] is not None and source_row[0] < target_row[0]):
+            yield "removed", source_row[0]
+            source_row = next(source, sentinel)
+        elif source_row[0] is None or target_row[0] < source_row[0]:
+            yield "added", target_row[0]
+            target_row = next(target, sentinel)
+        else:
+            if source_row[1] != target_row[1]:
+                yield "changed", source_row[0]
+            source_row = next(source, sentinel)
+            target_row = next(target, sentinel)
+
+
+def _load_rows(engine: Engine, table: Table, columns: Sequence[str], ids: List[str]) -> Dict[str, dict]:
+    with engine.connect() as conn:
+        rows = conn.execute(select(*(table.c[name] for name in columns)).where(table.c.id.in_(ids))).mappings()
+        return {row["id"]: dict(row) for row in rows}
+
+
+def _changed_columns(
+    source_engine: Engine,
+    target_engine: Engine,
+    table: Table,
+    columns: Sequence[str],
+    ids: List[str]
+) -> Iterator[dict]:
+    source_rows = _load_rows(source_engine, table, columns, ids)
+    target_rows = _load_rows(target_engine, table, columns, ids)
+    for row_id in ids:
+        before, after = source_rows.get(row_id, {}), target_rows.get(row_id, {})
+        yield {
+            "type": "changed",
+            "table": table.name,
+            "id": row_id,
+            "columns": [name for name in columns if before.get(name) != after.get(name)],
+        }
+
+
+def diff_databases(
+    source_engine: Engine,
+    target_engine: Engine,
+    tables: Sequence[str] = tuple(DIFF_TABLES),
+    details: bool = True,
+    ignore_columns: Sequence[str] = ("created_at", "updated_at"),
+) -> Iterator[dict]:
+    """
+    Unterschiede pro Tabelle als Events (für NDJSON):
+    {"type": "added" | "removed" | "changed", "table", "id"[, "columns"]},
+    am Ende jeder Tabelle {"type": "table_summary", ...}.
+    added = nur in der Zieldatenbank, removed = nur in der Quelldatenbank.
+    """
+    for table_name in tables:
+        table = DIFF_TABLES[table_name]
+        columns = [c.name for c in table.columns if c.name not in ignore_columns]
+        started = time.perf_counter()
+        counts = {"added": 0, "removed": 0, "changed": 0}
+        pending_changed: List[str] = []
+
+        for kind, row_id in merge_diff(
+            _stream_hashes(source_engine, table, columns),
+            _stream_hashes(target_engine, table, columns)
+        ):
+            counts[kind] += 1
+            if kind == "changed" and details:
+                pending_changed.append(row_id)
+                if len(pending_changed) >= DETAIL_BATCH_SIZE:
+                    yield from _changed_columns(source_engine, target_engine, table, columns, pending_changed)
+                    pending_changed = []
+            else:
+                yield {"type": kind, "table": table_name, "id": row_id}
+        if pending_changed:
+            yield from _changed_columns(source_engine, target_engine, table, columns, pending_changed)
+
+        seconds = time.perf_counter() - started
+        logger.info(
+            f"🔍 Diff {table_name}: +{counts['added']} -{counts['removed']} ~{counts['changed']} in {seconds:.1f}s"
+        )
+        yield {"type": "table_summary", "table": table_name, **counts, "seconds": round(seconds, 3)}
+
+
+def diff_as_ndjson(events: Iterator[dict]) -> Iterator[str]:
+    for event in events:
+        yield json.dumps(event, default=str) + "\n"
@@ -0,0 +1,470 @@
+"""
+Equivalence Harness
+Randomisierter Differential-Test zwischen der eingefrorenen Referenz
+(reference_calculations) und alternativen Berechnungs-Engines.
+
+Jeder Fall ist ein kleiner, aus einem Seed erzeugter Bestand mit gezielten
+Grenzfällen (Existenzgründer-Phase, CHF-Verträge, ausgeschlossene und
+vorgezogene Preiserhöhungen, Bestandsschutz-Grenzen, Vertragsende,
+Arbeitsplätze-Staffeln, Monatsende-Daten, camelCase-Schlüssel). Für jeden
+Fall werden alle Metriken an vielen Stichtagen verglichen; Beträge müssen
+auf den Cent übereinstimmen.
+
+Eine Engine ist ein Objekt mit
+    name: str
+    evaluate(case: Case, dates: List[datetime]) -> Dict[(entity_id, date), Dict[str, value]]
+wobei entity_id eine Vertrags-ID oder "customer:<id>" ist. Neue Engines
+werden mit register_engine() bekannt gemacht.
+"""
+import random
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.models.contract import Contract
+from app.models.price_increase import PriceIncrease
+from app.models.commission_rate import CommissionRate
+from app.models.settings import Settings
+from app.services import reference_calculations as reference
+from app.services.portfolio_generator import build_default_settings, CAMEL_CASE_KEYS, AMOUNT_TYPES
+from app.utils.date_utils import add_months
+
+# Abweichungen unter einem halben Cent gelten als gleich
+CENT_TOLERANCE = 0.005
+
+CONTRACT_METRICS = ["effective_status", "monthly_price", "monthly_commission", "earnings_to_date", "exit_payout"]
+CUSTOMER_METRICS = [
+    "total_monthly_rental", "total_monthly_revenue", "total_monthly_commission",
+    "total_monthly_net_income", "total_earned", "exit_payout_if_today_in_months",
+    "active_contracts", "total_seats",
+]
+
+MetricKey = Tuple[str, datetime]
+
+
+@dataclass
+class Case:
+    """Ein Testbestand mit allen Eingaben der Berechnung"""
+    seed: int
+    settings: Settings
+    contracts: List[Contract]
+    price_increases: List[PriceIncrease]
+    commission_rates: List[CommissionRate]
+    contracts_by_customer: Dict[str, List[Contract]] = field(default_factory=dict)
+
+    def __post_init__(self):
+        if not self.contracts_by_customer:
+            grouped = defaultdict(list)
+            for contract in self.contracts:
+                grouped[contract.customer_id].append(contract)
+            self.contracts_by_customer = dict(grouped)
+
+    def first_contract_date(self, customer_id: str) -> Optional[datetime]:
+        return reference.get_customer_first_contract_date(self.contracts_by_customer.get(customer_id, []))
+
+    def describe(self) -> dict:
+        """Serialisierbare Beschreibung zum Nachstellen eines Fehlers"""
+        return {
+            "seed": self.seed,
+            "settings": {
+                "founder_delay_months": self.settings.founder_delay_months,
+                "min_contract_months_for_payout": self.settings.min_contract_months_for_payout,
+                "exit_payout_tiers": self.settings.exit_payout_tiers,
+                "exit_payout_by_type": self.settings.exit_payout_by_type,
+                "personal_tax_rate": self.settings.personal_tax_rate,
+            },
+            "price_increases": [
+                {"id": pi.id, "valid_from": pi.valid_from.isoformat(), "lock_in_months": pi.lock_in_months,
+                 "amount_increases": pi.amount_increases}
+                for pi in self.price_increases
+            ],
+            "commission_rates": [
+                {"id": rate.id, "valid_from": rate.valid_from.isoformat(), "rates": rate.rates}
+                for rate in self.commission_rates
+            ],
+        }
+
+
+def describe_contract(contract: Contract) -> dict:
+    return {
+        "id": contract.id,
+        "customer_id": contract.customer_id,
+        "amounts": [contract.software_rental_amount, contract.software_care_amount, contract.apps_amount,
+                    contract.purchase_amount, contract.cloud_amount],
+        "currency": contract.currency,
+        "start_date": contract.start_date.isoformat(),
+        "end_date": contract.end_date.isoformat() if contract.end_date else None,
+        "is_founder_discount": contract.is_founder_discount,
+        "number_of_seats": contract.number_of_seats,
+        "excluded": contract.excluded_price_increase_ids,
+        "included_early": contract.included_early_price_increase_ids,
+    }
+
+
+# --- Engines -------------------------------------------------------------
+
+class ModuleEngine:
+    """Engine über ein Modul mit der Funktions-API von calculations.py"""
+
+    def __init__(self, name: str, calculations, customer_metrics: Callable):
+        self.name = name
+        self.calculations = calculations
+        self.customer_metrics = customer_metrics
+
+    def evaluate(self, case: Case, dates: List[datetime]) -> Dict[MetricKey, Dict]:
+        calc = self.calculations
+        results = {}
+        for customer_id, contracts in case.contracts_by_customer.items():
+            first_date = case.first_contract_date(customer_id)
+            for date in dates:
+                for contract in contracts:
+                    status, _ = calc.get_effective_status(contract, case.settings, date)
+                    results[(contract.id, date)] = {
+                        "effective_status": status,
+                        "monthly_price": calc.get_current_monthly_price(
+                            contract, case.price_increases, date, first_date),
+                        "monthly_commission": calc.get_current_monthly_commission(
+                            contract, case.settings, case.price_increases, case.commission_rates, date, first_date),
+                        "earnings_to_date": calc.calculate_earnings_to_date(
+                            contract, case.settings, case.price_increases, case.commission_rates, date, first_date),
+                        "exit_payout": calc.calculate_exit_payout(
+                            contract, case.settings, case.price_increases, case.commission_rates, date, first_date),
+                    }
+                results[(f"customer:{customer_id}", date)] = self.customer_metrics(
+                    customer_id, contracts, case.settings, case.price_increases, case.commission_rates, date
+                )
+        return results
+
+
+def _reference_engine():
+    return ModuleEngine("reference", reference, reference.calculate_customer_metrics)
+
+
+def _current_engine():
+    from app.services import calculations
+    from app.services.metrics import calculate_customer_metrics
+    return ModuleEngine("current", calculations, calculate_customer_metrics)
+
+
+class PortfolioEngineAdapter:
+    """
+    Vektorisierte Portfolio-Engine (portfolio_engine.py). Sie berechnet Preis,
+    Provision und Exit-Zahlung; effective_status und earnings_to_date kommen
+    weiterhin aus calculations.py.
+    """
+
+    name = "portfolio"
+
+    def evaluate(self, case: Case, dates: List[datetime]) -> Dict[MetricKey, Dict]:
+        from app.services import calculations
+        from app.services.portfolio_engine import PortfolioSnapshot, sequential_sum
+
+        snapshot = PortfolioSnapshot(case.contracts, case.settings, case.price_increases, case.commission_rates)
+        rental = sequential_sum(snapshot.amounts[:, :4])
+        results = {}
+        for date in dates:
+            result = snapshot.evaluate(date)
+            earnings = {}
+            for i, contract in enumerate(case.contracts):
+                first_date = case.first_contract_date(contract.customer_id)
+                status, _ = calculations.get_effective_status(contract, case.settings, date)
+                earnings[contract.id] = calculations.calculate_earnings_to_date(
+                    contract, case.settings, case.price_increases, case.commission_rates, date, first_date)
+                results[(contract.id, date)] = {
+                    "effective_status": status,
+                    "monthly_price": float(result.monthly_price[i]),
+                    "monthly_commission": float(result.monthly_commission[i]),
+                    "earnings_to_date": earnings[contract.id],
+                    "exit_payout": float(result.exit_payout[i]),
+                }
+
+            active = result.effective_active
+            totals = result.customer_totals()
+            totals["rental"] = result.per_customer(np.where(active, rental, 0.0))
+            totals["active"] = result.per_customer(active.astype(float))
+            totals["seats"] = result.per_customer(np.where(active, snapshot.seats, 0).astype(float))
+            for customer_id, contracts in case.contracts_by_customer.items():
+                c = snapshot.customer_positions[customer_id]
+                commission = float(totals["monthly_commission"][c])
+                results[(f"customer:{customer_id}", date)] = {
+                    "customer_id": customer_id,
+                    "total_monthly_rental": round(float(totals["rental"][c]), 2),
+                    "total_monthly_revenue": round(float(totals["monthly_revenue"][c]), 2),
+                    "total_monthly_commission": round(commission, 2),
+                    "total_monthly_net_income": round(commission * (1 - case.settings.personal_tax_rate / 100), 2),
+                    "total_earned": round(sum(earnings[contract.id] for contract in contracts), 2),
+                    "exit_payout_if_today_in_months": round(max(0.0, float(totals["exit_payout"][c])), 2),
+                    "active_contracts": int(totals["active"][c]),
+                    "total_seats": int(totals["seats"][c]),
+                }
+        return results
+
+
+_ENGINES: Dict[str, Callable] = {
+    "reference": _reference_engine,
+    "current": _current_engine,
+    "portfolio": PortfolioEngineAdapter,
+}
+
+
+def register_engine(name: str, factory: Callable):
+    """Macht eine Engine für den Harness verfügbar (factory() -> Engine)"""
+    _ENGINES[name] = factory
+
+
+def get_engine(name: str):
+    if name not in _ENGINES:
+        raise KeyError(f"Unknown engine '{name}', available: {', '.join(sorted(_ENGINES))}")
+    return _ENGINES[name]()
+
+
+def available_engines() -> List[str]:
+    return sorted(_ENGINES)
+
+
+# --- Fallgenerator -------------------------------------------------------
+
+class CaseGenerator:
+    """Erzeugt Bestände mit gezielten Grenzfällen aus einem Seed"""
+
+    def __init__(self, seed: int, now: Optional[datetime] = None):
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.now = (now or datetime.utcnow()).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    def _id(self) -> str:
+        return str(uuid.UUID(int=self.rng.getrandbits(128), version=4))
+
+    def _date(self, months_from_now_min: int, months_from_now_max: int) -> datetime:
+        rng = self.rng
+        base = add_months(self.now.replace(day=1), rng.randint(months_from_now_min, months_from_now_max))
+        day = rng.choice([1, 1, 1, 15, 28, 29, 30, 31, rng.randint(2, 27)])
+        next_month = add_months(base, 1)
+        return base.replace(day=min(day, (next_month - base).days))
+
+    def _settings(self) -> Settings:
+        rng = self.rng
+        settings = build_default_settings()
+        settings.founder_delay_months = rng.choice([0, 6, 12, 12, 18])
+        settings.min_contract_months_for_payout = rng.choice([36, 60, 60])
+        settings.personal_tax_rate = rng.choice([0.0, 35.0, 42.0, 45.0])
+        variant = rng.random()
+        if variant < 0.15:
+            settings.exit_payout_tiers = []
+        elif variant < 0.3:
+            # Lücke in der Staffel -> Fallback auf min_contract_months_for_payout
+            settings.exit_payout_tiers = [
+                {"min_seats": 1, "max_seats": 5, "months": 48},
+                {"min_seats": 8, "max_seats": 10, "months": 60},
+            ]
+        if rng.random() < 0.3:
+            settings.exit_payout_by_type = {
+                amount_type: {"enabled": rng.random() < 0.6, "additional_months": rng.choice([0, 6, 12, 24])}
+                for amount_type in AMOUNT_TYPES
+            }
+        return settings
+
+    def _price_increases(self) -> List[PriceIncrease]:
+        rng = self.rng
+        count = rng.choice([0, 1, 2, 4, 6, 10])
+        rows = []
+        for _ in range(count):
+            keys = CAMEL_CASE_KEYS if rng.random() < 0.3 else {t: t for t in AMOUNT_TYPES}
+            increases = {}
+            for amount_type in AMOUNT_TYPES:
+                roll = rng.random()
+                if roll < 0.1:
+                    continue  # Schlüssel fehlt
+                increases[keys[amount_type]] = 0 if roll < 0.3 else round(rng.uniform(0.5, 8.0), 1)
+            rows.append(PriceIncrease(
+                id=self._id(),
+                valid_from=self._date(-120, 18),
+                amount_increases=increases if rng.random() > 0.05 else {},
+                lock_in_months=rng.choice([0, 6, 12, 24, 24, 36]),
+            ))
+        # Zwei Erhöhungen am selben Tag
+        if rows and rng.random() < 0.2:
+            twin = rows[0]
+            rows.append(PriceIncrease(
+                id=self._id(), valid_from=twin.valid_from,
+                amount_increases={"software_rental": 2.0}, lock_in_months=twin.lock_in_months,
+            ))
+        return rows
+
+    def _commission_rates(self) -> List[CommissionRate]:
+        rng = self.rng
+        variant = rng.random()
+        if variant < 0.1:
+            return []  # Default-Sätze
+        count = rng.choice([1, 2, 3, 5])
+        earliest = -180 if variant > 0.2 else 1  # teils nur zukünftige Sätze -> Fallback ältester Satz
+        rows = []
+        for _ in range(count):
+            keys = CAMEL_CASE_KEYS if rng.random() < 0.3 else {t: t for t in AMOUNT_TYPES}
+            rows.append(CommissionRate(
+                id=self._id(),
+                valid_from=self._date(earliest, 24),
+                rates={keys[t]: rng.choice([0.0, 5.0, 10.0, 12.5, 20.0, 25.0]) for t in AMOUNT_TYPES},
+            ))
+        return sorted(rows, key=lambda r: r.valid_from)
+
+    def _contract(self, customer_id: str, price_increases: List[PriceIncrease], first_start: datetime) -> Contract:
+        rng = self.rng
+        start = first_start if rng.random() < 0.5 else self._date(-130, 14)
+        end_date = None
+        if rng.random() < 0.3:
+            end_date = start + timedelta(days=rng.randint(-10, 2500))
+        amounts = [
+            0.0 if rng.random() < 0.35 else round(rng.uniform(1, 400), 2)
+            for _ in AMOUNT_TYPES
+        ]
+        excluded, included = [], []
+        if price_increases and rng.random() < 0.25:
+            excluded = [pi.id for pi in rng.sample(price_increases, k=rng.randint(1, len(price_increases)))]
+        if price_increases and rng.random() < 0.25:
+            included = [pi.id for pi in rng.sample(price_increases, k=rng.randint(1, len(price_increases)))]
+        return Contract(
+            id=self._id(),
+            customer_id=customer_id,
+            software_rental_amount=amounts[0],
+            software_care_amount=amounts[1],
+            apps_amount=amounts[2],
+            purchase_amount=amounts[3],
+            cloud_amount=amounts[4],
+            currency=rng.choice(["EUR", "EUR", "CHF"]),
+            start_date=start,
+            end_date=end_date,
+            is_founder_discount=rng.random() < 0.25,
+            number_of_seats=rng.choice([0, 1, 3, 5, 6, 7, 10, 11, 25]),
+            excluded_price_increase_ids=excluded,
+            included_early_price_increase_ids=included,
+        )
+
+    def _lock_in_boundary_contract(self, customer_id: str, price_increase: PriceIncrease) -> Contract:
+        """Vertrag, dessen Beginn genau an der Bestandsschutz-Grenze der Erhöhung liegt"""
+        offset = price_increase.lock_in_months + self.rng.choice([-1, 0, 0, 1])
+        start = add_months(price_increase.valid_from, -offset)
+        contract = self._contract(customer_id, [], start)
+        contract.start_date = start
+        return contract
+
+    def generate(self, customers: int = 3) -> Case:
+        settings = self._settings()
+        price_increases = self._price_increases()
+        commission_rates = self._commission_rates()
+        contracts = []
+        for _ in range(customers):
+            customer_id = self._id()
+            first_start = self._date(-130, 6)
+            for _ in range(self.rng.choice([1, 1, 2, 3])):
+                contracts.append(self._contract(customer_id, price_increases, first_start))
+            if price_increases and self.rng.random() < 0.4:
+                contracts.append(self._lock_in_boundary_contract(customer_id, self.rng.choice(price_increases)))
+        return Case(self.seed, settings, contracts, price_increases, commission_rates)
+
+    def dates(self, case: Case, count: int) -> List[datetime]:
+        """Stichtage: zufällige Tage plus Grenzen (Vertragsbeginn/-ende, Erhöhungen, Gründerende)"""
+        rng = self.rng
+        candidates = {self.now}
+        for contract in case.contracts:
+            candidates.add(contract.start_date)
+            candidates.add(contract.start_date - timedelta(days=1))
+            if contract.end_date:
+                candidates.add(contract.end_date)
+                candidates.add(contract.end_date + timedelta(days=1))
+            if contract.is_founder_discount:
+                founder_end = add_months(contract.start_date, case.settings.founder_delay_months)
+                candidates.add(founder_end)
+                candidates.add(founder_end - timedelta(days=1))
+        for pi in case.price_increases:
+            candidates.add(pi.valid_from)
+            candidates.add(pi.valid_from - timedelta(days=1))
+        for rate in case.commission_rates:
+            candidates.add(rate.valid_from)
+        boundaries = sorted(candidates)
+        selected = set(rng.sample(boundaries, k=min(len(boundaries), count // 2)))
+        while len(selected) < count:
+            selected.add(self._date(-140, 36))
+        return sorted(selected)
+
+
+# --- Vergleich -----------------------------------------------------------
+
+def _equal(expected, actual) -> bool:
+    if isinstance(expected, (int, float)) and isinstance(actual, (int, float)) \
+            and not isinstance(expected, bool) and not isinstance(actual, bool):
+        return abs(expected - actual) <= CENT_TOLERANCE
+    return expected == actual
+
+
+def compare_results(expected: Dict[MetricKey, Dict], actual: Dict[MetricKey, Dict]) -> List[dict]:
+    """Liste der Abweichungen (fehlende Einträge zählen als Abweichung)"""
+    mismatches = []
+    for key, expected_metrics in expected.items():
+        entity_id, date = key
+        actual_metrics = actual.get(key)
+        metrics = CUSTOMER_METRICS if entity_id.startswith("customer:") else CONTRACT_METRICS
+        for metric in metrics:
+            expected_value = expected_metrics.get(metric)
+            actual_value = actual_metrics.get(metric) if actual_metrics else None
+            if not _equal(expected_value, actual_value):
+                mismatches.append({
+                    "entity": entity_id,
+                    "date": date.isoformat(),
+                    "metric": metric,
+                    "expected": expected_value,
+                    "actual": actual_value,
+                })
+    return mismatches
+
+
+def run_equivalence(
+    engine,
+    cases: int = 100,
+    seed: int = 0,
+    dates_per_case: int = 24,
+    customers_per_case: int = 3,
+    max_failures: int = 20,
+) -> dict:
+    """
+    Vergleicht eine Engine mit der Referenz über `cases` zufällige Bestände.
+    Jeder Fall nutzt seed + Fallnummer, Fehler sind damit einzeln nachstellbar.
+    """
+    reference_engine = _reference_engine()
+    now = datetime.utcnow()
+    failures = []
+    comparisons = 0
+    for index in range(cases):
+        generator = CaseGenerator(seed + index, now=now)
+        case = generator.generate(customers_per_case)
+        dates = generator.dates(case, dates_per_case)
+
+        expected = reference_engine.evaluate(case, dates)
+        actual = engine.evaluate(case, dates)
+        comparisons += sum(len(metrics) for metrics in expected.values())
+
+        mismatches = compare_results(expected, actual)
+        if mismatches:
+            contracts = {c.id: c for c in case.contracts}
+            failures.append({
+                "case_seed": case.seed,
+                "mismatch_count": len(mismatches),
+                "mismatches": mismatches[:10],
+                "contracts": [describe_contract(contracts[m["entity"]])
+                              for m in mismatches[:10] if m["entity"] in contracts],
+                "case": case.describe(),
+            })
+            if len(failures) >= max_failures:
+                break
+
+    return {
+        "engine": engine.name,
+        "cases": index + 1 if cases else 0,
+        "comparisons": comparisons,
+        "failed_cases": len(failures),
+        "failures": failures,
+    }
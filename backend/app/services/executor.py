@@ -0,0 +1,60 @@
+"""
+Calculation Executor
+Begrenzter Thread-Pool für CPU-lastige Berechnungen aus async Endpunkten
+"""
+import asyncio
+import contextvars
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+from app.config import settings
+from app.services.profiler import profile_thread
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_calculation_executor() -> ThreadPoolExecutor:
+    """Gibt den Executor zurück und erstellt ihn bei Bedarf"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=max(1, settings.CALC_EXECUTOR_WORKERS),
+            thread_name_prefix="calc"
+        )
+        logger.info(f"Calculation executor started with {settings.CALC_EXECUTOR_WORKERS} workers")
+    return _executor
+
+
+async def run_calculation(func: Callable[..., T], *args, **kwargs) -> T:
+    """
+    Führt eine sync Berechnung im Calculation-Executor aus.
+    
+    Der Executor ist bewusst getrennt vom AnyIO-Threadpool: langsame
+    Dashboard-Berechnungen belegen höchstens CALC_EXECUTOR_WORKERS Threads,
+    leichte Requests bleiben davon unberührt. Der aktuelle Kontext
+    (contextvars) wird in den Worker-Thread übernommen, ein laufendes
+    Request-Profil erfasst damit auch den Worker-Thread.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    call = functools.partial(context.run, _profiled_call, func, *args, **kwargs)
+    return await loop.run_in_executor(get_calculation_executor(), call)
+
+
+def _profiled_call(func: Callable[..., T], *args, **kwargs) -> T:
+    with profile_thread(func):
+        return func(*args, **kwargs)
+
+
+def shutdown_calculation_executor():
+    """Beendet den Executor beim Shutdown"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
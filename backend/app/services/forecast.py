@@ -9,7 +9,9 @@ from app.services.calculations import (
     get_current_monthly_price
 )
 from app.utils.date_utils import add_months
+from app.utils.timing import timed
 
+@timed("calc")
 def generate_forecast(
     contracts: List[Contract],
     settings: Settings,
@@ -0,0 +1,229 @@
+"""
+Job Service
+Führt länger laufende Aufgaben im Hintergrund aus (eigener Thread-Pool).
+
+Jeder Job bekommt eine ID und wird in der Tabelle "jobs" gespeichert.
+Fortschritts-Events werden sowohl persistiert (für späteren Abruf) als auch
+im Speicher gehalten, damit laufende Jobs live als NDJSON gestreamt werden
+können.
+"""
+import contextvars
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.job import Job
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = {"succeeded", "failed", "cancelled"}
+
+
+class JobCancelled(Exception):
+    """Wird von JobHandle.check_cancelled() ausgelöst"""
+
+
+class JobHandle:
+    """
+    Wird an die Job-Funktion übergeben: Fortschritt melden und auf
+    Abbruch prüfen. Thread-safe, Events dürfen aus Worker-Threads kommen.
+    """
+
+    def __init__(self, job_id: str, job_type: str):
+        self.id = job_id
+        self.job_type = job_type
+        self.status = "queued"
+        self.events: List[dict] = []
+        self._condition = threading.Condition()
+        self._cancel_requested = threading.Event()
+
+    def progress(self, event: Dict[str, Any]):
+        """Meldet ein Fortschritts-Event (wird gestreamt und gespeichert)"""
+        event = {"timestamp": datetime.now().isoformat(), **event}
+        with self._condition:
+            self.events.append(event)
+            events = list(self.events)
+            self._condition.notify_all()
+        _update_job(self.id, progress=events)
+
+    def _set_status(self, status: str):
+        with self._condition:
+            self.status = status
+            self._condition.notify_all()
+
+    def request_cancel(self):
+        self._cancel_requested.set()
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel_requested.is_set()
+
+    def check_cancelled(self):
+        if self._cancel_requested.is_set():
+            raise JobCancelled()
+
+    def wait_for_events(self, start: int, timeout: float) -> List[dict]:
+        """Wartet auf Events ab Index start (oder Statuswechsel/Timeout)"""
+        with self._condition:
+            if len(self.events) <= start and self.status not in TERMINAL_STATUSES:
+                self._condition.wait(timeout)
+            return self.events[start:]
+
+
+def _update_job(job_id: str, **values):
+    db = SessionLocal()
+    try:
+        db.query(Job).filter(Job.id == job_id).update(values, synchronize_session=False)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"❌ Failed to update job {job_id}: {e}")
+    finally:
+        db.close()
+
+
+def job_to_dict(job: Job, include_result: bool = True) -> dict:
+    data = {
+        "id": job.id,
+        "job_type": job.job_type,
+        "status": job.status,
+        "params": job.params,
+        "progress": job.progress or [],
+        "error_message": job.error_message,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+    if include_result:
+        data["result"] = job.result
+    return data
+
+
+class JobService:
+    """Startet Jobs und hält die Handles laufender Jobs"""
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._handles: Dict[str, JobHandle] = {}
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="job")
+        return self._executor
+
+    def submit(self, job_type: str, func: Callable[[JobHandle], Any], params: Optional[dict] = None) -> str:
+        """Legt den Job an und startet ihn im Hintergrund; gibt die Job-ID zurück"""
+        db = SessionLocal()
+        try:
+            job = Job(job_type=job_type, status="queued", params=params, progress=[])
+            db.add(job)
+            db.commit()
+            job_id = job.id
+        finally:
+            db.close()
+
+        handle = JobHandle(job_id, job_type)
+        with self._lock:
+            self._handles[job_id] = handle
+        # Kontext der Anfrage mitnehmen (u.a. die gewählte Datenbank)
+        context = contextvars.copy_context()
+        self._get_executor().submit(context.run, self._run, handle, func)
+        logger.info(f"📋 Job {job_id} ({job_type}) queued")
+        return job_id
+
+    def _run(self, handle: JobHandle, func: Callable[[JobHandle], Any]):
+        handle._set_status("running")
+        _update_job(handle.id, status="running", started_at=datetime.now())
+        try:
+            result = func(handle)
+        except JobCancelled:
+            logger.info(f"⏹️ Job {handle.id} cancelled")
+            _update_job(handle.id, status="cancelled", finished_at=datetime.now())
+            handle._set_status("cancelled")
+        except Exception as e:
+            logger.error(f"❌ Job {handle.id} ({handle.job_type}) failed: {e}")
+            _update_job(handle.id, status="failed", error_message=str(e), finished_at=datetime.now())
+            handle._set_status("failed")
+        else:
+            _update_job(handle.id, status="succeeded", result=result, finished_at=datetime.now())
+            handle._set_status("succeeded")
+            logger.info(f"✅ Job {handle.id} ({handle.job_type}) finished")
+        finally:
+            with self._lock:
+                self._handles.pop(handle.id, None)
+
+    def get_handle(self, job_id: str) -> Optional[JobHandle]:
+        with self._lock:
+            return self._handles.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        """Fordert den Abbruch an (kooperativ über check_cancelled)"""
+        handle = self.get_handle(job_id)
+        if handle is None:
+            return False
+        handle.request_cancel()
+        return True
+
+    def stream_events(self, job_id: str, poll_seconds: float = 15.0) -> Iterator[str]:
+        """
+        NDJSON-Stream der Fortschritts-Events bis zum Ende des Jobs.
+        Für bereits beendete Jobs werden die gespeicherten Events geliefert.
+        """
+        handle = self.get_handle(job_id)
+        sent = 0
+        while handle is not None:
+            events = handle.wait_for_events(sent, poll_seconds)
+            for event in events:
+                yield json.dumps(event) + "\n"
+            sent += len(events)
+            if handle.status in TERMINAL_STATUSES and len(handle.events) <= sent:
+                break
+            if not events:
+                # Keep-alive, damit Proxies die Verbindung nicht schließen
+                yield json.dumps({"type": "heartbeat"}) + "\n"
+
+        db = SessionLocal()
+        try:
+            job = db.query(Job).filter(Job.id == job_id).first()
+            if job is None:
+                return
+            for event in (job.progress or [])[sent:]:
+                yield json.dumps(event) + "\n"
+            yield json.dumps({"type": "status", "status": job.status, "error_message": job.error_message}) + "\n"
+        finally:
+            db.close()
+
+    def shutdown(self):
+        for handle in list(self._handles.values()):
+            handle.request_cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+def mark_interrupted_jobs():
+    """Beim Start: Jobs, die beim letzten Shutdown noch liefen, als fehlgeschlagen markieren"""
+    db = SessionLocal()
+    try:
+        count = db.query(Job).filter(Job.status.in_(["queued", "running"])).update(
+            {"status": "failed", "error_message": "Interrupted by server restart", "finished_at": datetime.now()},
+            synchronize_session=False
+        )
+        db.commit()
+        if count:
+            logger.warning(f"⚠️ {count} interrupted job(s) marked as failed")
+    except Exception as e:
+        db.rollback()
+        logger.error(f"❌ Failed to mark interrupted jobs: {e}")
+    finally:
+        db.close()
+
+
+job_service = JobService(max_workers=settings.JOB_WORKERS)
@@ -0,0 +1,78 @@
+"""
+Event-Loop Monitor
+Misst die Verzögerung des asyncio Event-Loops (Lag)
+"""
+import asyncio
+import logging
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Messintervall in Sekunden
+SAMPLE_INTERVAL = 0.1
+
+# Ab dieser Verzögerung wird eine Warnung geloggt (blockierender Code im Loop)
+WARN_THRESHOLD = 0.25
+
+
+class EventLoopLagMonitor:
+    """
+    Schläft periodisch SAMPLE_INTERVAL Sekunden und misst, wie viel später der
+    Loop tatsächlich wieder aufwacht. Blockierender Sync-Code in async Routes
+    (z.B. DB-Abfragen oder subprocess.run) zeigt sich direkt als Lag.
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.samples = 0
+        self.total_lag = 0.0
+        self.max_lag = 0.0
+        self.last_lag = 0.0
+        self.slow_ticks = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def record(self, lag: float):
+        self.samples += 1
+        self.total_lag += lag
+        self.last_lag = lag
+        if lag > self.max_lag:
+            self.max_lag = lag
+        if lag >= WARN_THRESHOLD:
+            self.slow_ticks += 1
+            logger.warning(f"⚠️ Event loop blocked for {lag * 1000:.0f} ms")
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = time.perf_counter() - start - self.interval
+            self.record(max(0.0, lag))
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def reset(self):
+        self.samples = 0
+        self.total_lag = 0.0
+        self.max_lag = 0.0
+        self.last_lag = 0.0
+        self.slow_ticks = 0
+
+    def snapshot(self) -> dict:
+        return {
+            "samples": self.samples,
+            "avg_lag_ms": round(self.total_lag / self.samples * 1000, 3) if self.samples else 0.0,
+            "max_lag_ms": round(self.max_lag * 1000, 3),
+            "last_lag_ms": round(self.last_lag * 1000, 3),
+            "slow_ticks": self.slow_ticks,
+        }
+
+
+loop_monitor = EventLoopLagMonitor()
@@ -5,12 +5,14 @@ from app.models.contract import Contract
 from app.models.settings import Settings
 from app.models.price_increase import PriceIncrease
 from app.models.commission_rate import CommissionRate
+from app.utils.timing import timed
 from app.services.calculations import (
     get_current_monthly_commission,
     get_current_monthly_price,
     calculate_earnings_to_date,
     calculate_exit_payout,
-    get_effective_status
+    get_effective_status,
+    LedgerBalance
 )
 
 
@@ -32,16 +34,22 @@ def get_customer_first_contract_date(contracts: List[Contract]) -> Optional[date
     return earliest_date
 
 
+@timed("calc")
 def calculate_customer_metrics(
     customer_id: str,
     contracts: List[Contract],
     settings: Settings,
     price_increases: List[PriceIncrease],
     commission_rates: List[CommissionRate],
-    today: datetime
+    today: datetime,
+    ledger_balances: Optional[Dict[str, LedgerBalance]] = None
 ) -> Dict:
     """
     Berechnet alle Metriken für einen Kunden
+    
+    Args:
+        ledger_balances: Ledger-Summen pro Vertrags-ID (load_ledger_balances);
+                         total_earned rechnet dann nur die offenen Monate.
     """
     total_monthly_rental = 0.0
     total_monthly_revenue = 0.0  # Mit Preiserhöhungen
@@ -86,7 +94,8 @@ def calculate_customer_metrics(
         
         earned = calculate_earnings_to_date(
             contract, settings, price_increases, commission_rates, today,
-            customer_first_contract_date
+            customer_first_contract_date,
+            ledger_balance=ledger_balances.get(contract.id) if ledger_balances else None
         )
         total_earned += earned
         
@@ -112,13 +121,15 @@ def calculate_customer_metrics(
     }
 
 
+@timed("calc")
 def calculate_contract_metrics(
     contract: Contract,
     settings: Settings,
     price_increases: List[PriceIncrease],
     commission_rates: List[CommissionRate],
     today: datetime,
-    customer_first_contract_date: datetime = None
+    customer_first_contract_date: datetime = None,
+    ledger_balance: Optional[LedgerBalance] = None
 ) -> Dict:
     """
     Berechnet alle Metriken für einen Vertrag
@@ -126,6 +137,7 @@ def calculate_contract_metrics(
     Args:
         customer_first_contract_date: Das Startdatum des ersten Vertrags des Kunden.
                                       Wird für die Bestandsschutz-Berechnung verwendet.
+        ledger_balance: Ledger-Summe des Vertrags (siehe calculate_earnings_to_date)
     """
     from app.utils.date_utils import months_between
     
@@ -155,7 +167,7 @@ def calculate_contract_metrics(
     
     earned_commission_to_date = calculate_earnings_to_date(
         contract, settings, price_increases, commission_rates, today,
-        customer_first_contract_date
+        customer_first_contract_date, ledger_balance
     )
     exit_payout = calculate_exit_payout(
         contract, settings, price_increases, commission_rates, today,
@@ -0,0 +1,380 @@
+"""
+Monte-Carlo-Forecast
+Wahrscheinlichkeitsbasierte Prognose von Provision und Exit-Zahlung.
+
+Kündigungsmodell (aus den Vertragsdaten geschätzt):
+- Vertragstyp = Betragstyp mit dem höchsten Betrag (Software Miete, Pflege, ...)
+- Monatliche Kündigungsrate pro Typ und Laufzeit-Bucket (TENURE_BUCKETS_MONTHS):
+  beendete Verträge ohne Folgevertrag / Vertragsmonate unter Beobachtung.
+  Dünn besetzte Typen werden zur Rate über alle Typen hin gezogen.
+- Verlängerungsquote pro Typ: Anteil der beendeten Verträge, bei denen der
+  Kunde innerhalb von RENEWAL_WINDOW_MONTHS einen Folgevertrag gleichen Typs
+  abgeschlossen hat. Bei Verträgen mit geplantem Enddatum im Prognosezeitraum
+  wird pro Pfad gewürfelt, ob sie verlängert werden (= laufen weiter).
+
+Simulation: pro Pfad und Vertrag wird eine Exp(1)-verteilte Zufallszahl E
+gezogen; der Vertrag läuft im Monat m, solange E größer als die kumulierte
+Kündigungsrate bis zum Vormonat ist. Ein nicht verlängertes Enddatum wird
+durch Kappen von E abgebildet. Gerechnet wird "alle laufen weiter" minus die
+(wenigen) Paare aus Pfad und Vertrag, die im Zeitraum ausscheiden.
+
+Der Speicherbedarf ist durch MONTE_CARLO_MEMORY_MB begrenzt: die Pfade
+werden in Blöcken simuliert, deren Größe sich aus Vertragsanzahl und
+erwartetem Abgangsanteil ergibt. Die Zufallszahlen kommen pro festem
+Pfadblock (PATHS_PER_SEED_BLOCK) aus einem eigenen, aus dem Seed
+abgeleiteten Generator; ein Seed liefert so unabhängig von Speicherbudget
+und Blockgröße dasselbe Ergebnis. Provision und Exit-Zahlung pro Vertrag und
+Monat (ohne Kündigung) kommen aus dem PortfolioSnapshot.
+"""
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from app.services.portfolio_engine import AMOUNT_TYPES, PortfolioSnapshot, sequential_sum, _month_index
+from app.utils.date_utils import add_months
+
+logger = logging.getLogger(__name__)
+
+# Untergrenzen der Laufzeit-Buckets in Monaten: [0,12), [12,24), [24,36), [36,60), [60,∞)
+TENURE_BUCKETS_MONTHS = (0, 12, 24, 36, 60)
+RENEWAL_WINDOW_MONTHS = 3
+# Gewicht der typübergreifenden Rate (in Vertragsmonaten bzw. Verträgen)
+HAZARD_PRIOR_MONTHS = 120
+RENEWAL_PRIOR_CONTRACTS = 10
+
+PERCENTILES = (10, 50, 90)
+
+# Pfade pro Zufallsgenerator (SeedSequence.spawn); Simulationsblöcke
+# bestehen immer aus ganzen Seed-Blöcken
+PATHS_PER_SEED_BLOCK = 16
+
+# Ab dieser kumulierten Rate gilt ein Vertrag sicher als gekündigt (exp(-50) ≈ 0)
+_DEAD = 50.0
+
+
+@dataclass
+class ChurnModel:
+    """Geschätzte Kündigungs- und Verlängerungsraten"""
+    as_of: datetime
+    hazards: np.ndarray        # (Typen, Buckets) monatliche Kündigungswahrscheinlichkeit
+    exposure_months: np.ndarray  # (Typen, Buckets)
+    churned: np.ndarray        # (Typen, Buckets)
+    renewal_rates: np.ndarray  # (Typen,)
+    ended_contracts: np.ndarray  # (Typen,)
+    renewed_contracts: np.ndarray  # (Typen,)
+
+    def to_dict(self) -> dict:
+        buckets = [
+            f"{low}-{high - 1}" if high else f"{low}+"
+            for low, high in zip(TENURE_BUCKETS_MONTHS, TENURE_BUCKETS_MONTHS[1:] + (None,))
+        ]
+        return {
+            "as_of": self.as_of.isoformat(),
+            "tenure_buckets": buckets,
+            "types": [
+                {
+                    "contract_type": amount_type,
+                    "monthly_churn": [round(float(h), 5) for h in self.hazards[t]],
+                    "exposure_months": [int(e) for e in self.exposure_months[t]],
+                    "churned": [int(c) for c in self.churned[t]],
+                    "renewal_rate": round(float(self.renewal_rates[t]), 4),
+                    "ended_contracts": int(self.ended_contracts[t]),
+                    "renewed_contracts": int(self.renewed_contracts[t]),
+                }
+                for t, amount_type in enumerate(AMOUNT_TYPES)
+            ],
+        }
+
+
+def contract_types(snapshot: PortfolioSnapshot) -> np.ndarray:
+    """Typ-Index (AMOUNT_TYPES) des höchsten Betrags pro Vertrag"""
+    return np.argmax(snapshot.amounts, axis=1)
+
+
+def tenure_bucket(tenure_months: np.ndarray) -> np.ndarray:
+    return np.searchsorted(np.array(TENURE_BUCKETS_MONTHS), tenure_months, side="right") - 1
+
+
+def _renewed_mask(snapshot: PortfolioSnapshot, types: np.ndarray, ended: np.ndarray) -> np.ndarray:
+    """Beendete Verträge, zu denen der Kunde rechtzeitig einen Folgevertrag gleichen Typs hat"""
+    renewed = np.zeros(snapshot.size, dtype=bool)
+    window = np.timedelta64(31 * RENEWAL_WINDOW_MONTHS, "D")
+    # Nach Kunde, Typ und Start sortiert: Folgeverträge stehen direkt dahinter
+    order = np.lexsort((snapshot.start, types, snapshot.customer_index))
+    for position, i in enumerate(order):
+        if not ended[i]:
+            continue
+        for j in order[position + 1:]:
+            if snapshot.customer_index[j] != snapshot.customer_index[i] or types[j] != types[i]:
+                break
+            if snapshot.start[j] > snapshot.end[i] + window:
+                break
+            if snapshot.start[j] >= snapshot.end[i] - window and j != i:
+                renewed[i] = True
+                break
+    return renewed
+
+
+def fit_churn_model(snapshot: PortfolioSnapshot, as_of: datetime) -> ChurnModel:
+    """Schätzt Kündigungs- und Verlängerungsraten aus den bis as_of beendeten Verträgen"""
+    types = contract_types(snapshot)
+    as_of64 = np.datetime64(as_of, "us")
+    started = snapshot.start <= as_of64
+    ended = started & snapshot.has_end & (snapshot.end <= as_of64)
+    renewed = _renewed_mask(snapshot, types, ended)
+    churned = ended & ~renewed
+
+    # Beobachtete Laufzeit in Monaten: bis zum Ende bzw. bis as_of
+    observed_until = np.where(ended, snapshot.end, as_of64)
+    # wie _month_index (Jahr * 12 + Monat), direkt auf datetime64
+    end_month = observed_until.astype("datetime64[M]").astype(np.int64) + 1970 * 12 + 1
+    tenure = np.where(started, np.maximum(end_month - snapshot.start_month, 0), 0)
+
+    bounds = TENURE_BUCKETS_MONTHS + (np.iinfo(np.int64).max,)
+    n_types, n_buckets = len(AMOUNT_TYPES), len(TENURE_BUCKETS_MONTHS)
+    exposure = np.zeros((n_types, n_buckets))
+    events = np.zeros((n_types, n_buckets))
+    churn_bucket = tenure_bucket(tenure)
+    for b in range(n_buckets):
+        months_in_bucket = np.clip(tenure, bounds[b], bounds[b + 1]) - bounds[b]
+        exposure[:, b] = np.bincount(types[started], weights=months_in_bucket[started], minlength=n_types)
+        events[:, b] = np.bincount(types[churned & (churn_bucket == b)], minlength=n_types)
+
+    pooled = events.sum(axis=0) / np.maximum(exposure.sum(axis=0), 1)
+    hazards = (events + HAZARD_PRIOR_MONTHS * pooled[None, :]) / (exposure + HAZARD_PRIOR_MONTHS)
+
+    ended_count = np.bincount(types[ended], minlength=n_types).astype(float)
+    renewed_count = np.bincount(types[renewed], minlength=n_types).astype(float)
+    pooled_renewal = renewed_count.sum() / max(ended_count.sum(), 1)
+    renewal_rates = (renewed_count + RENEWAL_PRIOR_CONTRACTS * pooled_renewal) / (ended_count + RENEWAL_PRIOR_CONTRACTS)
+
+    return ChurnModel(
+        as_of=as_of,
+        hazards=np.clip(hazards, 0.0, 1.0),
+        exposure_months=exposure,
+        churned=events,
+        renewal_rates=renewal_rates,
+        ended_contracts=ended_count,
+        renewed_contracts=renewed_count,
+    )
+
+
+def contract_month_values(snapshot: PortfolioSnapshot, dates: List[datetime]):
+    """
+    Provision und Exit-Zahlung pro Monat und Vertrag, wenn der Vertrag zu dem
+    Zeitpunkt (noch) läuft, (Monate, n). Das Vertragsende wird hier ignoriert.
+    """
+    commission = np.zeros((len(dates), snapshot.size))
+    exit_payout = np.zeros((len(dates), snapshot.size))
+    for m, (date, adjusted) in enumerate(snapshot.iter_adjusted_amounts(dates)):
+        rates = snapshot.rates_for_date(date) / 100
+        day = np.datetime64(date, "us")
+        running = ~(day < snapshot.start) & ~(snapshot.is_founder & (day < snapshot.founder_end))
+        commission[m] = np.where(running, sequential_sum(adjusted * rates), 0.0)
+        months = snapshot.exit_months(date, cache=False, ignore_end=True)
+        exit_payout[m] = np.maximum(0.0, sequential_sum(adjusted * rates * months))
+    return commission, exit_payout
+
+
+# Speicher pro Pfad und Vertrag (E) bzw. pro ausgeschiedenem Paar (Indizes,
+# Abgangsmonat, Sortierung, Zwischenwerte) in Byte
+_BYTES_PER_CELL = 9
+_BYTES_PER_EXIT = 80
+
+
+def paths_per_chunk(contracts: int, months: int, exit_share: float, memory_mb: int) -> int:
+    """
+    Pfade pro Block, so dass E (Pfade x Verträge) und die Liste der
+    ausgeschiedenen Verträge (erwarteter Anteil exit_share, mit Reserve)
+    zusammen mit den festen Arrays (Monate x Verträge) ins Budget passen
+    """
+    fixed = contracts * months * 8 * 6
+    per_path = contracts * (_BYTES_PER_CELL + _BYTES_PER_EXIT * min(1.0, exit_share * 1.5 + 0.01))
+    available = memory_mb * 1024 * 1024 - fixed
+    return max(1, int(available // max(per_path, 1)))
+
+
+def _draw_thresholds(
+    seeds: List[np.random.SeedSequence],
+    first_path: int,
+    size: int,
+    n: int,
+    ending: np.ndarray,
+    ending_cap: np.ndarray,
+    ending_renewal: np.ndarray
+) -> np.ndarray:
+    """
+    E (size, n) für die Pfade ab first_path (Vielfaches von
+    PATHS_PER_SEED_BLOCK), inklusive gewürfelter Verlängerung und Kappen
+    beim geplanten Vertragsende. Jeder Seed-Block zieht aus seinem eigenen
+    Generator, daher hängt E eines Pfads nicht von der Blockgröße ab.
+    """
+    threshold = np.empty((size, n))
+    for offset in range(0, size, PATHS_PER_SEED_BLOCK):
+        rows = threshold[offset:offset + PATHS_PER_SEED_BLOCK]
+        rng = np.random.default_rng(seeds[(first_path + offset) // PATHS_PER_SEED_BLOCK])
+        rng.standard_exponential(out=rows)
+        if len(ending):
+            renewed = rng.random((len(rows), len(ending))) < ending_renewal[None, :]
+            rows[:, ending] = np.where(renewed, rows[:, ending], np.minimum(rows[:, ending], ending_cap[None, :]))
+    return threshold
+
+
+def simulate_forecast(
+    snapshot: PortfolioSnapshot,
+    model: ChurnModel,
+    start_date: datetime,
+    months: int,
+    paths: int,
+    memory_mb: int,
+    seed: Optional[int] = None,
+    progress: Optional[Callable[[int, int], None]] = None
+) -> dict:
+    """
+    Simuliert `paths` Verläufe über `months` Monate ab start_date und liefert
+    pro Monat P10/P50/P90 (und Mittelwert) von Provision und Exit-Zahlung.
+    progress(fertige_pfade, pfade) wird nach jedem Block aufgerufen und darf
+    (z.B. bei Abbruch) eine Exception werfen.
+    """
+    started_at = time.perf_counter()
+    dates = [add_months(start_date, m) for m in range(months)]
+    first_day = np.datetime64(dates[0], "us")
+
+    # Nur Verträge, die im Prognosezeitraum laufen und etwas beitragen können
+    commission, exit_payout = contract_month_values(snapshot, dates)
+    relevant = ~(snapshot.has_end & (snapshot.end < first_day))
+    keep = np.flatnonzero(relevant & ((commission > 0).any(axis=0) | (exit_payout > 0).any(axis=0)))
+    commission, exit_payout = commission[:, keep], exit_payout[:, keep]
+    n = len(keep)
+
+    # Kumulierte Kündigungsrate bis zum Vormonat (Monat 0 laufen alle noch),
+    # plus minimale Rampe, damit sie streng steigt (für das Kappen von E)
+    types = contract_types(snapshot)[keep]
+    start = snapshot.start[keep]
+    cumulative = np.zeros((months, n))
+    for m, date in enumerate(dates[:-1]):
+        tenure = np.maximum(_month_index(date) - snapshot.start_month[keep], 0)
+        hazard = np.where(np.datetime64(date, "us") < start, 0.0, model.hazards[types, tenure_bucket(tenure)])
+        cumulative[m + 1] = cumulative[m] - np.log1p(-np.minimum(hazard, 1 - 1e-12))
+    cumulative += 1e-9 * np.arange(1, months + 1)[:, None]
+    np.minimum(cumulative, _DEAD, out=cumulative)
+
+    # Geplantes Vertragsende im Zeitraum: erster Monat, in dem der Vertrag
+    # nicht mehr läuft (Stichtag nach dem Enddatum)
+    end = snapshot.end[keep]
+    has_end = snapshot.has_end[keep]
+    end_offset = np.full(n, months, dtype=np.int64)
+    for m, date in reversed(list(enumerate(dates))):
+        end_offset = np.where(has_end & (np.datetime64(date, "us") > end), m, end_offset)
+    ending = np.flatnonzero(end_offset < months)
+    ending_cap = cumulative[end_offset[ending], ending]
+    ending_renewal = model.renewal_rates[types[ending]]
+
+    # Erwarteter Anteil der Verträge, die innerhalb des Zeitraums ausscheiden
+    survival = np.exp(-cumulative[-1])
+    exit_probability = 1 - survival
+    exit_probability[ending] = 1 - ending_renewal * survival[ending]
+    exit_share = float(exit_probability.mean()) if n else 0.0
+
+    # Alle Verträge laufen = Basis; pro Pfad werden die Ausgeschiedenen abgezogen
+    base = np.stack([commission.sum(axis=1), exit_payout.sum(axis=1)], axis=1)
+    totals = np.zeros((paths, months, 2))
+    budget = paths_per_chunk(n, months, exit_share, memory_mb)
+    chunk = min(paths, max(1, budget // PATHS_PER_SEED_BLOCK) * PATHS_PER_SEED_BLOCK)
+    seeds = np.random.SeedSequence(seed).spawn(-(-paths // PATHS_PER_SEED_BLOCK))
+
+    done = 0
+    while done < paths:
+        size = min(chunk, paths - done)
+        threshold = _draw_thresholds(seeds, done, size, n, ending, ending_cap, ending_renewal)
+
+        # Nur Paare (Pfad, Vertrag), die vor Ende des Zeitraums ausscheiden
+        path_index, contract_index = np.nonzero(threshold <= cumulative[-1][None, :])
+        exit_threshold = threshold[path_index, contract_index]
+        del threshold
+        # Anzahl gelaufener Monate: im Monat m läuft der Vertrag, solange E > kumulierte Rate
+        months_alive = np.zeros(len(path_index), dtype=np.int16)
+        for m in range(months):
+            months_alive += exit_threshold > cumulative[m][contract_index]
+        del exit_threshold
+        order = np.argsort(months_alive, kind="stable")
+        path_index, contract_index, months_alive = path_index[order], contract_index[order], months_alive[order]
+        del order
+
+        block = totals[done:done + size]
+        block[:] = base[None, :, :]
+        for m in range(months):
+            # Ausgeschieden im Monat m: months_alive <= m (Präfix der sortierten Liste)
+            cut = np.searchsorted(months_alive, m, side="right")
+            for k, values in enumerate((commission, exit_payout)):
+                block[:, m, k] -= np.bincount(
+                    path_index[:cut], weights=values[m][contract_index[:cut]], minlength=size
+                )
+        done += size
+        if progress:
+            progress(done, paths)
+
+    tax_factor = 1 - snapshot.settings.personal_tax_rate / 100
+    bands = np.percentile(totals, PERCENTILES, axis=0)
+    means = totals.mean(axis=0)
+    scheduled = np.arange(months)[:, None] < end_offset[None, :]
+    expected_without_churn = np.stack(
+        [(commission * scheduled).sum(axis=1), (exit_payout * scheduled).sum(axis=1)], axis=1
+    )
+
+    def band(m: int, k: int) -> Dict[str, float]:
+        result = {f"p{p}": round(float(bands[i, m, k]), 2) for i, p in enumerate(PERCENTILES)}
+        result["mean"] = round(float(means[m, k]), 2)
+        result["without_churn"] = round(float(expected_without_churn[m, k]), 2)
+        return result
+
+    elapsed = time.perf_counter() - started_at
+    logger.info(
+        f"🎲 Monte Carlo forecast: {paths} paths x {n} contracts x {months} months "
+        f"in {elapsed:.1f}s (chunk {chunk} paths)"
+    )
+    return {
+        "start_date": dates[0].isoformat(),
+        "paths": paths,
+        "months": months,
+        "seed": seed,
+        "contracts": n,
+        "paths_per_chunk": chunk,
+        "duration_seconds": round(elapsed, 2),
+        "percentiles": list(PERCENTILES),
+        "forecast": [
+            {
+                "date": date.strftime("%Y-%m"),
+                "commission": band(m, 0),
+                "commission_net": {key: round(value * tax_factor, 2) for key, value in band(m, 0).items()},
+                "exit_payout": band(m, 1),
+            }
+            for m, date in enumerate(dates)
+        ],
+        "churn_model": model.to_dict(),
+    }
+
+
+def run_monte_carlo_job(
+    job,
+    snapshot: PortfolioSnapshot,
+    start_date: datetime,
+    months: int,
+    paths: int,
+    memory_mb: int,
+    seed: Optional[int] = None
+) -> dict:
+    """Job-Funktion für job_service: Modell schätzen, simulieren, Fortschritt pro Block melden"""
+    model = fit_churn_model(snapshot, datetime.utcnow())
+    job.progress({"type": "model_fitted", "contracts": snapshot.size})
+
+    def on_chunk(done: int, total: int):
+        job.check_cancelled()
+        job.progress({"type": "paths_simulated", "done": done, "total": total})
+
+    job.check_cancelled()
+    return simulate_forecast(snapshot, model, start_date, months, paths, memory_mb, seed, progress=on_chunk)
@@ -0,0 +1,536 @@
+"""
+Portfolio Engine
+Vektorisierte Berechnung (numpy) von Umsatz, Provision und Exit-Zahlung
+für den ganzen Bestand zu einem Stichtag.
+
+Die Regeln entsprechen calculations.py (Bestandsschutz über den ersten
+Kundenvertrag, ausgeschlossene/vorgezogene Preiserhöhungen, Existenzgründer-
+Phase, Arbeitsplätze-Staffel, Exit-Zahlung pro Vertragstyp). Alles, was nur
+von den Stammdaten abhängt, wird einmal im PortfolioSnapshot vorberechnet;
+pro Stichtag bleiben wenige Array-Operationen über alle Verträge.
+
+Hypothetische Preiserhöhungen und Provisionssätze lassen sich übergeben,
+ohne etwas zu speichern (Szenario-Vorschau). Die Abweichung zur skalaren
+Berechnung wird mit dem Differential-Test geprüft:
+    python scripts/check_equivalence.py --engine portfolio
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import func as sql_func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings as app_settings
+from app.database import DatabaseScoped
+from app.models.contract import Contract
+from app.models.customer import Customer
+from app.models.price_increase import PriceIncrease
+from app.models.commission_rate import CommissionRate
+from app.models.settings import Settings
+from app.services.calculations import get_commission_rates_for_date, get_exit_payout_months
+from app.services.executor import run_calculation
+from app.utils.date_utils import add_months
+
+logger = logging.getLogger(__name__)
+
+AMOUNT_TYPES = ("software_rental", "software_care", "apps", "purchase", "cloud")
+
+_CAMEL_TO_SNAKE = {
+    "softwareRental": "software_rental",
+    "softwareCare": "software_care",
+    "apps": "apps",
+    "purchase": "purchase",
+    "cloud": "cloud",
+}
+
+_DEFAULT_EXIT_CONFIG = {
+    "software_rental": {"enabled": True, "additional_months": 12},
+    "software_care": {"enabled": False, "additional_months": 0},
+    "apps": {"enabled": True, "additional_months": 12},
+    "purchase": {"enabled": True, "additional_months": 12},
+    "cloud": {"enabled": False, "additional_months": 0},
+}
+
+
+def _month_index(date: datetime) -> int:
+    return date.year * 12 + date.month
+
+
+def _datetime64(values: Sequence[Optional[datetime]]) -> np.ndarray:
+    return np.array([np.datetime64(v, "us") if v else np.datetime64("NaT") for v in values], dtype="datetime64[us]")
+
+
+def sequential_sum(columns: np.ndarray) -> np.ndarray:
+    """
+    Zeilensumme in fester Spaltenreihenfolge (wie die Python-Schleifen in
+    calculations.py); numpy.sum würde anders runden und Cent-Rundungen kippen
+    """
+    total = np.zeros(columns.shape[0])
+    for t in range(columns.shape[1]):
+        total += columns[:, t]
+    return total
+
+
+def rate_vector(rates: Dict[str, float]) -> np.ndarray:
+    """Provisionssätze (bereits normalisiert) als Vektor in AMOUNT_TYPES-Reihenfolge"""
+    return np.array([rates.get(amount_type, 0) or 0 for amount_type in AMOUNT_TYPES], dtype=float)
+
+
+@dataclass(frozen=True, eq=False)
+class PriceIncreaseTerms:
+    """Die für die Berechnung relevanten Felder einer (evtl. hypothetischen) Preiserhöhung"""
+    id: str
+    valid_from: datetime
+    lock_in_months: int
+    # (Typ-Index, Faktor) in der Reihenfolge von amount_increases; einzeln
+    # angewendet wie in calculations.py, damit die Ergebnisse bitgleich sind
+    steps: Tuple[Tuple[int, float], ...]
+
+    @classmethod
+    def from_price_increase(cls, price_increase) -> "PriceIncreaseTerms":
+        steps = []
+        for amount_type, increase_percent in (price_increase.amount_increases or {}).items():
+            normalized_key = _CAMEL_TO_SNAKE.get(amount_type, amount_type)
+            if normalized_key in AMOUNT_TYPES:
+                steps.append((AMOUNT_TYPES.index(normalized_key), 1 + increase_percent / 100))
+        return cls(
+            id=price_increase.id,
+            valid_from=price_increase.valid_from,
+            lock_in_months=price_increase.lock_in_months or 0,
+            steps=tuple(steps),
+        )
+
+    def apply(self, adjusted: np.ndarray, eligible: np.ndarray):
+        for t, factor in self.steps:
+            adjusted[eligible, t] *= factor
+
+
+@dataclass
+class PortfolioResult:
+    """Ergebnis pro Vertrag zu einem Stichtag (Arrays in Vertragsreihenfolge)"""
+    snapshot: "PortfolioSnapshot"
+    date: datetime
+    effective_active: np.ndarray
+    monthly_price: np.ndarray
+    monthly_commission: np.ndarray
+    exit_payout: np.ndarray
+
+    @property
+    def monthly_revenue(self) -> np.ndarray:
+        """Umsatz wie in calculate_customer_metrics: nur effektiv aktive Verträge"""
+        return np.where(self.effective_active, self.monthly_price, 0.0)
+
+    def per_customer(self, values: np.ndarray) -> np.ndarray:
+        return np.bincount(self.snapshot.customer_index, weights=values, minlength=len(self.snapshot.customer_ids))
+
+    def totals(self) -> Dict[str, float]:
+        return {
+            "monthly_revenue": float(self.monthly_revenue.sum()),
+            "monthly_commission": float(self.monthly_commission.sum()),
+            "exit_payout": float(self.exit_payout.sum()),
+        }
+
+    def customer_totals(self) -> Dict[str, np.ndarray]:
+        return {
+            "monthly_revenue": self.per_customer(self.monthly_revenue),
+            "monthly_commission": self.per_customer(self.monthly_commission),
+            "exit_payout": self.per_customer(self.exit_payout),
+        }
+
+
+class PortfolioSnapshot:
+    """
+    Vorberechnete Arrays eines Bestands. Unveränderlich nach dem Aufbau;
+    Zwischenergebnisse pro Stichtag (angepasste Beträge, Exit-Restmonate)
+    werden in kleinen LRU-Caches gehalten.
+    """
+
+    CACHE_SIZE = 16
+
+    def __init__(
+        self,
+        contracts: List[Contract],
+        settings: Settings,
+        price_increases: List[PriceIncrease],
+        commission_rates: List[CommissionRate],
+    ):
+        started = time.perf_counter()
+        self.settings = settings
+        self.commission_rates = list(commission_rates)
+        self.size = len(contracts)
+
+        self.contract_ids = [c.id for c in contracts]
+        self.customer_ids: List[str] = []
+        customer_positions: Dict[str, int] = {}
+        customer_index = np.empty(self.size, dtype=np.int64)
+        first_dates: Dict[str, datetime] = {}
+        for i, contract in enumerate(contracts):
+            if contract.customer_id not in customer_positions:
+                customer_positions[contract.customer_id] = len(self.customer_ids)
+                self.customer_ids.append(contract.customer_id)
+            customer_index[i] = customer_positions[contract.customer_id]
+            current = first_dates.get(contract.customer_id)
+            if contract.start_date and (current is None or contract.start_date < current):
+                first_dates[contract.customer_id] = contract.start_date
+        self.customer_index = customer_index
+        self.customer_positions = customer_positions
+
+        self.amounts = np.array([
+            [
+                contract.software_rental_amount or 0, contract.software_care_amount or 0,
+                contract.apps_amount or 0, contract.purchase_amount or 0,
+                getattr(contract, "cloud_amount", 0) or 0,
+            ]
+            for contract in contracts
+        ], dtype=float).reshape(self.size, len(AMOUNT_TYPES))
+
+        self.start = _datetime64([c.start_date for c in contracts])
+        self.start_month = np.array([_month_index(c.start_date) for c in contracts], dtype=np.int64)
+        self.end = _datetime64([c.end_date for c in contracts])
+        self.has_end = ~np.isnat(self.end)
+
+        founder_delay = settings.founder_delay_months if settings else 12
+        self.is_founder = np.array([bool(c.is_founder_discount) for c in contracts], dtype=bool)
+        self.founder_end = _datetime64([
+            add_months(c.start_date, founder_delay) if c.is_founder_discount else None for c in contracts
+        ])
+
+        first = [first_dates.get(c.customer_id) or c.start_date for c in contracts]
+        self.first_date = _datetime64(first)
+        self.first_month = np.array([_month_index(d) for d in first], dtype=np.int64)
+
+        seats = [getattr(c, "number_of_seats", 1) or 1 for c in contracts]
+        self.seats = np.array(seats, dtype=np.int64)
+        base_months_by_seats = {s: get_exit_payout_months(settings, s) for s in set(seats)}
+        self.base_months = np.array([base_months_by_seats[s] for s in seats], dtype=np.int64)
+
+        exit_config = settings.exit_payout_by_type if settings.exit_payout_by_type else _DEFAULT_EXIT_CONFIG
+        self.exit_enabled = np.zeros(len(AMOUNT_TYPES), dtype=bool)
+        self.exit_additional = np.zeros(len(AMOUNT_TYPES), dtype=np.int64)
+        for t, amount_type in enumerate(AMOUNT_TYPES):
+            type_config = exit_config.get(amount_type, {"enabled": False, "additional_months": 0})
+            if isinstance(type_config, dict):
+                self.exit_enabled[t] = bool(type_config.get("enabled", False))
+                self.exit_additional[t] = type_config.get("additional_months", 0) or 0
+            else:
+                self.exit_enabled[t] = bool(getattr(type_config, "enabled", False))
+                self.exit_additional[t] = getattr(type_config, "additional_months", 0) or 0
+
+        # Ausschlüsse und Vorziehungen: Preiserhöhungs-ID -> Vertragspositionen
+        self._excluded: Dict[str, List[int]] = {}
+        self._included_early: Dict[str, List[int]] = {}
+        for i, contract in enumerate(contracts):
+            for pi_id in contract.excluded_price_increase_ids or []:
+                self._excluded.setdefault(pi_id, []).append(i)
+            for pi_id in contract.included_early_price_increase_ids or []:
+                self._included_early.setdefault(pi_id, []).append(i)
+
+        self.price_increases = [PriceIncreaseTerms.from_price_increase(pi) for pi in price_increases]
+        self._eligibility = {terms.id: self.eligibility(terms) for terms in self.price_increases}
+
+        self._adjusted_cache: "OrderedDict[datetime, np.ndarray]" = OrderedDict()
+        self._exit_months_cache: "OrderedDict[datetime, np.ndarray]" = OrderedDict()
+        self._derived: Dict[tuple, object] = {}
+        self.built_at = time.monotonic()
+        self.build_seconds = time.perf_counter() - started
+
+    # ---------- Preiserhöhungen ----------
+
+    def _positions_mask(self, positions: Optional[List[int]]) -> np.ndarray:
+        mask = np.zeros(self.size, dtype=bool)
+        if positions:
+            mask[positions] = True
+        return mask
+
+    def eligibility(self, terms: PriceIncreaseTerms) -> np.ndarray:
+        """
+        Verträge, für die die Preiserhöhung ab valid_from gilt
+        (gleiche Prüfung wie get_current_monthly_price, ohne das Stichtags-Kriterium)
+        """
+        excluded = self._positions_mask(self._excluded.get(terms.id))
+        manually_included = self._positions_mask(self._included_early.get(terms.id))
+        valid_from = np.datetime64(terms.valid_from, "us")
+
+        after_start = ~(valid_from < self.start)
+        # months_between(first_date, valid_from), 0 wenn der erste Vertrag später beginnt
+        months_at_price_increase = np.where(
+            self.first_date > valid_from, 0, _month_index(terms.valid_from) - self.first_month
+        )
+        lock_in_fulfilled = months_at_price_increase >= terms.lock_in_months
+        return ~excluded & (after_start | manually_included) & (lock_in_fulfilled | manually_included)
+
+    def adjusted_amounts(
+        self,
+        date: datetime,
+        extra_price_increases: Sequence[PriceIncreaseTerms] = (),
+        cache: bool = True
+    ) -> np.ndarray:
+        """Beträge inkl. aller bis zum Stichtag gültigen Preiserhöhungen, (n, 5)"""
+        cache = cache and not extra_price_increases
+        if cache:
+            cached = self._adjusted_cache.get(date)
+            if cached is not None:
+                self._adjusted_cache.move_to_end(date)
+                return cached
+
+        adjusted = self.amounts.copy()
+        for terms in self.price_increases:
+            if terms.valid_from <= date:
+                terms.apply(adjusted, self._eligibility[terms.id])
+        for terms in extra_price_increases:
+            if terms.valid_from <= date:
+                terms.apply(adjusted, self.eligibility(terms))
+
+        if cache:
+            self._adjusted_cache[date] = adjusted
+            if len(self._adjusted_cache) > self.CACHE_SIZE:
+                self._adjusted_cache.popitem(last=False)
+        return adjusted
+
+    def applied_price_increases(self, date: datetime) -> List[Tuple[str, np.ndarray]]:
+        """(ID, berechtigte Verträge) der bis zum Stichtag gültigen Preiserhöhungen"""
+        return [
+            (terms.id, self._eligibility[terms.id]) for terms in self.price_increases if terms.valid_from <= date
+        ]
+
+    def iter_adjusted_amounts(self, dates: Sequence[datetime]) -> Iterator[Tuple[datetime, np.ndarray]]:
+        """
+        Angepasste Beträge für viele Stichtage (aufsteigend sortiert). Sie ändern
+        sich nur an Preiserhöhungs-Terminen und werden nur dort neu berechnet;
+        das gelieferte Array ist dann dasselbe Objekt wie zuvor (nicht verändern).
+        """
+        adjusted = None
+        applied_price_increases = None
+        for date in sorted(dates):
+            applied = tuple(terms.valid_from <= date for terms in self.price_increases)
+            if applied != applied_price_increases:
+                adjusted = self.adjusted_amounts(date, cache=False)
+                applied_price_increases = applied
+            yield date, adjusted
+
+    def derived(self, key: tuple, compute):
+        """
+        Aus dem Snapshot abgeleitete Auswertungen (z.B. Kohorten) einmal pro
+        Datenstand berechnen; der Cache verschwindet mit dem Snapshot
+        """
+        if key not in self._derived:
+            self._derived[key] = compute()
+        return self._derived[key]
+
+    # ---------- Status und Exit ----------
+
+    def months_running(self, date: datetime) -> np.ndarray:
+        return np.where(self.start > np.datetime64(date, "us"), 0, _month_index(date) - self.start_month)
+
+    def effective_active(self, date: datetime) -> np.ndarray:
+        """get_effective_status(...) == 'active'"""
+        day = np.datetime64(date, "us")
+        completed = self.has_end & (day > self.end)
+        not_started = day < self.start
+        in_founder_phase = self.is_founder & (day < self.founder_end)
+        return ~completed & ~not_started & ~in_founder_phase
+
+    def wall_clock_status(self, now: Optional[datetime] = None):
+        """(active, completed) nach Contract.status, das die aktuelle Uhrzeit verwendet"""
+        now64 = np.datetime64(now or datetime.utcnow(), "us")
+        completed = self.has_end & (now64 > self.end)
+        active = ~completed & ~(now64 < self.start)
+        return active, completed
+
+    def exit_months(self, date: datetime, cache: bool = True, ignore_end: bool = False) -> np.ndarray:
+        """
+        Restmonate für die Exit-Zahlung pro Vertrag und Typ (0 = keine Zahlung), (n, 5).
+        ignore_end: Vertragsende nicht berücksichtigen (für Simulationen, die
+        selbst entscheiden, ob ein Vertrag zum Stichtag noch läuft)
+        """
+        cache = cache and not ignore_end
+        if cache:
+            cached = self._exit_months_cache.get(date)
+            if cached is not None:
+                self._exit_months_cache.move_to_end(date)
+                return cached
+
+        remaining = (
+            self.base_months[:, None] + self.exit_additional[None, :] - self.months_running(date)[:, None]
+        )
+        paid = self.exit_enabled[None, :] & (self.amounts > 0) & (remaining > 0)
+        if not ignore_end:
+            _, wall_completed = self.wall_clock_status()
+            ended = wall_completed | (self.has_end & (self.end < np.datetime64(date, "us")))
+            paid &= ~ended[:, None]
+        months = np.where(paid, remaining, 0).astype(float)
+
+        if cache:
+            self._exit_months_cache[date] = months
+            if len(self._exit_months_cache) > self.CACHE_SIZE:
+                self._exit_months_cache.popitem(last=False)
+        return months
+
+    # ---------- Auswertung ----------
+
+    def rates_for_date(self, date: datetime, commission_rates: Optional[List] = None) -> np.ndarray:
+        rates_list = self.commission_rates if commission_rates is None else commission_rates
+        return rate_vector(get_commission_rates_for_date(rates_list, date))
+
+    def evaluate(
+        self,
+        date: datetime,
+        extra_price_increases: Sequence[PriceIncreaseTerms] = (),
+        commission_rates: Optional[List] = None
+    ) -> PortfolioResult:
+        """
+        Alle Verträge zum Stichtag. extra_price_increases und commission_rates
+        ersetzen bzw. ergänzen die Stammdaten nur für diese Auswertung.
+        """
+        adjusted = self.adjusted_amounts(date, extra_price_increases)
+        rates = self.rates_for_date(date, commission_rates) / 100
+        effective_active = self.effective_active(date)
+        wall_active, _ = self.wall_clock_status()
+
+        monthly_commission = np.where(wall_active & effective_active, sequential_sum(adjusted * rates), 0.0)
+        exit_payout = np.maximum(0.0, sequential_sum(adjusted * rates * self.exit_months(date)))
+
+        return PortfolioResult(
+            snapshot=self,
+            date=date,
+            effective_active=effective_active,
+            monthly_price=sequential_sum(adjusted),
+            monthly_commission=monthly_commission,
+            exit_payout=exit_payout,
+        )
+
+    def exit_payout_series(self, dates: Sequence[datetime]) -> Iterator[Tuple[datetime, np.ndarray]]:
+        """
+        Exit-Zahlung pro Vertrag für viele Stichtage in einem Durchlauf
+        (aufsteigend sortiert). Angepasste Beträge werden nur an Preiserhöhungs-
+        Terminen neu berechnet; dazwischen ändern sich nur Sätze und Restmonate.
+        """
+        for date, adjusted in self.iter_adjusted_amounts(dates):
+            rates = self.rates_for_date(date) / 100
+            months = self.exit_months(date, cache=False)
+            yield date, np.maximum(0.0, sequential_sum(adjusted * rates * months))
+
+
+def exit_payout_curve(
+    snapshot: PortfolioSnapshot,
+    dates: Sequence[datetime],
+    customer_ids: Sequence[str] = (),
+    top_customers: int = 0
+) -> dict:
+    """
+    Gesamte Exit-Zahlung (brutto/netto) je Stichtag, optional auch pro Kunde
+    für die angegebenen Kunden bzw. die Top-Kunden nach Exit-Zahlung am
+    ersten Stichtag.
+    """
+    tax_factor = 1 - snapshot.settings.personal_tax_rate / 100
+    points = []
+    per_customer = []
+    for date, payouts in snapshot.exit_payout_series(dates):
+        total = float(payouts.sum())
+        points.append({
+            "date": date,
+            "total_exit_payout": round(total, 2),
+            "total_exit_payout_net": round(total * tax_factor, 2),
+        })
+        if customer_ids or top_customers:
+            per_customer.append(
+                np.bincount(snapshot.customer_index, weights=payouts, minlength=len(snapshot.customer_ids))
+            )
+
+    customers = []
+    if per_customer:
+        matrix = np.vstack(per_customer)
+        positions = [snapshot.customer_positions[c] for c in customer_ids if c in snapshot.customer_positions]
+        if top_customers:
+            top = np.argsort(-matrix[0], kind="stable")[:top_customers]
+            positions += [int(p) for p in top if int(p) not in positions]
+        customers = [
+            {
+                "customer_id": snapshot.customer_ids[p],
+                "exit_payouts": [round(float(value), 2) for value in matrix[:, p]],
+            }
+            for p in positions
+        ]
+
+    return {"points": points, "customers": customers}
+
+
+class SnapshotCache:
+    """
+    Hält einen PortfolioSnapshot der aktuellen Datenbank. Neu aufgebaut wird,
+    wenn sich Anzahl oder letzte Änderung (updated_at) der Stammdaten ändert
+    oder der Snapshot älter als PORTFOLIO_SNAPSHOT_MAX_AGE_SECONDS ist.
+    """
+
+    def __init__(self, max_age_seconds: int):
+        self.max_age_seconds = max_age_seconds
+        self._snapshot: Optional[PortfolioSnapshot] = None
+        self._fingerprint = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def _fingerprint_of(self, db: AsyncSession) -> tuple:
+        parts = []
+        for model in (Contract, PriceIncrease, CommissionRate, Settings):
+            row = (await db.execute(select(sql_func.count(), sql_func.max(model.updated_at)).select_from(model))).one()
+            parts.append((row[0], row[1]))
+        return tuple(parts)
+
+    def _is_fresh(self, fingerprint) -> bool:
+        return (
+            self._snapshot is not None
+            and self._fingerprint == fingerprint
+            and time.monotonic() - self._snapshot.built_at < self.max_age_seconds
+        )
+
+    async def get(self, db: AsyncSession) -> PortfolioSnapshot:
+        fingerprint = await self._fingerprint_of(db)
+        if self._is_fresh(fingerprint):
+            return self._snapshot
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._is_fresh(fingerprint):
+                return self._snapshot
+            contracts = (await db.execute(select(Contract))).scalars().all()
+            settings = (await db.execute(select(Settings).where(Settings.id == "default"))).scalars().first()
+            price_increases = (await db.execute(select(PriceIncrease))).scalars().all()
+            commission_rates = (await db.execute(
+                select(CommissionRate).order_by(CommissionRate.valid_from)
+            )).scalars().all()
+            if not settings:
+                raise ValueError("Einstellungen nicht konfiguriert")
+
+            snapshot = await run_calculation(PortfolioSnapshot, contracts, settings, price_increases, commission_rates)
+            self._snapshot = snapshot
+            self._fingerprint = fingerprint
+            logger.info(f"📸 Portfolio snapshot built: {snapshot.size} contracts in {snapshot.build_seconds:.2f}s")
+            return snapshot
+
+    def invalidate(self):
+        self._snapshot = None
+        self._fingerprint = None
+
+
+async def load_customer_names(db: AsyncSession, customer_ids: Sequence[str]) -> Dict[str, dict]:
+    """Name und Kundennummer für die angegebenen Kunden"""
+    if not customer_ids:
+        return {}
+    rows = (await db.execute(
+        select(Customer.id, Customer.name, Customer.name2, Customer.kundennummer)
+        .where(Customer.id.in_(list(customer_ids)))
+    )).all()
+    return {
+        row.id: {"name": f"{row.name} {row.name2 or ''}".strip(), "kundennummer": row.kundennummer}
+        for row in rows
+    }
+
+
+# Ein Snapshot pro Datenbank (PROD/DEMO)
+snapshot_cache = DatabaseScoped(lambda: SnapshotCache(max_age_seconds=app_settings.PORTFOLIO_SNAPSHOT_MAX_AGE_SECONDS))
@@ -0,0 +1,456 @@
+"""
+Portfolio Generator
+Deterministischer Generator für große synthetische Bestände
+(Kunden, Verträge, Preiserhöhungen, Provisionssätze).
+
+Gleicher Seed + gleiches Stichtagsdatum ergeben exakt dieselben Daten.
+Der Generator dient als Fixture für Benchmarks und den Differential-Test
+der Berechnungs-Engines; geschrieben wird per COPY direkt in PostgreSQL.
+
+Synthetische Daten sind markiert:
+- Kundennummern beginnen mit KUNDENNUMMER_PREFIX
+- Preiserhöhungen und Provisionssätze haben SYNTHETIC_MARKER in der Beschreibung
+"""
+import copy
+import csv
+import io
+import json
+import logging
+import random
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from app.models.contract import Contract
+from app.models.customer import Customer
+from app.models.price_increase import PriceIncrease
+from app.models.commission_rate import CommissionRate
+from app.models.settings import Settings
+from app.utils.date_utils import add_months
+
+logger = logging.getLogger(__name__)
+
+KUNDENNUMMER_PREFIX = "97"
+# CustomerSchema erlaubt höchstens 8 Ziffern: Präfix + laufende Nummer
+KUNDENNUMMER_MAX_DIGITS = 8
+SYNTHETIC_MARKER = "[synthetic]"
+
+AMOUNT_TYPES = ["software_rental", "software_care", "apps", "purchase", "cloud"]
+CAMEL_CASE_KEYS = {
+    "software_rental": "softwareRental",
+    "software_care": "softwareCare",
+    "apps": "apps",
+    "purchase": "purchase",
+    "cloud": "cloud",
+}
+
+# (Wahrscheinlichkeit > 0, Median, Streuung) der monatlichen Beträge
+AMOUNT_DISTRIBUTIONS = {
+    "software_rental": (0.75, 120.0, 0.6),
+    "software_care": (0.55, 55.0, 0.5),
+    "apps": (0.35, 25.0, 0.7),
+    "purchase": (0.12, 180.0, 0.8),
+    "cloud": (0.30, 45.0, 0.6),
+}
+
+# Verträge pro Kunde: (Anzahl, Gewicht)
+CONTRACTS_PER_CUSTOMER = [(1, 52), (2, 24), (3, 12), (4, 6), (5, 3), (6, 2), (8, 1)]
+
+# Arbeitsplätze: (von, bis, Gewicht) - deckt die Staffeln der Exit-Zahlungen ab
+SEAT_RANGES = [(1, 5, 68), (6, 10, 20), (11, 25, 9), (26, 60, 3)]
+
+CITIES = [
+    ("Berlin", "10115", "Deutschland"), ("Hamburg", "20095", "Deutschland"),
+    ("München", "80331", "Deutschland"), ("Köln", "50667", "Deutschland"),
+    ("Frankfurt", "60311", "Deutschland"), ("Stuttgart", "70173", "Deutschland"),
+    ("Leipzig", "04109", "Deutschland"), ("Dresden", "01067", "Deutschland"),
+    ("Nürnberg", "90402", "Deutschland"), ("Münster", "48143", "Deutschland"),
+    ("Wien", "1010", "Österreich"), ("Graz", "8010", "Österreich"),
+    ("Zürich", "8001", "Schweiz"), ("Basel", "4001", "Schweiz"),
+]
+
+NAMES = [
+    "Müller", "Schmidt", "Schneider", "Fischer", "Weber", "Meyer", "Wagner", "Becker",
+    "Schulz", "Hoffmann", "Koch", "Bauer", "Richter", "Klein", "Wolf", "Neumann",
+]
+SUFFIXES = ["GmbH", "AG", "KG", "e.K.", "GbR", "Praxis", "Apotheke", "Steuerkanzlei"]
+
+CUSTOMER_COLUMNS = ["id", "name", "name2", "ort", "plz", "kundennummer", "land", "created_at", "updated_at"]
+CONTRACT_COLUMNS = [
+    "id", "customer_id", "software_rental_amount", "software_care_amount", "apps_amount",
+    "purchase_amount", "cloud_amount", "currency", "start_date", "end_date",
+    "is_founder_discount", "number_of_seats", "excluded_price_increase_ids",
+    "included_early_price_increase_ids", "notes", "created_at", "updated_at",
+]
+
+
+class PortfolioGenerator:
+    """
+    Erzeugt einen Bestand mit realistischen Verteilungen:
+    - Vertragsbeginne über die letzten Jahre, jüngere Jahrgänge häufiger,
+      überwiegend zum Monatsersten, teils zum Monatsende (29.-31.)
+    - Mehrere Verträge pro Kunde (Bestandsschutz über den ersten Vertrag)
+    - Existenzgründer (teils mit Vertragsbeginn in der Zukunft),
+      beendete Verträge, CHF-Verträge bei Schweizer Kunden
+    - Ausgeschlossene und manuell vorgezogene Preiserhöhungen
+    - Preiserhöhungs- und Provisionssatz-Historie mit gemischten Schlüsseln
+      (snake_case und camelCase, wie in Altdaten)
+    """
+
+    def __init__(
+        self,
+        num_contracts: int,
+        seed: int = 42,
+        price_increase_count: int = 8,
+        commission_rate_count: int = 4,
+        start_year: int = 2012,
+        reference_date: Optional[datetime] = None,
+        kundennummer_prefix: str = KUNDENNUMMER_PREFIX,
+    ):
+        self.num_contracts = num_contracts
+        self.seed = seed
+        self.price_increase_count = price_increase_count
+        self.commission_rate_count = commission_rate_count
+        self.start_year = start_year
+        self.reference_date = (reference_date or datetime.now()).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        if not kundennummer_prefix.isdigit() or len(kundennummer_prefix) >= KUNDENNUMMER_MAX_DIGITS:
+            raise ValueError(f"Kundennummer-Präfix muss aus 1-{KUNDENNUMMER_MAX_DIGITS - 1} Ziffern bestehen")
+        self.kundennummer_prefix = kundennummer_prefix
+        self._number_digits = KUNDENNUMMER_MAX_DIGITS - len(kundennummer_prefix)
+        self._rng = random.Random(seed)
+        self._price_increases: Optional[List[dict]] = None
+        self._commission_rates: Optional[List[dict]] = None
+
+    def _uuid(self) -> str:
+        return str(uuid.UUID(int=self._rng.getrandbits(128), version=4))
+
+    # --- Historie -------------------------------------------------------
+
+    def price_increases(self) -> List[dict]:
+        """Preiserhöhungen, rückwärts ab dem Stichtag (halbjährlich/jährlich)"""
+        if self._price_increases is None:
+            rng = self._rng
+            rows = []
+            valid_from = datetime(self.reference_date.year, 1, 1)
+            for index in range(self.price_increase_count):
+                increases = {}
+                use_camel_case = rng.random() < 0.3
+                for amount_type in AMOUNT_TYPES:
+                    percent = 0 if rng.random() < 0.25 else round(rng.uniform(1.5, 6.0), 1)
+                    key = CAMEL_CASE_KEYS[amount_type] if use_camel_case else amount_type
+                    increases[key] = percent
+                rows.append({
+                    "id": self._uuid(),
+                    "valid_from": valid_from,
+                    "amount_increases": increases,
+                    "lock_in_months": rng.choice([0, 12, 12, 24, 24, 24, 36]),
+                    "description": f"{SYNTHETIC_MARKER} Preiserhöhung {valid_from:%m/%Y}",
+                })
+                valid_from = add_months(valid_from, -rng.choice([6, 12, 12, 18]))
+            rows.reverse()
+            self._price_increases = rows
+        return self._price_increases
+
+    def commission_rates(self) -> List[dict]:
+        """Provisionssätze-Historie; der älteste Satz gilt ab start_year"""
+        if self._commission_rates is None:
+            rng = self._rng
+            rows = []
+            span_months = max(12, (self.reference_date.year - self.start_year) * 12)
+            for index in range(self.commission_rate_count):
+                if index == 0:
+                    valid_from = datetime(self.start_year - 1, 1, 1)
+                else:
+                    offset = span_months * index // self.commission_rate_count
+                    valid_from = add_months(datetime(self.start_year, 1, 1), offset)
+                base = rng.choice([15.0, 18.0, 20.0, 22.0, 25.0])
+                rates = {
+                    "software_rental": base,
+                    "software_care": base,
+                    "apps": base,
+                    "purchase": round(base / 2, 1),
+                    "cloud": round(rng.uniform(5.0, 12.0), 1),
+                }
+                if rng.random() < 0.3:
+                    rates = {CAMEL_CASE_KEYS[k]: v for k, v in rates.items()}
+                rows.append({
+                    "id": self._uuid(),
+                    "valid_from": valid_from,
+                    "rates": rates,
+                    "description": f"{SYNTHETIC_MARKER} Provisionssätze ab {valid_from:%m/%Y}",
+                })
+            self._commission_rates = rows
+        return self._commission_rates
+
+    # --- Kunden und Verträge --------------------------------------------
+
+    def _start_date(self) -> datetime:
+        rng = self._rng
+        total_months = (self.reference_date.year - self.start_year) * 12 + self.reference_date.month
+        # Dreiecksverteilung: jüngere Jahrgänge häufiger
+        month_offset = int(rng.triangular(0, total_months, total_months * 0.8))
+        first_of_month = add_months(datetime(self.start_year, 1, 1), month_offset)
+        roll = rng.random()
+        if roll < 0.7:
+            day = 1
+        elif roll < 0.8:
+            day = 15
+        elif roll < 0.9:
+            day = rng.randint(29, 31)
+        else:
+            day = rng.randint(2, 28)
+        return _clip_day(first_of_month, day)
+
+    def _amounts(self, seats: int) -> Dict[str, float]:
+        rng = self._rng
+        seat_factor = 1 + (seats - 1) * 0.15
+        amounts = {}
+        for amount_type, (probability, median, sigma) in AMOUNT_DISTRIBUTIONS.items():
+            if rng.random() < probability:
+                amounts[amount_type] = round(rng.lognormvariate(0, sigma) * median * seat_factor, 2)
+            else:
+                amounts[amount_type] = 0.0
+        if not any(amounts.values()):
+            amounts["software_rental"] = round(rng.lognormvariate(0, 0.5) * 120.0, 2)
+        return amounts
+
+    def _seats(self) -> int:
+        rng = self._rng
+        low, high, _ = rng.choices(SEAT_RANGES, weights=[w for _, _, w in SEAT_RANGES])[0]
+        return rng.randint(low, high)
+
+    def _contract(self, customer_id: str, start_date: datetime, currency: str, now: datetime) -> dict:
+        rng = self._rng
+        price_increases = self.price_increases()
+
+        is_founder = rng.random() < 0.06
+        if is_founder and rng.random() < 0.5:
+            # Existenzgründer: Mietbeginn nach der Karenzzeit, oft in der Zukunft
+            start_date = add_months(self.reference_date.replace(day=1), rng.randint(1, 12))
+
+        end_date = None
+        if rng.random() < 0.15:
+            end_date = add_months(start_date, rng.randint(6, 96))
+
+        seats = self._seats()
+        amounts = self._amounts(seats)
+
+        excluded = []
+        if price_increases and rng.random() < 0.03:
+            excluded = [pi["id"] for pi in rng.sample(price_increases, k=min(2, len(price_increases)))]
+        included_early = []
+        if price_increases and rng.random() < 0.03:
+            # Manuell aktivierte Erhöhung vor Vertragsbeginn bzw. in der Bestandsschutzfrist
+            candidates = [pi["id"] for pi in price_increases if pi["id"] not in excluded]
+            if candidates:
+                included_early = [rng.choice(candidates)]
+
+        return {
+            "id": self._uuid(),
+            "customer_id": customer_id,
+            "software_rental_amount": amounts["software_rental"],
+            "software_care_amount": amounts["software_care"],
+            "apps_amount": amounts["apps"],
+            "purchase_amount": amounts["purchase"],
+            "cloud_amount": amounts["cloud"],
+            "currency": currency,
+            "start_date": start_date,
+            "end_date": end_date,
+            "is_founder_discount": is_founder,
+            "number_of_seats": seats,
+            "excluded_price_increase_ids": excluded,
+            "included_early_price_increase_ids": included_early,
+            "notes": "",
+            "created_at": now,
+            "updated_at": now,
+        }
+
+    def iter_customers(self) -> Iterator[Tuple[dict, List[dict]]]:
+        """Liefert (Kunde, Verträge) bis num_contracts erreicht ist"""
+        rng = self._rng
+        # Historie zuerst erzeugen, damit der Zufallsstrom stabil bleibt
+        self.price_increases()
+        self.commission_rates()
+
+        now = datetime(self.reference_date.year, self.reference_date.month, self.reference_date.day)
+        counts, weights = zip(*CONTRACTS_PER_CUSTOMER)
+        remaining = self.num_contracts
+        index = 0
+        while remaining > 0:
+            index += 1
+            if index >= 10 ** self._number_digits:
+                raise ValueError(
+                    f"Zu viele Kunden für das Präfix '{self.kundennummer_prefix}': "
+                    f"höchstens {10 ** self._number_digits - 1} Kundennummern mit {KUNDENNUMMER_MAX_DIGITS} Ziffern"
+                )
+            city, plz, land = rng.choice(CITIES)
+            customer = {
+                "id": self._uuid(),
+                "name": f"{rng.choice(NAMES)} {rng.choice(SUFFIXES)}",
+                "name2": rng.choice(NAMES) if rng.random() < 0.4 else None,
+                "ort": city,
+                "plz": plz,
+                "kundennummer": f"{self.kundennummer_prefix}{index:0{self._number_digits}d}",
+                "land": land,
+                "created_at": now,
+                "updated_at": now,
+            }
+            currency = "CHF" if land == "Schweiz" and rng.random() < 0.7 else "EUR"
+
+            num = min(rng.choices(counts, weights=weights)[0], remaining)
+            start_date = self._start_date()
+            contracts = []
+            for _ in range(num):
+                contracts.append(self._contract(customer["id"], start_date, currency, now))
+                # Folgeverträge starten später (Erweiterungen)
+                if start_date < self.reference_date:
+                    start_date = _clip_day(
+                        add_months(start_date.replace(day=1), rng.randint(1, 36)), start_date.day
+                    )
+            remaining -= num
+            yield customer, contracts
+
+    def build_models(self) -> Tuple[List[Customer], List[Contract], List[PriceIncrease], List[CommissionRate]]:
+        """Erzeugt den Bestand als (nicht gespeicherte) ORM-Objekte, z.B. für Benchmarks"""
+        customers, contracts = [], []
+        for customer_row, contract_rows in self.iter_customers():
+            customers.append(Customer(**customer_row))
+            contracts.extend(Contract(**row) for row in contract_rows)
+        price_increases = [PriceIncrease(**row) for row in self.price_increases()]
+        commission_rates = [CommissionRate(**row) for row in self.commission_rates()]
+        return customers, contracts, price_increases, commission_rates
+
+
+def build_default_settings() -> Settings:
+    """
+    Settings-Objekt mit den Spalten-Defaults (wie eine frische Installation).
+    Spalten-Defaults greifen sonst erst beim INSERT.
+    """
+    values = {}
+    for column in Settings.__table__.columns:
+        default = column.default
+        if default is not None and not default.is_callable:
+            values[column.key] = copy.deepcopy(default.arg)
+    return Settings(**values)
+
+
+def _clip_day(first_of_month: datetime, day: int) -> datetime:
+    """Setzt den Tag, begrenzt auf das Monatsende"""
+    next_month = add_months(first_of_month.replace(day=1), 1)
+    last_day = (next_month - first_of_month.replace(day=1)).days
+    return first_of_month.replace(day=min(day, last_day))
+
+
+# --- Schreiben per COPY -------------------------------------------------
+
+_NULL = r"\N"
+
+
+def _csv_value(value):
+    if value is None:
+        return _NULL
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    if isinstance(value, (list, dict)):
+        return json.dumps(value)
+    return value
+
+
+def _copy_rows(cursor, table: str, columns: List[str], rows: List[dict]):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([_csv_value(row[column]) for column in columns])
+    buffer.seek(0)
+    cursor.copy_expert(
+        f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '{_NULL}')",
+        buffer
+    )
+
+
+def count_non_synthetic_customers(engine: Engine, kundennummer_prefix: str = KUNDENNUMMER_PREFIX) -> int:
+    with engine.connect() as conn:
+        return conn.execute(
+            text("SELECT count(*) FROM customers WHERE kundennummer NOT LIKE :prefix"),
+            {"prefix": f"{kundennummer_prefix}%"}
+        ).scalar()
+
+
+def delete_synthetic_data(engine: Engine, kundennummer_prefix: str = KUNDENNUMMER_PREFIX):
+    """Entfernt zuvor generierte Daten (Verträge per ON DELETE CASCADE)"""
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM contracts WHERE customer_id IN (SELECT id FROM customers WHERE kundennummer LIKE :prefix)"),
+                     {"prefix": f"{kundennummer_prefix}%"})
+        conn.execute(text("DELETE FROM customers WHERE kundennummer LIKE :prefix"),
+                     {"prefix": f"{kundennummer_prefix}%"})
+        conn.execute(text("DELETE FROM price_increases WHERE description LIKE :marker"),
+                     {"marker": f"{SYNTHETIC_MARKER}%"})
+        conn.execute(text("DELETE FROM commission_rates WHERE description LIKE :marker"),
+                     {"marker": f"{SYNTHETIC_MARKER}%"})
+    logger.info("🧹 Synthetic portfolio removed")
+
+
+def write_portfolio(generator: PortfolioGenerator, engine: Engine, chunk_size: int = 50_000) -> dict:
+    """
+    Schreibt den Bestand in einer Transaktion per COPY (psycopg2).
+    Kunden und Verträge werden in Blöcken von chunk_size Verträgen gestreamt,
+    der Speicherbedarf bleibt damit unabhängig von der Bestandsgröße.
+    """
+    started = time.perf_counter()
+    customer_total = contract_total = 0
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        now = datetime.utcnow()
+        _copy_rows(cursor, "price_increases",
+                   ["id", "valid_from", "amount_increases", "lock_in_months", "description", "created_at", "updated_at"],
+                   [{**row, "created_at": now, "updated_at": now} for row in generator.price_increases()])
+        _copy_rows(cursor, "commission_rates",
+                   ["id", "valid_from", "rates", "description", "created_at", "updated_at"],
+                   [{**row, "created_at": now, "updated_at": now} for row in generator.commission_rates()])
+
+        customers: List[dict] = []
+        contracts: List[dict] = []
+        for customer, customer_contracts in generator.iter_customers():
+            customers.append(customer)
+            contracts.extend(customer_contracts)
+            if len(contracts) >= chunk_size:
+                _copy_rows(cursor, "customers", CUSTOMER_COLUMNS, customers)
+                _copy_rows(cursor, "contracts", CONTRACT_COLUMNS, contracts)
+                customer_total += len(customers)
+                contract_total += len(contracts)
+                logger.info(f"   {contract_total:,} / {generator.num_contracts:,} contracts written")
+                customers, contracts = [], []
+        if customers:
+            _copy_rows(cursor, "customers", CUSTOMER_COLUMNS, customers)
+            _copy_rows(cursor, "contracts", CONTRACT_COLUMNS, contracts)
+            customer_total += len(customers)
+            contract_total += len(contracts)
+
+        cursor.execute("ANALYZE customers")
+        cursor.execute("ANALYZE contracts")
+        raw.commit()
+    except Exception:
+        raw.rollback()
+        raise
+    finally:
+        raw.close()
+
+    duration = time.perf_counter() - started
+    logger.info(f"✅ Synthetic portfolio written: {customer_total:,} customers, "
+                f"{contract_total:,} contracts in {duration:.1f}s")
+    return {
+        "customers": customer_total,
+        "contracts": contract_total,
+        "price_increases": len(generator.price_increases()),
+        "commission_rates": len(generator.commission_rates()),
+        "seconds": round(duration, 1),
+    }
@@ -0,0 +1,306 @@
+"""
+Profiler Service
+Sampling-Profiler für einzelne Requests im Live-System.
+
+Aktivierung pro Request über den Header "X-Profile: 1" oder den
+Query-Parameter "profile=1" (nur mit PROFILING_ENABLED und gültigem
+Bearer-Token). Ein Sampler-Thread liest alle PROFILING_SAMPLE_INTERVAL_MS
+die Stacks der Threads, die für den Request arbeiten (Endpoint,
+Threadpool, Calculation-Executor), und speichert sie im "collapsed"
+Format (eine Zeile "frame;frame;frame count"), das flamegraph.pl und
+speedscope direkt lesen.
+
+Auf dem Event-Loop-Thread laufen andere Requests mit; dort zählen nur
+Samples, deren Stack den Endpoint des profilierten Requests enthält.
+"""
+import functools
+import hmac
+import inspect
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from fastapi import HTTPException, Request
+from fastapi.routing import APIRoute
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_QUERY_PARAM = "profile"
+
+
+def _frame_label(code) -> str:
+    name = getattr(code, "co_qualname", code.co_name)
+    filename = os.path.basename(code.co_filename)
+    # ";" trennt Frames im collapsed Format
+    return f"{name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+
+
+class ProfileSession:
+    """Ein laufender Profiling-Lauf für genau einen Request"""
+
+    def __init__(self, method: str, path: str, interval_seconds: float):
+        self.id = uuid.uuid4().hex[:12]
+        self.method = method
+        self.path = path
+        self.interval_seconds = interval_seconds
+        self.started_at = datetime.now()
+        self._lock = threading.Lock()
+        self._threads: Dict[int, List] = {}
+        self.stacks: Counter = Counter()
+        self.ticks = 0
+        self.samples = 0
+        self.duration_seconds = 0.0
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._started = 0.0
+
+    def register_thread(self, ident: int, root_code=None):
+        with self._lock:
+            self._threads.setdefault(ident, []).append(root_code)
+
+    def unregister_thread(self, ident: int, root_code=None):
+        with self._lock:
+            roots = self._threads.get(ident)
+            if roots:
+                roots.remove(root_code)
+                if not roots:
+                    del self._threads[ident]
+
+    def _sample(self):
+        with self._lock:
+            threads = {ident: list(roots) for ident, roots in self._threads.items()}
+        if not threads:
+            return
+        frames = sys._current_frames()
+        for ident, roots in threads.items():
+            frame = frames.get(ident)
+            if frame is None:
+                continue
+            codes = []
+            while frame is not None:
+                codes.append(frame.f_code)
+                frame = frame.f_back
+            codes.reverse()
+
+            # Stack ab dem äußersten registrierten Root; ohne Root kein Sample
+            start = None
+            for root in roots:
+                if root is None:
+                    start = 0
+                    break
+                if root in codes:
+                    index = codes.index(root)
+                    start = index if start is None else min(start, index)
+            if start is None:
+                continue
+            stack = ";".join(_frame_label(code) for code in codes[start:])
+            with self._lock:
+                self.stacks[stack] += 1
+                self.samples += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval_seconds):
+            self.ticks += 1
+            try:
+                self._sample()
+            except Exception as e:
+                logger.debug(f"Profile sample failed: {e}")
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._sampler = threading.Thread(
+            target=self._run, name=f"profiler-{self.id}", daemon=True
+        )
+        self._sampler.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join(timeout=1)
+        self.duration_seconds = time.perf_counter() - self._started
+
+    def collapsed(self) -> str:
+        """Stacks im collapsed Format (für flamegraph.pl / speedscope)"""
+        with self._lock:
+            return "\n".join(f"{stack} {n}" for stack, n in self.stacks.most_common())
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round(self.duration_seconds * 1000, 1),
+            "interval_ms": round(self.interval_seconds * 1000, 1),
+            "ticks": self.ticks,
+            "samples": self.samples,
+            "unique_stacks": len(self.stacks),
+        }
+
+
+class ProfileStore:
+    """Hält die letzten abgeschlossenen Profile im Speicher"""
+
+    def __init__(self, max_profiles: int):
+        self.max_profiles = max_profiles
+        self._lock = threading.Lock()
+        self._profiles: "OrderedDict[str, ProfileSession]" = OrderedDict()
+
+    def add(self, session: ProfileSession):
+        with self._lock:
+            self._profiles[session.id] = session
+            while len(self._profiles) > self.max_profiles:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[ProfileSession]:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def list(self) -> List[dict]:
+        with self._lock:
+            return [session.summary() for session in reversed(self._profiles.values())]
+
+
+class Profiler:
+    """Startet Sessions und begrenzt die Anzahl gleichzeitiger Profile"""
+
+    def __init__(self, max_concurrent: int, max_profiles: int, interval_ms: int):
+        self.max_concurrent = max_concurrent
+        self.interval_seconds = max(interval_ms, 1) / 1000
+        self.store = ProfileStore(max_profiles)
+        self._lock = threading.Lock()
+        self._active = 0
+
+    def try_start(self, method: str, path: str) -> Optional[ProfileSession]:
+        """Startet eine Session oder gibt None zurück, wenn das Limit erreicht ist"""
+        with self._lock:
+            if self._active >= self.max_concurrent:
+                return None
+            self._active += 1
+        session = ProfileSession(method, path, self.interval_seconds)
+        session.start()
+        return session
+
+    def finish(self, session: ProfileSession):
+        session.stop()
+        with self._lock:
+            self._active -= 1
+        self.store.add(session)
+        logger.info(
+            f"🔬 Profile {session.id} for {session.method} {session.path}: "
+            f"{session.samples} samples in {session.duration_seconds * 1000:.0f} ms"
+        )
+
+
+profiler = Profiler(
+    max_concurrent=settings.PROFILING_MAX_CONCURRENT,
+    max_profiles=settings.PROFILING_MAX_STORED,
+    interval_ms=settings.PROFILING_SAMPLE_INTERVAL_MS,
+)
+
+_active_session: ContextVar[Optional[ProfileSession]] = ContextVar("profile_session", default=None)
+
+
+@contextmanager
+def profile_thread(func: Optional[Callable] = None):
+    """
+    Meldet den aktuellen Thread für die Dauer des Blocks bei der aktiven
+    Session an (No-Op ohne Profiling). Mit func zählen nur Stacks, in denen
+    dessen Code vorkommt.
+    """
+    session = _active_session.get()
+    if session is None:
+        yield
+        return
+    ident = threading.get_ident()
+    root_code = getattr(inspect.unwrap(func), "__code__", None) if func is not None else None
+    session.register_thread(ident, root_code)
+    try:
+        yield
+    finally:
+        session.unregister_thread(ident, root_code)
+
+
+def is_profiling_admin(request: Request) -> bool:
+    """Profiling nur wenn aktiviert und (falls Auth aktiv) mit gültigem Token"""
+    if not settings.PROFILING_ENABLED:
+        return False
+    if not settings.AUTH_PASSWORD:
+        return True
+    authorization = request.headers.get("Authorization", "")
+    return hmac.compare_digest(authorization, f"Bearer {settings.AUTH_PASSWORD}")
+
+
+def require_profiling_admin(request: Request):
+    """Dependency für die Profil-Endpunkte"""
+    if not is_profiling_admin(request):
+        raise HTTPException(status_code=403, detail="Profiling is not enabled for this client")
+
+
+def _profiling_requested(request: Request) -> bool:
+    return (
+        request.headers.get(PROFILE_HEADER) == "1"
+        or request.query_params.get(PROFILE_QUERY_PARAM) == "1"
+    )
+
+
+def _wrap_endpoint(endpoint: Callable) -> Callable:
+    """Meldet den Thread, in dem der Endpoint läuft, bei der Session an"""
+    if inspect.iscoroutinefunction(inspect.unwrap(endpoint)):
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args, **kwargs):
+            with profile_thread(endpoint):
+                return await endpoint(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def sync_wrapper(*args, **kwargs):
+        with profile_thread(endpoint):
+            return endpoint(*args, **kwargs)
+    return sync_wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """
+    Route-Klasse für Router, deren Requests profiliert werden können.
+    Verwendung: APIRouter(route_class=ProfiledRoute)
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, _wrap_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self) -> Callable:
+        original_handler = super().get_route_handler()
+
+        async def profiled_handler(request: Request):
+            if not _profiling_requested(request):
+                return await original_handler(request)
+            if not is_profiling_admin(request):
+                raise HTTPException(status_code=403, detail="Profiling is not enabled for this client")
+
+            session = profiler.try_start(request.method, request.url.path)
+            if session is None:
+                raise HTTPException(status_code=429, detail="Too many profiled requests in progress")
+
+            token = _active_session.set(session)
+            try:
+                response = await original_handler(request)
+            finally:
+                _active_session.reset(token)
+                profiler.finish(session)
+            response.headers["X-Profile-Id"] = session.id
+            response.headers["X-Profile-Samples"] = str(session.samples)
+            return response
+
+        return profiled_handler
@@ -0,0 +1,214 @@
+"""
+Szenarien
+Vorschau der Auswirkung hypothetischer Preiserhöhungen bzw. Provisionssätze
+auf Umsatz, Provision und Exit-Zahlungen. Gerechnet wird auf dem gecachten
+PortfolioSnapshot, in der Datenbank wird nichts geändert.
+"""
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.services.portfolio_engine import PortfolioResult, PortfolioSnapshot, PriceIncreaseTerms
+
+METRICS = ("monthly_revenue", "monthly_commission", "exit_payout")
+
+# Änderungen unter einem halben Cent gelten als "nicht betroffen"
+AFFECTED_THRESHOLD = 0.005
+
+
+def naive_utc(date: datetime) -> datetime:
+    """Zeitzonen-behaftete Eingaben (z.B. "...Z") wie die gespeicherten Daten als naive UTC"""
+    if date.tzinfo is not None:
+        return date.astimezone(timezone.utc).replace(tzinfo=None)
+    return date
+
+
+class _ProposedPriceIncrease:
+    """Minimales Objekt mit den Feldern, die PriceIncreaseTerms erwartet"""
+
+    def __init__(self, valid_from: datetime, amount_increases: Dict[str, float], lock_in_months: int):
+        self.id = f"scenario-{uuid.uuid4()}"
+        self.valid_from = naive_utc(valid_from)
+        self.amount_increases = amount_increases
+        self.lock_in_months = lock_in_months
+
+
+def proposed_price_increase_terms(proposals: Sequence) -> List[PriceIncreaseTerms]:
+    return [
+        PriceIncreaseTerms.from_price_increase(
+            _ProposedPriceIncrease(p.valid_from, p.amount_increases, p.lock_in_months)
+        )
+        for p in proposals
+    ]
+
+
+@dataclass
+class ContractPage:
+    """
+    Ausschnitt der Vertragsliste: ohne Filter alle betroffenen Verträge,
+    mit contract_id/customer_id alle passenden (auch unveränderte)
+    """
+    offset: int = 0
+    limit: int = 100
+    contract_id: Optional[str] = None
+    customer_id: Optional[str] = None
+
+    @classmethod
+    def from_request(cls, request) -> "ContractPage":
+        return cls(request.contract_offset, request.contract_limit, request.contract_id, request.customer_id)
+
+
+def _delta(before: float, after: float) -> dict:
+    return {"before": round(before, 2), "after": round(after, 2), "delta": round(after - before, 2)}
+
+
+def contract_deltas(
+    before: PortfolioResult,
+    after: PortfolioResult,
+    contract_changed: np.ndarray,
+    page: ContractPage
+) -> dict:
+    """
+    Vorher/Nachher pro Vertrag, absteigend nach Betrag der Provisions-,
+    dann Exit- und Umsatzänderung sortiert und auf page beschnitten
+    """
+    snapshot = before.snapshot
+    selected = contract_changed.copy()
+    if page.contract_id is not None or page.customer_id is not None:
+        selected[:] = True
+        if page.contract_id is not None:
+            selected &= np.asarray(snapshot.contract_ids, dtype=object) == page.contract_id
+        if page.customer_id is not None:
+            position = snapshot.customer_positions.get(page.customer_id, -1)
+            selected &= snapshot.customer_index == position
+    positions = np.flatnonzero(selected)
+
+    before_values = {metric: getattr(before, metric)[positions] for metric in METRICS}
+    after_values = {metric: getattr(after, metric)[positions] for metric in METRICS}
+    deltas = {metric: after_values[metric] - before_values[metric] for metric in METRICS}
+    order = np.lexsort((
+        -np.abs(deltas["monthly_revenue"]), -np.abs(deltas["exit_payout"]), -np.abs(deltas["monthly_commission"])
+    ))
+    page_order = order[page.offset:page.offset + page.limit]
+    return {
+        "contracts_total": len(positions),
+        "contracts": [
+            {
+                "contract_id": snapshot.contract_ids[positions[k]],
+                "customer_id": snapshot.customer_ids[snapshot.customer_index[positions[k]]],
+                **{
+                    metric: _delta(float(before_values[metric][k]), float(after_values[metric][k]))
+                    for metric in METRICS
+                },
+            }
+            for k in page_order
+        ],
+    }
+
+
+def compare_results(
+    before: PortfolioResult,
+    after: PortfolioResult,
+    top_customers: int,
+    page: Optional[ContractPage] = None
+) -> dict:
+    """Vorher/Nachher-Vergleich gesamt, pro Kunde (Top-Kunden nach Provisionsänderung) und pro Vertrag"""
+    snapshot = before.snapshot
+    before_customers = before.customer_totals()
+    after_customers = after.customer_totals()
+    before_totals = before.totals()
+    after_totals = after.totals()
+
+    contract_changed = np.zeros(snapshot.size, dtype=bool)
+    for metric in METRICS:
+        contract_changed |= np.abs(getattr(after, metric) - getattr(before, metric)) >= AFFECTED_THRESHOLD
+
+    commission_delta = after_customers["monthly_commission"] - before_customers["monthly_commission"]
+    revenue_delta = after_customers["monthly_revenue"] - before_customers["monthly_revenue"]
+    customer_changed = np.bincount(
+        snapshot.customer_index, weights=contract_changed, minlength=len(snapshot.customer_ids)
+    ) > 0
+    changed_positions = np.flatnonzero(customer_changed)
+    order = np.lexsort((-np.abs(revenue_delta[changed_positions]), -np.abs(commission_delta[changed_positions])))
+    top_positions = changed_positions[order][:top_customers]
+
+    return {
+        "total_contracts": snapshot.size,
+        "affected_contracts": int(contract_changed.sum()),
+        "affected_customers": int(customer_changed.sum()),
+        "totals": {metric: _delta(before_totals[metric], after_totals[metric]) for metric in METRICS},
+        "customers": [
+            {
+                "customer_id": snapshot.customer_ids[c],
+                **{
+                    metric: _delta(float(before_customers[metric][c]), float(after_customers[metric][c]))
+                    for metric in METRICS
+                },
+            }
+            for c in top_positions
+        ],
+        **contract_deltas(before, after, contract_changed, page or ContractPage(limit=0)),
+    }
+
+
+def price_increase_scenario(
+    snapshot: PortfolioSnapshot,
+    proposals: Sequence,
+    evaluation_date: datetime,
+    top_customers: int,
+    page: Optional[ContractPage] = None
+) -> dict:
+    """
+    Bestand mit und ohne die vorgeschlagenen Preiserhöhungen zum Stichtag.
+    Bestandsschutz, Ausschlüsse und Vorziehungen gelten wie für echte
+    Preiserhöhungen (neue Erhöhungen sind bei keinem Vertrag ausgeschlossen).
+    """
+    terms = proposed_price_increase_terms(proposals)
+    before = snapshot.evaluate(evaluation_date)
+    after = snapshot.evaluate(evaluation_date, extra_price_increases=terms)
+
+    result = compare_results(before, after, top_customers, page)
+    result["evaluation_date"] = evaluation_date
+    result["eligible_contracts"] = [
+        int((snapshot.eligibility(t) & ~(snapshot.has_end & (snapshot.end <= np.datetime64(t.valid_from, "us")))).sum())
+        for t in terms
+    ]
+    return result
+
+
+class _ProposedCommissionRate:
+    """Minimales Objekt mit den Feldern, die get_commission_rates_for_date erwartet"""
+
+    def __init__(self, valid_from: datetime, rates: Dict[str, float]):
+        self.id = f"scenario-{uuid.uuid4()}"
+        self.valid_from = naive_utc(valid_from)
+        self.rates = rates
+
+
+def commission_rate_scenario(
+    snapshot: PortfolioSnapshot,
+    proposal,
+    evaluation_date: datetime,
+    top_customers: int,
+    page: Optional[ContractPage] = None
+) -> dict:
+    """
+    Bestand mit den aktuellen und mit den vorgeschlagenen Provisionssätzen.
+    Angepasste Beträge und Exit-Restmonate kommen aus dem Snapshot-Cache,
+    neu gerechnet wird nur die Multiplikation mit den Sätzen.
+    """
+    commission_rates = [
+        rate for rate in snapshot.commission_rates
+        if not proposal.replaces_id or rate.id != proposal.replaces_id
+    ]
+    commission_rates.append(_ProposedCommissionRate(proposal.valid_from, proposal.rates))
+
+    before = snapshot.evaluate(evaluation_date)
+    after = snapshot.evaluate(evaluation_date, commission_rates=commission_rates)
+
+    result = compare_results(before, after, top_customers, page)
+    result["evaluation_date"] = evaluation_date
+    return result
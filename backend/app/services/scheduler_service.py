@@ -40,12 +40,17 @@ def scheduled_backup_job():
     The actual backup job that runs on schedule.
     This is called by APScheduler at the configured times.
     """
-    from app.database import SessionLocal
-    from app.models.backup import BackupConfig, BackupHistory
-    from app.models.customer import Customer
-    from app.models.contract import Contract
+    from app.database import engine_registry, use_database
+    
+    # Geplante Backups sichern immer die primäre Datenbank (DATABASE_URL)
+    with use_database(engine_registry.primary_id):
+        _run_scheduled_backup()
+
+
+def _run_scheduled_backup():
+    from app.database import SessionLocal, engine_registry
     from app.services import backup_service
-    from app.config import settings
+    from app.services.backup_jobs import BackupJobConflict, backup_options, dump_with_counts, record_backup, reserved
     
     logger.info("=" * 50)
     logger.info("🕐 Scheduled backup job starting...")
@@ -54,64 +59,30 @@ def scheduled_backup_job():
     
     db = SessionLocal()
     try:
-        # Get database name from config
-        url = settings.DATABASE_URL
-        db_name = url.rsplit("/", 1)[-1]
+        db_name = engine_registry.get().db_name
         
         # Check if database exists
         if not backup_service.database_exists(db_name):
             logger.error(f"❌ Database '{db_name}' does not exist!")
             return
         
-        # Count records before backup
-        customer_count = db.query(Customer).count()
-        contract_count = db.query(Contract).count()
-        
         logger.info(f"   Database: {db_name}")
-        logger.info(f"   Customers: {customer_count}, Contracts: {contract_count}")
         
-        # Create backup
-        success, result, filepath = backup_service.create_backup(db_name)
-        
-        # Get or create config to update last backup status
-        config = db.query(BackupConfig).filter(BackupConfig.id == "default").first()
-        if not config:
-            config = BackupConfig(id="default")
-            db.add(config)
+        # Create backup (Zählung im selben Snapshot wie der Dump); nicht parallel
+        # zu einem laufenden Backup-/Restore-Job derselben Datenbank
+        with reserved(db_name, "geplantes Backup"):
+            success, result, filepath, counts = dump_with_counts(db_name, backup_options(db), trigger="scheduled")
+        customer_count, contract_count = counts["customers"], counts["contracts"]
+        logger.info(f"   Customers: {customer_count}, Contracts: {contract_count}")
+        record_backup(db, db_name, success, result, filepath, customer_count, contract_count)
         
         if success:
-            config.last_backup_at = datetime.now()
-            config.last_backup_status = "success"
-            
-            # Save to history
-            import os
-            from app.main import BACKEND_VERSION
-            
-            file_size = os.path.getsize(filepath) if filepath and os.path.exists(filepath) else 0
-            
-            history_entry = BackupHistory(
-                filename=result,
-                database_name=db_name,
-                file_size=file_size,
-                customer_count=customer_count,
-                contract_count=contract_count,
-                app_version=BACKEND_VERSION,
-                status="success"
-            )
-            db.add(history_entry)
-            
-            # Cleanup old backups
-            max_backups = config.max_backups or 7
-            backup_service.cleanup_old_backups(max_backups, db_name)
-            
             logger.info(f"✅ Scheduled backup completed: {result}")
         else:
-            config.last_backup_at = datetime.now()
-            config.last_backup_status = "failed"
             logger.error(f"❌ Scheduled backup failed: {result}")
         
-        db.commit()
-        
+    except BackupJobConflict as e:
+        logger.warning(f"⏭️ Scheduled backup skipped: {e}")
     except Exception as e:
         logger.error(f"❌ Scheduled backup exception: {str(e)}")
         db.rollback()
@@ -119,6 +90,65 @@ def scheduled_backup_job():
         db.close()
 
 
+def version_check_job():
+    """
+    Aktualisiert den Cache des Versions-Checks im Hintergrund.
+    Der eigentliche Refresh läuft auf dem App-Event-Loop (Single-Flight).
+    """
+    from app.services.version_service import version_cache
+    
+    try:
+        version_cache.refresh_threadsafe()
+    except Exception as e:
+        logger.warning(f"⚠️ Version check refresh failed: {str(e)}")
+
+
+def schedule_version_check(interval_minutes: int):
+    """Registriert den periodischen Versions-Check"""
+    scheduler = get_scheduler()
+    scheduler.add_job(
+        version_check_job,
+        trigger="interval",
+        minutes=max(1, interval_minutes),
+        id="version_check",
+        name="Docker Image Version Check",
+        replace_existing=True
+    )
+    logger.info(f"✅ Version check scheduled every {interval_minutes} minutes")
+
+
+def ledger_close_job():
+    """Monatsabschluss im Provisions-Ledger (nur wenn Monate offen sind)"""
+    from app.database import SessionLocal, engine_registry, use_database
+    from app.services.commission_ledger import has_pending_periods, submit_ledger_job
+    
+    # Primäre und aktive Datenbank (bei PROD/DEMO-Betrieb)
+    for database_id in dict.fromkeys([engine_registry.primary_id, engine_registry.active_database_id()]):
+        with use_database(database_id):
+            db = SessionLocal()
+            try:
+                if has_pending_periods(db):
+                    submit_ledger_job()
+            except Exception as e:
+                logger.error(f"❌ Commission ledger close failed for {database_id}: {str(e)}")
+            finally:
+                db.close()
+
+
+def schedule_ledger_close():
+    """Registriert den Monatsabschluss (am Monatsersten) und holt verpasste Abschlüsse nach"""
+    scheduler = get_scheduler()
+    scheduler.add_job(
+        ledger_close_job,
+        trigger=CronTrigger(day=1, hour=0, minute=30),
+        id="commission_ledger_close",
+        name="Commission Ledger Monthly Close",
+        replace_existing=True
+    )
+    scheduler.add_job(ledger_close_job, id="commission_ledger_catch_up", replace_existing=True)
+    logger.info("✅ Commission ledger close scheduled monthly")
+
+
 def update_backup_schedule(schedule_days: list, schedule_time: str, is_enabled: bool):
     """
     Update the backup schedule based on configuration.
@@ -198,12 +228,13 @@ def initialize_scheduler_from_db():
     Initialize the scheduler with configuration from the database.
     Called on application startup.
     """
-    from app.database import SessionLocal
+    from app.database import engine_registry
     from app.models.backup import BackupConfig
     
     logger.info("🔧 Initializing backup scheduler from database...")
     
-    db = SessionLocal()
+    # Backup-Konfiguration der primären Datenbank
+    db = engine_registry.get(engine_registry.primary_id).session_factory()
     try:
         config = db.query(BackupConfig).filter(BackupConfig.id == "default").first()
         
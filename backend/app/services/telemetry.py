@@ -0,0 +1,165 @@
+"""
+Telemetry Service
+Prometheus-kompatible Metriken für /metrics
+"""
+import logging
+from typing import Optional
+
+from prometheus_client import Counter, Histogram, CONTENT_TYPE_LATEST, generate_latest, REGISTRY
+from prometheus_client.core import GaugeMetricFamily, CounterMetricFamily
+
+from app.utils.timing import add_request_observer
+
+logger = logging.getLogger(__name__)
+
+# Auswertungen der Berechnungs-Engine, die pro Request gezählt werden
+CALC_EVALUATION_COUNTERS = [
+    "get_current_monthly_commission",
+    "get_current_monthly_price",
+    "calculate_earnings_to_date",
+    "calculate_exit_payout",
+]
+
+REQUEST_LATENCY = Histogram(
+    "contracts_http_request_duration_seconds",
+    "HTTP request latency per route",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+
+REQUEST_SPAN_SECONDS = Counter(
+    "contracts_http_request_span_seconds_total",
+    "Time spent per span (db, orm, calc, serialize) per route",
+    ["route", "span"]
+)
+
+CALC_EVALUATIONS = Counter(
+    "contracts_calc_evaluations_total",
+    "Calculation engine evaluations",
+    ["function", "route"]
+)
+
+CALC_EVALUATIONS_PER_REQUEST = Histogram(
+    "contracts_calc_commission_evaluations_per_request",
+    "get_current_monthly_commission evaluations triggered by a single request",
+    ["route"],
+    buckets=(0, 10, 100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+)
+
+DB_QUERIES_PER_REQUEST = Histogram(
+    "contracts_db_queries_per_request",
+    "SQL statements executed by a single request",
+    ["route"],
+    buckets=(0, 1, 2, 5, 10, 25, 50, 100, 250, 1_000, 5_000)
+)
+
+CACHE_REQUESTS = Counter(
+    "contracts_cache_requests_total",
+    "Cache lookups by cache and result (hit/miss)",
+    ["cache", "result"]
+)
+
+BACKUP_DURATION = Histogram(
+    "contracts_backup_duration_seconds",
+    "Duration of backup jobs",
+    ["trigger", "status"],
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600)
+)
+
+BACKUP_SIZE = Histogram(
+    "contracts_backup_size_bytes",
+    "Size of successfully created backups",
+    ["trigger"],
+    buckets=(1e5, 1e6, 1e7, 5e7, 1e8, 5e8, 1e9, 5e9)
+)
+
+
+def record_cache_access(cache: str, hit: bool):
+    """Zählt einen Cache-Zugriff (Hit-Ratio = hit / (hit + miss))"""
+    CACHE_REQUESTS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+def observe_backup(trigger: str, success: bool, duration_seconds: float, size_bytes: Optional[int] = None):
+    """Erfasst Dauer und Größe eines Backup-Jobs"""
+    BACKUP_DURATION.labels(trigger=trigger, status="success" if success else "failed").observe(duration_seconds)
+    if success and size_bytes:
+        BACKUP_SIZE.labels(trigger=trigger).observe(size_bytes)
+
+
+def _route_label(request) -> str:
+    """Route-Template statt konkreter Pfad, damit die Label-Anzahl begrenzt bleibt"""
+    route = request.scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+def _observe_request(request, response, total_seconds, timings):
+    route = _route_label(request)
+    REQUEST_LATENCY.labels(
+        method=request.method, route=route, status=str(response.status_code)
+    ).observe(total_seconds)
+
+    DB_QUERIES_PER_REQUEST.labels(route=route).observe(timings.queries.count)
+
+    for span_name, seconds in timings.snapshot().items():
+        REQUEST_SPAN_SECONDS.labels(route=route, span=span_name).inc(seconds)
+
+    counters = dict(timings.counters)
+    for function in CALC_EVALUATION_COUNTERS:
+        if counters.get(function):
+            CALC_EVALUATIONS.labels(function=function, route=route).inc(counters[function])
+    if counters.get("get_current_monthly_commission"):
+        CALC_EVALUATIONS_PER_REQUEST.labels(route=route).observe(counters["get_current_monthly_commission"])
+
+
+class RuntimeCollector:
+    """Liest DB-Pool-Status und Event-Loop-Lag beim Scrape aus"""
+
+    def collect(self):
+        from app.database import engine, async_engine, get_pool_status
+        from app.services.loop_monitor import loop_monitor
+
+        checked_out = GaugeMetricFamily("contracts_db_pool_checked_out", "Connections in use", labels=["engine"])
+        checked_in = GaugeMetricFamily("contracts_db_pool_checked_in", "Idle connections in the pool", labels=["engine"])
+        overflow = GaugeMetricFamily("contracts_db_pool_overflow", "Connections above pool_size", labels=["engine"])
+        size = GaugeMetricFamily("contracts_db_pool_size", "Configured pool size", labels=["engine"])
+        wait = CounterMetricFamily("contracts_db_pool_checkout_wait_seconds", "Total time spent waiting for a connection", labels=["engine"])
+        checkouts = CounterMetricFamily("contracts_db_pool_checkouts", "Connection checkouts", labels=["engine"])
+        timeouts = CounterMetricFamily("contracts_db_pool_checkout_timeouts", "Checkouts that hit pool_timeout", labels=["engine"])
+
+        for name, eng in (("sync", engine), ("async", async_engine)):
+            status = get_pool_status(eng)
+            if "checked_out" not in status:
+                continue
+            checked_out.add_metric([name], status["checked_out"])
+            checked_in.add_metric([name], status["checked_in"])
+            overflow.add_metric([name], status["overflow"])
+            size.add_metric([name], status["pool_size"])
+            if status.get("wait"):
+                wait.add_metric([name], status["wait"]["total_wait_seconds"])
+                checkouts.add_metric([name], status["wait"]["checkouts"])
+                timeouts.add_metric([name], status["wait"]["timeouts"])
+
+        yield from (checked_out, checked_in, overflow, size, wait, checkouts, timeouts)
+
+        lag = loop_monitor.snapshot()
+        yield GaugeMetricFamily("contracts_event_loop_lag_max_seconds", "Max event-loop lag since start", value=lag["max_lag_ms"] / 1000)
+        yield GaugeMetricFamily("contracts_event_loop_lag_last_seconds", "Last measured event-loop lag", value=lag["last_lag_ms"] / 1000)
+        yield CounterMetricFamily("contracts_event_loop_slow_ticks", "Event-loop ticks above the warn threshold", value=lag["slow_ticks"])
+
+
+_installed = False
+
+
+def install_telemetry():
+    """Registriert Request-Observer und Runtime-Collector (einmalig)"""
+    global _installed
+    if _installed:
+        return
+    add_request_observer(_observe_request)
+    REGISTRY.register(RuntimeCollector())
+    _installed = True
+
+
+def render_metrics() -> tuple:
+    """Prometheus Text-Format; Prozess-Metriken (RSS etc.) liefert der Default-Collector"""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,196 @@
+"""
+Version Service
+Prüft per Docker Hub und docker inspect, ob neuere Images verfügbar sind.
+Das Ergebnis wird mit TTL zwischengespeichert und im Hintergrund aktualisiert.
+"""
+import asyncio
+import logging
+import time
+from concurrent.futures import Future
+from typing import Optional
+
+import httpx
+
+from app.config import settings
+from app.services.telemetry import record_cache_access
+
+logger = logging.getLogger(__name__)
+
+# Images, die auf Updates geprüft werden
+IMAGES = [
+    "bimberle/contracts-backend",
+    "bimberle/contracts-frontend"
+]
+
+
+def get_current_version() -> str:
+    """Get the current backend version from main module."""
+    try:
+        from app.main import BACKEND_VERSION
+        return BACKEND_VERSION
+    except ImportError:
+        return "unknown"
+
+
+async def get_docker_hub_digest(image: str, tag: str = "latest") -> Optional[str]:
+    """
+    Get the digest of an image from Docker Hub.
+    Returns None if unable to fetch.
+    """
+    try:
+        # Docker Hub API v2 - get manifest
+        url = f"{settings.DOCKER_HUB_API_URL}/repositories/{image}/tags/{tag}"
+        async with httpx.AsyncClient(timeout=10.0) as client:
+            response = await client.get(url)
+            if response.status_code == 200:
+                data = response.json()
+                return data.get("digest") or data.get("images", [{}])[0].get("digest")
+    except Exception as e:
+        logger.warning(f"Error fetching Docker Hub digest: {e}")
+    return None
+
+
+async def get_local_image_digest(image: str) -> Optional[str]:
+    """
+    Get the digest of a locally running image.
+    Returns None if unable to fetch.
+    """
+    process = None
+    try:
+        # Use docker inspect to get the image digest (async subprocess, does not block the event loop)
+        process = await asyncio.create_subprocess_exec(
+            settings.DOCKER_CLI, "inspect", "--format", "{{index .RepoDigests 0}}", image,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        stdout, _ = await asyncio.wait_for(process.communicate(), timeout=10)
+        if process.returncode == 0:
+            # Format: image@sha256:...
+            digest_str = stdout.decode().strip()
+            if "@" in digest_str:
+                return digest_str.split("@")[1]
+    except asyncio.TimeoutError:
+        logger.warning(f"Timeout getting local image digest for {image}")
+        if process and process.returncode is None:
+            process.kill()
+            await process.wait()
+    except Exception as e:
+        logger.warning(f"Error getting local image digest: {e}")
+    return None
+
+
+async def fetch_version_info() -> dict:
+    """
+    Compares the digest of the running images with Docker Hub.
+    This is the expensive part (HTTP + subprocess) and only runs on refresh.
+    """
+    try:
+        updates_available = False
+        details = []
+        
+        # Query Docker Hub and docker inspect for all images concurrently
+        hub_digests = await asyncio.gather(*(get_docker_hub_digest(image) for image in IMAGES))
+        local_digests = await asyncio.gather(*(get_local_image_digest(f"{image}:latest") for image in IMAGES))
+        
+        for image, hub_digest, local_digest in zip(IMAGES, hub_digests, local_digests):
+            image_update_available = False
+            if hub_digest and local_digest:
+                image_update_available = hub_digest != local_digest
+                if image_update_available:
+                    updates_available = True
+            
+            details.append({
+                "image": image,
+                "local_digest": local_digest[:20] + "..." if local_digest else None,
+                "hub_digest": hub_digest[:20] + "..." if hub_digest else None,
+                "update_available": image_update_available
+            })
+        
+        return {
+            "current_version": get_current_version(),
+            "update_available": updates_available,
+            "details": details
+        }
+    except Exception as e:
+        return {
+            "current_version": get_current_version(),
+            "update_available": False,
+            "error": str(e)
+        }
+
+
+class VersionCheckCache:
+    """
+    Hält das letzte Ergebnis des Versions-Checks mit TTL.
+    
+    - Frisches Ergebnis: wird sofort ausgeliefert.
+    - Abgelaufenes Ergebnis: wird sofort ausgeliefert, ein Refresh startet im Hintergrund.
+    - Kein Ergebnis: der Aufrufer wartet auf den (einzigen) laufenden Refresh.
+    
+    Gleichzeitige Refreshes werden zu einem Single-Flight-Aufruf zusammengefasst.
+    """
+
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self._result: Optional[dict] = None
+        self._checked_at: Optional[float] = None
+        self._inflight: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.hits = 0
+        self.misses = 0
+
+    def bind_loop(self, loop: asyncio.AbstractEventLoop):
+        """Merkt sich den App-Event-Loop für Refreshes aus Scheduler-Threads"""
+        self._loop = loop
+
+    def is_fresh(self) -> bool:
+        return (
+            self._result is not None
+            and self._checked_at is not None
+            and time.time() - self._checked_at < self.ttl_seconds
+        )
+
+    async def _do_refresh(self) -> dict:
+        result = await fetch_version_info()
+        self._result = result
+        self._checked_at = time.time()
+        return result
+
+    def _start_refresh(self) -> asyncio.Task:
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.get_running_loop().create_task(self._do_refresh())
+        return self._inflight
+
+    async def refresh(self) -> dict:
+        """Aktualisiert den Cache; parallele Aufrufer teilen sich einen Refresh"""
+        return await asyncio.shield(self._start_refresh())
+
+    def refresh_threadsafe(self, timeout: float = 60) -> Optional[dict]:
+        """Refresh aus einem fremden Thread (z.B. APScheduler) auf dem App-Loop"""
+        if self._loop is None or self._loop.is_closed():
+            logger.debug("Version check refresh skipped: no event loop bound")
+            return None
+        future: Future = asyncio.run_coroutine_threadsafe(self.refresh(), self._loop)
+        return future.result(timeout=timeout)
+
+    async def get(self, force: bool = False) -> dict:
+        """Liefert das Ergebnis aus dem Cache (siehe Klassenbeschreibung)"""
+        if force or self._result is None:
+            self.misses += 1
+            record_cache_access("version_check", hit=False)
+            result = await self.refresh()
+        else:
+            self.hits += 1
+            record_cache_access("version_check", hit=True)
+            result = self._result
+            if not self.is_fresh():
+                self._start_refresh()
+        
+        return {
+            **result,
+            "checked_at": self._checked_at,
+            "cache_age_seconds": round(time.time() - self._checked_at, 1) if self._checked_at else None
+        }
+
+
+version_cache = VersionCheckCache(ttl_seconds=settings.VERSION_CHECK_TTL_SECONDS)
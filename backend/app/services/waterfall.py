@@ -0,0 +1,95 @@
+"""
+Provisions-Wasserfall
+Zerlegt die Veränderung der monatlichen Provision von Monat zu Monat in:
+
+- new_contracts:       Verträge, die neu beginnen
+- founder_activations: Existenzgründer-Phase endet, Provision startet
+- price_increases:     wirksam gewordene Preiserhöhungen (zu alten Sätzen)
+- rate_changes:        geänderte Provisionssätze (auf die neuen Beträge)
+- ended_contracts:     Vertragsende erreicht
+- run_off:             Verträge, die nach aktuellem Vertragsstatus
+                       (Contract.status, heutige Uhrzeit) nicht zählen, also
+                       heute schon beendet bzw. noch nicht begonnen sind.
+                       Ihre Zu- und Abgänge laut Vertragsdaten werden hier
+                       wieder ausgebucht.
+
+Gerechnet wird in einem Durchlauf über die Monate auf dem PortfolioSnapshot,
+jeweils nur mit dem Zustand des Vormonats. Anfangs- und Endwert jedes Monats
+entsprechen total_commission aus generate_forecast.
+"""
+from datetime import datetime
+from typing import List
+
+import numpy as np
+
+from app.services.portfolio_engine import PortfolioSnapshot, sequential_sum
+from app.utils.date_utils import add_months
+
+COMPONENTS = (
+    "new_contracts", "founder_activations", "price_increases",
+    "rate_changes", "ended_contracts", "run_off",
+)
+
+
+def commission_waterfall(snapshot: PortfolioSnapshot, start_date: datetime, months: int) -> dict:
+    """Eröffnungswert zum start_date und pro Folgemonat die Zerlegung der Veränderung"""
+    dates = [add_months(start_date, m) for m in range(months + 1)]
+    wall_active, _ = snapshot.wall_clock_status()
+
+    previous = None
+    opening = 0.0
+    result: List[dict] = []
+    for date, adjusted in snapshot.iter_adjusted_amounts(dates):
+        rates = snapshot.rates_for_date(date) / 100
+        active = snapshot.effective_active(date)
+        commission = np.where(active, sequential_sum(adjusted * rates), 0.0)
+
+        if previous is None:
+            opening = float(commission[wall_active].sum())
+            previous = (date, adjusted, rates, active, commission)
+            continue
+        _, prev_adjusted, prev_rates, prev_active, prev_commission = previous
+
+        started = ~prev_active & active
+        ended = prev_active & ~active
+        running = prev_active & active
+        founder = started & snapshot.is_founder
+        new = started & ~snapshot.is_founder
+
+        # Preiserhöhung zu alten Sätzen, danach Satzänderung auf die neuen Beträge
+        at_old_rates = sequential_sum(adjusted * prev_rates)
+        price_effect = np.where(running, at_old_rates - sequential_sum(prev_adjusted * prev_rates), 0.0)
+        rate_effect = np.where(running, commission - at_old_rates, 0.0)
+        delta = commission - prev_commission
+
+        components = {
+            "new_contracts": float(commission[new].sum()),
+            "founder_activations": float(commission[founder].sum()),
+            "price_increases": float(price_effect.sum()),
+            "rate_changes": float(rate_effect.sum()),
+            "ended_contracts": float(-prev_commission[ended].sum()),
+            "run_off": float(-delta[~wall_active].sum()),
+        }
+        closing = float(commission[wall_active].sum())
+        result.append({
+            "date": date.strftime("%Y-%m"),
+            "opening_commission": round(opening, 2),
+            **{name: round(value, 2) for name, value in components.items()},
+            "closing_commission": round(closing, 2),
+            "counts": {
+                "new_contracts": int(new.sum()),
+                "founder_activations": int(founder.sum()),
+                "price_increases": int((running & (np.abs(price_effect) >= 0.005)).sum()),
+                "rate_changes": int((running & (np.abs(rate_effect) >= 0.005)).sum()),
+                "ended_contracts": int(ended.sum()),
+                "run_off": int((~wall_active & (started | ended)).sum()),
+            },
+        })
+        opening = closing
+        previous = (date, adjusted, rates, active, commission)
+
+    return {
+        "start_date": dates[0].strftime("%Y-%m"),
+        "opening_commission": result[0]["opening_commission"] if result else round(opening, 2),
+        "months": result,
+    }
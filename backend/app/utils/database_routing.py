@@ -0,0 +1,67 @@
+"""
+Datenbank-Routing pro Anfrage
+Die Datenbank wird per Header X-Database-Id oder Cookie database_id
+gewählt (Cookie = Sitzung, gesetzt über POST /api/databases/switch mit
+scope "session"); ohne Angabe gilt die aktive Datenbank aus databases.json.
+"""
+import json
+from http.cookies import SimpleCookie
+from typing import Optional
+
+from app.database import current_database_id, engine_registry, UnknownDatabaseError
+
+DATABASE_HEADER = "x-database-id"
+DATABASE_COOKIE = "database_id"
+
+
+def _requested_database(scope) -> Optional[str]:
+    headers = dict(scope.get("headers") or [])
+    header = headers.get(DATABASE_HEADER.encode())
+    if header:
+        return header.decode().strip() or None
+    cookie_header = headers.get(b"cookie")
+    if cookie_header:
+        cookie = SimpleCookie()
+        try:
+            cookie.load(cookie_header.decode())
+        except Exception:
+            return None
+        if DATABASE_COOKIE in cookie:
+            return cookie[DATABASE_COOKIE].value or None
+    return None
+
+
+class DatabaseRoutingMiddleware:
+    """
+    Reine ASGI-Middleware (äußerste Schicht): setzt current_database_id für
+    die ganze Anfrage, damit SessionLocal/AsyncSessionLocal, Dependencies,
+    Threadpool-Endpunkte und gestartete Jobs dieselbe Datenbank verwenden.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        database_id = _requested_database(scope)
+        if database_id is not None:
+            try:
+                engine_registry.resolve(database_id)
+            except UnknownDatabaseError as e:
+                body = json.dumps({"detail": str(e)}).encode()
+                await send({
+                    "type": "http.response.start",
+                    "status": 400,
+                    "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+                })
+                await send({"type": "http.response.body", "body": body})
+                return
+
+        token = current_database_id.set(database_id)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_database_id.reset(token)
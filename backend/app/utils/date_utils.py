@@ -1,3 +1,4 @@
+import calendar
 from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
 
@@ -5,6 +6,21 @@ def add_months(date: datetime, months: int) -> datetime:
     """Fügt Monate zu einem Datum hinzu"""
     return date + relativedelta(months=months)
 
+def add_months_stepwise(date: datetime, months: int) -> datetime:
+    """
+    Wie months-mal add_months(date, 1) hintereinander: ein in einem kurzen
+    Monat gekürzter Tag bleibt gekürzt (31.01. -> 28.02. -> 28.03.)
+    """
+    day = date.day
+    year, month = date.year, date.month
+    for step in range(months):
+        if day <= 28:
+            # Ab hier wird nicht mehr gekürzt
+            return add_months(date.replace(year=year, month=month, day=day), months - step)
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        day = min(day, calendar.monthrange(year, month)[1])
+    return date.replace(year=year, month=month, day=day)
+
 def months_between(start_date: datetime, end_date: datetime) -> int:
     """Berechnet die Anzahl der Monate zwischen zwei Daten"""
     if start_date > end_date:
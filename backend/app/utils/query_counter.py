@@ -0,0 +1,108 @@
+"""
+Query-Counter
+Zählt SQL-Statements pro Request und erkennt N+1-Muster über
+normalisierte Statement-Fingerprints (Literale und Bind-Parameter durch ?
+ersetzt).
+
+Für Tests:
+
+    from app.utils.query_counter import assert_max_queries
+
+    def test_dashboard_queries(client):
+        with assert_max_queries(10):
+            client.get("/api/analytics/dashboard")
+"""
+import re
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import List, Optional, Tuple
+
+# Bind-Parameter (psycopg2 / asyncpg), String- und Zahl-Literale
+_PARAM_RE = re.compile(r"%\(\w+\)s|%s|\$\d+|'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    """Normalisiert ein Statement, sodass gleiche Queries mit anderen Werten gleich aussehen"""
+    normalized = _PARAM_RE.sub("?", statement)
+    normalized = _IN_LIST_RE.sub("(...)", normalized)
+    return _WHITESPACE_RE.sub(" ", normalized).strip()
+
+
+class QueryStats:
+    """Anzahl, DB-Zeit und Fingerprints der Statements eines Requests (thread-safe)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total_seconds = 0.0
+        self.fingerprints: Counter = Counter()
+
+    def record(self, statement: str, seconds: float):
+        key = fingerprint(statement)
+        with self._lock:
+            self.count += 1
+            self.total_seconds += seconds
+            self.fingerprints[key] += 1
+
+    def repeated(self, min_count: int = 2) -> List[Tuple[str, int]]:
+        """Fingerprints, die mindestens min_count mal ausgeführt wurden (häufigste zuerst)"""
+        with self._lock:
+            return [(fp, n) for fp, n in self.fingerprints.most_common() if n >= min_count]
+
+    def snapshot(self, min_count: int = 2) -> dict:
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_seconds * 1000, 1),
+            "repeated": [
+                {"statement": fp[:300], "count": n} for fp, n in self.repeated(min_count)
+            ],
+        }
+
+
+# Aktive Tracker aus track_queries(); gelten prozessweit, damit auch
+# Statements aus dem Threadpool / TestClient-Thread mitgezählt werden
+_trackers: List[QueryStats] = []
+_trackers_lock = threading.Lock()
+
+
+def record_tracked(statement: str, seconds: float):
+    """Meldet ein Statement an alle aktiven Tracker"""
+    if not _trackers:
+        return
+    with _trackers_lock:
+        trackers = list(_trackers)
+    for stats in trackers:
+        stats.record(statement, seconds)
+
+
+@contextmanager
+def track_queries():
+    """Zählt alle Statements, die innerhalb des Blocks ausgeführt werden"""
+    stats = QueryStats()
+    with _trackers_lock:
+        _trackers.append(stats)
+    try:
+        yield stats
+    finally:
+        with _trackers_lock:
+            _trackers.remove(stats)
+
+
+@contextmanager
+def assert_max_queries(max_queries: int, label: Optional[str] = None):
+    """
+    Schlägt fehl (AssertionError), wenn im Block mehr als max_queries
+    Statements ausgeführt wurden. Die Meldung listet wiederholte Fingerprints,
+    damit N+1-Regressionen direkt erkennbar sind.
+    """
+    with track_queries() as stats:
+        yield stats
+
+    if stats.count > max_queries:
+        lines = [f"{label or 'Block'} executed {stats.count} queries (max {max_queries})"]
+        for fp, n in stats.repeated()[:5]:
+            lines.append(f"  {n}x {fp[:200]}")
+        raise AssertionError("\n".join(lines))
@@ -0,0 +1,238 @@
+"""
+Request-Timing
+Leichtgewichtige Span-API pro Request mit Ausgabe als Server-Timing-Header
+und strukturierter Log-Zeile.
+
+Spans:
+    db        Zeit in der Datenbank (SQLAlchemy cursor events, automatisch)
+    orm       ORM-Hydration (Laden abzüglich der DB-Zeit darin)
+    calc      Berechnungs-Engine (Metriken, Forecast)
+    serialize Aufbau und Encoding der Antwort
+"""
+import functools
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional
+
+from fastapi.responses import JSONResponse
+from sqlalchemy import event
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.utils.query_counter import QueryStats, record_tracked
+
+logger = logging.getLogger(__name__)
+
+# Reihenfolge der Spans im Server-Timing-Header
+SPAN_ORDER = ["db", "orm", "calc", "serialize"]
+
+
+class RequestTimings:
+    """Sammelt die Span-Dauern eines Requests (thread-safe)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.durations: Dict[str, float] = defaultdict(float)
+        self.counts: Dict[str, int] = defaultdict(int)
+        self.counters: Dict[str, int] = defaultdict(int)
+        self.queries = QueryStats()
+        self.started = time.perf_counter()
+
+    def add(self, name: str, seconds: float):
+        with self._lock:
+            self.durations[name] += seconds
+            self.counts[name] += 1
+
+    def increment(self, name: str, amount: int = 1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def get(self, name: str) -> float:
+        with self._lock:
+            return self.durations.get(name, 0.0)
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self.durations)
+
+
+_current_timings: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def get_current_timings() -> Optional[RequestTimings]:
+    """Gibt die Timings des aktuellen Requests zurück (None außerhalb eines Requests)"""
+    return _current_timings.get()
+
+
+@contextmanager
+def span(name: str, exclude_db: bool = False):
+    """
+    Misst einen Abschnitt und addiert ihn zum Span `name` des aktuellen Requests.
+    Mit exclude_db=True wird die DB-Zeit innerhalb des Abschnitts abgezogen
+    (z.B. für ORM-Hydration). Außerhalb eines Requests ein No-Op.
+    """
+    timings = _current_timings.get()
+    if timings is None:
+        yield
+        return
+
+    db_before = timings.get("db") if exclude_db else 0.0
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        if exclude_db:
+            elapsed = max(0.0, elapsed - (timings.get("db") - db_before))
+        timings.add(name, elapsed)
+
+
+def count(name: str, amount: int = 1):
+    """
+    Zählt ein Ereignis im aktuellen Request (z.B. Auswertungen der
+    Berechnungs-Engine). Außerhalb eines Requests ein No-Op.
+    """
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.increment(name, amount)
+
+
+def timed(name: str) -> Callable:
+    """Decorator-Variante von span()"""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current_timings.get() is None:
+                return func(*args, **kwargs)
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def install_db_timing(sync_engine):
+    """
+    Registriert Cursor-Events auf einer (sync) Engine, die die DB-Zeit und
+    die Statements (Query-Counter) dem aktuellen Request zuordnen.
+    Für AsyncEngines die .sync_engine übergeben.
+    """
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_timing_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("_timing_query_start")
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        timings = _current_timings.get()
+        if timings is not None:
+            timings.add("db", elapsed)
+            timings.queries.record(statement, elapsed)
+        record_tracked(statement, elapsed)
+
+
+class TimedJSONResponse(JSONResponse):
+    """JSONResponse, deren Encoding als Span "serialize" gemessen wird"""
+
+    def render(self, content) -> bytes:
+        with span("serialize"):
+            return super().render(content)
+
+
+# Callbacks (request, response, total_seconds, timings) nach jedem Request
+_request_observers: List[Callable] = []
+
+
+def add_request_observer(observer: Callable):
+    """Registriert einen Callback, der nach jedem Request aufgerufen wird"""
+    _request_observers.append(observer)
+
+
+def format_server_timing(timings: Dict[str, float], total: float) -> str:
+    """Formatiert die Spans als Server-Timing-Header (Dauer in ms)"""
+    parts = []
+    for name in SPAN_ORDER + sorted(k for k in timings if k not in SPAN_ORDER):
+        if name in timings:
+            parts.append(f"{name};dur={timings[name] * 1000:.1f}")
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+class ServerTimingMiddleware(BaseHTTPMiddleware):
+    """
+    Legt pro Request ein RequestTimings-Objekt im Kontext an, setzt den
+    Server-Timing-Header und schreibt eine strukturierte Log-Zeile.
+
+    Mit debug_headers=True kommen X-DB-Query-Count, X-DB-Time-Ms und
+    X-DB-Repeated-Queries dazu. Statements, deren Fingerprint mindestens
+    n_plus_one_threshold mal vorkommt, werden als mögliches N+1 geloggt.
+
+    Sync Endpoints (Threadpool) und der Calculation-Executor übernehmen den
+    Kontext per Kopie und schreiben daher in dasselbe Objekt.
+    """
+
+    def __init__(
+        self,
+        app,
+        log_threshold_ms: int = 0,
+        debug_headers: bool = False,
+        n_plus_one_threshold: int = 10
+    ):
+        super().__init__(app)
+        self.log_threshold_ms = log_threshold_ms
+        self.debug_headers = debug_headers
+        self.n_plus_one_threshold = n_plus_one_threshold
+
+    async def dispatch(self, request, call_next):
+        timings = RequestTimings()
+        token = _current_timings.set(timings)
+        try:
+            response = await call_next(request)
+        finally:
+            _current_timings.reset(token)
+
+        total = time.perf_counter() - timings.started
+        durations = timings.snapshot()
+        response.headers["Server-Timing"] = format_server_timing(durations, total)
+
+        queries = timings.queries
+        repeated = queries.repeated(self.n_plus_one_threshold) if queries.count else []
+        if self.debug_headers:
+            response.headers["X-DB-Query-Count"] = str(queries.count)
+            response.headers["X-DB-Time-Ms"] = f"{queries.total_seconds * 1000:.1f}"
+            response.headers["X-DB-Repeated-Queries"] = str(len(repeated))
+        if repeated:
+            logger.warning(json.dumps({
+                "event": "n_plus_one_suspected",
+                "method": request.method,
+                "path": request.url.path,
+                "query_count": queries.count,
+                "repeated": [{"statement": fp[:300], "count": n} for fp, n in repeated[:5]],
+            }))
+
+        for observer in _request_observers:
+            try:
+                observer(request, response, total, timings)
+            except Exception as e:
+                logger.warning(f"Request observer failed: {e}")
+
+        total_ms = total * 1000
+        if total_ms >= self.log_threshold_ms:
+            logger.info(json.dumps({
+                "event": "request_timing",
+                "method": request.method,
+                "path": request.url.path,
+                "status": response.status_code,
+                "total_ms": round(total_ms, 1),
+                "spans_ms": {name: round(value * 1000, 1) for name, value in durations.items()},
+                "span_counts": dict(timings.counts),
+                "counters": dict(timings.counters),
+                "db_queries": queries.count,
+            }))
+        return response
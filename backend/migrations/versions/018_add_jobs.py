@@ -0,0 +1,46 @@
+"""Add jobs table for background jobs
+
+Revision ID: 018_add_jobs
+Revises: 017_add_backup_app_version
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '018_add_jobs'
+down_revision = '017_add_backup_app_version'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    
+    if 'jobs' not in inspector.get_table_names():
+        op.create_table(
+            'jobs',
+            sa.Column('id', sa.String(), primary_key=True),
+            sa.Column('job_type', sa.String(), nullable=False),
+            sa.Column('status', sa.String(), nullable=False, server_default='queued'),
+            sa.Column('params', sa.JSON(), nullable=True),
+            sa.Column('progress', sa.JSON(), nullable=True),
+            sa.Column('result', sa.JSON(), nullable=True),
+            sa.Column('error_message', sa.String(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), server_default=sa.func.now()),
+            sa.Column('started_at', sa.DateTime(), nullable=True),
+            sa.Column('finished_at', sa.DateTime(), nullable=True),
+        )
+        op.create_index('ix_jobs_job_type', 'jobs', ['job_type'])
+        op.create_index('ix_jobs_status', 'jobs', ['status'])
+
+
+def downgrade():
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    
+    if 'jobs' in inspector.get_table_names():
+        op.drop_index('ix_jobs_status', table_name='jobs')
+        op.drop_index('ix_jobs_job_type', table_name='jobs')
+        op.drop_table('jobs')
@@ -0,0 +1,71 @@
+"""Add commission ledger tables
+
+Revision ID: 019_add_commission_ledger
+Revises: 018_add_jobs
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '019_add_commission_ledger'
+down_revision = '018_add_jobs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    tables = inspector.get_table_names()
+    
+    if 'commission_ledger' not in tables:
+        op.create_table(
+            'commission_ledger',
+            sa.Column('id', sa.String(), primary_key=True),
+            sa.Column('contract_id', sa.String(), sa.ForeignKey('contracts.id', ondelete='CASCADE'), nullable=False),
+            sa.Column('customer_id', sa.String(), sa.ForeignKey('customers.id', ondelete='CASCADE'), nullable=False),
+            sa.Column('period', sa.String(), nullable=False),
+            sa.Column('accrual_date', sa.DateTime(), nullable=False),
+            sa.Column('effective_status', sa.String(), nullable=False),
+            sa.Column('software_rental_amount', sa.Float(), server_default='0'),
+            sa.Column('software_care_amount', sa.Float(), server_default='0'),
+            sa.Column('apps_amount', sa.Float(), server_default='0'),
+            sa.Column('purchase_amount', sa.Float(), server_default='0'),
+            sa.Column('cloud_amount', sa.Float(), server_default='0'),
+            sa.Column('commission_rate_id', sa.String(), nullable=True),
+            sa.Column('rates', sa.JSON(), nullable=True),
+            sa.Column('applied_price_increase_ids', sa.JSON(), nullable=True),
+            sa.Column('commission', sa.Float(), nullable=False, server_default='0'),
+            sa.Column('computed_at', sa.DateTime(), server_default=sa.func.now()),
+            sa.UniqueConstraint('contract_id', 'period', name='uq_commission_ledger_contract_period'),
+        )
+        op.create_index('ix_commission_ledger_contract_id', 'commission_ledger', ['contract_id'])
+        op.create_index('ix_commission_ledger_customer_id', 'commission_ledger', ['customer_id'])
+        op.create_index('ix_commission_ledger_period', 'commission_ledger', ['period'])
+    
+    if 'commission_ledger_months' not in tables:
+        op.create_table(
+            'commission_ledger_months',
+            sa.Column('period', sa.String(), primary_key=True),
+            sa.Column('status', sa.String(), nullable=False, server_default='closed'),
+            sa.Column('contract_count', sa.Integer(), server_default='0'),
+            sa.Column('total_commission', sa.Float(), server_default='0'),
+            sa.Column('closed_at', sa.DateTime(), server_default=sa.func.now()),
+            sa.Column('recomputed_at', sa.DateTime(), nullable=True),
+            sa.Column('invalidated_at', sa.DateTime(), nullable=True),
+        )
+
+
+def downgrade():
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    tables = inspector.get_table_names()
+    
+    if 'commission_ledger_months' in tables:
+        op.drop_table('commission_ledger_months')
+    if 'commission_ledger' in tables:
+        op.drop_index('ix_commission_ledger_period', table_name='commission_ledger')
+        op.drop_index('ix_commission_ledger_customer_id', table_name='commission_ledger')
+        op.drop_index('ix_commission_ledger_contract_id', table_name='commission_ledger')
+        op.drop_table('commission_ledger')
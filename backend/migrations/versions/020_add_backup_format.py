@@ -0,0 +1,41 @@
+"""Add dump format, parallel jobs and compression level to backup_configs
+
+Revision ID: 020_add_backup_format
+Revises: 019_add_commission_ledger
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '020_add_backup_format'
+down_revision = '019_add_commission_ledger'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    
+    if 'backup_configs' in inspector.get_table_names():
+        existing_columns = [col['name'] for col in inspector.get_columns('backup_configs')]
+        
+        if 'backup_format' not in existing_columns:
+            op.add_column('backup_configs', sa.Column('backup_format', sa.String(), nullable=True, server_default='custom'))
+        if 'parallel_jobs' not in existing_columns:
+            op.add_column('backup_configs', sa.Column('parallel_jobs', sa.Integer(), nullable=True, server_default='4'))
+        if 'compression_level' not in existing_columns:
+            op.add_column('backup_configs', sa.Column('compression_level', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    
+    if 'backup_configs' in inspector.get_table_names():
+        existing_columns = [col['name'] for col in inspector.get_columns('backup_configs')]
+        
+        for column in ('compression_level', 'parallel_jobs', 'backup_format'):
+            if column in existing_columns:
+                op.drop_column('backup_configs', column)
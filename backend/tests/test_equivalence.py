@@ -0,0 +1,44 @@
+"""
+Differential-Test in CI: calculations.py und die Portfolio-Engine müssen auf
+den Cent mit der eingefrorenen Referenz übereinstimmen - auf den Grenzfall-
+Beständen des Harness und auf einem generierten Bestand (fester Seed).
+"""
+from datetime import datetime
+
+import pytest
+
+from app.services.equivalence import Case, CaseGenerator, compare_results, get_engine, run_equivalence
+from app.services.portfolio_generator import PortfolioGenerator, build_default_settings
+
+ENGINES = ["current", "portfolio"]
+SEED = 42
+REFERENCE_DATE = datetime(2026, 1, 1)
+
+
+def _failure_summary(result: dict) -> str:
+    return "; ".join(
+        f"Fall-Seed {f['case_seed']}: {f['mismatches'][0]['metric']} @ {f['mismatches'][0]['date']}"
+        for f in result["failures"][:3]
+    )
+
+
+@pytest.mark.parametrize("engine_name", ENGINES)
+def test_engine_matches_reference_on_edge_cases(engine_name):
+    result = run_equivalence(get_engine(engine_name), cases=6, seed=SEED, dates_per_case=12)
+    assert result["failed_cases"] == 0, _failure_summary(result)
+
+
+@pytest.fixture(scope="module")
+def generated_case():
+    generator = PortfolioGenerator(80, seed=SEED, reference_date=REFERENCE_DATE)
+    _, contracts, price_increases, commission_rates = generator.build_models()
+    case = Case(SEED, build_default_settings(), contracts, price_increases, commission_rates)
+    dates = CaseGenerator(SEED, now=REFERENCE_DATE).dates(case, 12)
+    return case, dates, get_engine("reference").evaluate(case, dates)
+
+
+@pytest.mark.parametrize("engine_name", ENGINES)
+def test_engine_matches_reference_on_generated_portfolio(engine_name, generated_case):
+    case, dates, expected = generated_case
+    mismatches = compare_results(expected, get_engine(engine_name).evaluate(case, dates))
+    assert not mismatches, mismatches[:3]
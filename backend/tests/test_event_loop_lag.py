@@ -0,0 +1,168 @@
+"""
+Regressionstest: Provisionssatz-Routen und Versions-Check dürfen den
+Event-Loop nicht blockieren.
+
+Die Handler laufen nebenläufig zu einer Lag-Messung (EventLoopLagMonitor).
+Die DB-Session ist ein Stub mit asynchroner Latenz, "docker inspect" ein
+Skript mit Verzögerung und Docker Hub eine asynchrone Attrappe. Das UPDATE der
+Ledger-Monate trifft im Stub Zeilen, sodass Anlegen/Ändern/Löschen auch den
+Ledger-Job einreichen; job_service.submit schläft dabei synchron wie der
+Insert der Job-Zeile. Blockierender Sync-Code (db.query, subprocess.run,
+job_service.submit auf dem Loop) ließe den Lag über die Schranke steigen.
+"""
+import asyncio
+import stat
+import sys
+import time
+from datetime import datetime
+
+import pytest
+from sqlalchemy.sql.dml import Update
+
+from app.models.commission_rate import CommissionRate as CommissionRateModel
+from app.routers import commission_rates
+from app.routers.system import check_for_updates
+from app.schemas.commission_rate import CommissionRateCreate, CommissionRateUpdate
+from app.services import commission_ledger, version_service
+from app.services.loop_monitor import EventLoopLagMonitor
+
+# Simulierte Dauer einer DB-Abfrage bzw. von docker inspect
+DB_LATENCY = 0.2
+DOCKER_LATENCY = 0.5
+
+# Größte zulässige Verzögerung des Loops während der Anfragen
+MAX_LAG = 0.1
+
+
+class _Result:
+    def __init__(self, rows, rowcount: int = 0):
+        self._rows = rows
+        self.rowcount = rowcount
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return list(self._rows)
+
+    def first(self):
+        return self._rows[0] if self._rows else None
+
+    def scalar(self):
+        return self._rows[0].valid_from if self._rows else None
+
+
+class StubAsyncSession:
+    """AsyncSession-Ersatz: jede Abfrage wartet DB_LATENCY, ohne den Loop zu blockieren"""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    async def execute(self, statement):
+        await asyncio.sleep(DB_LATENCY)
+        # UPDATE commission_ledger_months: abgeschlossene Monate werden ungültig
+        return _Result(self.rows, rowcount=3 if isinstance(statement, Update) else 0)
+
+    def add(self, obj):
+        pass
+
+    async def delete(self, obj):
+        await asyncio.sleep(DB_LATENCY)
+
+    async def commit(self):
+        await asyncio.sleep(DB_LATENCY)
+
+    async def refresh(self, obj):
+        await asyncio.sleep(DB_LATENCY)
+
+
+def _rate() -> CommissionRateModel:
+    return CommissionRateModel(
+        id="rate-1", valid_from=datetime(2024, 1, 1), rates={"software_rental": 20.0}, description=""
+    )
+
+
+@pytest.fixture
+def fake_job_service(monkeypatch):
+    """job_service.submit-Ersatz, der wie der Insert der Job-Zeile synchron blockiert"""
+    submitted = []
+
+    def submit(job_type, func, params=None):
+        time.sleep(DB_LATENCY)
+        submitted.append(job_type)
+        return f"job-{len(submitted)}"
+
+    monkeypatch.setattr(commission_ledger.job_service, "submit", submit)
+    return submitted
+
+
+@pytest.fixture
+def fake_docker(tmp_path, monkeypatch):
+    """docker-CLI-Stub, der DOCKER_LATENCY schläft; Docker Hub und Versionsnummer ohne Netzwerk/DB"""
+    script = tmp_path / "docker"
+    script.write_text(
+        f"#!{sys.executable}\n"
+        "import time\n"
+        f"time.sleep({DOCKER_LATENCY})\n"
+        "print('bimberle/contracts-backend@sha256:local')\n"
+    )
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setattr(version_service.settings, "DOCKER_CLI", str(script))
+
+    async def hub_digest(image, tag="latest"):
+        await asyncio.sleep(DB_LATENCY)
+        return "sha256:hub"
+
+    monkeypatch.setattr(version_service, "get_docker_hub_digest", hub_digest)
+    # app.main würde beim Import die Datenbank initialisieren
+    monkeypatch.setattr(version_service, "get_current_version", lambda: "test")
+
+
+async def _measure(*coroutines) -> EventLoopLagMonitor:
+    monitor = EventLoopLagMonitor(interval=0.01)
+    monitor.start()
+    await asyncio.sleep(0.05)
+    try:
+        await asyncio.gather(*coroutines)
+        # Den letzten Tick noch auswerten lassen
+        await asyncio.sleep(0.05)
+    finally:
+        monitor.stop()
+    return monitor
+
+
+def test_probe_detects_blocking_code():
+    """Gegenprobe: ein blockierender Aufruf im Loop wird als Lag erkannt"""
+    async def blocking():
+        time.sleep(0.3)
+
+    monitor = asyncio.run(_measure(blocking()))
+    assert monitor.max_lag >= 0.25
+
+
+def test_commission_rate_routes_do_not_block_event_loop(fake_job_service):
+    db = StubAsyncSession([_rate()])
+    monitor = asyncio.run(_measure(
+        commission_rates.get_commission_rates(db=db),
+        commission_rates.get_commission_rate("rate-1", db=db),
+        commission_rates.create_commission_rate(CommissionRateCreate(valid_from=datetime(2025, 1, 1)), db=db),
+        commission_rates.update_commission_rate("rate-1", CommissionRateUpdate(description="neu"), db=db),
+        commission_rates.delete_commission_rate("rate-1", db=db),
+        commission_rates.get_effective_commission_rate("2025-06-01", db=db),
+    ))
+    # Anlegen, Ändern und Löschen haben je einen Ledger-Job eingereicht
+    assert fake_job_service == [commission_ledger.LEDGER_JOB_TYPE] * 3
+    assert monitor.samples > 10
+    assert monitor.max_lag < MAX_LAG, f"Event loop blocked for {monitor.max_lag * 1000:.0f} ms"
+
+
+def test_version_check_does_not_block_event_loop(fake_docker):
+    monitor = asyncio.run(_measure(check_for_updates(force=True), check_for_updates(force=True)))
+    assert monitor.samples > 10
+    assert monitor.max_lag < MAX_LAG, f"Event loop blocked for {monitor.max_lag * 1000:.0f} ms"
+
+
+def test_version_check_reads_local_digest_from_docker(fake_docker):
+    result = asyncio.run(version_service.fetch_version_info())
+    assert result["details"][0]["local_digest"].startswith("sha256:local")
+    assert result["update_available"] is True
@@ -0,0 +1,58 @@
+"""
+Monte-Carlo-Forecast: gleicher Seed, gleiches Ergebnis - unabhängig davon,
+in wie große Blöcke das Speicherbudget die Pfade aufteilt.
+"""
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import monte_carlo
+from app.services.portfolio_engine import PortfolioSnapshot
+
+START = datetime(2025, 1, 1)
+
+
+@pytest.fixture(scope="module")
+def snapshot():
+    contracts = [
+        SimpleNamespace(
+            id=f"c{i}", customer_id=f"k{i // 2}",
+            software_rental_amount=100.0 + i, software_care_amount=20.0,
+            apps_amount=0, purchase_amount=0, cloud_amount=0,
+            start_date=datetime(2018 + i % 5, 1 + i % 12, 1),
+            end_date=datetime(2022 + i % 4, 1 + (i * 5) % 12, 1) if i % 3 == 0 else None,
+            is_founder_discount=False, number_of_seats=3,
+            excluded_price_increase_ids=[], included_early_price_increase_ids=[],
+        )
+        for i in range(60)
+    ]
+    settings = SimpleNamespace(
+        founder_delay_months=12, exit_payout_by_type=None, exit_payout_tiers=[],
+        min_contract_months_for_payout=12, personal_tax_rate=30,
+    )
+    return PortfolioSnapshot(contracts, settings, [], [])
+
+
+def _forecast(snapshot, monkeypatch, chunk_budget: int, paths: int = 101):
+    monkeypatch.setattr(monte_carlo, "paths_per_chunk", lambda *args: chunk_budget)
+    model = monte_carlo.fit_churn_model(snapshot, START)
+    return monte_carlo.simulate_forecast(snapshot, model, START, 24, paths, memory_mb=64, seed=7)
+
+
+def test_seed_result_independent_of_chunk_size(snapshot, monkeypatch):
+    whole = _forecast(snapshot, monkeypatch, chunk_budget=10_000)
+    small = _forecast(snapshot, monkeypatch, chunk_budget=20)
+    tiny = _forecast(snapshot, monkeypatch, chunk_budget=1)
+
+    assert whole["paths_per_chunk"] == 101
+    assert small["paths_per_chunk"] == monte_carlo.PATHS_PER_SEED_BLOCK
+    assert tiny["paths_per_chunk"] == monte_carlo.PATHS_PER_SEED_BLOCK
+    assert small["forecast"] == whole["forecast"]
+    assert tiny["forecast"] == whole["forecast"]
+
+
+def test_churn_lowers_forecast(snapshot, monkeypatch):
+    result = _forecast(snapshot, monkeypatch, chunk_budget=10_000)
+    last = result["forecast"][-1]["commission"]
+    assert last["p10"] <= last["p50"] <= last["p90"] <= last["without_churn"]
@@ -0,0 +1,109 @@
+"""
+Query-Budgets pro Endpunkt: Dashboard und Testlauf dürfen unabhängig von der
+Bestandsgröße nur eine feste Anzahl Statements ausführen (N+1-Regressionen
+schlagen hier fehl).
+
+Bestand aus dem PortfolioGenerator (fester Seed) in einer SQLite-In-Memory-
+Datenbank; die Statements zählen die Cursor-Events aus install_db_timing.
+Async-Routen bekommen eine AsyncSession-Fassade über der Sync-Session, die
+Statements laufen also echt gegen die Datenbank.
+"""
+import asyncio
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.models.commission_ledger import CommissionLedgerEntry, CommissionLedgerMonth
+from app.models.commission_rate import CommissionRate
+from app.models.contract import Contract
+from app.models.customer import Customer
+from app.models.price_increase import PriceIncrease
+from app.models.settings import Settings
+from app.routers import analytics
+from app.routers import tests as tests_router
+from app.services.portfolio_generator import PortfolioGenerator, build_default_settings
+from app.utils.query_counter import assert_max_queries
+from app.utils.timing import install_db_timing
+
+REFERENCE_DATE = datetime(2026, 1, 1)
+
+# Kunden, Einstellungen, Preiserhöhungen, Provisionssätze, Verträge, Ledger-Monate
+DASHBOARD_QUERY_BUDGET = 6
+# Verträge, Kunden, Einstellungen, Preiserhöhungen, Provisionssätze
+TEST_RUN_QUERY_BUDGET = 5
+
+TABLES = [
+    Customer.__table__, Contract.__table__, Settings.__table__, PriceIncrease.__table__,
+    CommissionRate.__table__, CommissionLedgerMonth.__table__, CommissionLedgerEntry.__table__,
+]
+
+
+@compiles(JSONB, "sqlite")
+def _jsonb_as_json(type_, compiler, **kw):
+    return "JSON"
+
+
+class SyncBackedAsyncSession:
+    """Minimale AsyncSession-Fassade für lesende Routen (SQLite ohne async-Treiber)"""
+
+    def __init__(self, session):
+        self._session = session
+
+    async def execute(self, statement):
+        return self._session.execute(statement)
+
+
+def _seed(num_contracts: int):
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine, tables=TABLES)
+    install_db_timing(engine)
+
+    generator = PortfolioGenerator(num_contracts, seed=7, reference_date=REFERENCE_DATE)
+    customers, contracts, price_increases, commission_rates = generator.build_models()
+    db = sessionmaker(bind=engine)()
+    db.add_all([build_default_settings(), *customers, *contracts, *price_increases, *commission_rates])
+    db.commit()
+    db.close()
+    return engine, len(customers)
+
+
+@pytest.fixture(params=[20, 120], ids=["small", "large"])
+def portfolio(request):
+    engine, customer_count = _seed(request.param)
+    yield engine, customer_count
+    engine.dispose()
+
+
+def test_dashboard_query_budget(portfolio):
+    engine, customer_count = portfolio
+    db = sessionmaker(bind=engine)()
+    try:
+        with assert_max_queries(DASHBOARD_QUERY_BUDGET, label="GET /api/analytics/dashboard"):
+            response = asyncio.run(analytics.get_dashboard(exit_date=None, db=SyncBackedAsyncSession(db)))
+    finally:
+        db.close()
+    assert response["data"].total_customers == customer_count
+
+
+class _Job:
+    def progress(self, event: dict):
+        pass
+
+    def check_cancelled(self):
+        pass
+
+
+def test_test_run_query_budget(portfolio, monkeypatch):
+    engine, customer_count = portfolio
+    monkeypatch.setattr(tests_router, "SessionLocal", sessionmaker(bind=engine))
+    with assert_max_queries(TEST_RUN_QUERY_BUDGET, label="Testlauf") as stats:
+        result = tests_router.run_test_categories(_Job())
+
+    assert result["summary"]["total_tests"] > 0
+    assert stats.count == TEST_RUN_QUERY_BUDGET
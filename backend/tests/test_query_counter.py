@@ -0,0 +1,68 @@
+"""
+Query-Counter: assert_max_queries gegen eine befüllte Session.
+In-Memory-SQLite mit den Tabellen customers und contracts; die Statements
+kommen wie in der App über die Cursor-Events aus install_db_timing.
+"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import selectinload, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.models.contract import Contract
+from app.models.customer import Customer
+from app.utils.query_counter import assert_max_queries, fingerprint
+from app.utils.timing import install_db_timing
+
+CUSTOMER_COUNT = 5
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Customer.__table__.create(engine)
+    Contract.__table__.create(engine)
+    install_db_timing(engine)
+
+    db = sessionmaker(bind=engine)()
+    for i in range(CUSTOMER_COUNT):
+        customer = Customer(name=f"Kunde {i}", ort="Berlin", plz="10115", kundennummer=f"K{i:07d}")
+        customer.contracts = [
+            Contract(start_date=datetime(2024, 1, 1), software_rental_amount=100.0 * (j + 1))
+            for j in range(2)
+        ]
+        db.add(customer)
+    db.commit()
+    db.expunge_all()
+    try:
+        yield db
+    finally:
+        db.close()
+        engine.dispose()
+
+
+def test_eager_loading_stays_within_limit(session):
+    with assert_max_queries(2) as stats:
+        customers = session.query(Customer).options(selectinload(Customer.contracts)).all()
+        total = sum(len(customer.contracts) for customer in customers)
+
+    assert total == CUSTOMER_COUNT * 2
+    assert stats.count == 2
+
+
+def test_lazy_loading_n_plus_one_fails(session):
+    with pytest.raises(AssertionError) as excinfo:
+        with assert_max_queries(2, label="customer list"):
+            for customer in session.query(Customer).all():
+                len(customer.contracts)
+
+    message = str(excinfo.value)
+    assert message.startswith(f"customer list executed {CUSTOMER_COUNT + 1} queries (max 2)")
+    # Die Lazy-Loads der Verträge erscheinen als ein wiederholter Fingerprint
+    assert f"{CUSTOMER_COUNT}x SELECT contracts." in message
+
+
+def test_fingerprint_normalizes_literals_and_in_lists():
+    assert fingerprint("SELECT * FROM t WHERE id IN (1, 2, 3) AND name = 'x'") == \
+        fingerprint("SELECT *  FROM t WHERE id IN (7, 8) AND name = 'y'")
@@ -0,0 +1,78 @@
+"""
+Szenario-Vorschau: Änderung pro Vertrag (seitenweise, sortiert, filterbar)
+auf einem generierten Bestand.
+"""
+from datetime import datetime
+
+import pytest
+
+from app.services.portfolio_engine import PortfolioSnapshot
+from app.services.portfolio_generator import PortfolioGenerator, build_default_settings
+from app.services.scenarios import ContractPage, commission_rate_scenario, price_increase_scenario
+
+EVALUATION_DATE = datetime(2026, 1, 1)
+
+
+class _PriceIncrease:
+    valid_from = datetime(2025, 7, 1)
+    amount_increases = {"software_rental": 5.0, "apps": 3.0}
+    lock_in_months = 12
+
+
+class _Proposal:
+    replaces_id = None
+    valid_from = datetime(2025, 6, 1)
+    rates = {"software_rental": 30.0, "software_care": 10.0, "apps": 20.0, "purchase": 10.0, "cloud": 10.0}
+
+
+@pytest.fixture(scope="module")
+def portfolio():
+    generator = PortfolioGenerator(200, seed=3, reference_date=EVALUATION_DATE)
+    _, contracts, price_increases, commission_rates = generator.build_models()
+    return PortfolioSnapshot(contracts, build_default_settings(), price_increases, commission_rates), contracts
+
+
+def _commission_deltas(result: dict):
+    return [abs(c["monthly_commission"]["delta"]) for c in result["contracts"]]
+
+
+def test_commission_rate_contract_pages(portfolio):
+    snapshot, _ = portfolio
+    full = commission_rate_scenario(snapshot, _Proposal(), EVALUATION_DATE, 0, ContractPage(limit=10_000))
+    second = commission_rate_scenario(snapshot, _Proposal(), EVALUATION_DATE, 0, ContractPage(offset=5, limit=5))
+
+    assert full["contracts_total"] == full["affected_contracts"] == len(full["contracts"]) > 10
+    assert _commission_deltas(full) == sorted(_commission_deltas(full), reverse=True)
+    assert second["contracts"] == full["contracts"][5:10]
+    assert sum(c["monthly_commission"]["delta"] for c in full["contracts"]) == pytest.approx(
+        full["totals"]["monthly_commission"]["delta"], abs=0.01 * len(full["contracts"])
+    )
+
+
+def test_commission_rate_contract_filters(portfolio):
+    snapshot, contracts = portfolio
+    contract = contracts[0]
+    by_contract = commission_rate_scenario(
+        snapshot, _Proposal(), EVALUATION_DATE, 0, ContractPage(contract_id=contract.id)
+    )
+    by_customer = commission_rate_scenario(
+        snapshot, _Proposal(), EVALUATION_DATE, 0, ContractPage(customer_id=contract.customer_id)
+    )
+
+    assert [c["contract_id"] for c in by_contract["contracts"]] == [contract.id]
+    assert {c["contract_id"] for c in by_customer["contracts"]} == {
+        c.id for c in contracts if c.customer_id == contract.customer_id
+    }
+
+
+def test_price_increase_contract_deltas(portfolio):
+    snapshot, _ = portfolio
+    full = price_increase_scenario(snapshot, [_PriceIncrease()], EVALUATION_DATE, 0, ContractPage(limit=10_000))
+    changed = full["contracts"][0]
+    single = price_increase_scenario(
+        snapshot, [_PriceIncrease()], EVALUATION_DATE, 0, ContractPage(contract_id=changed["contract_id"])
+    )
+
+    assert full["contracts_total"] == full["affected_contracts"] == len(full["contracts"]) > 0
+    assert changed["monthly_revenue"]["delta"] > 0
+    assert single["contracts"] == [changed]
@@ -117,7 +117,7 @@ export default function BackupSettings({ onBackupRestored }: BackupSettingsProps
       }
     } catch (err: any) {
       console.error('Error creating backup:', err);
-      alert(err.response?.data?.detail || 'Fehler beim Erstellen des Backups');
+      alert(err.response?.data?.detail || err.message || 'Fehler beim Erstellen des Backups');
     } finally {
       setCreatingBackup(false);
     }
@@ -160,7 +160,7 @@ export default function BackupSettings({ onBackupRestored }: BackupSettingsProps
       onBackupRestored?.();
     } catch (err: any) {
       console.error('Error restoring backup:', err);
-      alert(err.response?.data?.detail || 'Fehler beim Wiederherstellen des Backups');
+      alert(err.response?.data?.detail || err.message || 'Fehler beim Wiederherstellen des Backups');
     } finally {
       setRestoringBackup(null);
     }
@@ -268,6 +268,50 @@ export default function BackupSettings({ onBackupRestored }: BackupSettingsProps
             <p className="text-sm text-gray-500 mt-1">Ältere Backups werden automatisch gelöscht</p>
           </div>
 
+          {/* Backup Format */}
+          <div>
+            <label className="block font-medium text-gray-700 mb-2">Backup-Format</label>
+            <select
+              value={config?.backupFormat ?? 'custom'}
+              onChange={(e) => config && setConfig({ ...config, backupFormat: e.target.value as 'custom' | 'directory' })}
+              className="px-4 py-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-blue-500 focus:border-transparent outline-none"
+            >
+              <option value="custom">Eine Datei (.sql)</option>
+              <option value="directory">Parallel, gepackt (.tar.zst)</option>
+            </select>
+            <p className="text-sm text-gray-500 mt-1">Das parallele Format ist bei großen Datenbanken deutlich schneller</p>
+          </div>
+
+          {/* Parallel Jobs & Compression */}
+          <div className="flex gap-6">
+            <div>
+              <label className="block font-medium text-gray-700 mb-2">Parallele Prozesse</label>
+              <input
+                type="number"
+                min="1"
+                max="32"
+                value={config?.parallelJobs ?? 4}
+                onChange={(e) => config && setConfig({ ...config, parallelJobs: parseInt(e.target.value) || 1 })}
+                className="w-24 px-4 py-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-blue-500 focus:border-transparent outline-none"
+              />
+            </div>
+            <div>
+              <label className="block font-medium text-gray-700 mb-2">Kompressionsstufe</label>
+              <input
+                type="number"
+                min="0"
+                max="19"
+                placeholder="Standard"
+                value={config?.compressionLevel ?? ''}
+                onChange={(e) => config && setConfig({
+                  ...config,
+                  compressionLevel: e.target.value === '' ? null : parseInt(e.target.value)
+                })}
+                className="w-28 px-4 py-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-blue-500 focus:border-transparent outline-none"
+              />
+            </div>
+          </div>
+
           {/* Save Button */}
           <div className="pt-4 border-t">
             <button
@@ -42,12 +42,20 @@ export default function CalculationTests() {
   const [error, setError] = useState<string | null>(null);
   const [expandedTests, setExpandedTests] = useState<Set<number>>(new Set());
   const [filterCategory, setFilterCategory] = useState<string>('all');
+  const [progress, setProgress] = useState<{ completed: number; total: number } | null>(null);
 
   const runTests = async () => {
     try {
       setLoading(true);
       setError(null);
-      const response = await api.runCalculationTests();
+      setProgress(null);
+      const response = await api.runCalculationTests((events) => {
+        const finished = events.filter((e: any) => e.type === 'category_finished');
+        const last = finished[finished.length - 1];
+        if (last) {
+          setProgress({ completed: last.completed, total: last.total });
+        }
+      });
       setResults(response);
       // Expand all tests with warnings by default
       const warningIndices = new Set<number>();
@@ -59,7 +67,7 @@ export default function CalculationTests() {
       setExpandedTests(warningIndices);
     } catch (err: any) {
       console.error('Error running tests:', err);
-      setError(err.response?.data?.detail || 'Fehler beim Ausführen der Tests');
+      setError(err.response?.data?.detail || err.message || 'Fehler beim Ausführen der Tests');
     } finally {
       setLoading(false);
     }
@@ -123,7 +131,7 @@ export default function CalculationTests() {
           {loading ? (
             <>
               <div className="animate-spin rounded-full h-4 w-4 border-b-2 border-white"></div>
-              Tests laufen...
+              Tests laufen...{progress && ` (${progress.completed}/${progress.total})`}
             </>
           ) : (
             <>
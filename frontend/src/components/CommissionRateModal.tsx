@@ -1,4 +1,5 @@
 import { useState, useEffect } from 'react';
+import { ScenarioResult } from '../types';
 
 // Hilfsfunktion für Komma-Anzeige - Strings werden direkt durchgelassen
 const displayWithComma = (val: number | string): string => {
@@ -50,6 +51,8 @@ export default function CommissionRateModal({
   });
   const [error, setError] = useState<string | null>(null);
   const [loading, setLoading] = useState(false);
+  const [preview, setPreview] = useState<ScenarioResult | null>(null);
+  const [previewLoading, setPreviewLoading] = useState(false);
 
   useEffect(() => {
     if (isOpen) {
@@ -81,9 +84,58 @@ export default function CommissionRateModal({
         });
       }
       setError(null);
+      setPreview(null);
     }
   }, [isOpen, commissionRate]);
 
+  // Hilfsfunktion zum Parsen (Komma → Punkt)
+  const parseRate = (val: number | string): number => {
+    if (typeof val === 'number') return val;
+    return parseFloat(val.replace(',', '.')) || 0;
+  };
+
+  const buildPayload = () => ({
+    validFrom: new Date(formData.validFrom + 'T12:00:00').toISOString(),
+    rates: {
+      software_rental: parseRate(formData.rates.softwareRental),
+      software_care: parseRate(formData.rates.softwareCare),
+      apps: parseRate(formData.rates.apps),
+      purchase: parseRate(formData.rates.purchase),
+      cloud: parseRate(formData.rates.cloud),
+    },
+    description: formData.description,
+  });
+
+  // Trockenlauf: Auswirkung auf Provision und Exit-Zahlungen ohne zu speichern
+  const handlePreview = async () => {
+    setError(null);
+    setPreviewLoading(true);
+    try {
+      const response = await fetch('/api/scenarios/commission-rates', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({
+          ...buildPayload(),
+          replacesId: commissionRate?.id,
+          topCustomers: 0,
+          contractLimit: 0,
+        }),
+      });
+      const data = await response.json();
+      if (!response.ok) {
+        throw new Error(data.detail || 'Fehler bei der Vorschau');
+      }
+      setPreview(data.data);
+    } catch (err) {
+      setError(err instanceof Error ? err.message : 'Fehler bei der Vorschau');
+    } finally {
+      setPreviewLoading(false);
+    }
+  };
+
+  const formatDelta = (value: number) =>
+    `${value >= 0 ? '+' : ''}${value.toLocaleString('de-DE', { minimumFractionDigits: 2, maximumFractionDigits: 2 })} €`;
+
   const handleChange = (field: string, value: string | number) => {
     if (field.startsWith('rates.')) {
       const rateField = field.split('.')[1];
@@ -108,24 +160,8 @@ export default function CommissionRateModal({
     setError(null);
     setLoading(true);
 
-    // Hilfsfunktion zum Parsen (Komma → Punkt)
-    const parseRate = (val: number | string): number => {
-      if (typeof val === 'number') return val;
-      return parseFloat(val.replace(',', '.')) || 0;
-    };
-
     try {
-      const payload = {
-        validFrom: new Date(formData.validFrom + 'T12:00:00').toISOString(),
-        rates: {
-          software_rental: parseRate(formData.rates.softwareRental),
-          software_care: parseRate(formData.rates.softwareCare),
-          apps: parseRate(formData.rates.apps),
-          purchase: parseRate(formData.rates.purchase),
-          cloud: parseRate(formData.rates.cloud),
-        },
-        description: formData.description,
-      };
+      const payload = buildPayload();
 
       const url = commissionRate
         ? `/api/commission-rates/${commissionRate.id}`
@@ -274,6 +310,33 @@ export default function CommissionRateModal({
             />
           </div>
 
+          <div className="border-t pt-4">
+            <button
+              type="button"
+              onClick={handlePreview}
+              className="w-full px-4 py-2 border border-blue-300 text-blue-700 rounded-lg hover:bg-blue-50 transition disabled:opacity-50"
+              disabled={previewLoading}
+            >
+              {previewLoading ? 'Berechnet...' : 'Auswirkung berechnen'}
+            </button>
+            {preview && (
+              <div className="mt-3 bg-gray-50 border border-gray-200 rounded-lg p-3 text-sm space-y-1">
+                <p className="text-gray-600">
+                  Stichtag {new Date(preview.evaluationDate).toLocaleDateString('de-DE')},{' '}
+                  {preview.affectedContracts} von {preview.totalContracts} Verträgen betroffen
+                </p>
+                <p className="flex justify-between">
+                  <span className="text-gray-700">Monatliche Provision</span>
+                  <span className="font-medium">{formatDelta(preview.totals.monthlyCommission.delta)}</span>
+                </p>
+                <p className="flex justify-between">
+                  <span className="text-gray-700">Exit-Zahlungen</span>
+                  <span className="font-medium">{formatDelta(preview.totals.exitPayout.delta)}</span>
+                </p>
+              </div>
+            )}
+          </div>
+
           <div className="flex gap-3 pt-4">
             <button
               type="button"
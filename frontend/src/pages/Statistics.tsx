@@ -2,8 +2,8 @@ import { useState, useEffect, useCallback } from 'react';
 import Forecast from './Forecast';
 import ContractStatistics from '../components/ContractStatistics';
 import api from '../services/api';
-import { DashboardSummary } from '../types';
-import { formatCurrency } from '../utils/formatting';
+import { DashboardSummary, ExitPayoutCurve } from '../types';
+import { formatCurrency, formatDate } from '../utils/formatting';
 
 function Statistics() {
   const [activeTab, setActiveTab] = useState<'forecast' | 'contracts'>('forecast');
@@ -11,22 +11,39 @@ function Statistics() {
   const [loading, setLoading] = useState(true);
   const [exitDate, setExitDate] = useState<string>('');
   const [isExitModalOpen, setIsExitModalOpen] = useState(false);
+  const [exitCurve, setExitCurve] = useState<ExitPayoutCurve | null>(null);
 
   const loadSummary = useCallback(async () => {
     try {
-      const dashboardData = await api.getDashboard(exitDate || undefined);
+      const dashboardData = await api.getDashboard();
       setSummary(dashboardData);
     } catch (err) {
       console.error('Fehler beim Laden der Übersicht:', err);
     } finally {
       setLoading(false);
     }
-  }, [exitDate]);
+  }, []);
 
   useEffect(() => {
     loadSummary();
   }, [loadSummary]);
 
+  // Exit-Zahlung zum Stichtag plus jährlicher Verlauf der folgenden 5 Jahre in einem Aufruf
+  useEffect(() => {
+    if (!isExitModalOpen) return;
+    let cancelled = false;
+    api.getExitPayoutCurve(exitDate || undefined, 60, 12)
+      .then((curve) => {
+        if (!cancelled) setExitCurve(curve);
+      })
+      .catch((err) => console.error('Fehler beim Laden der Exit-Zahlung:', err));
+    return () => {
+      cancelled = true;
+    };
+  }, [exitDate, isExitModalOpen]);
+
+  const exitPoint = exitCurve?.points[0];
+
   return (
     <div className="flex flex-col h-full overflow-auto gap-4">
       {/* KPI Cards - kompakt, 7 Kacheln */}
@@ -149,14 +166,31 @@ function Statistics() {
               <div className="bg-gray-50 rounded-lg p-4 space-y-3">
                 <div className="flex justify-between">
                   <span className="text-gray-600">Exit-Zahlung (Brutto)</span>
-                  <span className="font-bold text-gray-900">{formatCurrency(summary.totalExitPayout)}</span>
+                  <span className="font-bold text-gray-900">{formatCurrency(exitPoint?.totalExitPayout ?? summary.totalExitPayout)}</span>
                 </div>
                 <div className="flex justify-between">
                   <span className="text-gray-600">Exit-Zahlung (Netto)</span>
-                  <span className="font-bold text-green-600 text-lg">{formatCurrency(summary.totalExitPayoutNet)}</span>
+                  <span className="font-bold text-green-600 text-lg">{formatCurrency(exitPoint?.totalExitPayoutNet ?? summary.totalExitPayoutNet)}</span>
                 </div>
               </div>
 
+              {exitCurve && exitCurve.points.length > 1 && (
+                <div>
+                  <div className="text-sm font-medium text-gray-700 mb-2">Verlauf bei späterem Exit</div>
+                  <div className="space-y-1 text-sm">
+                    {exitCurve.points.map((point) => (
+                      <div key={point.date} className="flex justify-between">
+                        <span className="text-gray-600">{formatDate(point.date)}</span>
+                        <span className="text-gray-900">
+                          {formatCurrency(point.totalExitPayout)}
+                          <span className="text-green-600 ml-2">({formatCurrency(point.totalExitPayoutNet)} netto)</span>
+                        </span>
+                      </div>
+                    ))}
+                  </div>
+                </div>
+              )}
+
               <div className="flex justify-end gap-3 mt-6">
                 <button
                   onClick={() => setIsExitModalOpen(false)}
@@ -9,6 +9,7 @@ import {
   ApiResponse,
   Forecast,
   DashboardSummary,
+  ExitPayoutCurve,
   CustomerCreateRequest,
   CustomerUpdateRequest,
   ContractCreateRequest,
@@ -334,6 +335,16 @@ class ApiClient {
     return response.data.data!;
   }
 
+  async getExitPayoutCurve(fromDate?: string, months: number = 60, stepMonths: number = 1): Promise<ExitPayoutCurve> {
+    const params: Record<string, unknown> = { months, step_months: stepMonths };
+    if (fromDate) {
+      params.from_date = fromDate;
+    }
+    const url = this.buildUrl('/analytics/exit-payout-curve', params);
+    const response = await this.axiosInstance.get<ApiResponse<ExitPayoutCurve>>(url);
+    return response.data.data!;
+  }
+
   async getForecast(months: number = 12): Promise<Forecast> {
     const url = this.buildUrl('/analytics/forecast', { months });
     const response = await this.axiosInstance.get<ApiResponse<Forecast>>(url);
@@ -399,15 +410,42 @@ class ApiClient {
     return response.data.data!;
   }
 
-  async createBackup(): Promise<{ filename: string; databaseName: string }> {
+  // Backup und Restore laufen als Hintergrund-Job; es wird bis zum Ende gepollt
+  async createBackup(onProgress?: (progress: any[]) => void): Promise<{ filename: string; databaseName: string }> {
     const url = this.buildUrl('/backups/create');
-    const response = await this.axiosInstance.post<ApiResponse<{ filename: string; databaseName: string }>>(url, {});
-    return response.data.data!;
+    const response = await this.axiosInstance.post(url, {});
+    return this.waitForBackupJob(response.data.data.job_id, 'Backup fehlgeschlagen', onProgress);
   }
 
-  async restoreBackup(backupId: string): Promise<void> {
+  async restoreBackup(backupId: string, onProgress?: (progress: any[]) => void): Promise<void> {
     const url = this.buildUrl('/backups/restore');
-    await this.axiosInstance.post(url, { backupId });
+    const response = await this.axiosInstance.post(url, { backupId });
+    await this.waitForBackupJob(response.data.data.job_id, 'Restore fehlgeschlagen', onProgress);
+  }
+
+  async getBackupJob(jobId: string): Promise<any> {
+    const url = this.buildUrl(`/backups/jobs/${jobId}`);
+    const response = await this.axiosInstance.get(url);
+    return response.data.data;
+  }
+
+  async cancelBackupJob(jobId: string): Promise<void> {
+    const url = this.buildUrl(`/backups/jobs/${jobId}/cancel`);
+    await this.axiosInstance.post(url);
+  }
+
+  private async waitForBackupJob(jobId: string, failureMessage: string, onProgress?: (progress: any[]) => void): Promise<any> {
+    while (true) {
+      await new Promise(resolve => setTimeout(resolve, 1000));
+      const job = await this.getBackupJob(jobId);
+      onProgress?.(job.progress || []);
+      if (job.status === 'succeeded') {
+        return job.result;
+      }
+      if (job.status === 'failed' || job.status === 'cancelled') {
+        throw new Error(job.error_message || failureMessage);
+      }
+    }
   }
 
   async deleteBackup(filename: string): Promise<void> {
@@ -421,9 +459,28 @@ class ApiClient {
 
   // ==================== Tests ====================
 
-  async runCalculationTests(): Promise<any> {
+  // Startet den Testlauf als Hintergrund-Job und pollt bis zum Ergebnis
+  async runCalculationTests(onProgress?: (progress: any[]) => void): Promise<any> {
     const url = this.buildUrl('/tests/run');
     const response = await this.axiosInstance.post(url);
+    const jobId: string = response.data.data.job_id;
+
+    while (true) {
+      await new Promise(resolve => setTimeout(resolve, 1000));
+      const job = await this.getCalculationTestJob(jobId);
+      onProgress?.(job.progress || []);
+      if (job.status === 'succeeded') {
+        return job.result;
+      }
+      if (job.status === 'failed' || job.status === 'cancelled') {
+        throw new Error(job.error_message || 'Testlauf fehlgeschlagen');
+      }
+    }
+  }
+
+  async getCalculationTestJob(jobId: string): Promise<any> {
+    const url = this.buildUrl(`/tests/jobs/${jobId}`);
+    const response = await this.axiosInstance.get(url);
     return response.data.data;
   }
 }
@@ -371,6 +371,61 @@ export interface DashboardSummary {
   }>;
 }
 
+// Exit-Zahlung Verlauf über mehrere Stichtage
+export interface ExitPayoutPoint {
+  date: string;
+  totalExitPayout: number;
+  totalExitPayoutNet: number;
+}
+
+export interface ExitPayoutCurve {
+  points: ExitPayoutPoint[];
+  customers: Array<{
+    customerId: string;
+    customerName: string | null;
+    exitPayouts: number[];
+  }>;
+}
+
+// Was-wäre-wenn-Vorschau (Preiserhöhung / Provisionssatz)
+export interface MetricDelta {
+  before: number;
+  after: number;
+  delta: number;
+}
+
+export interface ScenarioTotals {
+  monthlyRevenue: MetricDelta;
+  monthlyCommission: MetricDelta;
+  exitPayout: MetricDelta;
+}
+
+export interface CustomerScenarioDelta extends ScenarioTotals {
+  customerId: string;
+  customerName: string | null;
+  kundennummer: string | null;
+}
+
+export interface ContractScenarioDelta extends ScenarioTotals {
+  contractId: string;
+  customerId: string;
+  customerName: string | null;
+  kundennummer: string | null;
+}
+
+export interface ScenarioResult {
+  evaluationDate: string;
+  totalContracts: number;
+  affectedContracts: number;
+  affectedCustomers: number;
+  totals: ScenarioTotals;
+  customers: CustomerScenarioDelta[];
+  // Seite der Verträge, sortiert nach Betrag der Änderung
+  contracts: ContractScenarioDelta[];
+  contractsTotal: number;
+  eligibleContracts: number[];
+}
+
 // Backup Configuration
 export interface BackupConfig {
   id: string;
@@ -378,6 +433,9 @@ export interface BackupConfig {
   scheduleTime: string;
   maxBackups: number;
   isEnabled: boolean;
+  backupFormat: 'custom' | 'directory';
+  parallelJobs: number;
+  compressionLevel: number | null;
   lastBackupAt: string | null;
   lastBackupStatus: string | null;
   backupDirectory: string;